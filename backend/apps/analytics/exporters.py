@@ -0,0 +1,257 @@
+"""
+Streaming tabular file writers for reports and data exports (CSV, XLSX,
+HTML, PDF, NDJSON and XML)
+
+Each writer receives rows one at a time and writes them straight to a
+binary file object, so the size of the result set never decides the memory
+used. ``write_table`` drives a writer over any row iterable (typically
+``queryset.values_list(...).iterator(chunk_size=...)``).
+"""
+import csv
+import io
+import json
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from html import escape
+from uuid import UUID
+from xml.sax.saxutils import escape as xml_escape, quoteattr
+
+from django.utils import timezone
+
+
+def to_text(value):
+    """Plain text representation of a cell value"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+class TableWriter:
+    """Base class: ``write_row`` per row, then ``close`` once"""
+
+    extension = ''
+    content_type = 'application/octet-stream'
+
+    def __init__(self, stream, headers, title='Report'):
+        self.stream = stream
+        self.headers = list(headers)
+        self.title = title
+
+    def write_row(self, row):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CSVWriter(TableWriter):
+    extension = 'csv'
+    content_type = 'text/csv'
+
+    def __init__(self, stream, headers, title='Report'):
+        super().__init__(stream, headers, title)
+        self.text = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        self.writer = csv.writer(self.text)
+        self.writer.writerow(self.headers)
+
+    def write_row(self, row):
+        self.writer.writerow([to_text(value) for value in row])
+
+    def close(self):
+        self.text.flush()
+        self.text.detach()
+
+
+class ExcelWriter(TableWriter):
+    """XLSX via openpyxl's write-only mode (rows are spooled to disk, not kept)"""
+
+    extension = 'xlsx'
+    content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    def __init__(self, stream, headers, title='Report'):
+        from openpyxl import Workbook
+
+        super().__init__(stream, headers, title)
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(title=re.sub(r'[\\/*?:\[\]]', ' ', title)[:31] or 'Report')
+        self.sheet.append(self.headers)
+
+    def write_row(self, row):
+        self.sheet.append([self._cell(value) for value in row])
+
+    @staticmethod
+    def _cell(value):
+        if isinstance(value, datetime):
+            # Excel has no time zones
+            return timezone.localtime(value).replace(tzinfo=None) if timezone.is_aware(value) else value
+        if isinstance(value, (date, int, float, Decimal, bool)) or value is None:
+            return value
+        if isinstance(value, UUID):
+            return str(value)
+        return to_text(value)
+
+    def close(self):
+        self.workbook.save(self.stream)
+
+
+class HTMLWriter(TableWriter):
+    extension = 'html'
+    content_type = 'text/html'
+
+    def __init__(self, stream, headers, title='Report'):
+        super().__init__(stream, headers, title)
+        self._write(
+            f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{escape(title)}</title></head>"
+            f"<body><h1>{escape(title)}</h1>\n<table border=\"1\"><thead><tr>"
+            + ''.join(f"<th>{escape(str(header))}</th>" for header in self.headers)
+            + "</tr></thead>\n<tbody>\n"
+        )
+
+    def _write(self, text):
+        self.stream.write(text.encode('utf-8'))
+
+    def write_row(self, row):
+        self._write('<tr>' + ''.join(f"<td>{escape(to_text(value))}</td>" for value in row) + '</tr>\n')
+
+    def close(self):
+        self._write('</tbody></table></body></html>\n')
+
+
+class PDFWriter(TableWriter):
+    """
+    Landscape A4 table drawn line by line with reportlab's canvas
+
+    Cells are truncated to their column width. Rows are not collected into a
+    platypus ``Table``, though reportlab still keeps the finished pages until
+    ``save()``; prefer CSV/XLSX for very large results.
+    """
+
+    extension = 'pdf'
+    content_type = 'application/pdf'
+
+    FONT = 'Helvetica'
+    FONT_SIZE = 7
+    LINE_HEIGHT = 10
+    MARGIN = 30
+
+    def __init__(self, stream, headers, title='Report'):
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.pdfgen import canvas
+
+        super().__init__(stream, headers, title)
+        self.width, self.height = landscape(A4)
+        self.canvas = canvas.Canvas(stream, pagesize=(self.width, self.height))
+        self.canvas.setTitle(title)
+        self.column_width = (self.width - 2 * self.MARGIN) / max(len(self.headers), 1)
+        self._new_page()
+
+    def _new_page(self):
+        self.y = self.height - self.MARGIN
+        self.canvas.setFont(f"{self.FONT}-Bold", self.FONT_SIZE + 3)
+        self.canvas.drawString(self.MARGIN, self.y, self.title)
+        self.y -= self.LINE_HEIGHT * 2
+        self._draw_line(self.headers, bold=True)
+
+    def _draw_line(self, values, bold=False):
+        font = f"{self.FONT}-Bold" if bold else self.FONT
+        self.canvas.setFont(font, self.FONT_SIZE)
+        for index, value in enumerate(values):
+            text = to_text(value)
+            limit = self.column_width - 4
+            while text and self.canvas.stringWidth(text, font, self.FONT_SIZE) > limit:
+                text = text[:-1]
+            self.canvas.drawString(self.MARGIN + index * self.column_width, self.y, text)
+        self.y -= self.LINE_HEIGHT
+
+    def write_row(self, row):
+        if self.y < self.MARGIN:
+            self.canvas.showPage()
+            self._new_page()
+        self._draw_line(row)
+
+    def close(self):
+        self.canvas.save()
+
+
+class NDJSONWriter(TableWriter):
+    """One JSON object per line keyed by the headers (decimals kept as strings)"""
+
+    extension = 'ndjson'
+    content_type = 'application/x-ndjson'
+
+    def write_row(self, row):
+        record = {
+            header: value if value is None or isinstance(value, (bool, int, float, str)) else to_text(value)
+            for header, value in zip(self.headers, row)
+        }
+        self.stream.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+
+
+class XMLWriter(TableWriter):
+    """``<rows><row><field>value</field>...</row></rows>``"""
+
+    extension = 'xml'
+    content_type = 'application/xml'
+
+    def __init__(self, stream, headers, title='Report'):
+        super().__init__(stream, headers, title)
+        self.tags = [re.sub(r'[^A-Za-z0-9_.-]', '_', str(header)) or 'field' for header in self.headers]
+        self.tags = [tag if re.match(r'[A-Za-z_]', tag) else f"_{tag}" for tag in self.tags]
+        self._write(f'<?xml version="1.0" encoding="utf-8"?>\n<rows name={quoteattr(title)}>\n')
+
+    def _write(self, text):
+        self.stream.write(text.encode('utf-8'))
+
+    def write_row(self, row):
+        self._write('<row>' + ''.join(
+            f"<{tag}>{xml_escape(to_text(value))}</{tag}>" for tag, value in zip(self.tags, row)
+        ) + '</row>\n')
+
+    def close(self):
+        self._write('</rows>\n')
+
+
+WRITERS = {
+    'csv': CSVWriter,
+    'excel': ExcelWriter,
+    'html': HTMLWriter,
+    'pdf': PDFWriter,
+    'json': NDJSONWriter,
+    'xml': XMLWriter,
+}
+
+
+def get_writer_class(output_format):
+    """Writer class for ``output_format``; raises ValueError if unsupported"""
+    try:
+        return WRITERS[output_format]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported output format '{output_format}'. "
+            f"Choose one of: {', '.join(sorted(WRITERS))}"
+        )
+
+
+def write_table(stream, output_format, headers, rows, **options):
+    """
+    Stream ``rows`` into ``stream`` in ``output_format``
+
+    Returns:
+        int: Number of rows written
+    """
+    writer = get_writer_class(output_format)(stream, headers, **options)
+    count = 0
+    for row in rows:
+        writer.write_row(row)
+        count += 1
+    writer.close()
+    return count
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataexport',
+            name='export_type',
+            field=models.CharField(choices=[('employees', 'Employees'), ('attendance', 'Attendance'), ('projects', 'Projects'), ('tasks', 'Tasks'), ('invoices', 'Invoices'), ('expenses', 'Expenses'), ('clients', 'Clients'), ('tickets', 'Tickets'), ('assets', 'Assets'), ('custom', 'Custom Export')], max_length=50),
+        ),
+    ]
@@ -403,6 +403,7 @@ class DataExport(TimeStampedModel):
     
     EXPORT_TYPE_CHOICES = [
         ('employees', 'Employees'),
+        ('attendance', 'Attendance'),
         ('projects', 'Projects'),
         ('tasks', 'Tasks'),
         ('invoices', 'Invoices'),
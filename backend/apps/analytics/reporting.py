@@ -0,0 +1,413 @@
+"""
+Report execution engine
+
+Turns a ``Report`` definition into an ORM query and streams the result into
+a file attached to a ``ReportExecution``:
+
+* ``data_source``: a key of ``DATA_SOURCES`` (e.g. ``'invoices'``); when
+  empty the source is derived from ``report_type``
+* ``columns_config``: list of field paths (``'client__name'``) or
+  ``{"field": ..., "label": ...}`` dicts; defaults to the model's own fields
+* ``filters_config``: ``{"status": "paid", "issue_date__gte": "$start"}`` or
+  a list of ``{"field", "operator", "value"}`` dicts. ``"$name"`` values are
+  taken from the execution ``parameters``; filters whose parameter is not
+  supplied are skipped
+* ``grouping_config``: ``{"group_by": [...], "aggregates": [{"field",
+  "function", "label"}]}`` (a plain list means group by those fields and count)
+* ``sorting_config``: list of field paths/output labels, ``-`` for descending
+* ``query_config``: ``{"limit": N, "distinct": true}``
+
+Rows are read with ``values_list().iterator(chunk_size=REPORT_CHUNK_SIZE)``,
+written by ``apps.analytics.exporters`` into a temporary file and then
+saved to ``ReportExecution.output_file``, so memory stays flat regardless
+of the number of rows.
+"""
+import logging
+import os
+import tempfile
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.files import File
+from django.db.models import Avg, Count, Max, Min, Sum, Value
+from django.utils import timezone
+from django.utils.text import slugify
+
+from apps.analytics.exporters import get_writer_class, write_table
+from apps.analytics.models import ReportExecution
+
+logger = logging.getLogger(__name__)
+
+# Models reports may read from
+DATA_SOURCES = {
+    'employees': 'hr.Employee',
+    'departments': 'hr.Department',
+    'attendance': 'hr.Attendance',
+    'leaves': 'hr.Leave',
+    'payroll': 'hr.Payroll',
+    'projects': 'project.Project',
+    'tasks': 'project.Task',
+    'timesheets': 'project.Timesheet',
+    'invoices': 'finance.Invoice',
+    'invoice_lines': 'finance.InvoiceLine',
+    'payments': 'finance.Payment',
+    'expenses': 'finance.Expense',
+    'journal_entries': 'finance.JournalEntry',
+    'general_ledger': 'finance.GeneralLedger',
+    'budgets': 'finance.Budget',
+    'clients': 'crm.Client',
+    'leads': 'crm.Lead',
+    'opportunities': 'crm.Opportunity',
+    'tickets': 'helpdesk.Ticket',
+    'assets': 'asset.Asset',
+    'documents': 'dms.Document',
+}
+
+# Data source used when a report leaves ``data_source`` empty
+REPORT_TYPE_SOURCES = {
+    'project_status': 'projects',
+    'financial': 'invoices',
+    'hr_metrics': 'employees',
+    'sales_pipeline': 'opportunities',
+    'timesheet': 'timesheets',
+    'expense': 'expenses',
+    'asset_inventory': 'assets',
+    'ticket_summary': 'tickets',
+}
+
+AGGREGATES = {
+    'count': Count,
+    'sum': Sum,
+    'avg': Avg,
+    'min': Min,
+    'max': Max,
+}
+
+LOOKUPS = {
+    'exact', 'iexact', 'contains', 'icontains', 'in', 'gt', 'gte', 'lt', 'lte',
+    'startswith', 'istartswith', 'endswith', 'iendswith', 'range', 'isnull',
+    'date', 'year', 'month', 'day',
+}
+
+# Lookups that may also be selected as a column or grouped on
+TRANSFORMS = {'date', 'year', 'month', 'day'}
+
+# Never readable through a report, whatever the path
+SENSITIVE_FIELDS = {'password', 'secret', 'token', 'api_key', 'salt'}
+RESTRICTED_APPS = {'authentication'}
+
+
+class ReportConfigError(Exception):
+    """The report definition cannot be turned into a query"""
+
+
+class ReportAccessError(ReportConfigError):
+    """The user may not read data the report definition selects"""
+
+
+def resolve_model(report):
+    return source_model(report.data_source or REPORT_TYPE_SOURCES.get(report.report_type))
+
+
+def source_model(source):
+    """Model behind a ``DATA_SOURCES`` key"""
+    if source not in DATA_SOURCES:
+        raise ReportConfigError(f"Unknown data source '{source}'")
+    return apps.get_model(DATA_SOURCES[source])
+
+
+def _resolve_field(model, path):
+    """Validate a ``__`` field path; returns (field, trailing lookup or None)"""
+    if not isinstance(path, str) or not path:
+        raise ReportConfigError(f"Field must be a name, not {path!r}")
+    parts = path.split('__')
+    current, field = model, None
+    for index, part in enumerate(parts):
+        last = index == len(parts) - 1
+        try:
+            if current is None:
+                raise FieldDoesNotExist
+            field = current._meta.pk if part == 'pk' else current._meta.get_field(part)
+        except FieldDoesNotExist:
+            if field is not None and last and part in LOOKUPS:
+                return field, part
+            raise ReportConfigError(f"Unknown field '{path}'")
+        if any(word in part.lower() for word in SENSITIVE_FIELDS):
+            raise ReportConfigError(f"Field '{path}' is not allowed")
+        current = field.related_model
+        if not last and current is not None and current._meta.app_label in RESTRICTED_APPS:
+            raise ReportConfigError(f"Field '{path}' is not allowed")
+    return field, None
+
+
+def path_models(model, path):
+    """Models whose rows a validated field path reads, starting with ``model``"""
+    models = [model]
+    for part in path.split('__'):
+        try:
+            field = models[-1]._meta.pk if part == 'pk' else models[-1]._meta.get_field(part)
+        except FieldDoesNotExist:
+            break
+        if field.related_model is None:
+            break
+        models.append(field.related_model)
+    return models
+
+
+def check_read_access(user, model, paths=()):
+    """
+    Require ``user`` to be staff or hold the ``view`` permission of ``model``
+    and of every model the field ``paths`` reach through relations
+
+    Raises:
+        ReportAccessError: A model ``user`` may not read
+    """
+    if user.is_staff:
+        return
+    models = {model}
+    for path in paths:
+        models.update(path_models(model, path))
+    for related in sorted(models, key=lambda m: m._meta.label):
+        if not user.has_perm(f"{related._meta.app_label}.view_{related._meta.model_name}"):
+            raise ReportAccessError(f"You are not allowed to read {related._meta.verbose_name_plural}")
+
+
+def resolve_output(model, path):
+    """Validate a path that is selected (a field, optionally with a date transform)"""
+    _, lookup = _resolve_field(model, path)
+    if lookup and lookup not in TRANSFORMS:
+        raise ReportConfigError(f"'{path}' must be a field, not a '{lookup}' lookup")
+
+
+def default_columns(model):
+    """Every concrete field of ``model`` except soft-delete and sensitive ones"""
+    return [
+        {'field': field.name, 'label': str(field.verbose_name).title()}
+        for field in model._meta.concrete_fields
+        if field.name not in ('deleted_at',)
+        and not any(word in field.name for word in SENSITIVE_FIELDS)
+    ]
+
+
+def _columns(report, model):
+    columns = []
+    for column in report.columns_config or default_columns(model):
+        if isinstance(column, str):
+            column = {'field': column}
+        if not isinstance(column, dict):
+            raise ReportConfigError(f"Column must be a field name or an object: {column!r}")
+        field_path = column.get('field')
+        if not field_path:
+            raise ReportConfigError(f"Column without a field: {column}")
+        resolve_output(model, field_path)
+        columns.append({'field': field_path, 'label': column.get('label') or field_path})
+    return columns
+
+
+_MISSING = object()
+
+
+def _parameter(value, parameters):
+    """Substitute ``"$name"`` with the execution parameter; ``_MISSING`` if absent"""
+    if isinstance(value, str) and value.startswith('$'):
+        return parameters.get(value[1:], _MISSING)
+    return value
+
+
+def resolve_filters(config, model, parameters=None):
+    """Validated ``filter()`` kwargs from a dict or list filter definition"""
+    parameters = parameters or {}
+    if isinstance(config, dict):
+        items = list(config.items())
+    elif isinstance(config, list):
+        items = []
+        for item in config:
+            if not isinstance(item, dict) or not item.get('field'):
+                raise ReportConfigError(f"Filter without a field: {item!r}")
+            items.append((f"{item['field']}__{item.get('operator', 'exact')}", item.get('value')))
+    else:
+        raise ReportConfigError('Filters must be an object or a list')
+
+    lookups = {}
+    for lookup, value in items:
+        _resolve_field(model, lookup)
+        value = _parameter(value, parameters)
+        if value is _MISSING:
+            continue
+        lookups[lookup] = value
+    return lookups
+
+
+def _grouping(report, model):
+    """(group_by fields, {alias: aggregate}) or (None, None) when not grouped"""
+    config = report.grouping_config
+    if not config:
+        return None, None
+    if isinstance(config, list):
+        config = {'group_by': config}
+    if not isinstance(config, dict):
+        raise ReportConfigError('Grouping must be an object or a list')
+
+    group_by = list(config.get('group_by') or [])
+    for field_path in group_by:
+        resolve_output(model, field_path)
+
+    aggregates = {}
+    for aggregate in config.get('aggregates') or [{'function': 'count', 'field': 'pk', 'label': 'count'}]:
+        if not isinstance(aggregate, dict):
+            raise ReportConfigError(f"Aggregate must be an object: {aggregate!r}")
+        function = AGGREGATES.get(aggregate.get('function', 'count'))
+        if function is None:
+            raise ReportConfigError(f"Unknown aggregate function '{aggregate.get('function')}'")
+        field_path = aggregate.get('field', 'pk')
+        _resolve_field(model, field_path)
+        label = aggregate.get('label') or f"{aggregate.get('function', 'count')}_{field_path}"
+        aggregates[label] = function(field_path)
+    return group_by, aggregates
+
+
+def _ordering(report, allowed):
+    ordering = []
+    for item in report.sorting_config or []:
+        if isinstance(item, dict):
+            item = ('-' if item.get('direction') == 'desc' else '') + str(item.get('field', ''))
+        if not isinstance(item, str) or item.lstrip('-') not in allowed:
+            raise ReportConfigError(f"Cannot sort by '{item}'")
+        ordering.append(item)
+    return ordering
+
+
+def source_queryset(model):
+    """All live rows of ``model`` (soft-deleted rows excluded)"""
+    queryset = model._default_manager.all()
+    if any(field.name == 'deleted_at' for field in model._meta.concrete_fields):
+        queryset = queryset.filter(deleted_at__isnull=True)
+    return queryset
+
+
+def _filter_paths(config):
+    """Field paths (with their lookups) of a validated filter definition"""
+    if isinstance(config, dict):
+        return list(config)
+    return [item['field'] for item in config]
+
+
+def build_report_query(report, parameters=None, user=None):
+    """
+    Build the queryset for a report
+
+    With a ``user``, the report may only read models they hold the ``view``
+    permission of (see ``check_read_access``): its source and every model
+    its columns, filters, grouping and sorting reach.
+
+    Returns:
+        tuple: (headers, queryset of tuples)
+
+    Raises:
+        ReportConfigError: The definition references unknown or forbidden
+            fields, sources or functions
+        ReportAccessError: ``user`` may not read what the report selects
+    """
+    parameters = parameters or {}
+    model = resolve_model(report)
+    queryset = source_queryset(model)
+    filters = report.filters_config or {}
+    try:
+        queryset = queryset.filter(**resolve_filters(filters, model, parameters))
+    except (TypeError, ValueError, ValidationError) as e:
+        message = '; '.join(e.messages) if isinstance(e, ValidationError) else e
+        raise ReportConfigError(f"Invalid filter value: {message}")
+    paths = _filter_paths(filters)
+
+    group_by, aggregates = _grouping(report, model)
+    if group_by is not None:
+        outputs = group_by + list(aggregates)
+        # Aggregate labels may contain spaces; annotate under safe aliases
+        aliases = {f"agg_{index}": expression for index, expression in enumerate(aggregates.values())}
+        label_alias = dict(zip(aggregates, aliases))
+        if group_by:
+            queryset = queryset.values(*group_by).annotate(**aliases)
+        else:
+            # Totals only: group on a constant so the result is one row
+            queryset = queryset.annotate(report_total=Value(1)).values('report_total').annotate(**aliases)
+        ordering = [
+            ('-' if item.startswith('-') else '') + label_alias.get(item.lstrip('-'), item.lstrip('-'))
+            for item in _ordering(report, outputs)
+        ]
+        queryset = queryset.order_by(*(ordering or group_by))
+        paths += group_by + [expression.source_expressions[0].name for expression in aggregates.values()]
+        headers = outputs
+        queryset = queryset.values_list(*group_by, *aliases)
+    else:
+        columns = _columns(report, model)
+        fields = [column['field'] for column in columns]
+        ordering = _ordering(report, fields + [field.name for field in model._meta.concrete_fields])
+        queryset = queryset.order_by(*(ordering or ['pk']))
+        paths += fields + [item.lstrip('-') for item in ordering]
+        headers = [column['label'] for column in columns]
+        queryset = queryset.values_list(*fields)
+
+    if user is not None:
+        check_read_access(user, model, paths)
+
+    query_config = report.query_config or {}
+    if query_config.get('distinct'):
+        queryset = queryset.distinct()
+    if query_config.get('limit'):
+        queryset = queryset[:int(query_config['limit'])]
+    return headers, queryset
+
+
+def run_report_execution(execution_id):
+    """
+    Execute a queued ``ReportExecution`` and attach the output file
+
+    Marks the execution ``completed`` with real ``row_count``,
+    ``duration_seconds`` and ``output_size_bytes``, or ``failed`` with the
+    error message.
+    """
+    execution = ReportExecution.objects.select_related('report').get(pk=execution_id)
+    if execution.status != 'running':
+        return execution
+
+    report = execution.report
+    started = time.monotonic()
+    chunk_size = getattr(settings, 'REPORT_CHUNK_SIZE', 2000)
+
+    try:
+        writer_class = get_writer_class(execution.output_format)
+        headers, queryset = build_report_query(report, execution.parameters)
+        with tempfile.TemporaryFile() as output:
+            row_count = write_table(
+                output, execution.output_format, headers,
+                queryset.iterator(chunk_size=chunk_size), title=report.name
+            )
+            size = output.tell()
+            output.seek(0)
+            stamp = timezone.localtime().strftime('%Y%m%d%H%M%S')
+            filename = f"{slugify(report.name) or 'report'}-{execution.pk}-{stamp}.{writer_class.extension}"
+            execution.output_file.save(os.path.basename(filename), File(output), save=False)
+    except Exception as e:
+        if not isinstance(e, ReportConfigError):
+            logger.exception(f"Report execution {execution.pk} failed")
+        execution.status = 'failed'
+        execution.error_message = str(e)
+        execution.completed_at = timezone.now()
+        execution.duration_seconds = round(time.monotonic() - started)
+        execution.save(update_fields=[
+            'status', 'error_message', 'completed_at', 'duration_seconds', 'updated_at'
+        ])
+        return execution
+
+    execution.status = 'completed'
+    execution.row_count = row_count
+    execution.output_size_bytes = size
+    execution.completed_at = timezone.now()
+    execution.duration_seconds = round(time.monotonic() - started)
+    execution.save(update_fields=[
+        'status', 'row_count', 'output_size_bytes', 'output_file',
+        'completed_at', 'duration_seconds', 'updated_at'
+    ])
+    return execution
@@ -1,13 +1,20 @@
 """
 Business Intelligence & Analytics serializers
 """
+from copy import copy
+
 from rest_framework import serializers
+from rest_framework.exceptions import PermissionDenied
 from django.utils import timezone
 from datetime import timedelta
 from apps.analytics.models import (
     Dashboard, Widget, Report, ReportExecution,
     KPI, KPIValue, DataExport, SavedFilter
 )
+from apps.analytics.exporters import get_writer_class
+from apps.analytics.exporting import build_export_query
+from apps.analytics.reporting import ReportAccessError, ReportConfigError, build_report_query
+from apps.core.computed import ComputedField, count_related, latest_related
 
 
 # ============= Dashboard Serializers =============
@@ -16,7 +23,7 @@ class DashboardListSerializer(serializers.ModelSerializer):
     """List serializer for dashboards"""
     
     owner_name = serializers.CharField(source='owner.get_full_name', read_only=True)
-    widget_count = serializers.SerializerMethodField()
+    widget_count = ComputedField(count_related(Widget, 'dashboard', deleted_at__isnull=True, is_visible=True))
     
     class Meta:
         model = Dashboard
@@ -28,10 +35,6 @@ class DashboardListSerializer(serializers.ModelSerializer):
             'widget_count',
             'created_at', 'updated_at'
         ]
-    
-    def get_widget_count(self, obj):
-        """Count widgets in dashboard"""
-        return obj.widgets.filter(deleted_at__isnull=True, is_visible=True).count()
 
 
 class DashboardSerializer(serializers.ModelSerializer):
@@ -76,8 +79,8 @@ class ReportListSerializer(serializers.ModelSerializer):
     """List serializer for reports"""
     
     owner_name = serializers.CharField(source='owner.get_full_name', read_only=True)
-    execution_count = serializers.SerializerMethodField()
-    last_execution_status = serializers.SerializerMethodField()
+    execution_count = ComputedField(count_related(ReportExecution, 'report'))
+    last_execution_status = ComputedField(latest_related(ReportExecution, 'report', 'status', ['-started_at']))
     
     class Meta:
         model = Report
@@ -90,15 +93,6 @@ class ReportListSerializer(serializers.ModelSerializer):
             'execution_count', 'last_execution_status',
             'created_at', 'updated_at'
         ]
-    
-    def get_execution_count(self, obj):
-        """Count report executions"""
-        return obj.executions.count()
-    
-    def get_last_execution_status(self, obj):
-        """Get last execution status"""
-        last_execution = obj.executions.order_by('-started_at').first()
-        return last_execution.status if last_execution else None
 
 
 class ReportSerializer(serializers.ModelSerializer):
@@ -111,9 +105,23 @@ class ReportSerializer(serializers.ModelSerializer):
         model = Report
         fields = '__all__'
     
+    def validate(self, attrs):
+        """Reject definitions that cannot be built or read data the user may not see"""
+        report = copy(self.instance) if self.instance else Report()
+        for name, value in attrs.items():
+            setattr(report, name, value)
+        request = self.context.get('request')
+        try:
+            build_report_query(report, user=request.user if request else None)
+        except ReportAccessError as e:
+            raise PermissionDenied(str(e))
+        except ReportConfigError as e:
+            raise serializers.ValidationError(str(e))
+        return attrs
+    
     def get_recent_executions(self, obj):
         """Get recent executions"""
-        executions = obj.executions.order_by('-started_at')[:10]
+        executions = obj.executions.select_related('report', 'executed_by').order_by('-started_at')[:10]
         return ReportExecutionSerializer(executions, many=True).data
 
 
@@ -268,6 +276,22 @@ class DataExportSerializer(serializers.ModelSerializer):
             'error_message',
             'created_at'
         ]
+        read_only_fields = [
+            'requested_by', 'status', 'output_file', 'file_size_bytes', 'row_count',
+            'started_at', 'completed_at', 'expires_at', 'error_message'
+        ]
+    
+    def validate(self, attrs):
+        """Reject exports the pipeline cannot build"""
+        try:
+            get_writer_class(attrs.get('export_format'))
+            request = self.context.get('request')
+            build_export_query(
+                attrs.get('export_type'), attrs.get('filters'), user=request.user if request else None
+            )
+        except (ValueError, ReportConfigError) as e:
+            raise serializers.ValidationError(str(e))
+        return attrs
     
     def get_file_size_mb(self, obj):
         """Convert file size to MB"""
@@ -0,0 +1,67 @@
+"""
+Dashboard snapshot metrics for the Analytics dashboard
+"""
+from django.db.models import Case, F, IntegerField, Q, When
+
+from apps.core.snapshots import DashboardSnapshot, SnapshotMetric
+from apps.analytics.models import Dashboard, Report, KPI
+
+KPI_GREEN = (
+    Q(threshold_green__isnull=False) & ~Q(threshold_green=0) &
+    Q(current_value__gte=F('threshold_green'))
+)
+KPI_YELLOW = (
+    Q(threshold_yellow__isnull=False) & ~Q(threshold_yellow=0) &
+    Q(current_value__gte=F('threshold_yellow'))
+)
+
+
+def kpi_status(kpi):
+    """Traffic-light status of a KPI based on its thresholds"""
+    if kpi.threshold_green and kpi.current_value >= kpi.threshold_green:
+        return 'green'
+    if kpi.threshold_yellow and kpi.current_value >= kpi.threshold_yellow:
+        return 'yellow'
+    return 'red'
+
+
+def kpi_status_metric(status):
+    """Count active KPIs currently in ``status`` (green/yellow/red)"""
+    return SnapshotMetric(
+        f"{status}_kpis",
+        value=lambda kpi: kpi_status(kpi) == status,
+        expression=Case(
+            When(KPI_GREEN, then=int(status == 'green')),
+            When(KPI_YELLOW, then=int(status == 'yellow')),
+            default=int(status == 'red'),
+            output_field=IntegerField(),
+        ),
+        is_active=True, deleted_at__isnull=True
+    )
+
+
+analytics_snapshot = DashboardSnapshot('analytics')
+
+analytics_snapshot.track(
+    Dashboard,
+    SnapshotMetric('dashboards', deleted_at__isnull=True),
+    SnapshotMetric('active_dashboards', is_active=True, deleted_at__isnull=True),
+)
+
+analytics_snapshot.track(
+    Report,
+    SnapshotMetric('reports', deleted_at__isnull=True),
+    SnapshotMetric('active_reports', is_active=True, deleted_at__isnull=True),
+    SnapshotMetric(
+        'scheduled_reports', is_scheduled=True, is_active=True, deleted_at__isnull=True
+    ),
+)
+
+analytics_snapshot.track(
+    KPI,
+    SnapshotMetric('kpis', deleted_at__isnull=True),
+    SnapshotMetric('active_kpis', is_active=True, deleted_at__isnull=True),
+    kpi_status_metric('green'),
+    kpi_status_metric('yellow'),
+    kpi_status_metric('red'),
+)
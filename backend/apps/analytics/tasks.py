@@ -0,0 +1,19 @@
+"""
+Celery tasks for the analytics app
+"""
+from celery import shared_task
+
+from apps.analytics.exporting import produce_data_export
+from apps.analytics.reporting import run_report_execution
+
+
+@shared_task(ignore_result=True)
+def run_report(execution_id):
+    """Execute a queued report in the background"""
+    run_report_execution(execution_id)
+
+
+@shared_task(ignore_result=True)
+def run_data_export(export_id):
+    """Produce a requested data export in the background"""
+    produce_data_export(export_id)
@@ -0,0 +1,97 @@
+"""
+Report runs and definitions only read what the user may see
+"""
+from datetime import date
+
+import pytest
+from django.contrib.auth.models import Permission
+from rest_framework.test import APIClient
+
+from apps.analytics.models import Report, ReportExecution
+from apps.authentication.models import User
+from apps.hr.models import Department, Employee, Position
+
+pytestmark = pytest.mark.django_db
+
+
+def make_employee(email):
+    department, _ = Department.objects.get_or_create(code='ENG', defaults={'name': 'Engineering'})
+    position, _ = Position.objects.get_or_create(
+        code='DEV', defaults={
+            'title': 'Developer', 'level': 'staff', 'department': department,
+            'min_salary': 1, 'max_salary': 2,
+        },
+    )
+    user = User.objects.create_user(email=email, password='password123')
+    return Employee.objects.create(
+        user=user, employee_id=email.split('@')[0], first_name='Test', last_name='User', email=email,
+        phone='1', date_of_birth=date(1990, 1, 1), gender='male', marital_status='single',
+        id_card_number=email, tax_id=email, address='-', city='-', province='-', postal_code='1',
+        employment_type='permanent', join_date=date(2020, 1, 1), department=department, position=position,
+        base_salary=1000, bank_name='-', bank_account_number='1', bank_account_holder='-',
+        emergency_contact_name='-', emergency_contact_relationship='-', emergency_contact_phone='1',
+    )
+
+
+def client_for(employee):
+    client = APIClient()
+    # A fresh user: permissions are cached on the instance
+    client.force_authenticate(User.objects.get(pk=employee.user_id))
+    return client
+
+
+def grant(employee, *codenames):
+    employee.user.user_permissions.add(*Permission.objects.filter(codename__in=codenames))
+
+
+@pytest.fixture
+def payroll_report():
+    owner = make_employee('owner@example.com')
+    return Report.objects.create(
+        name='Payroll', description='', report_type='hr_metrics', owner=owner,
+        data_source='payroll', columns_config=['employee', 'net_salary'], is_public=True,
+    )
+
+
+def test_running_a_public_payroll_report_needs_view_payroll(payroll_report):
+    employee = make_employee('employee@example.com')
+
+    response = client_for(employee).post(f'/api/v1/analytics/reports/{payroll_report.pk}/run/', format='json')
+
+    assert response.status_code == 403
+    assert not ReportExecution.objects.exists()
+
+
+def test_running_with_view_payroll_is_accepted(payroll_report):
+    employee = make_employee('employee@example.com')
+    grant(employee, 'view_payroll', 'view_employee')
+
+    response = client_for(employee).post(f'/api/v1/analytics/reports/{payroll_report.pk}/run/', format='json')
+
+    assert response.status_code == 202
+    assert ReportExecution.objects.filter(report=payroll_report, executed_by=employee).exists()
+
+
+def test_creating_a_report_on_unreadable_data_is_forbidden():
+    employee = make_employee('employee@example.com')
+    grant(employee, 'view_employee')
+    data = {
+        'name': 'Salaries', 'description': 'Team list', 'report_type': 'hr_metrics', 'owner': employee.pk,
+        'data_source': 'employees', 'columns_config': ['first_name', 'department__name'],
+    }
+
+    response = client_for(employee).post('/api/v1/analytics/reports/', data, format='json')
+
+    assert response.status_code == 403, response.data
+    assert not Report.objects.exists()
+
+    grant(employee, 'view_department')
+    assert client_for(employee).post('/api/v1/analytics/reports/', data, format='json').status_code == 201
+
+
+def test_updating_a_report_to_read_payroll_is_forbidden(payroll_report):
+    response = client_for(payroll_report.owner).patch(
+        f'/api/v1/analytics/reports/{payroll_report.pk}/', {'filters_config': {'net_salary__gte': 0}}, format='json'
+    )
+
+    assert response.status_code == 403
@@ -7,8 +7,10 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+import logging
+from django.db import transaction
 from django.utils import timezone
-from django.db.models import Q, Count, Sum, Avg
+from django.db.models import F, Q, Count, Sum, Avg
 from datetime import timedelta
 
 from apps.analytics.models import (
@@ -25,12 +27,25 @@ from apps.analytics.serializers import (
     DataExportSerializer,
     SavedFilterSerializer
 )
+from apps.analytics.snapshots import analytics_snapshot
+from apps.analytics.exporters import get_writer_class
+from apps.analytics.reporting import ReportAccessError, ReportConfigError, build_report_query
+from apps.analytics.tasks import run_data_export, run_report
 from apps.core.permissions import IsAdminOrReadOnly
+from apps.core.mixins import ComputedFieldsMixin, ConditionalGetMixin
+from apps.core.pagination import KeysetPagination
+
+logger = logging.getLogger(__name__)
+
+
+def _employee(user):
+    """Employee profile of ``user`` (None for accounts without one)"""
+    return getattr(user, 'employee_profile', None)
 
 
 # ============= Dashboard Views =============
 
-class DashboardListView(generics.ListCreateAPIView):
+class DashboardListView(ComputedFieldsMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create dashboards"""
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -38,6 +53,7 @@ class DashboardListView(generics.ListCreateAPIView):
     search_fields = ['name', 'description']
     ordering_fields = ['display_order', 'created_at']
     ordering = ['display_order']
+    query_budget = 4
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -66,10 +82,11 @@ class DashboardListView(generics.ListCreateAPIView):
         return queryset.select_related('owner')
 
 
-class DashboardDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DashboardDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a dashboard"""
     permission_classes = [IsAuthenticated]
     serializer_class = DashboardSerializer
+    etag_related = ['widgets']
     
     def get_queryset(self):
         queryset = Dashboard.objects.filter(deleted_at__isnull=True)
@@ -95,7 +112,7 @@ class DashboardDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============= Widget Views =============
 
-class WidgetListView(generics.ListCreateAPIView):
+class WidgetListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create widgets"""
     permission_classes = [IsAuthenticated]
     serializer_class = WidgetSerializer
@@ -114,7 +131,7 @@ class WidgetListView(generics.ListCreateAPIView):
         return queryset.select_related('dashboard')
 
 
-class WidgetDetailView(generics.RetrieveUpdateDestroyAPIView):
+class WidgetDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a widget"""
     permission_classes = [IsAuthenticated]
     serializer_class = WidgetSerializer
@@ -128,7 +145,7 @@ class WidgetDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============= Report Views =============
 
-class ReportListView(generics.ListCreateAPIView):
+class ReportListView(ComputedFieldsMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create reports"""
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -136,6 +153,7 @@ class ReportListView(generics.ListCreateAPIView):
     search_fields = ['name', 'description']
     ordering_fields = ['created_at', 'last_run_at', 'run_count']
     ordering = ['name']
+    query_budget = 4
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -147,24 +165,23 @@ class ReportListView(generics.ListCreateAPIView):
         
         # Access control
         user = self.request.user
+        employee = _employee(user)
         if not user.is_staff:
-            if hasattr(user, 'employee'):
-                queryset = queryset.filter(
-                    Q(is_public=True) | Q(owner=user.employee)
-                )
+            queryset = queryset.filter(Q(is_public=True) | Q(owner=employee))
         
         # Filter my reports
         if self.request.query_params.get('my_reports', None) == 'true':
-            if hasattr(user, 'employee'):
-                queryset = queryset.filter(owner=user.employee)
+            queryset = queryset.filter(owner=employee)
         
         return queryset.select_related('owner')
 
 
-class ReportDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ReportDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a report"""
     permission_classes = [IsAuthenticated]
     serializer_class = ReportSerializer
+    query_budget = 4
+    etag_related = ['executions']
     
     def get_queryset(self):
         queryset = Report.objects.filter(deleted_at__isnull=True)
@@ -172,10 +189,7 @@ class ReportDetailView(generics.RetrieveUpdateDestroyAPIView):
         # Access control
         user = self.request.user
         if not user.is_staff:
-            if hasattr(user, 'employee'):
-                queryset = queryset.filter(
-                    Q(is_public=True) | Q(owner=user.employee)
-                )
+            queryset = queryset.filter(Q(is_public=True) | Q(owner=_employee(user)))
         
         return queryset.select_related('owner')
     
@@ -194,45 +208,66 @@ def report_run(request, pk):
     except Report.DoesNotExist:
         return Response({'error': 'Report not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Check access
+    # Check access: staff, or an employee running their own or a public report
     user = request.user
-    if not report.is_public and not user.is_staff:
-        if hasattr(user, 'employee') and report.owner != user.employee:
+    employee = _employee(user)
+    if not user.is_staff:
+        if employee is None or not (report.is_public or report.owner_id == employee.pk):
             return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
     
     # Get parameters
     parameters = request.data.get('parameters', {})
     output_format = request.data.get('output_format', report.default_format)
+    if not isinstance(parameters, dict):
+        return Response({'error': 'parameters must be an object'}, status=status.HTTP_400_BAD_REQUEST)
     
-    # Create execution record
+    # Reject broken definitions, and data the caller may not read, before queueing anything
+    try:
+        get_writer_class(output_format)
+        build_report_query(report, parameters, user=user)
+    except ReportAccessError as e:
+        return Response({'error': str(e)}, status=status.HTTP_403_FORBIDDEN)
+    except (ValueError, ReportConfigError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # Create execution record; the worker fills in the results
     execution = ReportExecution.objects.create(
         report=report,
-        executed_by=user.employee if hasattr(user, 'employee') else None,
+        executed_by=employee,
         parameters=parameters,
         output_format=output_format,
         status='running'
     )
     
-    # In a real implementation, this would be handled by a background task (Celery)
-    # For now, we'll just mark it as completed
-    execution.status = 'completed'
-    execution.completed_at = timezone.now()
-    execution.duration_seconds = 2
-    execution.row_count = 100  # Mock data
-    execution.save()
-    
     # Update report run count
-    report.run_count += 1
-    report.last_run_at = timezone.now()
-    report.save()
+    Report.objects.filter(pk=report.pk).update(
+        run_count=F('run_count') + 1,
+        last_run_at=timezone.now(),
+        updated_at=timezone.now()
+    )
+    
+    transaction.on_commit(lambda: _queue_report_execution(execution))
     
     serializer = ReportExecutionSerializer(execution)
-    return Response(serializer.data)
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+def _queue_report_execution(execution):
+    try:
+        run_report.delay(execution.pk)
+    except Exception as e:
+        logger.error(f"Could not queue report execution {execution.pk}: {e}")
+        ReportExecution.objects.filter(pk=execution.pk).update(
+            status='failed',
+            error_message='Could not queue the report for execution',
+            completed_at=timezone.now(),
+            updated_at=timezone.now()
+        )
 
 
 # ============= Report Execution Views =============
 
-class ReportExecutionListView(generics.ListAPIView):
+class ReportExecutionListView(ConditionalGetMixin, generics.ListAPIView):
     """List report executions"""
     permission_classes = [IsAuthenticated]
     serializer_class = ReportExecutionSerializer
@@ -246,19 +281,21 @@ class ReportExecutionListView(generics.ListAPIView):
         # Access control
         user = self.request.user
         if not user.is_staff:
-            if hasattr(user, 'employee'):
-                queryset = queryset.filter(
-                    Q(report__is_public=True) |
-                    Q(report__owner=user.employee) |
-                    Q(executed_by=user.employee)
-                )
+            employee = _employee(user)
+            if employee is None:
+                return queryset.none()
+            queryset = queryset.filter(
+                Q(report__is_public=True) |
+                Q(report__owner=employee) |
+                Q(executed_by=employee)
+            )
         
         return queryset.select_related('report', 'executed_by')
 
 
 # ============= KPI Views =============
 
-class KPIListView(generics.ListCreateAPIView):
+class KPIListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create KPIs"""
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -292,10 +329,11 @@ class KPIListView(generics.ListCreateAPIView):
         return queryset.select_related('owner', 'department', 'project')
 
 
-class KPIDetailView(generics.RetrieveUpdateDestroyAPIView):
+class KPIDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a KPI"""
     permission_classes = [IsAuthenticated]
     serializer_class = KPISerializer
+    etag_related = ['values']
     
     def get_queryset(self):
         queryset = KPI.objects.filter(deleted_at__isnull=True)
@@ -374,13 +412,15 @@ def kpi_update_value(request, pk):
 
 # ============= KPI Value Views =============
 
-class KPIValueListView(generics.ListCreateAPIView):
+class KPIValueListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create KPI values"""
     permission_classes = [IsAuthenticated]
     serializer_class = KPIValueSerializer
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['kpi', 'status']
     ordering = ['-period_date']
+    pagination_class = KeysetPagination
+    etag_from_page = True
     
     def get_queryset(self):
         kpi_id = self.request.query_params.get('kpi', None)
@@ -394,7 +434,7 @@ class KPIValueListView(generics.ListCreateAPIView):
 
 # ============= Data Export Views =============
 
-class DataExportListView(generics.ListCreateAPIView):
+class DataExportListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create data exports"""
     permission_classes = [IsAuthenticated]
     serializer_class = DataExportSerializer
@@ -405,25 +445,41 @@ class DataExportListView(generics.ListCreateAPIView):
     def get_queryset(self):
         queryset = DataExport.objects.all()
         
-        # Access control
+        # Access control: non-staff users only see their own exports
         user = self.request.user
         if not user.is_staff:
-            if hasattr(user, 'employee'):
-                queryset = queryset.filter(requested_by=user.employee)
+            employee = _employee(user)
+            if employee is None:
+                return queryset.none()
+            queryset = queryset.filter(requested_by=employee)
         
         return queryset.select_related('requested_by')
     
     def perform_create(self, serializer):
-        # Auto-set requested_by
-        if hasattr(self.request.user, 'employee'):
-            serializer.save(
-                requested_by=self.request.user.employee,
-                status='processing',
-                started_at=timezone.now()
-            )
+        # Auto-set requested_by; the file is produced by a background task
+        user = self.request.user
+        export = serializer.save(
+            requested_by=_employee(user),
+            status='processing',
+            started_at=timezone.now()
+        )
+        transaction.on_commit(lambda: _queue_data_export(export))
 
 
-class DataExportDetailView(generics.RetrieveAPIView):
+def _queue_data_export(export):
+    try:
+        run_data_export.delay(export.pk)
+    except Exception as e:
+        logger.error(f"Could not queue data export {export.pk}: {e}")
+        DataExport.objects.filter(pk=export.pk).update(
+            status='failed',
+            error_message='Could not queue the export',
+            completed_at=timezone.now(),
+            updated_at=timezone.now()
+        )
+
+
+class DataExportDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     """Retrieve a data export"""
     permission_classes = [IsAuthenticated]
     serializer_class = DataExportSerializer
@@ -431,18 +487,20 @@ class DataExportDetailView(generics.RetrieveAPIView):
     def get_queryset(self):
         queryset = DataExport.objects.all()
         
-        # Access control
+        # Access control: non-staff users only see their own exports
         user = self.request.user
         if not user.is_staff:
-            if hasattr(user, 'employee'):
-                queryset = queryset.filter(requested_by=user.employee)
+            employee = _employee(user)
+            if employee is None:
+                return queryset.none()
+            queryset = queryset.filter(requested_by=employee)
         
         return queryset.select_related('requested_by')
 
 
 # ============= Saved Filter Views =============
 
-class SavedFilterListView(generics.ListCreateAPIView):
+class SavedFilterListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create saved filters"""
     permission_classes = [IsAuthenticated]
     serializer_class = SavedFilterSerializer
@@ -470,7 +528,7 @@ class SavedFilterListView(generics.ListCreateAPIView):
             serializer.save(owner=self.request.user.employee)
 
 
-class SavedFilterDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SavedFilterDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a saved filter"""
     permission_classes = [IsAuthenticated]
     serializer_class = SavedFilterSerializer
@@ -501,58 +559,35 @@ class SavedFilterDetailView(generics.RetrieveUpdateDestroyAPIView):
 def analytics_dashboard(request):
     """Analytics overview dashboard"""
     
-    # Dashboard metrics
-    all_dashboards = Dashboard.objects.filter(deleted_at__isnull=True)
-    active_dashboards = all_dashboards.filter(is_active=True).count()
-    
-    # Report metrics
-    all_reports = Report.objects.filter(deleted_at__isnull=True)
-    active_reports = all_reports.filter(is_active=True).count()
-    scheduled_reports = all_reports.filter(is_scheduled=True, is_active=True).count()
+    # Running totals from the materialized snapshot
+    snapshot = analytics_snapshot.read()
     
     # Recent executions
     recent_executions = ReportExecution.objects.filter(
         status='completed'
     ).order_by('-completed_at')[:5]
     
-    # KPI metrics
-    all_kpis = KPI.objects.filter(deleted_at__isnull=True)
-    active_kpis = all_kpis.filter(is_active=True).count()
-    
-    # KPIs by status
-    green_kpis = 0
-    yellow_kpis = 0
-    red_kpis = 0
-    
-    for kpi in all_kpis.filter(is_active=True):
-        if kpi.threshold_green and kpi.current_value >= kpi.threshold_green:
-            green_kpis += 1
-        elif kpi.threshold_yellow and kpi.current_value >= kpi.threshold_yellow:
-            yellow_kpis += 1
-        else:
-            red_kpis += 1
-    
     # Export metrics
     today = timezone.now().date()
     exports_today = DataExport.objects.filter(created_at__date=today).count()
     
     return Response({
         'dashboards': {
-            'total': all_dashboards.count(),
-            'active': active_dashboards,
+            'total': snapshot.count('dashboards'),
+            'active': snapshot.count('active_dashboards'),
         },
         'reports': {
-            'total': all_reports.count(),
-            'active': active_reports,
-            'scheduled': scheduled_reports,
+            'total': snapshot.count('reports'),
+            'active': snapshot.count('active_reports'),
+            'scheduled': snapshot.count('scheduled_reports'),
             'recent_executions': ReportExecutionSerializer(recent_executions, many=True).data,
         },
         'kpis': {
-            'total': all_kpis.count(),
-            'active': active_kpis,
-            'green': green_kpis,
-            'yellow': yellow_kpis,
-            'red': red_kpis,
+            'total': snapshot.count('kpis'),
+            'active': snapshot.count('active_kpis'),
+            'green': snapshot.count('green_kpis'),
+            'yellow': snapshot.count('yellow_kpis'),
+            'red': snapshot.count('red_kpis'),
         },
         'exports': {
             'today': exports_today,
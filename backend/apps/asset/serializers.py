@@ -7,6 +7,7 @@ from apps.asset.models import (
     Asset, AssetCategory, Vendor, Procurement, ProcurementLine,
     AssetMaintenance, AssetAssignment, License
 )
+from apps.core.computed import ComputedField, count_related
 
 
 # ============ Asset Category ============
@@ -14,7 +15,7 @@ from apps.asset.models import (
 class AssetCategorySerializer(serializers.ModelSerializer):
     """Asset category serializer"""
     parent_name = serializers.CharField(source='parent.name', read_only=True)
-    asset_count = serializers.SerializerMethodField()
+    asset_count = ComputedField(count_related(Asset, 'category', deleted_at__isnull=True))
     
     class Meta:
         model = AssetCategory
@@ -24,17 +25,14 @@ class AssetCategorySerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'deleted_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'deleted_at']
-    
-    def get_asset_count(self, obj):
-        return obj.assets.filter(deleted_at__isnull=True).count()
 
 
 # ============ Vendor ============
 
 class VendorListSerializer(serializers.ModelSerializer):
     """Lightweight vendor list"""
-    asset_count = serializers.SerializerMethodField()
-    procurement_count = serializers.SerializerMethodField()
+    asset_count = ComputedField(count_related(Asset, 'vendor', deleted_at__isnull=True))
+    procurement_count = ComputedField(count_related(Procurement, 'vendor', deleted_at__isnull=True))
     
     class Meta:
         model = Vendor
@@ -45,18 +43,12 @@ class VendorListSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
-    
-    def get_asset_count(self, obj):
-        return obj.assets.filter(deleted_at__isnull=True).count()
-    
-    def get_procurement_count(self, obj):
-        return obj.procurements.filter(deleted_at__isnull=True).count()
 
 
 class VendorSerializer(serializers.ModelSerializer):
     """Full vendor serializer"""
-    asset_count = serializers.SerializerMethodField()
-    procurement_count = serializers.SerializerMethodField()
+    asset_count = ComputedField(count_related(Asset, 'vendor', deleted_at__isnull=True))
+    procurement_count = ComputedField(count_related(Procurement, 'vendor', deleted_at__isnull=True))
     
     class Meta:
         model = Vendor
@@ -70,12 +62,6 @@ class VendorSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'deleted_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'deleted_at']
-    
-    def get_asset_count(self, obj):
-        return obj.assets.filter(deleted_at__isnull=True).count()
-    
-    def get_procurement_count(self, obj):
-        return obj.procurements.filter(deleted_at__isnull=True).count()
 
 
 # ============ Asset ============
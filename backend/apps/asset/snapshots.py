@@ -0,0 +1,36 @@
+"""
+Dashboard snapshot metrics for the Asset dashboard
+"""
+from apps.core.snapshots import DashboardSnapshot, SnapshotMetric
+from apps.asset.models import Asset, License, Procurement
+
+asset_snapshot = DashboardSnapshot('asset')
+
+asset_snapshot.track(
+    Asset,
+    SnapshotMetric('assets', deleted_at__isnull=True),
+    SnapshotMetric('assets_by_type', group_by='asset_type', deleted_at__isnull=True),
+    SnapshotMetric('assets_by_status', group_by='status', deleted_at__isnull=True),
+    SnapshotMetric('purchase_cost', field='purchase_cost', deleted_at__isnull=True),
+    SnapshotMetric('current_value', field='current_value', deleted_at__isnull=True),
+)
+
+asset_snapshot.track(
+    License,
+    SnapshotMetric('licenses', deleted_at__isnull=True),
+    SnapshotMetric('active_licenses', status='active', deleted_at__isnull=True),
+    SnapshotMetric('license_seats', field='total_seats', deleted_at__isnull=True),
+    SnapshotMetric('license_seats_used', field='used_seats', deleted_at__isnull=True),
+)
+
+asset_snapshot.track(
+    Procurement,
+    SnapshotMetric('pending_procurements', status='submitted', deleted_at__isnull=True),
+    SnapshotMetric(
+        'active_procurements', status__in=['approved', 'ordered'], deleted_at__isnull=True
+    ),
+    SnapshotMetric(
+        'procurement_value', field='total_amount',
+        status__in=['approved', 'ordered', 'received'], deleted_at__isnull=True
+    ),
+)
@@ -12,6 +12,9 @@ from datetime import timedelta
 from decimal import Decimal
 
 from apps.authentication.permissions import IsAdminOrReadOnly
+from apps.core.aggregates import aggregate_metrics, count_if
+from apps.core.mixins import ComputedFieldsMixin, ConditionalGetMixin
+from apps.core.query_inspector import query_budget
 from apps.asset.models import (
     Asset, AssetCategory, Vendor, Procurement, ProcurementLine,
     AssetMaintenance, AssetAssignment, License
@@ -25,14 +28,16 @@ from apps.asset.serializers import (
     AssetAssignmentSerializer,
     LicenseListSerializer, LicenseSerializer
 )
+from apps.asset.snapshots import asset_snapshot
 
 
 # ============ Asset Category ============
 
-class AssetCategoryListView(generics.ListCreateAPIView):
+class AssetCategoryListView(ComputedFieldsMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create asset categories"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = AssetCategorySerializer
+    query_budget = 4
     
     def get_queryset(self):
         queryset = AssetCategory.objects.filter(deleted_at__isnull=True)
@@ -53,10 +58,11 @@ class AssetCategoryListView(generics.ListCreateAPIView):
         return queryset.order_by('name')
 
 
-class AssetCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AssetCategoryDetailView(ComputedFieldsMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete asset category"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = AssetCategorySerializer
+    query_budget = 4
     
     def get_queryset(self):
         return AssetCategory.objects.filter(deleted_at__isnull=True)
@@ -69,10 +75,11 @@ class AssetCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============ Vendor ============
 
-class VendorListView(generics.ListCreateAPIView):
+class VendorListView(ComputedFieldsMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create vendors"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = VendorListSerializer
+    query_budget = 4
     
     def get_queryset(self):
         queryset = Vendor.objects.filter(deleted_at__isnull=True)
@@ -94,10 +101,11 @@ class VendorListView(generics.ListCreateAPIView):
         return queryset.order_by('name')
 
 
-class VendorDetailView(generics.RetrieveUpdateDestroyAPIView):
+class VendorDetailView(ComputedFieldsMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete vendor"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = VendorSerializer
+    query_budget = 4
     
     def get_queryset(self):
         return Vendor.objects.filter(deleted_at__isnull=True)
@@ -110,7 +118,7 @@ class VendorDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============ Asset ============
 
-class AssetListView(generics.ListCreateAPIView):
+class AssetListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create assets"""
     permission_classes = [IsAuthenticated]
     serializer_class = AssetListSerializer
@@ -166,7 +174,7 @@ class AssetListView(generics.ListCreateAPIView):
         return queryset.select_related('category', 'assigned_to', 'vendor')
 
 
-class AssetDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AssetDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete asset"""
     permission_classes = [IsAuthenticated]
     serializer_class = AssetSerializer
@@ -265,7 +273,7 @@ def asset_return(request, pk):
 
 # ============ Procurement ============
 
-class ProcurementListView(generics.ListCreateAPIView):
+class ProcurementListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create procurements"""
     permission_classes = [IsAuthenticated]
     serializer_class = ProcurementListSerializer
@@ -309,10 +317,11 @@ class ProcurementListView(generics.ListCreateAPIView):
         return queryset.select_related('requested_by', 'department', 'vendor')
 
 
-class ProcurementDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProcurementDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete procurement"""
     permission_classes = [IsAuthenticated]
     serializer_class = ProcurementSerializer
+    etag_related = ['lines']
     
     def get_queryset(self):
         queryset = Procurement.objects.filter(deleted_at__isnull=True)
@@ -361,7 +370,7 @@ def procurement_approve(request, pk):
 
 # ============ Asset Maintenance ============
 
-class AssetMaintenanceListView(generics.ListCreateAPIView):
+class AssetMaintenanceListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create asset maintenances"""
     permission_classes = [IsAuthenticated]
     serializer_class = AssetMaintenanceListSerializer
@@ -408,7 +417,7 @@ class AssetMaintenanceListView(generics.ListCreateAPIView):
         return queryset.select_related('asset', 'assigned_to', 'vendor')
 
 
-class AssetMaintenanceDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AssetMaintenanceDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete asset maintenance"""
     permission_classes = [IsAuthenticated]
     serializer_class = AssetMaintenanceSerializer
@@ -460,7 +469,7 @@ def maintenance_complete(request, pk):
 
 # ============ License ============
 
-class LicenseListView(generics.ListCreateAPIView):
+class LicenseListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create licenses"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = LicenseListSerializer
@@ -499,7 +508,7 @@ class LicenseListView(generics.ListCreateAPIView):
         return queryset.select_related('vendor', 'owner')
 
 
-class LicenseDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LicenseDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete license"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = LicenseSerializer
@@ -515,102 +524,75 @@ class LicenseDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============ Dashboard ============
 
+@query_budget(6)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def asset_dashboard(request):
     """Asset dashboard with key metrics"""
     today = timezone.now().date()
     
-    # Asset metrics
-    assets = Asset.objects.filter(deleted_at__isnull=True)
+    # Running totals from the materialized snapshot
+    snapshot = asset_snapshot.read()
     
-    total_assets = assets.count()
-    assets_by_type = assets.values('asset_type').annotate(count=Count('id'))
-    assets_by_status = assets.values('status').annotate(count=Count('id'))
+    total_value = snapshot.get('purchase_cost', Decimal('0'))
+    current_value = snapshot.get('current_value', Decimal('0'))
     
-    total_value = assets.aggregate(
-        total=Coalesce(Sum('purchase_cost'), Decimal('0'), output_field=DecimalField())
-    )['total']
+    license_seats_total = snapshot.count('license_seats')
+    license_seats_used = snapshot.count('license_seats_used')
     
-    current_value = assets.aggregate(
-        total=Coalesce(Sum('current_value'), Decimal('0'), output_field=DecimalField())
-    )['total']
-    
-    # Warranty metrics
-    warranty_expiring = assets.filter(
-        warranty_end__gte=today,
-        warranty_end__lte=today + timedelta(days=30)
-    ).count()
-    
-    warranty_expired = assets.filter(warranty_end__lt=today).count()
-    
-    # License metrics
-    licenses = License.objects.filter(deleted_at__isnull=True)
-    
-    total_licenses = licenses.count()
-    active_licenses = licenses.filter(status='active').count()
-    
-    license_seats_total = licenses.aggregate(total=Sum('total_seats'))['total'] or 0
-    license_seats_used = licenses.aggregate(total=Sum('used_seats'))['total'] or 0
+    # Date-relative metrics are computed live
+    warranty = aggregate_metrics(Asset.objects.filter(deleted_at__isnull=True), {
+        'expiring': count_if(warranty_end__gte=today, warranty_end__lte=today + timedelta(days=30)),
+        'expired': count_if(warranty_end__lt=today),
+    })
     
-    licenses_expiring = licenses.filter(
+    licenses_expiring = License.objects.filter(
+        deleted_at__isnull=True,
         status='active',
         end_date__gte=today,
         end_date__lte=today + timedelta(days=30)
     ).count()
     
     # Maintenance metrics
-    maintenances = AssetMaintenance.objects.filter(deleted_at__isnull=True)
-    
-    upcoming_maintenance = maintenances.filter(
-        status='scheduled',
-        scheduled_date__gte=today,
-        scheduled_date__lte=today + timedelta(days=7)
-    ).count()
-    
-    overdue_maintenance = maintenances.filter(
-        status__in=['scheduled', 'in_progress'],
-        scheduled_date__lt=today
-    ).count()
-    
-    # Procurement metrics
-    procurements = Procurement.objects.filter(deleted_at__isnull=True)
-    
-    pending_approvals = procurements.filter(status='submitted').count()
-    active_procurements = procurements.filter(status__in=['approved', 'ordered']).count()
-    
-    procurement_value = procurements.filter(status__in=['approved', 'ordered', 'received']).aggregate(
-        total=Coalesce(Sum('total_amount'), Decimal('0'), output_field=DecimalField())
-    )['total']
+    maintenance = aggregate_metrics(AssetMaintenance.objects.filter(deleted_at__isnull=True), {
+        'upcoming': count_if(
+            status='scheduled',
+            scheduled_date__gte=today,
+            scheduled_date__lte=today + timedelta(days=7)
+        ),
+        'overdue': count_if(status__in=['scheduled', 'in_progress'], scheduled_date__lt=today),
+    })
     
     return Response({
         'assets': {
-            'total': total_assets,
+            'total': snapshot.count('assets'),
             'by_type': [
                 {
-                    'type': item['asset_type'],
-                    'count': item['count']
+                    'type': asset_type,
+                    'count': int(count)
                 }
-                for item in assets_by_type
+                for asset_type, count in snapshot.group('assets_by_type').items()
+                if count
             ],
             'by_status': [
                 {
-                    'status': item['status'],
-                    'count': item['count']
+                    'status': asset_status,
+                    'count': int(count)
                 }
-                for item in assets_by_status
+                for asset_status, count in snapshot.group('assets_by_status').items()
+                if count
             ],
             'total_value': float(total_value),
             'current_value': float(current_value),
             'depreciation': float(total_value - current_value)
         },
         'warranty': {
-            'expiring_soon': warranty_expiring,
-            'expired': warranty_expired
+            'expiring_soon': warranty['expiring'],
+            'expired': warranty['expired']
         },
         'licenses': {
-            'total': total_licenses,
-            'active': active_licenses,
+            'total': snapshot.count('licenses'),
+            'active': snapshot.count('active_licenses'),
             'total_seats': license_seats_total,
             'used_seats': license_seats_used,
             'available_seats': license_seats_total - license_seats_used,
@@ -618,12 +600,12 @@ def asset_dashboard(request):
             'expiring_soon': licenses_expiring
         },
         'maintenance': {
-            'upcoming_7_days': upcoming_maintenance,
-            'overdue': overdue_maintenance
+            'upcoming_7_days': maintenance['upcoming'],
+            'overdue': maintenance['overdue']
         },
         'procurement': {
-            'pending_approvals': pending_approvals,
-            'active': active_procurements,
-            'total_value': float(procurement_value)
+            'pending_approvals': snapshot.count('pending_procurements'),
+            'active': snapshot.count('active_procurements'),
+            'total_value': snapshot.amount('procurement_value')
         }
     })
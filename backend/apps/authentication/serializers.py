@@ -11,7 +11,7 @@ class PermissionSerializer(serializers.ModelSerializer):
     """Permission serializer"""
     class Meta:
         model = Permission
-        fields = ['id', 'name', 'codename', 'description', 'module', 'created_at']
+        fields = ['id', 'resource', 'action', 'code', 'description', 'is_active', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 
@@ -1,14 +1,17 @@
 """
 Utility functions for authentication module
 """
-from django.core.mail import send_mail
 from django.conf import settings
-from .models import AuditLog
+from apps.core.audit import audit_log_writer, clean_ip_address
+from apps.core.outbox import get_template, queue_email, render_template
 
 
 def create_audit_log(user, action, resource_type, resource_id, ip_address='', user_agent='', changes=None):
     """
-    Create an audit log entry
+    Queue an audit log entry
+    
+    The entry is buffered and written in batches by ``apps.core.audit``
+    (immediately when ``AUDIT_LOG_WRITER`` is ``'sync'``).
     
     Args:
         user: User instance
@@ -18,24 +21,34 @@ def create_audit_log(user, action, resource_type, resource_id, ip_address='', us
         ip_address: IP address of the request
         user_agent: User agent string
         changes: Dict of changes made (optional)
-    
-    Returns:
-        AuditLog instance
     """
-    return AuditLog.objects.create(
-        user=user,
+    audit_log_writer.add(
+        user_id=str(user.pk) if user is not None and user.pk is not None else None,
         action=action,
         resource_type=resource_type,
-        resource_id=resource_id,
-        ip_address=ip_address,
-        user_agent=user_agent,
+        resource_id=str(resource_id) if resource_id is not None else '',
+        description='',
+        ip_address=clean_ip_address(ip_address),
+        user_agent=(user_agent or '')[:500],
         changes=changes or {}
     )
 
 
+def _queue_user_email(user, template_type, subject, message, context):
+    """Queue ``message`` for ``user``, or the active template of ``template_type`` if one exists"""
+    template = get_template(template_type)
+    if template is not None:
+        subject, body_html, body_text = render_template(template, context)
+        return queue_email(
+            user.email, subject, body_text=body_text, body_html=body_html,
+            recipient_name=user.get_full_name(), template=template
+        )
+    return queue_email(user.email, subject, body_text=message, recipient_name=user.get_full_name())
+
+
 def send_password_reset_email(user, token):
     """
-    Send password reset email to user
+    Queue password reset email to user
     
     Args:
         user: User instance
@@ -62,18 +75,14 @@ def send_password_reset_email(user, token):
     Ikodio ERP Team
     """
     
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        fail_silently=False,
+    return _queue_user_email(
+        user, 'password_reset', subject, message, {'user': user, 'reset_link': reset_link}
     )
 
 
 def send_welcome_email(user):
     """
-    Send welcome email to new user
+    Queue welcome email to new user
     
     Args:
         user: User instance
@@ -96,18 +105,12 @@ def send_welcome_email(user):
     Ikodio ERP Team
     """
     
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        fail_silently=True,
-    )
+    return _queue_user_email(user, 'welcome', subject, message, {'user': user})
 
 
 def send_email_verification(user, verification_token):
     """
-    Send email verification link to user
+    Queue email verification link to user
     
     Args:
         user: User instance
@@ -132,10 +135,4 @@ def send_email_verification(user, verification_token):
     Ikodio ERP Team
     """
     
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [user.email],
-        fail_silently=False,
-    )
+    return queue_email(user.email, subject, body_text=message, recipient_name=user.get_full_name())
@@ -20,6 +20,8 @@ from .serializers import (
 )
 from .permissions import IsAdminOrReadOnly, IsSuperUserOrReadOnly
 from .utils import create_audit_log, send_password_reset_email
+from apps.core.mixins import ConditionalGetMixin
+from apps.core.pagination import KeysetPagination
 
 User = get_user_model()
 
@@ -141,7 +143,7 @@ class LogoutView(APIView):
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CurrentUserView(generics.RetrieveUpdateAPIView):
+class CurrentUserView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     """
     Get or update current authenticated user
     """
@@ -176,7 +178,7 @@ class CurrentUserView(generics.RetrieveUpdateAPIView):
         return super().patch(request, *args, **kwargs)
 
 
-class UserListView(generics.ListCreateAPIView):
+class UserListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     List all users or create new user
     """
@@ -211,7 +213,7 @@ class UserListView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
+class UserDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a user
     """
@@ -384,12 +386,13 @@ class PasswordResetConfirmView(APIView):
             )
 
 
-class RoleListView(generics.ListCreateAPIView):
+class RoleListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """
     List all roles or create new role
     """
     queryset = Role.objects.all().prefetch_related('permissions')
     serializer_class = RoleSerializer
+    etag_related = ['permissions']
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
     filter_backends = [SearchFilter, OrderingFilter]
     search_fields = ['name', 'description']
@@ -413,12 +416,13 @@ class RoleListView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class RoleDetailView(generics.RetrieveUpdateDestroyAPIView):
+class RoleDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a role
     """
     queryset = Role.objects.all().prefetch_related('permissions')
     serializer_class = RoleSerializer
+    etag_related = ['permissions']
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
     
     @extend_schema(
@@ -454,7 +458,7 @@ class RoleDetailView(generics.RetrieveUpdateDestroyAPIView):
         return super().delete(request, *args, **kwargs)
 
 
-class PermissionListView(generics.ListAPIView):
+class PermissionListView(ConditionalGetMixin, generics.ListAPIView):
     """
     List all permissions
     """
@@ -476,7 +480,7 @@ class PermissionListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
-class UserSessionListView(generics.ListAPIView):
+class UserSessionListView(ConditionalGetMixin, generics.ListAPIView):
     """
     List user sessions
     """
@@ -540,7 +544,7 @@ class RevokeSessionView(APIView):
             )
 
 
-class AuditLogListView(generics.ListAPIView):
+class AuditLogListView(ConditionalGetMixin, generics.ListAPIView):
     """
     List audit logs
     """
@@ -551,6 +555,8 @@ class AuditLogListView(generics.ListAPIView):
     search_fields = ['action', 'resource_type', 'user__email']
     ordering_fields = ['created_at']
     ordering = ['-created_at']
+    pagination_class = KeysetPagination
+    etag_from_page = True
     
     def get_queryset(self):
         if self.request.user.is_superuser:
@@ -0,0 +1,108 @@
+"""
+Conditional aggregation helpers for dashboard metrics
+
+Dashboards tend to ask the same queryset many questions ("how many tasks are
+todo?", "how many are done?", ...). Issuing one ``.count()`` per question costs
+one database round trip each. The helpers below describe every metric
+declaratively and resolve all of them with a single ``aggregate()`` call using
+``FILTER (WHERE ...)`` / ``CASE WHEN`` clauses.
+"""
+from django.db.models import Avg, Count, Q, Sum
+
+# Separator used to flatten nested metric names into SQL aliases
+METRIC_SEPARATOR = '__'
+
+
+def _build_filter(q=None, **lookups):
+    """Combine an optional Q object with keyword lookups"""
+    condition = Q(**lookups)
+    if q is not None:
+        condition &= q
+    return condition if condition else None
+
+
+def count_if(q=None, **lookups):
+    """
+    Count rows matching the given condition (all rows when no condition)
+
+    Usage:
+        count_if(status='active')
+        count_if(Q(status='active') | Q(status='on_hold'))
+    """
+    return Count('pk', filter=_build_filter(q, **lookups))
+
+
+def sum_if(field, q=None, **lookups):
+    """
+    Sum ``field`` over rows matching the given condition
+
+    Usage:
+        sum_if('hours', date__range=[week_start, week_end])
+    """
+    return Sum(field, filter=_build_filter(q, **lookups))
+
+
+def avg_if(field, q=None, **lookups):
+    """Average ``field`` over rows matching the given condition"""
+    return Avg(field, filter=_build_filter(q, **lookups))
+
+
+def choice_counts(field, choices):
+    """
+    Build one conditional count per choice value of ``field``
+
+    Usage:
+        choice_counts('status', Task.STATUS_CHOICES)
+        # {'backlog': Count(...), 'todo': Count(...), ...}
+    """
+    return {
+        value: count_if(**{field: value})
+        for value, _label in choices
+    }
+
+
+def _flatten(metrics, prefix=''):
+    """Flatten a nested metrics definition into alias -> expression"""
+    flat = {}
+    for name, expression in metrics.items():
+        alias = f"{prefix}{METRIC_SEPARATOR}{name}" if prefix else name
+        if isinstance(expression, dict):
+            flat.update(_flatten(expression, alias))
+        else:
+            flat[alias] = expression
+    return flat
+
+
+def _unflatten(metrics, values, prefix=''):
+    """Rebuild the nested structure of ``metrics`` from aggregate results"""
+    result = {}
+    for name, expression in metrics.items():
+        alias = f"{prefix}{METRIC_SEPARATOR}{name}" if prefix else name
+        if isinstance(expression, dict):
+            result[name] = _unflatten(expression, values, alias)
+        else:
+            value = values[alias]
+            # Sums/averages over empty sets come back as NULL
+            result[name] = 0 if value is None else value
+    return result
+
+
+def aggregate_metrics(queryset, metrics):
+    """
+    Evaluate a (possibly nested) dict of aggregate expressions in one query
+
+    Nested dicts are preserved in the result, so the definition can mirror the
+    shape of the API response. NULL results (empty sums) are returned as 0.
+
+    Usage:
+        metrics = aggregate_metrics(tasks, {
+            'total': count_if(),
+            'by_status': choice_counts('status', Task.STATUS_CHOICES),
+            'overdue': count_if(status__in=OPEN_STATUSES, due_date__lt=today),
+        })
+        metrics['by_status']['todo']
+    """
+    if not metrics:
+        return {}
+    values = queryset.order_by().aggregate(**_flatten(metrics))
+    return _unflatten(metrics, values)
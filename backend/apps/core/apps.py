@@ -5,3 +5,15 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
     verbose_name = 'Core'
+
+    def ready(self):
+        from django.utils.module_loading import autodiscover_modules
+
+        # Register dashboard snapshot metrics declared in apps/<app>/snapshots.py
+        autodiscover_modules('snapshots')
+
+        # Register webhook events declared in apps/<app>/webhooks.py
+        autodiscover_modules('webhooks')
+
+        # Keep the cached unread notification counters current
+        from apps.core import notifications  # noqa: F401
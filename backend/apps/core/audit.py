@@ -0,0 +1,303 @@
+"""
+Buffered writers for audit and API log records
+
+Requests enqueue plain field dicts into an in-process, bounded buffer
+instead of INSERTing synchronously. A background thread flushes the buffer
+with ``bulk_create`` whenever it reaches ``AUDIT_LOG_BATCH_SIZE`` records or
+every ``AUDIT_LOG_FLUSH_INTERVAL`` seconds, and the buffer is flushed once
+more at interpreter shutdown and when a Celery worker (or one of its pool
+processes, which skip ``atexit``) shuts down.
+
+``AUDIT_LOG_WRITER`` selects where flushed batches go:
+
+* ``'buffer'`` (default): ``bulk_create`` from the flusher thread
+* ``'celery'``: hand the batch to ``apps.core.tasks.write_log_records``
+* ``'sync'``: write each record immediately (tests, management commands)
+
+Backpressure: when ``AUDIT_LOG_MAX_PENDING`` records are waiting, the
+calling thread flushes inline instead of growing the buffer. ``stats()``
+reports the counters, which ``metrics_view`` publishes as
+``erp_log_buffer_*`` series.
+
+Failures: when ``bulk_create`` rejects a batch, the records are inserted one
+by one and the rows the database refuses are logged and dropped. If the
+database (or the Celery broker) is unreachable the batch goes back into the
+buffer; after ``AUDIT_LOG_MAX_ATTEMPTS`` consecutive failed flushes it is
+logged in full and dropped instead of being retried forever.
+
+Note that ``created_at`` is the time the batch is written, which trails the
+event by at most the flush interval in buffer mode.
+"""
+import atexit
+import ipaddress
+import logging
+import threading
+import time
+
+from celery.signals import worker_process_shutdown, worker_shutdown
+from django.apps import apps
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connections, router, transaction
+
+logger = logging.getLogger(__name__)
+
+# Registered writers by name (used by the Celery task to find the writer)
+writer_registry = {}
+
+# Errors meaning "try again later" rather than "this record is bad"
+DATABASE_UNAVAILABLE = (OperationalError, InterfaceError)
+
+
+def clean_ip_address(value):
+    """``value`` if it is a valid IPv4/IPv6 address, else ``None``"""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    return value
+
+
+class BufferedLogWriter:
+    """Bounded in-process buffer of records for one model"""
+
+    def __init__(self, name, model_label, prepare=None):
+        self.name = name
+        self.model_label = model_label
+        self.prepare = prepare
+        self._records = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._failures = 0
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'dropped': 0,
+            'quarantined': 0,
+            'backpressure_flushes': 0,
+            'high_water_mark': 0,
+            'last_flush_ms': 0,
+            'last_flush_size': 0,
+        }
+        writer_registry[name] = self
+
+    # ----- Configuration -----
+
+    @property
+    def mode(self):
+        return getattr(settings, 'AUDIT_LOG_WRITER', 'buffer')
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 200)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 2.0)
+
+    @property
+    def max_pending(self):
+        return getattr(settings, 'AUDIT_LOG_MAX_PENDING', 10000)
+
+    @property
+    def max_attempts(self):
+        return getattr(settings, 'AUDIT_LOG_MAX_ATTEMPTS', 5)
+
+    # ----- Producer side -----
+
+    def add(self, **fields):
+        """Queue one record (model field values)"""
+        if self.mode == 'sync':
+            self.write([fields])
+            return
+
+        self._ensure_thread()
+        with self._lock:
+            self._records.append(fields)
+            pending = len(self._records)
+            self._stats['enqueued'] += 1
+            self._stats['high_water_mark'] = max(self._stats['high_water_mark'], pending)
+
+        if pending >= self.max_pending:
+            # Buffer is full: make the producer pay for the write
+            self._stats['backpressure_flushes'] += 1
+            self.flush()
+        elif pending >= self.batch_size:
+            self._wakeup.set()
+
+    # ----- Consumer side -----
+
+    def flush(self):
+        """Write out everything currently buffered; returns the number of records"""
+        with self._flush_lock:
+            with self._lock:
+                records, self._records = self._records, []
+            if not records:
+                return 0
+
+            started = time.monotonic()
+            try:
+                if self.mode == 'celery':
+                    from apps.core.tasks import write_log_records
+                    for start in range(0, len(records), self.batch_size):
+                        try:
+                            write_log_records.delay(self.name, records[start:start + self.batch_size])
+                        except Exception as e:
+                            e.unwritten = records[start:]
+                            raise
+                else:
+                    self.write(records)
+            except Exception as e:
+                self._stats['failed_flushes'] += 1
+                self._failures += 1
+                unwritten = getattr(e, 'unwritten', records)
+                if self._failures >= self.max_attempts:
+                    self._quarantine(unwritten, e)
+                else:
+                    logger.error(f"Failed to flush {len(unwritten)} {self.name} records: {e}")
+                    self._requeue(unwritten)
+                return 0
+
+            self._failures = 0
+            self._stats['flushes'] += 1
+            self._stats['last_flush_size'] = len(records)
+            self._stats['last_flush_ms'] = round((time.monotonic() - started) * 1000, 2)
+            return len(records)
+
+    def write(self, records):
+        """
+        Insert ``records`` now (called by the flusher, the Celery task or sync mode)
+
+        A rejected batch is retried row by row and the bad rows are dropped.
+        Connection errors propagate with the records not yet written in
+        ``unwritten`` so the caller can retry just those.
+        """
+        model = apps.get_model(self.model_label)
+        prepared = self.prepare(records) if self.prepare is not None else records
+        using = router.db_for_write(model)
+        try:
+            with transaction.atomic(using=using):
+                model.objects.bulk_create(
+                    [model(**fields) for fields in prepared], batch_size=self.batch_size
+                )
+        except DATABASE_UNAVAILABLE:
+            raise
+        except Exception as e:
+            logger.warning(f"Bulk insert of {len(prepared)} {self.name} records failed ({e}); inserting one by one")
+        else:
+            self._stats['written'] += len(prepared)
+            return
+
+        # ``prepare`` keeps order and length, so index i of both lists is the same record
+        for index, fields in enumerate(prepared):
+            try:
+                with transaction.atomic(using=using):
+                    model(**fields).save(force_insert=True, using=using)
+            except DATABASE_UNAVAILABLE as e:
+                e.unwritten = records[index:]
+                raise
+            except Exception as e:
+                self._stats['dropped'] += 1
+                logger.error(f"Dropping invalid {self.name} record {records[index]!r}: {e}")
+            else:
+                self._stats['written'] += 1
+
+    def _quarantine(self, records, error):
+        """Give up on ``records`` after repeated failures, keeping them in the log"""
+        self._failures = 0
+        self._stats['quarantined'] += len(records)
+        logger.error(
+            f"Dropping {len(records)} {self.name} records after {self.max_attempts} "
+            f"failed flushes ({error}): {records!r}"
+        )
+
+    def _requeue(self, records):
+        with self._lock:
+            room = self.max_pending - len(self._records)
+            if room < len(records):
+                dropped = len(records) - max(room, 0)
+                self._stats['dropped'] += dropped
+                logger.error(f"Dropping {dropped} {self.name} records; buffer is full")
+                records = records[dropped:]
+            self._records[:0] = records
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=f"{self.name}-flusher", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                # The flusher thread owns its own DB connection
+                connections.close_all()
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._records)
+        return {'name': self.name, 'mode': self.mode, 'pending': pending, **self._stats}
+
+
+def _resolve_employees(records):
+    """Turn ``account_id`` (User pk) into the APILog ``user`` (Employee) FK"""
+    from apps.hr.models import Employee
+
+    account_ids = {record['account_id'] for record in records if record.get('account_id')}
+    employees = dict(
+        Employee.objects.filter(user_id__in=account_ids).values_list('user_id', 'id')
+    ) if account_ids else {}
+    prepared = []
+    for record in records:
+        record = dict(record)
+        account_id = record.pop('account_id', None)
+        record['user_id'] = employees.get(account_id) or employees.get(_coerce_pk(account_id))
+        prepared.append(record)
+    return prepared
+
+
+def _coerce_pk(value):
+    # User pks arrive as strings after a trip through Celery's JSON
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+audit_log_writer = BufferedLogWriter('audit_log', 'authentication.AuditLog')
+api_log_writer = BufferedLogWriter('api_log', 'core.APILog', prepare=_resolve_employees)
+
+
+def flush_all(**kwargs):
+    """Flush every writer (run at interpreter and Celery worker shutdown)"""
+    for writer in writer_registry.values():
+        try:
+            writer.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush {writer.name} at shutdown: {e}")
+
+
+def stats():
+    """Buffer metrics of every writer"""
+    return {name: writer.stats() for name, writer in writer_registry.items()}
+
+
+atexit.register(flush_all)
+# Pool processes exit without running ``atexit`` handlers
+worker_process_shutdown.connect(flush_all, weak=False)
+worker_shutdown.connect(flush_all, weak=False)
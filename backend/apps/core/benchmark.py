@@ -0,0 +1,454 @@
+"""
+End-to-end API benchmark
+
+``run(fixtures, concurrency, duration)`` replays a weighted mix of real API
+calls (dashboards, filtered lists, journal posting, kanban moves, document
+downloads, logins) from ``concurrency`` threads, each driving the full
+Django stack through its own test ``Client`` and database connection. Every
+call is timed and its queries counted (``metrics.count_queries``); calls
+sent during the warm-up are discarded.
+
+* Scenarios are declared with ``@scenario(name, weight, method, route)``;
+  the decorated function picks the parameters of one call from the
+  ``Fixtures`` loaded before the run and returns a ``Call``.
+* Virtual users are seeded users with an employee profile, authenticated
+  with a JWT access token and a client address of their own, so throttling
+  applies per user as it would in production.
+* Each thread draws from its own ``random.Random`` seeded with (seed,
+  thread); the call mix is reproducible, the interleaving is not.
+
+``summarize()`` turns the samples into p50/p95/p99 latency, throughput,
+error counts and queries per request for every scenario and in total;
+``compare()`` checks a summary against a stored baseline. Latencies are
+measured in-process, without a network or WSGI server in between: compare
+runs with each other, not with production numbers.
+"""
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+from collections import Counter, deque
+
+import django
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.authentication.models import User
+from apps.core.metrics import count_queries
+from apps.dms.models import Document
+from apps.finance.models import Invoice, JournalEntry
+from apps.helpdesk.models import Ticket
+from apps.hr.models import Department
+from apps.project.models import Project, Task
+
+RESULTS_VERSION = 1
+
+# Rows of each table the calls are spread over (the "hot" set)
+FIXTURE_ROWS = 5000
+
+# Latency percentiles reported for every scenario
+PERCENTILES = (50, 95, 99)
+
+DOCUMENT_SEARCHES = ('report', 'contract', 'policy', 'invoice', 'plan', 'proposal')
+
+
+class Call:
+    """One request: path, query parameters (GET) or JSON body, and the user sending it"""
+
+    def __init__(self, path, data=None, user=None, headers=None):
+        self.path = path
+        self.data = data
+        self.user = user
+        self.headers = user.headers if user else headers or {}
+
+
+class Scenario:
+    """A kind of request in the mix, picked ``weight`` times in ``sum(weights)``"""
+
+    def __init__(self, name, weight, method, route, build):
+        self.name = name
+        self.weight = weight
+        self.method = method
+        self.route = route
+        self.build = build
+
+
+SCENARIOS = []
+
+
+def scenario(name, weight, method, route):
+    """Register the decorated ``build(rng, fixtures) -> Call`` as a scenario"""
+    def register(build):
+        SCENARIOS.append(Scenario(name, weight, method, route, build))
+        return build
+    return register
+
+
+class VirtualUser:
+    """A seeded user the load generator acts as"""
+
+    def __init__(self, user):
+        self.pk = user.pk
+        self.email = user.email
+        self.headers = {
+            'HTTP_AUTHORIZATION': f"Bearer {RefreshToken.for_user(user).access_token}",
+            'REMOTE_ADDR': f"10.{user.pk // 65536 % 256}.{user.pk // 256 % 256}.{user.pk % 256}",
+        }
+
+
+def hot_set(queryset):
+    """Primary keys of the first ``FIXTURE_ROWS`` rows of ``queryset``"""
+    return list(queryset.order_by('pk').values_list('pk', flat=True)[:FIXTURE_ROWS])
+
+
+class Fixtures:
+    """Users and row IDs the scenarios draw their parameters from"""
+
+    def __init__(self, users, password, seed):
+        rng = random.Random(f"{seed}:fixtures")
+        self.password = password
+        self.users = [
+            VirtualUser(user)
+            for user in User.objects.filter(
+                is_active=True, is_superuser=False, employee_profile__isnull=False
+            ).order_by('pk')[:users]
+        ]
+        by_pk = {user.pk: user for user in self.users}
+
+        self.projects = hot_set(Project.objects.filter(deleted_at__isnull=True))
+        self.departments = hot_set(Department.objects.filter(deleted_at__isnull=True))
+        self.documents = hot_set(Document.objects.filter(deleted_at__isnull=True))
+        # Tasks the virtual users may move: their own (assigned) ones
+        self.assigned_tasks = [
+            (by_pk[user_pk], task_pk)
+            for user_pk, task_pk in Task.objects.filter(
+                deleted_at__isnull=True, assigned_to__user__in=list(by_pk)
+            ).order_by('pk').values_list('assigned_to__user', 'pk')[:FIXTURE_ROWS]
+        ]
+        # A draft can be posted once; every post takes the next one
+        drafts = list(
+            JournalEntry.objects.filter(deleted_at__isnull=True, status='draft')
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        rng.shuffle(drafts)
+        self.drafts = deque(drafts)
+
+    def user(self, rng):
+        return rng.choice(self.users)
+
+    def draft(self):
+        """Next unposted draft journal entry (None once they are used up)"""
+        try:
+            return self.drafts.popleft()
+        except IndexError:
+            return None
+
+
+def choice_values(model, field):
+    return [value for value, _label in model._meta.get_field(field).choices]
+
+
+# ===== SCENARIOS =====
+
+@scenario('login', 5, 'POST', '/api/v1/auth/login/')
+def login(rng, fixtures):
+    user = fixtures.user(rng)
+    return Call(
+        '/api/v1/auth/login/',
+        {'email': user.email, 'password': fixtures.password},
+        headers={'REMOTE_ADDR': f"172.16.{rng.randrange(256)}.{rng.randrange(1, 255)}"},
+    )
+
+
+DASHBOARDS = {
+    'finance': 6,
+    'project': 6,
+    'crm': 5,
+    'helpdesk': 5,
+    'hr': 4,
+    'analytics': 3,
+    'asset': 3,
+    'dms': 3,
+}
+
+
+def dashboard(route):
+    def build(rng, fixtures):
+        return Call(route, user=fixtures.user(rng))
+    return build
+
+
+for app, weight in DASHBOARDS.items():
+    scenario(f"{app}_dashboard", weight, 'GET', f"/api/v1/{app}/dashboard/")(
+        dashboard(f"/api/v1/{app}/dashboard/")
+    )
+
+
+@scenario('task_list', 10, 'GET', '/api/v1/project/tasks/?project=&status=')
+def task_list(rng, fixtures):
+    return Call(
+        '/api/v1/project/tasks/',
+        {'project': rng.choice(fixtures.projects), 'status': rng.choice(choice_values(Task, 'status'))},
+        fixtures.user(rng),
+    )
+
+
+@scenario('ticket_list', 8, 'GET', '/api/v1/helpdesk/tickets/?status=&priority=')
+def ticket_list(rng, fixtures):
+    return Call(
+        '/api/v1/helpdesk/tickets/',
+        {
+            'status': rng.choice(choice_values(Ticket, 'status')),
+            'priority': rng.choice(choice_values(Ticket, 'priority')),
+        },
+        fixtures.user(rng),
+    )
+
+
+@scenario('invoice_list', 6, 'GET', '/api/v1/finance/invoices/?status=|overdue=true')
+def invoice_list(rng, fixtures):
+    if rng.random() < 0.3:
+        params = {'overdue': 'true'}
+    else:
+        params = {'status': rng.choice(choice_values(Invoice, 'status'))}
+    return Call('/api/v1/finance/invoices/', params, fixtures.user(rng))
+
+
+@scenario('document_search', 6, 'GET', '/api/v1/dms/documents/?search=')
+def document_search(rng, fixtures):
+    return Call('/api/v1/dms/documents/', {'search': rng.choice(DOCUMENT_SEARCHES)}, fixtures.user(rng))
+
+
+@scenario('employee_list', 5, 'GET', '/api/v1/hr/employees/?department=')
+def employee_list(rng, fixtures):
+    return Call('/api/v1/hr/employees/', {'department': rng.choice(fixtures.departments)}, fixtures.user(rng))
+
+
+@scenario('journal_entry_list', 4, 'GET', '/api/v1/finance/journal-entries/?status=draft')
+def journal_entry_list(rng, fixtures):
+    return Call('/api/v1/finance/journal-entries/', {'status': 'draft'}, fixtures.user(rng))
+
+
+@scenario('journal_entry_post', 5, 'POST', '/api/v1/finance/journal-entries/<pk>/post/')
+def journal_entry_post(rng, fixtures):
+    pk = fixtures.draft()
+    if pk is None:
+        return None
+    return Call(f"/api/v1/finance/journal-entries/{pk}/post/", {}, fixtures.user(rng))
+
+
+@scenario('task_move', 8, 'PATCH', '/api/v1/project/tasks/<pk>/move/')
+def task_move(rng, fixtures):
+    if not fixtures.assigned_tasks:
+        return None
+    user, pk = rng.choice(fixtures.assigned_tasks)
+    return Call(
+        f"/api/v1/project/tasks/{pk}/move/",
+        {'status': rng.choice(choice_values(Task, 'status')), 'display_order': rng.randrange(100)},
+        user,
+    )
+
+
+@scenario('document_download', 8, 'POST', '/api/v1/dms/documents/<pk>/download/')
+def document_download(rng, fixtures):
+    return Call(f"/api/v1/dms/documents/{rng.choice(fixtures.documents)}/download/", user=fixtures.user(rng))
+
+
+# ===== RUNNER =====
+
+class Samples:
+    """Latencies, query counts, DB time and statuses of one scenario's calls"""
+
+    def __init__(self):
+        self.durations = []
+        self.queries = []
+        self.db_durations = []
+        self.statuses = Counter()
+
+    def add(self, duration, queries, db_duration, status_code):
+        self.durations.append(duration)
+        self.queries.append(queries)
+        self.db_durations.append(db_duration)
+        self.statuses[status_code] += 1
+
+    def merge(self, other):
+        self.durations += other.durations
+        self.queries += other.queries
+        self.db_durations += other.db_durations
+        self.statuses.update(other.statuses)
+
+
+def send(client, method, call):
+    if method == 'GET':
+        return client.get(call.path, call.data, **call.headers)
+    return client.generic(method, call.path, json.dumps(call.data or {}), 'application/json', **call.headers)
+
+
+def run(fixtures, concurrency, duration, warmup=0, seed=0, scenarios=None):
+    """
+    Replay the scenario mix from ``concurrency`` threads for ``warmup + duration`` seconds
+
+    Args:
+        fixtures: ``Fixtures`` the calls draw their users and parameters from
+        scenarios: Scenario names to run (default: all of ``SCENARIOS``)
+
+    Returns:
+        tuple: ({scenario name: ``Samples``}, seconds measured)
+    """
+    mix = [entry for entry in SCENARIOS if scenarios is None or entry.name in scenarios]
+    weights = [entry.weight for entry in mix]
+
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+    results = [dict() for _ in range(concurrency)]
+    failures = []
+
+    def worker(index):
+        rng = random.Random(f"{seed}:{index}")
+        client = Client(raise_request_exception=False)
+        samples = results[index]
+        try:
+            while time.perf_counter() < deadline:
+                entry = rng.choices(mix, weights)[0]
+                call = entry.build(rng, fixtures)
+                if call is None:
+                    continue
+                with count_queries() as counter:
+                    sent = time.perf_counter()
+                    response = send(client, entry.method, call)
+                    elapsed = time.perf_counter() - sent
+                if sent >= measure_from:
+                    samples.setdefault(entry.name, Samples()).add(
+                        elapsed, counter.count, counter.duration, response.status_code
+                    )
+        except Exception as e:
+            failures.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if failures:
+        raise failures[0]
+
+    merged = {}
+    for samples in results:
+        for name, entry in samples.items():
+            merged.setdefault(name, Samples()).merge(entry)
+    return merged, min(time.perf_counter(), deadline) - measure_from
+
+
+# ===== REPORTING =====
+
+def percentile(values, q):
+    """``q``-th percentile of sorted ``values``, interpolating between ranks"""
+    if not values:
+        return 0.0
+    rank = (len(values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def describe(samples, elapsed):
+    durations = sorted(samples.durations)
+    count = len(durations)
+    errors = sum(total for status_code, total in samples.statuses.items() if status_code >= 400)
+    latency = {f"p{q}": round(percentile(durations, q) * 1000, 2) for q in PERCENTILES}
+    latency['mean'] = round(sum(durations) / count * 1000, 2) if count else 0.0
+    latency['max'] = round(durations[-1] * 1000, 2) if count else 0.0
+    return {
+        'requests': count,
+        'errors': errors,
+        'error_rate': round(errors / count, 4) if count else 0.0,
+        'statuses': {str(status_code): total for status_code, total in sorted(samples.statuses.items())},
+        'throughput': round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        'latency_ms': latency,
+        'queries': {
+            'mean': round(sum(samples.queries) / count, 2) if count else 0.0,
+            'max': max(samples.queries, default=0),
+        },
+        'db_ms': {'mean': round(sum(samples.db_durations) / count * 1000, 2) if count else 0.0},
+    }
+
+
+def environment():
+    """Where the numbers were measured: code revision, database and interpreter"""
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        'revision': revision,
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'cpus': os.cpu_count(),
+        'host': platform.node(),
+    }
+
+
+def summarize(samples, elapsed, config):
+    """JSON-ready results of a run: per scenario and in total"""
+    total = Samples()
+    for entry in samples.values():
+        total.merge(entry)
+    routes = {entry.name: (entry.method, entry.route) for entry in SCENARIOS}
+    endpoints = {}
+    for name in sorted(samples):
+        method, route = routes[name]
+        endpoints[name] = {'method': method, 'route': route, **describe(samples[name], elapsed)}
+    return {
+        'version': RESULTS_VERSION,
+        'recorded_at': timezone.now().isoformat(),
+        'environment': environment(),
+        'config': {**config, 'measured_seconds': round(elapsed, 2)},
+        'endpoints': endpoints,
+        'total': describe(total, elapsed),
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Regressions of ``results`` against ``baseline``
+
+    A scenario regresses when its p95 latency grows or its throughput drops by
+    more than ``tolerance`` (a fraction), when it runs more queries per request,
+    or when its error rate grows by more than a percentage point.
+
+    Returns:
+        list: (scenario name, description) of every regression
+    """
+    regressions = []
+    current = {**results['endpoints'], 'total': results['total']}
+    previous = {**baseline.get('endpoints', {}), 'total': baseline.get('total', {})}
+    for name, entry in current.items():
+        before = previous.get(name)
+        if not before or not before.get('requests') or not entry['requests']:
+            continue
+        p95, p95_before = entry['latency_ms']['p95'], before['latency_ms']['p95']
+        if p95 > p95_before * (1 + tolerance):
+            regressions.append((name, f"p95 {p95_before}ms -> {p95}ms"))
+        throughput, throughput_before = entry['throughput'], before['throughput']
+        if throughput < throughput_before * (1 - tolerance):
+            regressions.append((name, f"throughput {throughput_before}/s -> {throughput}/s"))
+        # Query counts only vary with the parameters drawn; half a query on average is a real change
+        queries, queries_before = entry['queries']['mean'], before['queries']['mean']
+        if queries > queries_before + 0.5:
+            regressions.append((name, f"queries per request {queries_before} -> {queries}"))
+        if entry['error_rate'] > before['error_rate'] + 0.01:
+            regressions.append((name, f"error rate {before['error_rate']:.1%} -> {entry['error_rate']:.1%}"))
+    return regressions
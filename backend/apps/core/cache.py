@@ -1,11 +1,29 @@
 """
 Caching utilities for performance optimization
+
+Invalidation is generational: every namespace (``CACHE_KEYS``) and tag has
+a version counter stored in the cache, and that version is baked into each
+key built with ``versioned_key``. Invalidating a namespace or tag is a
+single INCR; entries written under the old version are never read again and
+simply age out through their timeout. No KEYS/SCAN over the keyspace needed.
 """
 from functools import wraps
 from django.core.cache import cache
 from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 import hashlib
 import json
+import logging
+import math
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE_VERSION_KEY = 'cache_version:ns:{}'
+TAG_VERSION_KEY = 'cache_version:tag:{}'
+COMPUTE_LOCK_KEY = '{}:lock'
 
 
 def cache_key(*args, **kwargs):
@@ -20,10 +38,75 @@ def cache_key(*args, **kwargs):
     return hashlib.md5(key_string.encode()).hexdigest()
 
 
-def cached_query(timeout=300, key_prefix='query'):
+def _initial_version():
+    # Seeded from the clock so a version key that was evicted never restarts
+    # at a generation whose entries may still be cached
+    return int(time.time() * 1000)
+
+
+def _namespace(pattern):
+    """Map legacy patterns such as ``'employees:*'`` to their namespace"""
+    return pattern.split(':', 1)[0].rstrip('*')
+
+
+def _get_versions(version_keys):
+    """Current values of ``version_keys``, initializing missing counters"""
+    versions = cache.get_many(version_keys)
+    for key in version_keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def _bump_version(version_key):
+    try:
+        return cache.incr(version_key)
+    except ValueError:
+        # Counter missing (never used or evicted); start a fresh generation
+        version = _initial_version()
+        if not cache.add(version_key, version, timeout=None):
+            return cache.incr(version_key)
+        return version
+
+
+def versioned_key(namespace, *parts, tags=()):
+    """
+    Build a cache key bound to the current namespace (and tag) versions
+    
+    Usage:
+        key = versioned_key('employees', 'list', digest, tags=['department:3'])
+    """
+    namespace_key = NAMESPACE_VERSION_KEY.format(namespace)
+    tag_keys = [TAG_VERSION_KEY.format(tag) for tag in sorted(set(tags))]
+    versions = _get_versions([namespace_key] + tag_keys)
+    
+    key = f"{namespace}:v{versions[namespace_key]}"
+    if tag_keys:
+        tag_versions = ','.join(f"{tag_key}={versions[tag_key]}" for tag_key in tag_keys)
+        key = f"{key}:t{hashlib.md5(tag_versions.encode()).hexdigest()[:12]}"
+    return ':'.join([key, *map(str, parts)])
+
+
+def invalidate_namespace(namespace):
+    """Invalidate every key built under ``namespace`` (single INCR)"""
+    return _bump_version(NAMESPACE_VERSION_KEY.format(namespace))
+
+
+def invalidate_tags(*tags):
+    """Invalidate every key built with any of ``tags`` (one INCR per tag)"""
+    for tag in set(tags):
+        _bump_version(TAG_VERSION_KEY.format(tag))
+    return len(set(tags))
+
+
+def cached_query(timeout=300, key_prefix='query', tags=()):
     """
     Decorator to cache database queries
     
+    Entries are versioned under the ``key_prefix`` namespace (and ``tags``),
+    so ``invalidate_cache(key_prefix)`` or ``invalidate_tags(...)`` evicts them.
+    
     Usage:
         @cached_query(timeout=600, key_prefix='employees')
         def get_active_employees():
@@ -34,7 +117,7 @@ def cached_query(timeout=300, key_prefix='query'):
         def wrapper(*args, **kwargs):
             # Generate cache key
             cache_suffix = cache_key(*args, **kwargs)
-            full_key = f"{key_prefix}:{func.__name__}:{cache_suffix}"
+            full_key = versioned_key(key_prefix, func.__name__, cache_suffix, tags=tags)
             
             # Try to get from cache
             result = cache.get(full_key)
@@ -50,29 +133,101 @@ def cached_query(timeout=300, key_prefix='query'):
     return decorator
 
 
+def _refresh_early(entry, beta):
+    """
+    Probabilistic early expiration (XFetch)
+    
+    Each reader recomputes slightly before expiry with a probability that
+    grows as expiry approaches and with the cost (``delta``) of recomputing,
+    so a hot key is refreshed by one caller instead of all of them at once.
+    """
+    return time.time() - entry['delta'] * beta * math.log(random.random()) >= entry['expires']
+
+
+def get_or_compute(key, callback, timeout=300, beta=1.0, lock_timeout=30, wait=5.0):
+    """
+    Get a cached value or compute it, protecting the source from stampedes
+    
+    * hot keys are refreshed early by a single caller (see ``_refresh_early``)
+      while everyone else keeps serving the cached value
+    * on a miss one caller computes under a short lock; the others wait up
+      to ``wait`` seconds for its result before computing themselves
+    
+    ``callback`` results of ``None`` are returned but not cached.
+    """
+    lock_key = COMPUTE_LOCK_KEY.format(key)
+    entry = cache.get(key)
+    locked = False
+    
+    if entry is not None:
+        if not _refresh_early(entry, beta):
+            return entry['value']
+        locked = cache.add(lock_key, 1, lock_timeout)
+        if not locked:
+            # Someone else is already refreshing
+            return entry['value']
+    else:
+        locked = cache.add(lock_key, 1, lock_timeout)
+        if not locked:
+            deadline = time.monotonic() + wait
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                entry = cache.get(key)
+                if entry is not None:
+                    return entry['value']
+    
+    try:
+        started = time.monotonic()
+        value = callback()
+        if value is not None:
+            cache.set(key, {
+                'value': value,
+                'delta': time.monotonic() - started,
+                'expires': time.time() + timeout,
+            }, timeout)
+        return value
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+
 def invalidate_cache(key_pattern):
     """
-    Invalidate cache keys matching pattern
+    Invalidate the namespace of a key pattern
+    
+    Bumps the namespace version instead of scanning for matching keys, so
+    ``'employees:*'`` and ``'employees'`` are equivalent and any narrower
+    pattern invalidates its whole namespace.
     
     Usage:
         invalidate_cache('employees:*')
     """
     try:
-        from django_redis import get_redis_connection
-        redis_conn = get_redis_connection("default")
-        
-        # Get all keys matching pattern
-        keys = redis_conn.keys(f"ikodio_erp:{key_pattern}")
-        
-        if keys:
-            redis_conn.delete(*keys)
-            return len(keys)
-        return 0
+        invalidate_namespace(_namespace(key_pattern))
+        return 1
     except Exception as e:
-        print(f"Error invalidating cache: {e}")
+        logger.error(f"Error invalidating cache '{key_pattern}': {e}")
         return 0
 
 
+def invalidate_on_change(namespace, *models):
+    """
+    Invalidate ``namespace`` whenever a row of ``models`` is saved or deleted
+    
+    ``models`` are model classes or ``'app_label.ModelName'`` labels. The
+    version is bumped once the transaction commits; bumping earlier would let
+    a concurrent reader cache the old rows under the new version. Queryset
+    ``update()`` sends no signals and still needs an explicit invalidation.
+    """
+    def handler(sender, **kwargs):
+        transaction.on_commit(lambda: invalidate_cache(namespace))
+    
+    for model in models:
+        label = model if isinstance(model, str) else model._meta.label
+        for signal in (post_save, post_delete):
+            signal.connect(handler, sender=model, weak=False, dispatch_uid=f"cache:{namespace}:{label}")
+
+
 class CacheManager:
     """
     Manager class for cache operations
@@ -89,13 +244,31 @@ class CacheManager:
             cache.set(key, result, timeout)
         return result
     
+    @staticmethod
+    def get_or_compute(key, callback, timeout=300):
+        """
+        Like get_or_set, with early refresh and a recompute lock (see get_or_compute)
+        """
+        return get_or_compute(key, callback, timeout)
+    
     @staticmethod
     def invalidate_pattern(pattern):
         """
-        Invalidate all keys matching pattern
+        Invalidate all keys matching pattern (namespace version bump)
         """
         return invalidate_cache(pattern)
     
+    @staticmethod
+    def invalidate_tags(*tags):
+        """
+        Invalidate all keys built with any of the tags
+        """
+        try:
+            return invalidate_tags(*tags)
+        except Exception as e:
+            logger.error(f"Error invalidating cache tags {tags}: {e}")
+            return 0
+    
     @staticmethod
     def clear_all():
         """
@@ -133,7 +306,8 @@ CACHE_TIMEOUTS = {
 }
 
 
-# Cache key patterns for different modules
+# Cache key patterns for different modules; each namespace (the part before
+# ':*') has its own version counter, see ``invalidate_cache``
 CACHE_KEYS = {
     'dashboard': 'dashboard:*',
     'employees': 'employees:*',
@@ -142,6 +316,8 @@ CACHE_KEYS = {
     'tasks': 'tasks:*',
     'invoices': 'invoices:*',
     'clients': 'clients:*',
+    'leads': 'leads:*',
+    'expenses': 'expenses:*',
     'assets': 'assets:*',
     'tickets': 'tickets:*',
     'documents': 'documents:*',
@@ -0,0 +1,119 @@
+"""
+Computed serializer fields backed by the queryset
+
+A ``SerializerMethodField`` that counts or sums related rows runs one query
+per serialized object. ``ComputedField`` declares the expression (or
+prefetch) that produces the value instead, and views using
+``apps.core.mixins.ComputedFieldsMixin`` add every declared ``annotate()``/
+``prefetch_related()`` to their queryset, so a page of any size costs the
+same number of queries.
+
+Usage:
+    class ClientListSerializer(serializers.ModelSerializer):
+        opportunity_count = ComputedField(count_related(Opportunity, 'client'))
+        total_revenue = ComputedField(
+            sum_related(Invoice, 'client', 'total_amount', status='paid'),
+            transform=lambda total: float(total or 0),
+        )
+
+    class ClientListView(ComputedFieldsMixin, generics.ListAPIView):
+        serializer_class = ClientListSerializer
+
+Objects that did not come from an annotated queryset (e.g. just created)
+still serialize correctly: the value is then read with one query.
+"""
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+
+def _related_rows(model, fk_field, filters):
+    """Rows of ``model`` pointing at the outer object, grouped on the foreign key"""
+    return model._default_manager.filter(
+        **{fk_field: OuterRef('pk')}, **filters
+    ).order_by().values(fk_field)
+
+
+def count_related(model, fk_field, **filters):
+    """Number of ``model`` rows whose ``fk_field`` is the object (0 when none)"""
+    rows = _related_rows(model, fk_field, filters).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def sum_related(model, fk_field, field, **filters):
+    """Sum of ``field`` over related ``model`` rows (None when there are none)"""
+    return Subquery(_related_rows(model, fk_field, filters).annotate(total=Sum(field)).values('total'))
+
+
+def latest_related(model, fk_field, field, ordering, **filters):
+    """``field`` of the first related ``model`` row in ``ordering`` (None when none)"""
+    rows = model._default_manager.filter(**{fk_field: OuterRef('pk')}, **filters)
+    return Subquery(rows.order_by(*ordering).values(field)[:1])
+
+
+class ComputedField(serializers.ReadOnlyField):
+    """
+    Read-only field whose value comes from the view's queryset
+
+    Args:
+        expression: Expression annotated under the field name
+        prefetch: ``Prefetch``/lookup added to the queryset; the value is
+            then ``compute(obj)`` reading the prefetched data
+        compute: Callable turning the object into the value (with ``prefetch``)
+        transform: Optional callable applied to the value before output
+    """
+
+    def __init__(self, expression=None, prefetch=None, compute=None, transform=None, **kwargs):
+        assert (expression is None) != (compute is None), (
+            'ComputedField needs either an expression or a compute callable'
+        )
+        self.expression = expression
+        self.prefetch = prefetch
+        self.compute = compute
+        self.transform = transform
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        # Transformed here: DRF skips ``to_representation`` for None
+        value = self._value(instance)
+        return self.transform(value) if self.transform is not None else value
+
+    def _value(self, instance):
+        if self.compute is not None:
+            return self.compute(instance)
+        if self.field_name in instance.__dict__:
+            return instance.__dict__[self.field_name]
+        # Not loaded through an annotated queryset
+        return type(instance)._default_manager.filter(pk=instance.pk).annotate(
+            **{self.field_name: self.expression}
+        ).values_list(self.field_name, flat=True).first()
+
+
+_computed_fields_cache = {}
+
+
+def computed_fields(serializer_class):
+    """``ComputedField`` instances declared on ``serializer_class``"""
+    fields = _computed_fields_cache.get(serializer_class)
+    if fields is None:
+        fields = [
+            field for field in serializer_class().fields.values()
+            if isinstance(field, ComputedField)
+        ]
+        _computed_fields_cache[serializer_class] = fields
+    return fields
+
+
+def with_computed_fields(queryset, serializer_class):
+    """Add the annotations and prefetches backing ``serializer_class``'s computed fields"""
+    meta = getattr(serializer_class, 'Meta', None)
+    if getattr(meta, 'model', None) is not queryset.model:
+        return queryset
+    fields = computed_fields(serializer_class)
+    annotations = {field.field_name: field.expression for field in fields if field.expression is not None}
+    prefetches = [field.prefetch for field in fields if field.prefetch is not None]
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    return queryset
@@ -76,6 +76,7 @@ class EmailLog(TimeStampedModel):
     # Error handling
     error_message = models.TextField(blank=True)
     retry_count = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)  # retry backoff or claim lease
     
     # Metadata
     metadata = models.JSONField(null=True, blank=True)
@@ -89,6 +90,7 @@ class EmailLog(TimeStampedModel):
             models.Index(fields=['recipient_email']),
             models.Index(fields=['status']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['status', 'next_attempt_at']),
         ]
     
     def __str__(self):
@@ -253,6 +255,7 @@ class WebhookDelivery(TimeStampedModel):
             models.Index(fields=['webhook', 'status']),
             models.Index(fields=['event']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['status', 'next_retry_at']),
         ]
     
     def __str__(self):
@@ -408,6 +411,9 @@ class ScheduledJob(BaseModel):
         verbose_name = 'Scheduled Job'
         verbose_name_plural = 'Scheduled Jobs'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['status', 'next_run_at']),
+        ]
     
     def __str__(self):
         return self.name
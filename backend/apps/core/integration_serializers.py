@@ -7,6 +7,7 @@ from apps.core.integration_models import (
     EmailTemplate, EmailLog, Notification, Webhook, WebhookDelivery,
     ExternalService, APILog, ScheduledJob, SystemSetting
 )
+from apps.core.scheduler import CronSchedule, ScheduleError, next_run_time, resolve_task
 
 
 # ============= Email Template Serializers =============
@@ -229,6 +230,35 @@ class ScheduledJobSerializer(serializers.ModelSerializer):
             'success_rate',
             'created_at', 'updated_at'
         ]
+        read_only_fields = [
+            'last_run_at', 'last_run_status', 'last_run_duration_seconds', 'last_run_error',
+            'next_run_at', 'total_runs', 'success_count', 'failure_count'
+        ]
+    
+    def validate_schedule_cron(self, value):
+        try:
+            CronSchedule(value).next_after(timezone.now())
+        except ScheduleError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+    
+    def validate_task_name(self, value):
+        try:
+            resolve_task(value)
+        except ScheduleError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+    
+    def save(self, **kwargs):
+        # A new schedule or status means a new next slot
+        if self.instance is None or {'schedule_cron', 'status'} & set(self.validated_data):
+            job = ScheduledJob(**{
+                'status': getattr(self.instance, 'status', 'active'),
+                'schedule_cron': getattr(self.instance, 'schedule_cron', ''),
+                **self.validated_data,
+            })
+            kwargs['next_run_at'] = next_run_time(job)
+        return super().save(**kwargs)
     
     def get_success_rate(self, obj):
         """Calculate success rate"""
@@ -3,6 +3,7 @@ Integration Layer URLs for notifications, webhooks, email, and system services
 """
 from django.urls import path
 from apps.core import integration_views as views
+from apps.core.notification_stream import notification_stream
 
 app_name = 'integration'
 
@@ -23,6 +24,8 @@ urlpatterns = [
     path('notifications/<int:pk>/', views.NotificationDetailView.as_view(), name='notification-detail'),
     path('notifications/<int:pk>/mark-read/', views.notification_mark_read, name='notification-mark-read'),
     path('notifications/mark-all-read/', views.notification_mark_all_read, name='notification-mark-all-read'),
+    path('notifications/unread-count/', views.notification_unread_count, name='notification-unread-count'),
+    path('notifications/stream/', notification_stream, name='notification-stream'),
     
     # Webhooks
     path('webhooks/', views.WebhookListView.as_view(), name='webhook-list'),
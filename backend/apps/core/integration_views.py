@@ -1,6 +1,8 @@
 """
 Integration Layer views for notifications, webhooks, email, and system services
 """
+import logging
+
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -22,11 +24,19 @@ from apps.core.integration_serializers import (
     ScheduledJobSerializer, SystemSettingSerializer
 )
 from apps.core.permissions import IsAdminOrReadOnly
+from apps.core.mixins import ConditionalGetMixin
+from apps.core.notifications import mark_all_read, mark_read, unread_count
+from apps.core.pagination import KeysetPagination
+from apps.core.outbox import queue_email, render_template
+from apps.core.scheduler import dispatch_job
+from apps.core.webhooks import deliver, dispatch_event
+
+logger = logging.getLogger(__name__)
 
 
 # ============= Email Template Views =============
 
-class EmailTemplateListView(generics.ListCreateAPIView):
+class EmailTemplateListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create email templates"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = EmailTemplateSerializer
@@ -44,7 +54,7 @@ class EmailTemplateListView(generics.ListCreateAPIView):
         return queryset.order_by('name')
 
 
-class EmailTemplateDetailView(generics.RetrieveUpdateDestroyAPIView):
+class EmailTemplateDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete an email template"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = EmailTemplateSerializer
@@ -58,7 +68,7 @@ class EmailTemplateDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============= Email Log Views =============
 
-class EmailLogListView(generics.ListAPIView):
+class EmailLogListView(ConditionalGetMixin, generics.ListAPIView):
     """List email logs"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = EmailLogSerializer
@@ -74,44 +84,48 @@ class EmailLogListView(generics.ListAPIView):
 @api_view(['POST'])
 @permission_classes([IsAdminOrReadOnly])
 def send_email(request):
-    """Send an email"""
+    """Queue an email in the outbox (sent by the background worker)"""
     recipient_email = request.data.get('recipient_email')
     subject = request.data.get('subject')
     body_html = request.data.get('body_html')
     body_text = request.data.get('body_text', '')
     template_id = request.data.get('template_id')
     
+    template = None
+    if template_id:
+        try:
+            template = EmailTemplate.objects.get(pk=template_id, is_active=True, deleted_at__isnull=True)
+        except EmailTemplate.DoesNotExist:
+            return Response({'error': 'Email template not found'}, status=status.HTTP_404_NOT_FOUND)
+        if not body_html and not body_text:
+            subject_rendered, body_html, body_text = render_template(
+                template, request.data.get('context') or {}
+            )
+            subject = subject or subject_rendered
+    
     if not recipient_email or not subject:
         return Response(
             {'error': 'recipient_email and subject are required'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Create email log
-    email_log = EmailLog.objects.create(
-        recipient_email=recipient_email,
-        recipient_name=request.data.get('recipient_name', ''),
-        subject=subject,
-        body_html=body_html or '',
+    email_log = queue_email(
+        recipient_email,
+        subject,
         body_text=body_text,
-        template_id=template_id,
-        status='pending',
+        body_html=body_html or '',
+        recipient_name=request.data.get('recipient_name', ''),
+        template=template,
         metadata=request.data.get('metadata', {})
     )
     
-    # In a real implementation, this would be sent via Celery task
-    # For now, just mark as sent
-    email_log.status = 'sent'
-    email_log.sent_at = timezone.now()
-    email_log.save()
-    
     serializer = EmailLogSerializer(email_log)
-    return Response(serializer.data)
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
 
 # ============= Notification Views =============
 
-class NotificationListView(generics.ListCreateAPIView):
+class NotificationListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create notifications"""
     permission_classes = [IsAuthenticated]
     serializer_class = NotificationSerializer
@@ -124,8 +138,8 @@ class NotificationListView(generics.ListCreateAPIView):
         queryset = Notification.objects.all()
         
         # Users see only their notifications
-        if hasattr(user, 'employee'):
-            queryset = queryset.filter(recipient=user.employee)
+        if hasattr(user, 'employee_profile'):
+            queryset = queryset.filter(recipient=user.employee_profile)
         
         # Filter unread only
         if self.request.query_params.get('unread_only', None) == 'true':
@@ -134,7 +148,7 @@ class NotificationListView(generics.ListCreateAPIView):
         return queryset.select_related('recipient')
 
 
-class NotificationDetailView(generics.RetrieveUpdateDestroyAPIView):
+class NotificationDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a notification"""
     permission_classes = [IsAuthenticated]
     serializer_class = NotificationSerializer
@@ -144,8 +158,8 @@ class NotificationDetailView(generics.RetrieveUpdateDestroyAPIView):
         queryset = Notification.objects.all()
         
         # Users see only their notifications
-        if hasattr(user, 'employee'):
-            queryset = queryset.filter(recipient=user.employee)
+        if hasattr(user, 'employee_profile'):
+            queryset = queryset.filter(recipient=user.employee_profile)
         
         return queryset.select_related('recipient')
 
@@ -159,12 +173,10 @@ def notification_mark_read(request, pk):
         notification = Notification.objects.get(pk=pk)
         
         # Check ownership
-        if hasattr(user, 'employee') and notification.recipient != user.employee:
+        if hasattr(user, 'employee_profile') and notification.recipient_id != user.employee_profile.pk:
             return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
         
-        notification.is_read = True
-        notification.read_at = timezone.now()
-        notification.save()
+        mark_read(notification)
         
         serializer = NotificationSerializer(notification)
         return Response(serializer.data)
@@ -179,18 +191,27 @@ def notification_mark_all_read(request):
     """Mark all notifications as read"""
     user = request.user
     
-    if hasattr(user, 'employee'):
-        Notification.objects.filter(
-            recipient=user.employee,
-            is_read=False
-        ).update(is_read=True, read_at=timezone.now())
+    if hasattr(user, 'employee_profile'):
+        mark_all_read(user.employee_profile.pk)
     
     return Response({'message': 'All notifications marked as read'})
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def notification_unread_count(request):
+    """Unread notification count of the current user (served from the cache)"""
+    user = request.user
+    
+    if not hasattr(user, 'employee_profile'):
+        return Response({'unread': 0})
+    
+    return Response({'unread': unread_count(user.employee_profile.pk)})
+
+
 # ============= Webhook Views =============
 
-class WebhookListView(generics.ListCreateAPIView):
+class WebhookListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create webhooks"""
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [SearchFilter, OrderingFilter]
@@ -212,10 +233,11 @@ class WebhookListView(generics.ListCreateAPIView):
         return queryset
 
 
-class WebhookDetailView(generics.RetrieveUpdateDestroyAPIView):
+class WebhookDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a webhook"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = WebhookSerializer
+    etag_related = ['deliveries']
     queryset = Webhook.objects.filter(deleted_at__isnull=True)
     
     def perform_destroy(self, instance):
@@ -233,33 +255,12 @@ def webhook_test(request, pk):
     except Webhook.DoesNotExist:
         return Response({'error': 'Webhook not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # Create test delivery
-    test_payload = {
-        'event': 'test',
-        'data': {'message': 'This is a test webhook delivery'},
-        'timestamp': timezone.now().isoformat()
-    }
-    
-    delivery = WebhookDelivery.objects.create(
-        webhook=webhook,
-        event='test',
-        payload=test_payload,
-        request_url=webhook.url,
-        request_body=str(test_payload),
-        status='pending'
+    # Send a test payload to this webhook only, right away
+    delivery, = dispatch_event(
+        'test', {'message': 'This is a test webhook delivery'}, webhooks=[webhook], queue=False
     )
-    
-    # In a real implementation, this would send an HTTP request
-    # For now, just mark as success
-    delivery.status = 'success'
-    delivery.sent_at = timezone.now()
-    delivery.response_status_code = 200
-    delivery.duration_ms = 100
-    delivery.save()
-    
-    webhook.last_triggered_at = timezone.now()
-    webhook.success_count += 1
-    webhook.save()
+    deliver([delivery])
+    delivery.refresh_from_db()
     
     serializer = WebhookDeliverySerializer(delivery)
     return Response(serializer.data)
@@ -267,13 +268,15 @@ def webhook_test(request, pk):
 
 # ============= Webhook Delivery Views =============
 
-class WebhookDeliveryListView(generics.ListAPIView):
+class WebhookDeliveryListView(ConditionalGetMixin, generics.ListAPIView):
     """List webhook deliveries"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = WebhookDeliverySerializer
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['webhook', 'event', 'status']
     ordering = ['-created_at']
+    pagination_class = KeysetPagination
+    etag_from_page = True
     
     def get_queryset(self):
         return WebhookDelivery.objects.select_related('webhook').order_by('-created_at')
@@ -281,7 +284,7 @@ class WebhookDeliveryListView(generics.ListAPIView):
 
 # ============= External Service Views =============
 
-class ExternalServiceListView(generics.ListCreateAPIView):
+class ExternalServiceListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create external services"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = ExternalServiceSerializer
@@ -299,7 +302,7 @@ class ExternalServiceListView(generics.ListCreateAPIView):
         return queryset.order_by('name')
 
 
-class ExternalServiceDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ExternalServiceDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete an external service"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = ExternalServiceSerializer
@@ -333,21 +336,23 @@ def external_service_health_check(request, pk):
 
 # ============= API Log Views =============
 
-class APILogListView(generics.ListAPIView):
+class APILogListView(ConditionalGetMixin, generics.ListAPIView):
     """List API logs"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = APILogSerializer
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['method', 'status_code', 'user']
     ordering = ['-created_at']
+    pagination_class = KeysetPagination
+    etag_from_page = True
     
     def get_queryset(self):
-        return APILog.objects.select_related('user').order_by('-created_at')[:1000]  # Limit to recent 1000
+        return APILog.objects.select_related('user').order_by('-created_at')
 
 
 # ============= Scheduled Job Views =============
 
-class ScheduledJobListView(generics.ListCreateAPIView):
+class ScheduledJobListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create scheduled jobs"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = ScheduledJobSerializer
@@ -365,7 +370,7 @@ class ScheduledJobListView(generics.ListCreateAPIView):
         return queryset.order_by('name')
 
 
-class ScheduledJobDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ScheduledJobDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a scheduled job"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = ScheduledJobSerializer
@@ -386,22 +391,22 @@ def scheduled_job_run(request, pk):
     except ScheduledJob.DoesNotExist:
         return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
     
-    # In a real implementation, this would trigger the actual job
-    # For now, just update stats
-    job.last_run_at = timezone.now()
-    job.last_run_status = 'success'
-    job.last_run_duration_seconds = 5
-    job.total_runs += 1
-    job.success_count += 1
-    job.save()
+    try:
+        dispatch_job(job.pk)
+    except Exception as e:
+        logger.warning(f"Could not queue scheduled job {job.pk}: {e}")
+        return Response(
+            {'error': 'Job could not be queued, try again later'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
     
     serializer = ScheduledJobSerializer(job)
-    return Response(serializer.data)
+    return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
 
 # ============= System Setting Views =============
 
-class SystemSettingListView(generics.ListCreateAPIView):
+class SystemSettingListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create system settings"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = SystemSettingSerializer
@@ -413,7 +418,7 @@ class SystemSettingListView(generics.ListCreateAPIView):
         return SystemSetting.objects.select_related('updated_by').order_by('category', 'key')
 
 
-class SystemSettingDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SystemSettingDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a system setting"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = SystemSettingSerializer
@@ -436,7 +441,7 @@ def integration_dashboard(request):
     
     # Notification metrics
     total_notifications = Notification.objects.count()
-    unread_notifications = Notification.objects.filter(is_read=False).count()
+    unread_notifications = unread_count()
     
     # Webhook metrics
     active_webhooks = Webhook.objects.filter(deleted_at__isnull=True, is_active=True).count()
@@ -0,0 +1,248 @@
+"""
+Management command checking the query count of every GET endpoint
+
+Walks the URL configuration and requests every list and detail endpoint
+as a superuser against the current database, inside a transaction that is
+rolled back, or against a throwaway test database filled by
+``seed_data --scale``. Lists are requested once per ``--page-sizes`` entry. An
+endpoint fails when
+
+* a list runs more queries for a larger page (per-row queries),
+* one request runs the same SQL ``--repeat-threshold`` times or more (it is
+  printed with the serializer field that ran it),
+* a request runs more queries than the ``query_budget`` declared on its view
+  (see ``apps.core.query_inspector``), or
+* it answers with a server error.
+
+Lists need more rows than the smallest page size to show per-row queries.
+Exits with an error when an endpoint fails, so it can gate CI.
+
+    python manage.py check_query_counts
+    python manage.py check_query_counts --page-sizes 5 50 --path /api/v1/crm/
+    python manage.py check_query_counts --scale 2   # freshly seeded test database
+"""
+import re
+from asyncio import iscoroutinefunction
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import URLResolver, get_resolver
+from django.urls.resolvers import RoutePattern
+from rest_framework.test import APIClient
+
+from apps.core.query_inspector import record_queries, view_query_budget
+
+PARAMETER = re.compile(r'<(?:\w+:)?(\w+)>')
+
+
+def iter_routes(patterns, prefix='', namespace=''):
+    """(route, view callable, view name) of every ``path()`` in ``patterns``"""
+    for entry in patterns:
+        if not isinstance(entry.pattern, RoutePattern):
+            continue
+        route = prefix + str(entry.pattern)
+        if isinstance(entry, URLResolver):
+            inner = f"{namespace}{entry.namespace}:" if entry.namespace else namespace
+            yield from iter_routes(entry.url_patterns, route, inner)
+        else:
+            yield route, entry.callback, f"{namespace}{entry.name or route}"
+
+
+def view_model(view):
+    """Model a class-based view reads (None for function views)"""
+    view_class = getattr(view, 'view_class', None)
+    queryset = getattr(view_class, 'queryset', None)
+    if queryset is not None:
+        return queryset.model
+    serializer_class = getattr(view_class, 'serializer_class', None)
+    return getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+
+
+def measurable(view):
+    """GET is allowed and answers with a finite response (streams are left out)"""
+    if iscoroutinefunction(view):
+        return False
+    view_class = getattr(view, 'view_class', None)
+    return view_class is None or hasattr(view_class, 'get')
+
+
+class Endpoint:
+    """A GET route and the results measured for it"""
+
+    def __init__(self, route, view, name):
+        self.route = route
+        self.view = view
+        self.name = name
+        self.parameters = PARAMETER.findall(route)
+        self.budget = view_query_budget(view)
+        self.runs = []  # (page size, status code, query count, repeated queries)
+
+    @property
+    def is_list(self):
+        return not self.parameters
+
+    def path(self):
+        """URL with parameters taken from the current data (None when there is none)"""
+        model = view_model(self.view)
+        if self.parameters and model is None:
+            return None
+        path = '/' + self.route
+        for name in self.parameters:
+            value = parameter_value(model, name)
+            if value is None:
+                return None
+            path = re.sub(rf'<(?:\w+:)?{name}>', str(value), path, count=1)
+        return path
+
+    def failures(self, threshold):
+        reasons = []
+        statuses = [status for _, status, _, _ in self.runs]
+        if max(statuses) >= 500:
+            reasons.append(f"HTTP {max(statuses)}")
+        counts = [count for _, status, count, _ in self.runs if status < 300]
+        if len(counts) == len(self.runs) > 1 and counts[-1] > counts[0]:
+            reasons.append('query count grows with the page size')
+        if any(len(repeated) for _, _, _, repeated in self.runs):
+            reasons.append(f"SQL repeated {threshold}+ times")
+        if self.budget is not None and any(count > self.budget for count in counts):
+            reasons.append(f"over its budget of {self.budget} queries")
+        return reasons
+
+
+def parameter_value(model, name):
+    """A value for URL parameter ``name``: the first row, or the parent with most rows"""
+    queryset = model._default_manager.all()
+    if any(field.name == 'deleted_at' for field in model._meta.fields):
+        queryset = queryset.filter(deleted_at__isnull=True)
+    if name == 'pk':
+        return queryset.order_by('pk').values_list('pk', flat=True).first()
+
+    field_name = name[:-3] if name.endswith('_id') else name
+    field = next((field for field in model._meta.fields if field.name == field_name), None)
+    if field is None:
+        return None
+    if field.many_to_one:
+        # The parent with the most children shows per-child queries best
+        row = queryset.values(field.attname).annotate(rows=Count('pk')).order_by('-rows').first()
+        return row and row[field.attname]
+    return queryset.order_by('pk').values_list(field_name, flat=True).first()
+
+
+class Command(BaseCommand):
+    help = 'Flag endpoints with per-row queries, repeated SQL or over their query budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-sizes',
+            type=int,
+            nargs='+',
+            default=[5, 50],
+            help='Page sizes to request lists with (default: 5 50)',
+        )
+        parser.add_argument(
+            '--path',
+            default='/api/v1/',
+            help='Only check endpoints under this path prefix (default: /api/v1/)',
+        )
+        parser.add_argument(
+            '--repeat-threshold',
+            type=int,
+            default=None,
+            help='Fail on SQL repeated this often in a request (default: QUERY_INSPECTOR_REPEAT_THRESHOLD)',
+        )
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=None,
+            help='Measure a test database seeded with seed_data --scale instead of the current one',
+        )
+
+    def handle(self, *args, **options):
+        self.threshold = options['repeat_threshold'] or getattr(settings, 'QUERY_INSPECTOR_REPEAT_THRESHOLD', 5)
+        prefix = options['path'].lstrip('/')
+        endpoints = [
+            Endpoint(route, view, name)
+            for route, view, name in iter_routes(get_resolver().url_patterns)
+            if route.startswith(prefix) and measurable(view)
+        ]
+        if not endpoints:
+            raise CommandError(f"No GET endpoints under {options['path']}")
+
+        # Keep the measurements free of cache hits and of the middleware's own logging;
+        # buffered API log rows would be flushed outside the rolled back transaction
+        with override_settings(
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            QUERY_INSPECTOR_ENABLED=False,
+            AUDIT_API_REQUESTS=False,
+        ):
+            if options['scale']:
+                self.measure_seeded(endpoints, sorted(options['page_sizes']), options['scale'])
+            else:
+                with transaction.atomic():
+                    self.measure(endpoints, sorted(options['page_sizes']))
+                    transaction.set_rollback(True)
+
+        self.report(endpoints)
+
+    def measure_seeded(self, endpoints, page_sizes, scale):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f"Seeding at scale {scale}...")
+            call_command('seed_data', scale=scale, verbosity=0)
+            self.measure(endpoints, page_sizes)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def measure(self, endpoints, page_sizes):
+        from django.core.cache import cache
+
+        user = get_user_model().objects.create_superuser(
+            email='query-check@example.com', password=None, first_name='Query', last_name='Check'
+        )
+        client = APIClient()
+        client.raise_request_exception = False
+        client.force_authenticate(user)
+
+        for endpoint in endpoints:
+            path = endpoint.path()
+            if path is None:
+                continue
+            for page_size in page_sizes if endpoint.is_list else [None]:
+                cache.clear()
+                with record_queries() as recorder:
+                    response = client.get(path, {'page_size': page_size} if page_size else None)
+                endpoint.runs.append(
+                    (page_size, response.status_code, recorder.count, recorder.repeated(self.threshold))
+                )
+
+    def report(self, endpoints):
+        failed = skipped = 0
+        for endpoint in endpoints:
+            if not endpoint.runs:
+                skipped += 1
+                continue
+            counts = ' -> '.join(str(count) for _, _, count, _ in endpoint.runs)
+            budget = f" (budget {endpoint.budget})" if endpoint.budget is not None else ''
+            line = f"{endpoint.name} /{endpoint.route}: {counts} queries{budget}"
+            reasons = endpoint.failures(self.threshold)
+            if reasons:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"FAIL {line} - {', '.join(reasons)}"))
+            else:
+                self.stdout.write(f"ok   {line}")
+            for query in endpoint.runs[-1][3]:
+                self.stdout.write(f"       {query}")
+
+        self.stdout.write(
+            f"\n{len(endpoints)} endpoints: {failed} failed, "
+            f"{skipped} skipped (no data for their URL parameters)"
+        )
+        if failed:
+            raise CommandError(f"{failed} endpoint(s) failed the query checks")
@@ -0,0 +1,34 @@
+"""
+Management command to rebuild materialized dashboard snapshots from scratch
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.snapshots import snapshot_registry
+
+
+class Command(BaseCommand):
+    help = 'Recompute dashboard snapshot counters from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dashboard',
+            action='append',
+            dest='dashboards',
+            help='Rebuild only this dashboard (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        names = options['dashboards'] or sorted(snapshot_registry)
+
+        unknown = set(names) - set(snapshot_registry)
+        if unknown:
+            raise CommandError(
+                f"Unknown dashboard(s): {', '.join(sorted(unknown))}. "
+                f"Available: {', '.join(sorted(snapshot_registry))}"
+            )
+
+        for name in names:
+            values = snapshot_registry[name].rebuild()
+            self.stdout.write(
+                self.style.SUCCESS(f"Rebuilt '{name}' snapshot ({len(values) - 1} metrics)")
+            )
@@ -0,0 +1,237 @@
+"""
+Management command running the end-to-end API benchmark
+
+Seeds a throwaway test database with ``seed_data --scale``, replays the
+weighted scenario mix of ``apps.core.benchmark`` at the given concurrency
+and reports p50/p95/p99 latency, throughput, errors and queries per request
+for every scenario. Results are written to JSON and compared against the
+stored baseline; the command exits with an error when a scenario regressed,
+so it can gate CI.
+
+    python manage.py run_benchmark --save-baseline            # on main
+    python manage.py run_benchmark                            # on the branch
+    python manage.py run_benchmark --scale 100 --concurrency 32 --duration 120
+    python manage.py run_benchmark --scenario task_list --scenario task_move
+    python manage.py run_benchmark --no-seed   # current data; its writes are kept
+"""
+import json
+import os
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from apps.core import audit, benchmark, seeding
+
+BENCHMARK_DIR = os.path.join(str(settings.BASE_DIR), 'benchmarks')
+
+# Settings a baseline must share with a run to be comparable
+COMPARABLE = ('scale', 'seed', 'concurrency', 'users', 'scenarios')
+
+
+class Command(BaseCommand):
+    help = 'Benchmark a weighted mix of API calls and compare the results against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=10,
+            help='seed_data scale factor of the benchmark database (default: 10)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=seeding.DEFAULT_SEED,
+            help=f"Seed of the data and of the call mix (default: {seeding.DEFAULT_SEED})",
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Threads sending requests at the same time (default: 8)',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Seconds to measure for (default: 30)',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=float,
+            default=5,
+            help='Seconds of unmeasured requests before measuring (default: 5)',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=100,
+            help='Seeded users to spread the calls over (default: 100)',
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            dest='scenarios',
+            choices=[entry.name for entry in benchmark.SCENARIOS],
+            metavar='NAME',
+            help='Only run this scenario (repeatable; default: the whole mix)',
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Results file (default: benchmarks/results-<timestamp>.json)',
+        )
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(BENCHMARK_DIR, 'baseline.json'),
+            help='Baseline to compare against (default: benchmarks/baseline.json)',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Store these results as the new baseline instead of failing on regressions',
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=20,
+            help='Percent p95 latency or throughput may move before it counts as a regression (default: 20)',
+        )
+        parser.add_argument(
+            '--no-seed',
+            action='store_true',
+            help='Benchmark the current database; posted entries, moved tasks and logins are kept',
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['duration'] <= 0:
+            raise CommandError('--concurrency and --duration must be positive')
+
+        # A key prefix of its own: cold caches, fresh throttle history and no
+        # entries cached from another database
+        prefix = f"benchmark-{uuid.uuid4().hex[:8]}"
+        caches = {alias: {**config, 'KEY_PREFIX': prefix} for alias, config in settings.CACHES.items()}
+
+        setup_test_environment()
+        try:
+            with override_settings(CACHES=caches, QUERY_INSPECTOR_ENABLED=False):
+                if options['no_seed']:
+                    self.stdout.write(self.style.WARNING(
+                        'Benchmarking the current database; the requests write to it'
+                    ))
+                    results = self.measure(options)
+                else:
+                    results = self.measure_seeded(options)
+        finally:
+            teardown_test_environment()
+
+        output = options['output'] or os.path.join(
+            BENCHMARK_DIR, f"results-{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+        self.write_json(output, results)
+
+        baseline = self.load_baseline(options['baseline'])
+        self.report(results, baseline)
+        self.stdout.write(f"\nResults written to {output}")
+
+        regressions = []
+        if baseline is not None:
+            regressions = benchmark.compare(results, baseline, options['tolerance'] / 100)
+            for name, description in regressions:
+                self.stdout.write(self.style.ERROR(f"REGRESSION {name}: {description}"))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+
+        if options['save_baseline']:
+            self.write_json(options['baseline'], results)
+            self.stdout.write(f"Baseline stored in {options['baseline']}")
+        elif regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against the baseline")
+
+    def measure_seeded(self, options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f"Seeding at scale {options['scale']}...")
+            call_command('seed_data', scale=options['scale'], seed=options['seed'], verbosity=0)
+            return self.measure(options)
+        finally:
+            # Buffered API log rows belong to the test database
+            audit.flush_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def measure(self, options):
+        fixtures = benchmark.Fixtures(options['users'], seeding.DEFAULT_PASSWORD, options['seed'])
+        if not fixtures.users:
+            raise CommandError('No active users with an employee profile to send requests as')
+
+        self.stdout.write(
+            f"Running {options['concurrency']} threads for {options['warmup']:g}s warm-up "
+            f"+ {options['duration']:g}s..."
+        )
+        samples, elapsed = benchmark.run(
+            fixtures,
+            options['concurrency'],
+            options['duration'],
+            warmup=options['warmup'],
+            seed=options['seed'],
+            scenarios=options['scenarios'],
+        )
+        return benchmark.summarize(samples, elapsed, {
+            'scale': None if options['no_seed'] else options['scale'],
+            'seed': options['seed'],
+            'concurrency': options['concurrency'],
+            'duration': options['duration'],
+            'warmup': options['warmup'],
+            'users': len(fixtures.users),
+            'scenarios': sorted(options['scenarios'] or [entry.name for entry in benchmark.SCENARIOS]),
+        })
+
+    def load_baseline(self, path):
+        if not os.path.exists(path):
+            self.stdout.write(f"No baseline at {path}; rerun with --save-baseline to store one")
+            return None
+        with open(path) as baseline_file:
+            return json.load(baseline_file)
+
+    def write_json(self, path, results):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as results_file:
+            json.dump(results, results_file, indent=2)
+            results_file.write('\n')
+
+    def report(self, results, baseline):
+        previous = {}
+        if baseline is not None:
+            previous = {**baseline.get('endpoints', {}), 'total': baseline.get('total', {})}
+            config = baseline.get('config', {})
+            different = [key for key in COMPARABLE if config.get(key) != results['config'].get(key)]
+            if baseline.get('environment', {}).get('database') != results['environment']['database']:
+                different.append('database')
+            if different:
+                self.stdout.write(self.style.WARNING(
+                    f"The baseline was measured with a different {', '.join(different)}; "
+                    f"the numbers are not directly comparable"
+                ))
+
+        self.stdout.write(
+            f"\n{'scenario':<22}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'p99 ms':>9}{'req/s':>9}{'queries':>9}{'p95 vs base':>13}"
+        )
+        rows = [*results['endpoints'].items(), ('total', results['total'])]
+        for name, entry in rows:
+            latency = entry['latency_ms']
+            change = ''
+            before = previous.get(name)
+            if before and before.get('requests') and before['latency_ms']['p95']:
+                change = f"{(latency['p95'] / before['latency_ms']['p95'] - 1) * 100:+.0f}%"
+            line = (
+                f"{name:<22}{entry['requests']:>9}{entry['errors']:>8}{latency['p50']:>9.1f}"
+                f"{latency['p95']:>9.1f}{latency['p99']:>9.1f}{entry['throughput']:>9.1f}"
+                f"{entry['queries']['mean']:>9.1f}{change:>13}"
+            )
+            self.stdout.write(self.style.WARNING(line) if entry['errors'] else line)
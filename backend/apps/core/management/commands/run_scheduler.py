@@ -0,0 +1,43 @@
+"""
+Management command to run the ScheduledJob scheduler in the foreground
+
+Several schedulers may run at once (one per host); each slot fires once.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.core.scheduler import run_due_jobs, seconds_until_next_job
+
+
+class Command(BaseCommand):
+    help = 'Dispatch due scheduled jobs to Celery (use --once for a single tick)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Dispatch what is due now and exit',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=None,
+            help='Maximum seconds between ticks (default: SCHEDULER_POLL_INTERVAL)',
+        )
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval'] or getattr(settings, 'SCHEDULER_POLL_INTERVAL', 15)
+        while True:
+            close_old_connections()
+            dispatched = run_due_jobs()
+            if dispatched:
+                self.stdout.write(f"Dispatched {dispatched} scheduled job(s)")
+            if options['once']:
+                return
+            # Wake up for the next slot, but re-check at least every poll interval
+            # so new and edited jobs are picked up
+            wait = seconds_until_next_job()
+            time.sleep(poll_interval if wait is None else min(max(wait, 0.5), poll_interval))
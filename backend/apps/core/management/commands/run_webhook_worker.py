@@ -0,0 +1,38 @@
+"""
+Management command to run the webhook delivery worker in the foreground
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.core.webhooks import deliver_due_webhooks
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending and due webhook deliveries (use --once for a single pass)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Deliver what is due now and exit',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep when nothing is due (default: 2)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            outcomes = deliver_due_webhooks()
+            if outcomes:
+                summary = ', '.join(f"{count} {status}" for status, count in sorted(outcomes.items()))
+                self.stdout.write(f"Delivered webhooks: {summary}")
+            if options['once']:
+                return
+            if not outcomes:
+                time.sleep(options['poll_interval'])
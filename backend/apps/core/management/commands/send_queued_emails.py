@@ -0,0 +1,36 @@
+"""
+Management command to drain the email outbox
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.core.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = 'Send pending EmailLog messages in batches over one SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep draining until interrupted',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=10.0,
+            help='Seconds between drains with --loop (default: 10)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            totals = drain_outbox()
+            if totals['sent'] or totals['failed'] or not options['loop']:
+                self.stdout.write(f"Sent {totals['sent']} emails, {totals['failed']} failed")
+            if not options['loop']:
+                return
+            time.sleep(options['poll_interval'])
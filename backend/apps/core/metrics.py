@@ -0,0 +1,335 @@
+"""
+Request metrics
+
+``QueryCounter`` is a ``connection.execute_wrapper`` that counts queries and
+database time, so it works with ``DEBUG=False`` (``connection.queries`` is
+only filled in debug mode). ``RequestMetricsMiddleware`` installs it on
+every database connection for the duration of a request and records, per
+view name (``resolver_match.view_name``) and method:
+
+* ``erp_requests_total``: requests by response status
+* ``erp_request_duration_seconds``: latency histogram
+* ``erp_request_db_duration_seconds``: database time histogram
+* ``erp_request_queries``: query count histogram
+
+``metrics_view`` also publishes the ``apps.core.audit`` buffer counters
+(``erp_log_buffer_*``, by writer) so backpressure and dropped records show
+up next to the request series.
+
+Every worker process counts in its own memory. With several workers (the
+gunicorn deployment) set ``METRICS_MULTIPROC_DIR`` to a directory shared by
+them: each process dumps its registry to ``metrics-<pid>.json`` there at most
+every ``METRICS_DUMP_INTERVAL`` seconds, and a scrape, whichever worker
+answers it, merges every file into one set of series. Files of exited
+workers are kept so counters never go backwards; empty the directory when
+the server starts. Without the setting a scrape reports the answering
+process only.
+
+Requests slower than ``METRICS_SLOW_REQUEST_MS`` or running more than
+``METRICS_SLOW_QUERY_COUNT`` queries get ``X-Query-Count`` and
+``Server-Timing`` response headers and a warning in the log.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.core import audit
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+UNMATCHED_VIEW = '<unmatched>'
+
+# ``apps.core.audit`` writer stats: (key, metric type, help)
+LOG_BUFFER_STATS = (
+    ('enqueued', 'counter', 'Records queued'),
+    ('written', 'counter', 'Records inserted'),
+    ('flushes', 'counter', 'Successful flushes'),
+    ('failed_flushes', 'counter', 'Flushes that failed and were retried or quarantined'),
+    ('dropped', 'counter', 'Records dropped (rejected rows or buffer overflow)'),
+    ('quarantined', 'counter', 'Records dropped after repeated failed flushes'),
+    ('backpressure_flushes', 'counter', 'Flushes run inline by a producer because the buffer was full'),
+    ('pending', 'gauge', 'Records waiting in the buffer'),
+    ('high_water_mark', 'gauge', 'Largest number of records waiting at once'),
+    ('last_flush_ms', 'gauge', 'Duration of the last flush in milliseconds'),
+    ('last_flush_size', 'gauge', 'Records written by the last flush'),
+)
+
+
+class QueryCounter:
+    """``execute_wrapper`` counting queries and the time spent in them"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+@contextmanager
+def count_queries():
+    """Count the queries run on every database connection inside the block"""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+class Histogram:
+    """Cumulative histogram per label set"""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            # [per-bucket counts..., +Inf count], sum
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def dump(self):
+        return [[list(labels), counts, total] for labels, (counts, total) in self.series.items()]
+
+    def merge(self, dumped):
+        """Add the series of another process's ``dump()``"""
+        for labels, counts, total in dumped:
+            series = self.series.setdefault(tuple(labels), [[0] * (len(self.buckets) + 1), 0.0])
+            series[0] = [mine + theirs for mine, theirs in zip(series[0], counts)]
+            series[1] += total
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self.series.items()):
+            base = _labels(label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class RequestMetrics:
+    """Per-view request metrics, merged across workers through ``METRICS_MULTIPROC_DIR``"""
+
+    LABELS = ('view', 'method')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._dump_lock = threading.Lock()
+        self._dumped_at = 0.0
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = {}
+            self.duration = Histogram(
+                'erp_request_duration_seconds', 'Request latency by view', DURATION_BUCKETS
+            )
+            self.db_duration = Histogram(
+                'erp_request_db_duration_seconds', 'Database time per request by view', DURATION_BUCKETS
+            )
+            self.queries = Histogram(
+                'erp_request_queries', 'Queries per request by view', QUERY_BUCKETS
+            )
+
+    @property
+    def histograms(self):
+        return (self.duration, self.db_duration, self.queries)
+
+    @property
+    def directory(self):
+        return getattr(settings, 'METRICS_MULTIPROC_DIR', '')
+
+    def observe(self, view, method, status_code, duration, db_duration, query_count):
+        labels = (view, method)
+        with self.lock:
+            key = labels + (status_code,)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.duration.observe(labels, duration)
+            self.db_duration.observe(labels, db_duration)
+            self.queries.observe(labels, query_count)
+        if self.directory and time.monotonic() - self._dumped_at >= getattr(settings, 'METRICS_DUMP_INTERVAL', 1.0):
+            self.dump()
+
+    def state(self):
+        """JSON-serialisable counts of this process"""
+        with self.lock:
+            return {
+                'requests': [list(key) + [count] for key, count in self.requests.items()],
+                'histograms': {histogram.name: histogram.dump() for histogram in self.histograms},
+                'log_buffers': audit.stats(),
+            }
+
+    def dump(self):
+        """Write this process's counts to ``METRICS_MULTIPROC_DIR``"""
+        if not self._dump_lock.acquire(blocking=False):
+            return  # another thread is writing the same file
+        try:
+            self._dumped_at = time.monotonic()
+            path = os.path.join(self.directory, f"metrics-{os.getpid()}.json")
+            with open(f"{path}.tmp", 'w') as f:
+                json.dump(self.state(), f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {self.directory}: {e}")
+        finally:
+            self._dump_lock.release()
+
+    def collect(self):
+        """States of every worker (just this process without ``METRICS_MULTIPROC_DIR``)"""
+        if not self.directory:
+            return [self.state()]
+        self.dump()
+        states = []
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path) as f:
+                    states.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable metrics file {path}: {e}")
+        return states
+
+    def merge(self, state):
+        with self.lock:
+            for *key, count in state['requests']:
+                key = tuple(key)
+                self.requests[key] = self.requests.get(key, 0) + count
+            for histogram in self.histograms:
+                histogram.merge(state['histograms'].get(histogram.name, []))
+
+    def render(self):
+        """Prometheus text exposition format, summed over all workers"""
+        states = self.collect()
+        merged = RequestMetrics()
+        for state in states:
+            merged.merge(state)
+        lines = ['# HELP erp_requests_total Requests by view and status', '# TYPE erp_requests_total counter']
+        for key, count in sorted(merged.requests.items()):
+            lines.append(f"erp_requests_total{{{_labels(self.LABELS + ('status',), key)}}} {count}")
+        for histogram in merged.histograms:
+            lines.extend(histogram.render(self.LABELS))
+        lines.extend(render_log_buffers([state['log_buffers'] for state in states]))
+        return '\n'.join(lines) + '\n'
+
+
+def render_log_buffers(per_process):
+    """
+    ``apps.core.audit`` writer stats of every process as Prometheus lines
+
+    Counters and ``pending`` are summed over the processes; the other gauges
+    report the largest value.
+    """
+    writers = {}
+    for process_stats in per_process:
+        for writer, values in process_stats.items():
+            writers.setdefault(writer, []).append(values)
+    lines = []
+    for key, kind, help_text in LOG_BUFFER_STATS:
+        name = f"erp_log_buffer_{key}_total" if kind == 'counter' else f"erp_log_buffer_{key}"
+        combine = sum if kind == 'counter' or key == 'pending' else max
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"])
+        for writer, values in sorted(writers.items()):
+            lines.append(f"{name}{{{_labels(('writer',), (writer,))}}} {combine(v[key] for v in values)}")
+    return lines
+
+
+request_metrics = RequestMetrics()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED_VIEW
+    return match.view_name or match.route or UNMATCHED_VIEW
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, query count and database time of every request
+
+    Install first in ``MIDDLEWARE`` so the other middleware is measured too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with count_queries() as counter:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        request_metrics.observe(
+            view_name(request), request.method, response.status_code,
+            duration, counter.duration, counter.count
+        )
+
+        slow_ms = getattr(settings, 'METRICS_SLOW_REQUEST_MS', 500)
+        slow_queries = getattr(settings, 'METRICS_SLOW_QUERY_COUNT', 20)
+        if duration * 1000 >= slow_ms or counter.count >= slow_queries:
+            response['X-Query-Count'] = counter.count
+            response['Server-Timing'] = (
+                f'db;dur={counter.duration * 1000:.1f};desc="{counter.count} queries", '
+                f'total;dur={duration * 1000:.1f}'
+            )
+            logger.warning(
+                f"Slow request: {request.method} {request.path} ({view_name(request)}) "
+                f"- {counter.count} queries, {counter.duration * 1000:.1f}ms db, "
+                f"{duration * 1000:.1f}ms total"
+            )
+        return response
+
+
+def _metrics_allowed(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and constant_time_compare(authorization, f"Bearer {token}"):
+        return True
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint (``METRICS_TOKEN`` bearer token or a staff JWT)"""
+    if not _metrics_allowed(request):
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    return HttpResponse(request_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
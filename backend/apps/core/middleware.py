@@ -2,10 +2,13 @@
 Custom security middleware for Django application
 """
 import logging
+import time
 from django.http import HttpResponseForbidden
 from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 
+from apps.core.audit import api_log_writer, clean_ip_address
+
 logger = logging.getLogger(__name__)
 
 
@@ -142,14 +145,17 @@ class IPWhitelistMiddleware(MiddlewareMixin):
 class AuditLogMiddleware(MiddlewareMixin):
     """
     Log all API requests for audit trail
+
+    With ``AUDIT_API_REQUESTS`` (off by default), requests are also recorded
+    as ``APILog`` rows through the buffered writer in ``apps.core.audit`` so
+    the INSERT never runs on the request path.
     """
     
     SENSITIVE_FIELDS = ['password', 'token', 'secret', 'api_key']
     
     def process_request(self, request):
         # Store request start time
-        import time
-        request._start_time = time.time()
+        request._start_time = time.perf_counter()
         return None
     
     def process_response(self, request, response):
@@ -158,17 +164,15 @@ class AuditLogMiddleware(MiddlewareMixin):
             return response
         
         # Calculate request duration
-        import time
-        duration = int((time.time() - getattr(request, '_start_time', time.time())) * 1000)
+        duration = int((time.perf_counter() - getattr(request, '_start_time', time.perf_counter())) * 1000)
         
         # Get user
         user = getattr(request, 'user', None)
-        user_id = user.id if user and user.is_authenticated else None
+        user_id = user.pk if user and user.is_authenticated else None
         
         # Get client IP
         client_ip = self.get_client_ip(request)
         
-        # Log request
         log_data = {
             'method': request.method,
             'path': request.path,
@@ -180,17 +184,38 @@ class AuditLogMiddleware(MiddlewareMixin):
         
         if response.status_code >= 400:
             logger.warning(f"API request failed: {log_data}")
-        else:
-            logger.info(f"API request: {log_data}")
+        
+        if getattr(settings, 'AUDIT_API_REQUESTS', False):
+            api_log_writer.add(
+                method=request.method,
+                path=request.path[:500],
+                query_params=self.redact(request.GET) or None,
+                account_id=str(user_id) if user_id is not None else None,
+                status_code=response.status_code,
+                duration_ms=duration,
+                ip_address=client_ip,
+                user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
+            )
         
         return response
     
+    def redact(self, params):
+        """Query parameters with sensitive values masked"""
+        return {
+            key: '***' if any(field in key.lower() for field in self.SENSITIVE_FIELDS)
+            else params.getlist(key)[-1]
+            for key in params
+        }
+    
     @staticmethod
     def get_client_ip(request):
-        """Get client IP address from request"""
+        """
+        Get client IP address from request
+
+        ``X-Forwarded-For`` is client-controlled, so a value that is not an IP
+        address falls back to ``REMOTE_ADDR`` (or ``None``) instead of being
+        stored in the ``GenericIPAddressField``.
+        """
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        ip = clean_ip_address(x_forwarded_for.split(',')[0]) if x_forwarded_for else None
+        return ip or clean_ip_address(request.META.get('REMOTE_ADDR'))
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('dashboard', models.CharField(max_length=50)),
+                ('metric', models.CharField(max_length=200)),
+                ('value', models.DecimalField(decimal_places=4, default=0, max_digits=24)),
+            ],
+            options={
+                'verbose_name': 'Dashboard Metric',
+                'verbose_name_plural': 'Dashboard Metrics',
+                'db_table': 'dashboard_metrics',
+                'ordering': ['dashboard', 'metric'],
+                'unique_together': {('dashboard', 'metric')},
+            },
+        ),
+    ]
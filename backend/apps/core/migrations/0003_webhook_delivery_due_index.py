@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_dashboard_metrics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='webhookdelivery',
+            index=models.Index(fields=['status', 'next_retry_at'], name='webhook_del_status_741062_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_webhook_delivery_due_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scheduledjob',
+            index=models.Index(fields=['status', 'next_run_at'], name='scheduled_j_status_09193f_idx'),
+        ),
+    ]
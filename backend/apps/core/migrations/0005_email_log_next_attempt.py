@@ -0,0 +1,22 @@
+# Generated by Django 5.0.1 on 2026-10-17 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_scheduled_job_due_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emaillog',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='emaillog',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='email_logs_status_33ca56_idx'),
+        ),
+    ]
@@ -1,7 +1,17 @@
 """
 Query optimization mixins for ViewSets
 """
+import hashlib
+import json
+from calendar import timegm
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from rest_framework import viewsets
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 
 
 class OptimizedQueryMixin:
@@ -30,30 +40,353 @@ class OptimizedQueryMixin:
         return queryset
 
 
+class ComputedFieldsMixin:
+    """
+    Annotate the queryset with the ``ComputedField`` values of the serializer
+
+    Applied in ``filter_queryset`` so it also covers views that build their
+    own ``get_queryset``. See ``apps.core.computed``.
+
+    Usage:
+        class ClientListView(ComputedFieldsMixin, ConditionalGetMixin, generics.ListCreateAPIView):
+            serializer_class = ClientListSerializer
+    """
+
+    def filter_queryset(self, queryset):
+        from apps.core.computed import with_computed_fields
+
+        queryset = super().filter_queryset(queryset)
+        return with_computed_fields(queryset, self.get_serializer_class())
+
+
+_row_state_cache = {}
+
+
+def representation_from_rows(serializer, model, related=()):
+    """
+    Whether ``serializer`` only outputs columns of ``model``'s own row
+
+    Nested serializers count when their source is one of the ``related``
+    collections and they in turn only output their rows' columns. Method
+    fields, computed fields, dotted sources (``client.name``) and
+    properties read other data, which ``updated_at`` does not cover.
+    """
+    from rest_framework import serializers
+
+    concrete = {field.name for field in model._meta.concrete_fields}
+    # Choice labels are read from the row too
+    concrete |= {f"get_{field.name}_display" for field in model._meta.concrete_fields if field.choices}
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        source = field.source_attrs
+        if len(source) != 1:
+            return False
+        if isinstance(field, serializers.BaseSerializer):
+            child = getattr(field, 'child', field)
+            if source[0] not in related:
+                return False
+            related_model = model._meta.get_field(source[0]).related_model
+            if not representation_from_rows(child, related_model):
+                return False
+        elif isinstance(field, serializers.SerializerMethodField) or source[0] not in concrete:
+            if not (isinstance(field, serializers.ManyRelatedField) and source[0] in related):
+                return False
+    return True
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs with 304 Not Modified
+    
+    When the serializer only outputs the row's own columns (see
+    ``representation_from_rows``), the validators come from ``updated_at``
+    and the 304 is sent before serializing:
+    
+    * list: ``max(updated_at)`` and ``count`` of the filtered queryset
+    * detail: the instance's ``updated_at`` (also sent as Last-Modified)
+    
+    Related collections embedded in the representation (e.g. invoice lines)
+    are not covered by the parent's ``updated_at``; list them in
+    ``etag_related`` to fold their count and ``max(updated_at)`` into the
+    validators. Set ``conditional_get = False`` to opt a view out.
+    
+    Any other representation (related names, counts, sums) can change
+    while every row it is read from keeps its ``updated_at``. Its ETag is
+    then a digest of the serialized data: the database work is done, but
+    an unchanged response is not rendered or sent again.
+    
+    Lists never send Last-Modified: a row leaving the filter does not move
+    ``max(updated_at)`` forward.
+    
+    Views over very large tables set ``etag_from_page = True``: the page is
+    fetched first and validated by its own rows plus the paginator's
+    next/previous links and count, avoiding a table-wide aggregate (meant
+    for keyset pagination, which runs no COUNT either).
+    
+    Usage:
+        class InvoiceDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
+            etag_related = ['lines']
+    """
+    conditional_get = True
+    etag_related = []
+    etag_from_page = False
+    
+    def _conditional_get_enabled(self, model):
+        if not self.conditional_get:
+            return False
+        try:
+            model._meta.get_field('updated_at')
+        except FieldDoesNotExist:
+            return False
+        return True
+    
+    def _validated_by_rows(self, model):
+        """Whether the row state validates the representation (cached per serializer)"""
+        serializer_class = self.get_serializer_class()
+        key = (serializer_class, model, tuple(self.etag_related))
+        if key not in _row_state_cache:
+            serializer = serializer_class(context=self.get_serializer_context())
+            _row_state_cache[key] = representation_from_rows(serializer, model, self.etag_related)
+        return _row_state_cache[key]
+    
+    def _validator_aggregates(self, model):
+        aggregates = {
+            'modified': Max('updated_at'),
+            'count': Count('pk', distinct=bool(self.etag_related)),
+        }
+        for name in self.etag_related:
+            related_model = model._meta.get_field(name).related_model
+            aggregates[f"{name}_count"] = Count(name, distinct=True)
+            if self._conditional_get_enabled(related_model):
+                aggregates[f"{name}_modified"] = Max(f"{name}__updated_at")
+        return aggregates
+    
+    def _validators(self, state):
+        """Return (etag, last_modified timestamp) for the aggregated state"""
+        user = getattr(self.request, 'user', None)
+        parts = [
+            str(getattr(user, 'pk', '')),
+            str(getattr(self.request, 'accepted_media_type', '')),
+        ] + [f"{key}={state[key]}" for key in sorted(state)]
+        digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+        etag = f'W/"{digest}"'
+        
+        modified = [value for key, value in state.items() if key.endswith('modified') and value]
+        last_modified = timegm(max(modified).utctimetuple()) if modified else None
+        return etag, last_modified
+    
+    def _data_validators(self, data):
+        """Return (etag, None) for serialized ``data``"""
+        content = json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+        return self._validators({'data': hashlib.md5(content.encode()).hexdigest()})[0], None
+    
+    def _not_modified(self, request, etag, last_modified):
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return self._add_validators(response, etag, last_modified)
+        return None
+    
+    def _add_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        # Per-user data: let browsers keep it but always revalidate
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    
+    def _respond(self, request, response):
+        """Validate a serialized response by its data"""
+        if response.status_code != 200:
+            return response
+        etag, _ = self._data_validators(response.data)
+        not_modified = self._not_modified(request, etag, None)
+        if not_modified is not None:
+            return not_modified
+        return self._add_validators(response, etag, None)
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if not self._conditional_get_enabled(queryset.model):
+            return super().list(request, *args, **kwargs)
+        if not self._validated_by_rows(queryset.model):
+            return self._respond(request, super().list(request, *args, **kwargs))
+        
+        if self.etag_from_page and self.paginator is not None:
+            return self._list_page(request, queryset)
+        
+        state = queryset.order_by().aggregate(**self._validator_aggregates(queryset.model))
+        etag, _ = self._validators(state)
+        not_modified = self._not_modified(request, etag, None)
+        if not_modified is not None:
+            return not_modified
+        
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            self._add_validators(response, etag, None)
+        return response
+    
+    def _list_page(self, request, queryset):
+        page = self.paginate_queryset(queryset)
+        # The envelope changes with rows outside the page too (next/previous, total)
+        paginator_page = getattr(self.paginator, 'page', None)
+        count = getattr(getattr(paginator_page, 'paginator', None), 'count', None)
+        state = {
+            'modified': max((obj.updated_at for obj in page), default=None),
+            'rows': ','.join(str(obj.pk) for obj in page),
+            'next': self.paginator.get_next_link(),
+            'previous': self.paginator.get_previous_link(),
+            'count': count if count is not None else getattr(self.paginator, 'count', None),
+        }
+        etag, _ = self._validators(state)
+        not_modified = self._not_modified(request, etag, None)
+        if not_modified is not None:
+            return not_modified
+        
+        serializer = self.get_serializer(page, many=True)
+        return self._add_validators(self.get_paginated_response(serializer.data), etag, None)
+    
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        model = type(instance)
+        if not self._conditional_get_enabled(model):
+            serializer = self.get_serializer(instance)
+            return Response(serializer.data)
+        if not self._validated_by_rows(model):
+            return self._respond(request, Response(self.get_serializer(instance).data))
+        
+        if self.etag_related:
+            state = model._base_manager.filter(pk=instance.pk).aggregate(
+                **self._validator_aggregates(model)
+            )
+        else:
+            state = {'modified': instance.updated_at, 'count': 1}
+        state['pk'] = instance.pk
+        etag, last_modified = self._validators(state)
+        not_modified = self._not_modified(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        
+        serializer = self.get_serializer(instance)
+        return self._add_validators(Response(serializer.data), etag, last_modified)
+
+
 class CachedQueryMixin:
     """
-    Mixin to cache queryset results
+    Mixin to cache rendered list responses
+    
+    Keys are a stable digest of (path, query params, permission scope,
+    media type), so they are shared by every worker process. The rendered
+    JSON bytes are cached, and recomputation is protected against stampedes
+    (see ``apps.core.cache.get_or_compute``). Cached lists are versioned under
+    ``cache_key_prefix`` (and ``cache_tags``); writes through the view
+    invalidate the namespace with a single INCR, and so does a save or delete
+    of any model in ``cache_invalidated_by`` (the listed model and every
+    model whose fields the list serializer embeds), wherever it happens.
+    
+    Placed before ``ConditionalGetMixin``, the ETag of the computed response
+    is cached with it and cache hits still answer 304.
     
     Usage:
         class DepartmentViewSet(CachedQueryMixin, viewsets.ModelViewSet):
             cache_timeout = 600  # 10 minutes
             cache_key_prefix = 'departments'
+            cache_invalidated_by = ['hr.Department', 'hr.Employee']
     """
     cache_timeout = 300  # 5 minutes default
     cache_key_prefix = 'viewset'
+    cache_tags = []
+    cache_invalidated_by = []
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.cache_invalidated_by:
+            from apps.core.cache import invalidate_on_change
+            
+            invalidate_on_change(cls.cache_key_prefix, *cls.cache_invalidated_by)
+    
+    def get_cache_scope(self):
+        """
+        Who shares a cached list: staff see everything, other users only
+        their own records. Override for views with other visibility rules.
+        """
+        user = self.request.user
+        if not user or not user.is_authenticated:
+            return 'anonymous'
+        if user.is_staff:
+            return 'staff'
+        return f"user:{user.pk}"
+    
+    def get_list_cache_key(self, request):
+        from apps.core.cache import cache_key, versioned_key
+        
+        query_params = sorted(
+            (key, sorted(request.query_params.getlist(key)))
+            for key in request.query_params
+        )
+        digest = cache_key(
+            request.path, query_params, self.get_cache_scope(), request.accepted_media_type
+        )
+        return versioned_key(self.cache_key_prefix, 'list', digest, tags=self.cache_tags)
     
     def list(self, request, *args, **kwargs):
-        from apps.core.cache import CacheManager
+        from django.http import HttpResponse
+        from apps.core.cache import get_or_compute
         
-        # Generate cache key based on query params
-        query_params = str(sorted(request.query_params.items()))
-        cache_key = f"{self.cache_key_prefix}:list:{hash(query_params)}"
+        renderer = request.accepted_renderer
+        if getattr(renderer, 'format', None) != 'json':
+            # Browsable API pages embed per-request forms; never cache them
+            return super().list(request, *args, **kwargs)
         
-        # Try to get from cache
-        def get_data():
-            return super(CachedQueryMixin, self).list(request, *args, **kwargs)
+        uncached = {}
         
-        return CacheManager.get_or_set(cache_key, get_data, self.cache_timeout)
+        def render_list():
+            response = super(CachedQueryMixin, self).list(request, *args, **kwargs)
+            if response.status_code != 200:
+                uncached['response'] = response
+                return None
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = f"{content_type}; charset={renderer.charset}"
+            return {
+                'content': renderer.render(
+                    response.data, request.accepted_media_type, self.get_renderer_context()
+                ),
+                'content_type': content_type,
+                'etag': response.get('ETag'),
+            }
+        
+        cached = get_or_compute(self.get_list_cache_key(request), render_list, self.cache_timeout)
+        if cached is None:
+            return uncached['response']
+        etag = cached.get('etag')
+        if etag:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                response = not_modified
+            else:
+                response = HttpResponse(cached['content'], content_type=cached['content_type'])
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return HttpResponse(cached['content'], content_type=cached['content_type'])
+    
+    def invalidate_list_cache(self):
+        from apps.core.cache import invalidate_cache
+        
+        invalidate_cache(self.cache_key_prefix)
+    
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.invalidate_list_cache()
+    
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.invalidate_list_cache()
+    
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self.invalidate_list_cache()
 
 
 class BulkOperationMixin:
@@ -116,25 +449,24 @@ class FilterOptimizationMixin:
 class PerformanceMonitoringMixin:
     """
     Monitor query performance
+
+    Adds ``X-Query-Count``/``X-Execution-Time`` headers for one view. Site-wide
+    metrics come from ``apps.core.metrics.RequestMetricsMiddleware``.
     """
     
     def dispatch(self, request, *args, **kwargs):
         import time
-        from django.db import connection
+        from apps.core.metrics import count_queries
         
-        # Reset query count
-        queries_before = len(connection.queries)
-        time_before = time.time()
+        time_before = time.perf_counter()
         
         # Execute request
-        response = super().dispatch(request, *args, **kwargs)
+        with count_queries() as counter:
+            response = super().dispatch(request, *args, **kwargs)
         
         # Calculate metrics
-        queries_after = len(connection.queries)
-        time_after = time.time()
-        
-        query_count = queries_after - queries_before
-        execution_time = (time_after - time_before) * 1000  # milliseconds
+        query_count = counter.count
+        execution_time = (time.perf_counter() - time_before) * 1000  # milliseconds
         
         # Add headers
         response['X-Query-Count'] = query_count
@@ -78,3 +78,6 @@ from .integration_models import (  # noqa: E402, F401
     ScheduledJob,
     SystemSetting,
 )
+
+# Import snapshot models to register them with Django
+from .snapshot_models import DashboardMetric  # noqa: E402, F401
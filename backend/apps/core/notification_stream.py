@@ -0,0 +1,232 @@
+"""
+Streaming notification endpoints (ASGI only)
+
+Clients keep one connection open instead of polling ``NotificationListView``:
+
+* SSE: ``GET /api/v1/integration/notifications/stream/`` (``EventSource``)
+* WebSocket: ``/ws/notifications/``
+
+Both authenticate with a JWT access token, from the ``Authorization:
+Bearer`` header or the ``token`` query parameter (browsers cannot set
+headers on ``EventSource``/``WebSocket``). The first event is the current
+``unread`` count, followed by ``notification`` events for new notifications
+and ``unread`` events whenever the counter changes. Messages are
+``{"event": ..., "data": ...}`` JSON on the WebSocket and ``event:``/``data:``
+frames on SSE; idle connections get a keep-alive every
+``NOTIFICATION_STREAM_KEEPALIVE`` seconds.
+
+Each server process holds a single Redis pattern subscription and fans
+messages out to its connected clients, so open streams do not each cost a
+Redis connection.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from apps.core.notifications import channel_name, unread_count
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_PATH = '/ws/notifications/'
+
+# Client reconnect delay announced on SSE streams
+RECONNECT_DELAY_MS = 5000
+
+# Events buffered per client before it is considered too slow and dropped
+CLIENT_QUEUE_SIZE = 100
+
+RESYNC = {'event': 'resync', 'data': None}
+CLOSED = {'event': 'closed', 'data': None}
+
+
+class NotificationHub:
+    """Relays the Redis notification channels to the streams of this process"""
+
+    def __init__(self):
+        self.queues = defaultdict(set)
+        self.listener = None
+
+    def subscribe(self, employee_id):
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.ensure_future(self.listen())
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.queues[employee_id].add(queue)
+        return queue
+
+    def unsubscribe(self, employee_id, queue):
+        queues = self.queues.get(employee_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.queues[employee_id]
+
+    def broadcast(self, employee_id, message):
+        for queue in list(self.queues.get(employee_id, ())):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Drop the slow client; it reconnects and resynchronises
+                self.unsubscribe(employee_id, queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(CLOSED)
+
+    async def listen(self):
+        prefix = channel_name('')
+        while True:
+            client = aioredis.Redis.from_url(settings.NOTIFICATION_REDIS_URL)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(channel_name('*'))
+                # Events may have been missed while (re)connecting
+                for employee_id in list(self.queues):
+                    self.broadcast(employee_id, RESYNC)
+                async for message in pubsub.listen():
+                    if message['type'] != 'pmessage':
+                        continue
+                    employee_id = message['channel'].decode()[len(prefix):]
+                    if not employee_id.isdigit() or int(employee_id) not in self.queues:
+                        continue
+                    try:
+                        self.broadcast(int(employee_id), json.loads(message['data']))
+                    except ValueError:
+                        logger.warning(f"Ignoring malformed notification event: {message['data']!r}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Notification hub lost its Redis subscription: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+
+
+hub = NotificationHub()
+
+
+def _employee_for_token(raw_token):
+    """Employee id of the user owning a JWT access token (None if invalid)"""
+    from apps.hr.models import Employee
+
+    close_old_connections()
+    try:
+        authentication = JWTAuthentication()
+        user = authentication.get_user(authentication.get_validated_token(raw_token))
+        return Employee.objects.filter(user=user).values_list('pk', flat=True).first()
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    finally:
+        close_old_connections()
+
+
+def _current_unread(employee_id):
+    close_old_connections()
+    try:
+        return unread_count(employee_id)
+    finally:
+        close_old_connections()
+
+
+async def notification_events(employee_id):
+    """
+    Events for one employee
+
+    Yields ``{"event", "data"}`` dicts, or None when a keep-alive is due.
+    Ends when the client is dropped for falling behind.
+    """
+    keepalive = getattr(settings, 'NOTIFICATION_STREAM_KEEPALIVE', 25)
+    queue = hub.subscribe(employee_id)
+    try:
+        yield {'event': 'unread', 'data': {'unread': await sync_to_async(_current_unread)(employee_id)}}
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield None
+                continue
+            if message is CLOSED:
+                return
+            if message is RESYNC:
+                message = {'event': 'unread', 'data': {'unread': await sync_to_async(_current_unread)(employee_id)}}
+            yield message
+    finally:
+        hub.unsubscribe(employee_id, queue)
+
+
+def _bearer_token(authorization):
+    parts = (authorization or '').split()
+    if len(parts) == 2 and parts[0] in settings.SIMPLE_JWT.get('AUTH_HEADER_TYPES', ('Bearer',)):
+        return parts[1]
+    return None
+
+
+async def notification_stream(request):
+    """Server-Sent Events stream of the current user's notifications"""
+    token = _bearer_token(request.headers.get('Authorization')) or request.GET.get('token')
+    employee_id = await sync_to_async(_employee_for_token)(token) if token else None
+    if employee_id is None:
+        return JsonResponse(
+            {'error': 'A valid access token of a user with an employee profile is required'},
+            status=401
+        )
+
+    async def frames():
+        yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+        async for message in notification_events(employee_id):
+            if message is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield f"event: {message['event']}\ndata: {json.dumps(message['data'], default=str)}\n\n"
+
+    response = StreamingHttpResponse(frames(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI WebSocket endpoint relaying the current user's notifications"""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if scope['path'] != WEBSOCKET_PATH:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    headers = {key.decode('latin1').lower(): value.decode('latin1') for key, value in scope.get('headers', [])}
+    query = parse_qs(scope.get('query_string', b'').decode())
+    token = _bearer_token(headers.get('authorization')) or (query.get('token') or [None])[-1]
+    employee_id = await sync_to_async(_employee_for_token)(token) if token else None
+    if employee_id is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+    await send({'type': 'websocket.accept'})
+
+    async def relay():
+        async for event in notification_events(employee_id):
+            if event is None:
+                event = {'event': 'keep-alive', 'data': None}
+            await send({'type': 'websocket.send', 'text': json.dumps(event, default=str)})
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'websocket.disconnect':
+            pass
+
+    tasks = [asyncio.ensure_future(relay()), asyncio.ensure_future(wait_for_disconnect())]
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    if tasks[0] in done:
+        # The relay ended (slow client or error): close the socket
+        await send({'type': 'websocket.close', 'code': 1011 if tasks[0].exception() else 1000})
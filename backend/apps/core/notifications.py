@@ -0,0 +1,196 @@
+"""
+Notification counters and push events
+
+Unread counts live in the cache (Redis in production): one counter per
+employee plus one for all notifications. A counter is filled from the
+database on first read and then kept current with atomic ``incr`` calls
+when a notification is created, deleted or changes ``is_read``, so reading
+it never touches the notifications table. Counters expire after
+``NOTIFICATION_COUNTER_TIMEOUT`` seconds, which bounds any drift.
+
+Every change is also published on the Redis channel
+``<prefix>:notifications:<employee id>`` as ``{"event", "data"}`` JSON;
+``apps.core.notification_stream`` relays those messages to connected
+clients over SSE and WebSocket.
+
+Counter updates and events are sent after the transaction commits.
+``QuerySet.update()`` bypasses signals: use ``mark_read``/``mark_all_read``
+to change ``is_read``.
+"""
+import json
+import logging
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from apps.core.integration_models import Notification
+
+logger = logging.getLogger(__name__)
+
+UNREAD_KEY = 'notifications:unread:{}'
+ALL_RECIPIENTS = 'all'
+
+
+def channel_name(employee_id):
+    """Redis pub/sub channel of an employee (``'*'`` for the pattern of all)"""
+    return f"{settings.CACHES['default'].get('KEY_PREFIX', '')}:notifications:{employee_id}"
+
+
+def _counter_timeout():
+    return getattr(settings, 'NOTIFICATION_COUNTER_TIMEOUT', 24 * 3600)
+
+
+def unread_count(employee_id=None):
+    """Unread notifications of an employee (all employees when None)"""
+    key = UNREAD_KEY.format(employee_id or ALL_RECIPIENTS)
+    count = cache.get(key)
+    if count is None:
+        queryset = Notification.objects.filter(is_read=False)
+        if employee_id:
+            queryset = queryset.filter(recipient_id=employee_id)
+        count = queryset.count()
+        # Keep a value another process cached (and maybe incremented) meanwhile
+        if not cache.add(key, count, _counter_timeout()):
+            count = cache.get(key, count)
+    return count
+
+
+def _adjust(key, delta):
+    """Apply ``delta`` to a cached counter; None when it is not cached"""
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # Not cached: the next read counts from the database
+        return None
+
+
+def adjust_unread(employee_id, delta):
+    """Move the unread counters of ``employee_id`` by ``delta`` and push the new value"""
+    if not delta:
+        return
+    try:
+        _adjust(UNREAD_KEY.format(ALL_RECIPIENTS), delta)
+        count = _adjust(UNREAD_KEY.format(employee_id), delta)
+        if count is None or count < 0:
+            cache.delete(UNREAD_KEY.format(employee_id))
+            count = unread_count(employee_id)
+    except Exception as e:
+        # Never fail the user's write because of the counters
+        logger.error(f"Failed to update unread notification counters of employee {employee_id}: {e}")
+        return
+    publish(employee_id, 'unread', {'unread': count})
+
+
+_redis_client = None
+
+
+def _redis():
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.NOTIFICATION_REDIS_URL)
+    return _redis_client
+
+
+def publish(employee_id, event, data):
+    """Push an event to the streams of ``employee_id``"""
+    try:
+        _redis().publish(channel_name(employee_id), json.dumps({'event': event, 'data': data}, default=str))
+    except Exception as e:
+        # Clients resynchronise the counter when they reconnect
+        logger.warning(f"Could not publish notification event '{event}': {e}")
+
+
+def notification_payload(notification):
+    return {
+        'id': notification.pk,
+        'notification_type': notification.notification_type,
+        'title': notification.title,
+        'message': notification.message,
+        'related_model': notification.related_model,
+        'related_id': notification.related_id,
+        'action_url': notification.action_url,
+        'is_important': notification.is_important,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at.isoformat(),
+    }
+
+
+def mark_read(notification):
+    """
+    Mark one notification read
+
+    Returns:
+        bool: True if it was unread (the counter is decremented exactly once)
+    """
+    now = timezone.now()
+    updated = Notification.objects.filter(pk=notification.pk, is_read=False).update(
+        is_read=True, read_at=now, updated_at=now
+    )
+    if updated:
+        notification.is_read = True
+        notification.read_at = now
+        notification.updated_at = now
+        recipient_id = notification.recipient_id
+        transaction.on_commit(lambda: adjust_unread(recipient_id, -1))
+    return bool(updated)
+
+
+def mark_all_read(employee_id):
+    """Mark every unread notification of an employee read; returns the count"""
+    now = timezone.now()
+    updated = Notification.objects.filter(recipient_id=employee_id, is_read=False).update(
+        is_read=True, read_at=now, updated_at=now
+    )
+    if updated:
+        transaction.on_commit(lambda: adjust_unread(employee_id, -updated))
+    return updated
+
+
+# ----- Signal handlers -----
+
+def _notification_pre_save(sender, instance, raw=False, **kwargs):
+    instance._unread_previous = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._unread_previous = sender._base_manager.filter(pk=instance.pk).values(
+        'recipient_id', 'is_read'
+    ).first()
+
+
+def _notification_post_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_unread_previous', None)
+    instance._unread_previous = None
+
+    changes = {}
+    if previous is not None and not previous['is_read']:
+        changes[previous['recipient_id']] = -1
+    if not instance.is_read:
+        changes[instance.recipient_id] = changes.get(instance.recipient_id, 0) + 1
+
+    payload = notification_payload(instance) if created else None
+    recipient_id = instance.recipient_id
+
+    def send():
+        if payload is not None:
+            publish(recipient_id, 'notification', payload)
+        for employee_id, delta in changes.items():
+            adjust_unread(employee_id, delta)
+
+    transaction.on_commit(send)
+
+
+def _notification_post_delete(sender, instance, **kwargs):
+    if not instance.is_read:
+        recipient_id = instance.recipient_id
+        transaction.on_commit(lambda: adjust_unread(recipient_id, -1))
+
+
+pre_save.connect(_notification_pre_save, sender=Notification, dispatch_uid='notification_counters')
+post_save.connect(_notification_post_save, sender=Notification, dispatch_uid='notification_counters')
+post_delete.connect(_notification_post_delete, sender=Notification, dispatch_uid='notification_counters')
@@ -0,0 +1,273 @@
+"""
+Transactional email outbox
+
+Mail is never sent inside a request. ``queue_email`` and
+``queue_template_emails`` store fully rendered messages as ``EmailLog`` rows
+with ``status='pending'`` and wake the ``drain_email_outbox`` Celery task
+after the transaction commits (so a rolled back request sends nothing).
+
+``drain_outbox`` sends pending rows in batches of ``EMAIL_OUTBOX_BATCH_SIZE``
+over a single SMTP connection (``get_connection()`` opened once, one
+``send_messages`` call per message so failures are recorded per row). A
+batch is claimed in a short transaction (``SKIP LOCKED``) that leases its
+rows by pushing ``next_attempt_at`` ``CLAIM_LEASE`` ahead, and is sent after
+that transaction commits, so no row lock is held during SMTP round trips and
+several workers can drain side by side without sending twice. A worker that
+dies mid-batch leaves its rows to be picked up once the lease runs out.
+
+Failed messages are retried with exponential backoff from
+``EMAIL_RETRY_BASE_SECONDS`` up to ``EMAIL_MAX_RETRIES`` times; after every
+drain the ``drain_email_outbox`` task schedules a wake-up for when the
+earliest waiting row is due.
+
+``EmailTemplate`` bodies are compiled once per process and cached by
+(template id, updated_at), so editing a template invalidates its entry.
+"""
+import logging
+import random
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connection, transaction
+from django.db.models import Min, Q
+from django.template import Context, Engine
+from django.utils import timezone
+
+from apps.core.integration_models import EmailLog, EmailTemplate
+
+logger = logging.getLogger(__name__)
+
+CLAIM_LEASE = timedelta(minutes=5)
+
+# Templates are compiled with a standalone engine (no loaders); subject and
+# text bodies render without HTML escaping
+_engine = Engine()
+
+
+# (template id, updated_at) -> compiled (subject, html, text)
+_compiled_templates = {}
+COMPILED_TEMPLATE_LIMIT = 256
+
+
+def compiled_template(template):
+    """Compiled (subject, html, text) templates, cached per template version"""
+    key = (template.pk, template.updated_at)
+    compiled = _compiled_templates.get(key)
+    if compiled is None:
+        if len(_compiled_templates) >= COMPILED_TEMPLATE_LIMIT:
+            _compiled_templates.clear()
+        compiled = (
+            _engine.from_string(template.subject),
+            _engine.from_string(template.body_html),
+            _engine.from_string(template.body_text) if template.body_text else None,
+        )
+        _compiled_templates[key] = compiled
+    return compiled
+
+
+def render_template(template, context=None):
+    """
+    Render an ``EmailTemplate``
+
+    Returns:
+        tuple: (subject, body_html, body_text)
+    """
+    subject, html, text = compiled_template(template)
+    context = context or {}
+    return (
+        ' '.join(subject.render(Context(context, autoescape=False)).split()),
+        html.render(Context(context)),
+        text.render(Context(context, autoescape=False)) if text else '',
+    )
+
+
+def get_template(template_type):
+    """Active template of ``template_type`` (None if there is none)"""
+    return EmailTemplate.objects.filter(
+        template_type=template_type, is_active=True, deleted_at__isnull=True
+    ).order_by('-updated_at').first()
+
+
+def queue_email(recipient_email, subject, body_text='', body_html='', recipient_name='',
+                template=None, metadata=None):
+    """Store one message in the outbox; returns the ``EmailLog``"""
+    email_log = EmailLog.objects.create(
+        recipient_email=recipient_email,
+        recipient_name=recipient_name,
+        subject=subject,
+        body_html=body_html,
+        body_text=body_text,
+        template=template,
+        status='pending',
+        metadata=metadata or {},
+    )
+    transaction.on_commit(wake_outbox)
+    return email_log
+
+
+def queue_template_emails(template, recipients, metadata=None):
+    """
+    Render ``template`` for every recipient and store the messages in bulk
+
+    Args:
+        template: ``EmailTemplate`` instance
+        recipients: Iterable of ``(email, name, context)`` tuples
+
+    Returns:
+        int: Number of queued messages
+    """
+    batch_size = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 100)
+    queued = 0
+    batch = []
+    for email, name, context in recipients:
+        subject, body_html, body_text = render_template(template, context)
+        batch.append(EmailLog(
+            recipient_email=email,
+            recipient_name=name or '',
+            subject=subject[:300],
+            body_html=body_html,
+            body_text=body_text,
+            template=template,
+            status='pending',
+            metadata=metadata or {},
+        ))
+        if len(batch) >= batch_size:
+            EmailLog.objects.bulk_create(batch)
+            queued += len(batch)
+            batch = []
+    if batch:
+        EmailLog.objects.bulk_create(batch)
+        queued += len(batch)
+    if queued:
+        transaction.on_commit(wake_outbox)
+    return queued
+
+
+def wake_outbox(eta=None):
+    """Ask a Celery worker to drain the outbox (now or at ``eta``)"""
+    from apps.core.tasks import drain_email_outbox
+
+    try:
+        if eta is None:
+            drain_email_outbox.delay()
+        else:
+            drain_email_outbox.apply_async(eta=eta)
+    except Exception as e:
+        # Pending rows stay in the outbox for the next drain
+        logger.warning(f"Could not wake the email outbox worker: {e}")
+
+
+def build_message(email_log, connection=None):
+    metadata = email_log.metadata or {}
+    to = f"{email_log.recipient_name} <{email_log.recipient_email}>" if email_log.recipient_name else email_log.recipient_email
+    message = EmailMultiAlternatives(
+        subject=email_log.subject,
+        body=email_log.body_text or '',
+        from_email=metadata.get('from_email') or settings.DEFAULT_FROM_EMAIL,
+        to=[to],
+        reply_to=[metadata['reply_to']] if metadata.get('reply_to') else None,
+        connection=connection,
+    )
+    if email_log.body_html:
+        if email_log.body_text:
+            message.attach_alternative(email_log.body_html, 'text/html')
+        else:
+            message.body = email_log.body_html
+            message.content_subtype = 'html'
+    return message
+
+
+def retry_delay(retry_count):
+    """Exponential backoff with jitter for the ``retry_count``-th retry"""
+    base = getattr(settings, 'EMAIL_RETRY_BASE_SECONDS', 60)
+    delay = min(base * (2 ** (retry_count - 1)), 6 * 3600)
+    return timedelta(seconds=delay * random.uniform(1.0, 1.25))
+
+
+def claim_batch(limit):
+    """Lease up to ``limit`` due pending rows to this worker"""
+    now = timezone.now()
+    with transaction.atomic():
+        due = EmailLog.objects.filter(status='pending').filter(
+            Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+        ).order_by('retry_count', 'created_at')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:limit])
+        EmailLog.objects.filter(pk__in=ids).update(next_attempt_at=now + CLAIM_LEASE)
+    return list(EmailLog.objects.filter(pk__in=ids).order_by('retry_count', 'created_at'))
+
+
+def _send_batch(mail_connection, email_logs):
+    """Send claimed rows over ``mail_connection`` and record the outcome; returns the failed ids"""
+    max_retries = getattr(settings, 'EMAIL_MAX_RETRIES', 3)
+    failed = []
+    for email_log in email_logs:
+        try:
+            try:
+                mail_connection.send_messages([build_message(email_log, mail_connection)])
+            except smtplib.SMTPServerDisconnected:
+                # The server dropped the session mid-batch; reconnect once
+                mail_connection.close()
+                mail_connection.open()
+                mail_connection.send_messages([build_message(email_log, mail_connection)])
+        except Exception as e:
+            email_log.retry_count += 1
+            email_log.error_message = str(e)
+            if email_log.retry_count > max_retries:
+                email_log.status = 'failed'
+                email_log.next_attempt_at = None
+            else:
+                email_log.next_attempt_at = timezone.now() + retry_delay(email_log.retry_count)
+            failed.append(email_log.pk)
+        else:
+            email_log.status = 'sent'
+            email_log.sent_at = timezone.now()
+            email_log.error_message = ''
+            email_log.next_attempt_at = None
+        email_log.updated_at = timezone.now()
+    EmailLog.objects.bulk_update(
+        email_logs, ['status', 'sent_at', 'error_message', 'retry_count', 'next_attempt_at', 'updated_at']
+    )
+    return failed
+
+
+def drain_outbox(max_batches=None):
+    """
+    Send due outbox messages over one SMTP connection
+
+    Failed rows are rescheduled with backoff, so each row is attempted at
+    most once per drain.
+
+    Returns:
+        dict: ``sent`` and ``failed`` counts
+    """
+    batch_size = getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 100)
+    totals = {'sent': 0, 'failed': 0}
+    mail_connection = None
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            email_logs = claim_batch(batch_size)
+            if not email_logs:
+                break
+            if mail_connection is None:
+                mail_connection = get_connection(fail_silently=False)
+                mail_connection.open()
+            failed = _send_batch(mail_connection, email_logs)
+            totals['sent'] += len(email_logs) - len(failed)
+            totals['failed'] += len(failed)
+            batches += 1
+    finally:
+        if mail_connection is not None:
+            mail_connection.close()
+    return totals
+
+
+def next_attempt_at():
+    """When the earliest waiting pending row becomes due (None if nothing waits)"""
+    return EmailLog.objects.filter(
+        status='pending', next_attempt_at__isnull=False
+    ).aggregate(next_at=Min('next_attempt_at'))['next_at']
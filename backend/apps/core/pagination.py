@@ -1,9 +1,47 @@
 """
 Custom pagination classes for optimized performance
 """
-from rest_framework.pagination import PageNumberPagination, CursorPagination
+import json
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination, Cursor, _reverse_ordering
 from rest_framework.response import Response
 from collections import OrderedDict
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+
+# Upper bound for capped counts; larger results report this value as approximate
+APPROXIMATE_COUNT_CAP = 10000
+
+
+def approximate_count(queryset, cap=APPROXIMATE_COUNT_CAP):
+    """
+    Cheap row count for very large tables
+    
+    Unfiltered querysets on PostgreSQL read the planner estimate from
+    ``pg_class.reltuples`` (no table scan). Otherwise rows are counted up to
+    ``cap``.
+    
+    Returns:
+        tuple: (count, is_exact)
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 until the table has been vacuumed/analyzed
+        if row and row[0] >= 0:
+            return int(row[0]), False
+    
+    count = queryset.order_by()[:cap + 1].count()
+    if count > cap:
+        return cap, False
+    return count, True
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -62,6 +100,169 @@ class OptimizedCursorPagination(CursorPagination):
         ]))
 
 
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination for high-volume, append-mostly tables
+    
+    The cursor holds the values of every ordering field of the last row
+    shown, and the next page is fetched with a row comparison on all of
+    them, e.g. for ``-date``::
+    
+        WHERE date <= %s AND (date < %s OR (date = %s AND id < %s))
+        ORDER BY date DESC, id DESC
+    
+    so page 5000 costs the same as page 1 however many rows share a date,
+    and no OFFSET or COUNT(*) runs. ``id`` is always appended to the
+    ordering to make positions unique. Nullable fields cannot be compared
+    this way; orderings on them fall back to the view's default.
+    
+    Clients that need a total can pass ``?count=approximate`` (see
+    ``approximate_count``).
+    
+    Usage:
+        class AuditLogListView(generics.ListAPIView):
+            pagination_class = KeysetPagination
+            ordering = ['-created_at']
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
+    count_query_param = 'count'
+    
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        
+        fields = {field.name: field for field in queryset.model._meta.concrete_fields}
+        if any(getattr(fields.get(order.lstrip('-')), 'null', False) for order in ordering):
+            default = getattr(view, 'ordering', None) or self.ordering
+            ordering = (default,) if isinstance(default, str) else tuple(default)
+        
+        if not any(order.lstrip('-') in ('id', 'pk') for order in ordering):
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        
+        # Compare foreign keys by their column, not the related model's ordering
+        return tuple(
+            order.replace(name, fields[name].attname) if name in fields else order
+            for order, name in ((order, order.lstrip('-')) for order in ordering)
+        )
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        self.count_is_exact = None
+        if request.query_params.get(self.count_query_param) == 'approximate':
+            self.count, self.count_is_exact = approximate_count(queryset)
+        
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        self.model = queryset.model
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor is not None else None
+        
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+        
+        # One extra row tells whether there is a page after this one
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.next_position = self.previous_position = position
+        
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+    
+    def _after(self, ordering, position):
+        """Rows following ``position`` in ``ordering``"""
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise ValueError(position)
+            values = [self._to_python(order.lstrip('-'), value) for order, value in zip(ordering, values)]
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        
+        condition = None
+        equal = {}
+        for order, value in zip(ordering, values):
+            name = order.lstrip('-')
+            term = Q(**equal, **{f"{name}__{'lt' if order.startswith('-') else 'gt'}": value})
+            condition = term if condition is None else condition | term
+            equal[name] = value
+        
+        # A range on the leading field lets the database seek its index
+        first = ordering[0]
+        bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": values[0]})
+        return bound & condition
+    
+    def _field(self, name):
+        if name == 'pk':
+            return self.model._meta.pk
+        return next((f for f in self.model._meta.concrete_fields if name in (f.name, f.attname)), None)
+    
+    def _to_python(self, name, value):
+        field = self._field(name)
+        return field.to_python(value) if field is not None else value
+    
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            name = order.lstrip('-')
+            field = self._field(name)
+            if field is not None:
+                values.append(field.value_to_string(instance))
+            else:
+                # Annotation
+                value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+                values.append(str(value))
+        return json.dumps(values)
+    
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else self.next_position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+    
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page else self.previous_position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+    
+    def get_paginated_response(self, data):
+        response = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('page_size', self.page_size),
+        ])
+        if self.count is not None:
+            response['count'] = self.count
+            response['count_is_exact'] = self.count_is_exact
+        response['results'] = data
+        return Response(response)
+    
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'].update({
+            'page_size': {'type': 'integer'},
+            'count': {'type': 'integer', 'description': 'Only with ?count=approximate'},
+            'count_is_exact': {'type': 'boolean'},
+        })
+        return response_schema
+
+
 class NoPaginationClass:
     """
     Disable pagination for specific views (use with caution!)
@@ -0,0 +1,193 @@
+"""
+N+1 query detection and per-view query budgets
+
+``QueryRecorder`` is a ``connection.execute_wrapper`` that groups the
+queries of a request by SQL template (the statement without its parameter
+values) and remembers where each one came from: the serializer field being
+rendered and the innermost line of project code. One template running
+``QUERY_INSPECTOR_REPEAT_THRESHOLD`` times or more in a single request is
+the signature of an N+1 pattern.
+
+With ``QUERY_INSPECTOR_ENABLED`` (on by default when ``DEBUG``),
+``QueryInspectorMiddleware`` records every request and logs the repeated
+SQL and the field that caused it::
+
+    N+1 in GET /api/v1/crm/leads/ (crm:lead-list): 20x SELECT ... FROM "crm_followup" WHERE ...
+    [LeadListSerializer.follow_up_count at apps/crm/serializers.py:88 in get_follow_up_count]
+
+Views declare the most queries one request may run next to their code::
+
+    class ClientListView(ComputedFieldsMixin, ConditionalGetMixin, generics.ListCreateAPIView):
+        query_budget = 6
+
+    @query_budget(8)
+    @api_view(['GET'])
+    def crm_dashboard(request):
+        ...
+
+The middleware warns when a request goes over its view's budget; the
+``check_query_counts`` management command enforces the budgets and flags
+endpoints whose query count grows with the amount of data.
+"""
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+from apps.core import metrics
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'%s(?:, %s)+')
+
+# Execute wrappers sit on the stack of every query; they are never its origin
+_WRAPPER_FILES = {
+    os.path.abspath(__file__),
+    os.path.abspath(metrics.__file__),
+}
+
+SQL_PREVIEW_LENGTH = 300
+
+
+def sql_template(sql):
+    """``sql`` with whitespace collapsed and ``IN (%s, %s, ...)`` lists folded"""
+    return _PLACEHOLDER_LIST.sub('%s, ...', _WHITESPACE.sub(' ', sql).strip())
+
+
+def query_origin():
+    """
+    Where the query being executed comes from
+
+    Returns:
+        tuple: (``Serializer.field`` being rendered or None,
+        ``path:line in function`` of the innermost project code or None)
+    """
+    apps_dir = os.path.join(str(settings.BASE_DIR), 'apps') + os.sep
+    field = location = None
+    frame = sys._getframe(1)
+    while frame is not None and (field is None or location is None):
+        code = frame.f_code
+        filename = code.co_filename
+        if location is None and filename.startswith(apps_dir) and filename not in _WRAPPER_FILES:
+            location = f"{os.path.relpath(filename, settings.BASE_DIR)}:{frame.f_lineno} in {code.co_name}"
+        if field is None and code.co_name == 'to_representation':
+            # Serializer.to_representation renders its fields one by one
+            owner = frame.f_locals.get('self')
+            current = frame.f_locals.get('field')
+            if isinstance(owner, BaseSerializer) and current is not None:
+                field = f"{type(owner).__name__}.{current.field_name}"
+        frame = frame.f_back
+    return field, location
+
+
+class RepeatedQuery:
+    """A SQL template run ``count`` times in one request"""
+
+    def __init__(self, sql, count, field, location):
+        self.sql = sql
+        self.count = count
+        self.field = field
+        self.location = location
+
+    def __str__(self):
+        sql = self.sql
+        if len(sql) > SQL_PREVIEW_LENGTH:
+            sql = sql[:SQL_PREVIEW_LENGTH] + '...'
+        origin = ' at '.join(part for part in (self.field, self.location) if part)
+        return f"{self.count}x {sql}" + (f" [{origin}]" if origin else '')
+
+
+class QueryRecorder:
+    """``execute_wrapper`` grouping queries by SQL template and origin"""
+
+    def __init__(self, capture_origin=True):
+        self.capture_origin = capture_origin
+        self.count = 0
+        self.templates = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        origins = self.templates.setdefault(sql_template(sql), Counter())
+        origins[query_origin() if self.capture_origin else (None, None)] += 1
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        """``RepeatedQuery`` for every template run ``threshold`` times or more, most frequent first"""
+        repeated = []
+        for sql, origins in self.templates.items():
+            count = sum(origins.values())
+            if count >= threshold:
+                (field, location), _ = origins.most_common(1)[0]
+                repeated.append(RepeatedQuery(sql, count, field, location))
+        return sorted(repeated, key=lambda query: -query.count)
+
+
+@contextmanager
+def record_queries(capture_origin=True):
+    """Record the queries run on every database connection inside the block"""
+    recorder = QueryRecorder(capture_origin)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield recorder
+
+
+def query_budget(limit):
+    """
+    Declare the most queries one request to a function view may run
+
+    Apply above ``@api_view``; class-based views set a ``query_budget``
+    attribute instead.
+    """
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def view_query_budget(view):
+    """Query budget declared for a resolved view callable (None when undeclared)"""
+    budget = getattr(view, 'query_budget', None)
+    if budget is None:
+        budget = getattr(getattr(view, 'view_class', None), 'query_budget', None)
+    return budget
+
+
+class QueryInspectorMiddleware:
+    """
+    Log N+1 patterns and query budget overruns (development only)
+
+    Enabled with ``QUERY_INSPECTOR_ENABLED``; every query of an inspected
+    request walks the Python stack, so keep it off in production.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSPECTOR_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'QUERY_INSPECTOR_REPEAT_THRESHOLD', 5)
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+
+        view = metrics.view_name(request)
+        for repeated in recorder.repeated(self.threshold):
+            logger.warning(f"N+1 in {request.method} {request.path} ({view}): {repeated}")
+
+        match = getattr(request, 'resolver_match', None)
+        budget = view_query_budget(match.func) if match is not None else None
+        if budget is not None and recorder.count > budget:
+            logger.warning(
+                f"Query budget exceeded: {request.method} {request.path} ({view}) "
+                f"ran {recorder.count} queries, budget is {budget}"
+            )
+        return response
@@ -0,0 +1,290 @@
+"""
+Scheduled job runner
+
+``ScheduledJob.schedule_cron`` holds a standard five field cron expression
+(``minute hour day-of-month month day-of-week``, with ``*``, ranges, steps,
+lists, month/day names and the ``@hourly``/``@daily``/``@weekly``/
+``@monthly``/``@yearly`` aliases), evaluated in ``TIME_ZONE``.
+
+``run_due_jobs`` is one scheduler tick: it reads active jobs with
+``next_run_at <= now`` (indexed on ``status, next_run_at``), locking them
+with ``SKIP LOCKED`` where the database supports it, moves each job's
+``next_run_at`` to its next cron slot and only then dispatches the
+``run_scheduled_job`` Celery task. The move is a compare-and-set on the slot
+that was read, so when several schedulers run side by side exactly one of
+them fires each slot. Missed slots (scheduler down) fire once, not once per
+missed slot.
+
+``run_job`` executes inside the Celery worker: ``task_name`` is a registered
+Celery task name or the dotted path of a callable under ``apps.``, called
+with ``task_params`` as keyword arguments. The real duration, status and
+error are recorded on the job.
+"""
+import calendar
+import logging
+import time
+from datetime import datetime, timedelta
+
+from celery import current_app
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.core.integration_models import ScheduledJob
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleError(ValueError):
+    """Invalid cron expression or task name"""
+
+
+ALIASES = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+MONTH_NAMES = {name.lower(): index for index, name in enumerate(calendar.month_abbr) if name}
+DAY_NAMES = {name: index for index, name in enumerate(['sun', 'mon', 'tue', 'wed', 'thu', 'fri', 'sat'])}
+
+# (name, low, high, names)
+FIELDS = [
+    ('minute', 0, 59, {}),
+    ('hour', 0, 23, {}),
+    ('day of month', 1, 31, {}),
+    ('month', 1, 12, MONTH_NAMES),
+    ('day of week', 0, 7, DAY_NAMES),
+]
+
+# Give up looking for a matching slot after this many years ("0 0 30 2 *")
+SEARCH_YEARS = 5
+
+
+def _value(text, names, field):
+    text = text.lower()
+    if text in names:
+        return names[text]
+    try:
+        return int(text)
+    except ValueError:
+        raise ScheduleError(f"Invalid {field} value '{text}'")
+
+
+def _parse_field(text, field, low, high, names):
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            if not step_text.isdigit() or int(step_text) == 0:
+                raise ScheduleError(f"Invalid {field} step '{step_text}'")
+            step = int(step_text)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (_value(bound, names, field) for bound in part.split('-', 1))
+        else:
+            start = _value(part, names, field)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ScheduleError(f"{field.capitalize()} '{text}' is out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """A parsed cron expression"""
+
+    def __init__(self, expression):
+        self.expression = expression
+        text = ALIASES.get(expression.strip().lower(), expression)
+        parts = text.split()
+        if len(parts) != len(FIELDS):
+            raise ScheduleError(f"Cron expression '{expression}' must have {len(FIELDS)} fields")
+        minutes, hours, days, months, weekdays = (
+            _parse_field(part, *spec) for part, spec in zip(parts, FIELDS)
+        )
+        self.minutes = sorted(minutes)
+        self.hours = hours
+        self.days = days
+        self.months = months
+        self.weekdays = {day % 7 for day in weekdays}  # 7 is Sunday too
+        # Like cron: when both day fields are restricted, either may match
+        self.any_day = parts[2].startswith('*')
+        self.any_weekday = parts[4].startswith('*')
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment):
+        """First slot strictly after ``moment`` (aware datetime in, aware datetime out)"""
+        local = timezone.localtime(moment).replace(tzinfo=None, second=0, microsecond=0)
+        local += timedelta(minutes=1)
+        limit = local.year + SEARCH_YEARS
+        while local.year <= limit:
+            if local.month not in self.months:
+                year, month = (local.year + 1, 1) if local.month == 12 else (local.year, local.month + 1)
+                local = datetime(year, month, 1)
+            elif not self._day_matches(local):
+                local = datetime(local.year, local.month, local.day) + timedelta(days=1)
+            elif local.hour not in self.hours:
+                local = local.replace(minute=0) + timedelta(hours=1)
+            else:
+                minute = next((value for value in self.minutes if value >= local.minute), None)
+                if minute is None:
+                    local = local.replace(minute=0) + timedelta(hours=1)
+                else:
+                    return timezone.make_aware(local.replace(minute=minute))
+        raise ScheduleError(f"Cron expression '{self.expression}' never matches")
+
+
+def next_run_time(job, after=None):
+    """Next slot of ``job`` after ``after`` (default now); None unless active"""
+    if job.status != 'active':
+        return None
+    return CronSchedule(job.schedule_cron).next_after(after or timezone.now())
+
+
+def resolve_task(task_name):
+    """Callable behind ``task_name``: a registered Celery task or an ``apps.`` function"""
+    task = current_app.tasks.get(task_name)
+    if task is not None:
+        return task
+    if not task_name.startswith('apps.'):
+        raise ScheduleError(f"Unknown task '{task_name}'")
+    try:
+        func = import_string(task_name)
+    except ImportError:
+        raise ScheduleError(f"Unknown task '{task_name}'")
+    if not callable(func):
+        raise ScheduleError(f"'{task_name}' is not callable")
+    return func
+
+
+def schedule_new_jobs(now=None):
+    """Give active jobs without a ``next_run_at`` their first slot"""
+    now = now or timezone.now()
+    jobs = ScheduledJob.objects.filter(status='active', next_run_at__isnull=True, deleted_at__isnull=True)
+    for job in jobs:
+        try:
+            next_run = next_run_time(job, now)
+        except ScheduleError as e:
+            logger.error(f"Scheduled job '{job.name}' has an invalid schedule: {e}")
+            continue
+        ScheduledJob.objects.filter(pk=job.pk, next_run_at__isnull=True).update(
+            next_run_at=next_run, updated_at=now
+        )
+
+
+def claim_due_jobs(now=None, limit=None):
+    """
+    Advance every due job to its next slot
+
+    Returns:
+        list: (job id, claimed slot) for the jobs this caller must dispatch
+    """
+    now = now or timezone.now()
+    limit = limit or getattr(settings, 'SCHEDULER_BATCH_SIZE', 100)
+    claimed = []
+    with transaction.atomic():
+        due = ScheduledJob.objects.filter(
+            status='active', next_run_at__lte=now, deleted_at__isnull=True
+        ).order_by('next_run_at')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        for job in due[:limit]:
+            try:
+                next_run = next_run_time(job, now)
+            except ScheduleError as e:
+                logger.error(f"Pausing scheduled job '{job.name}': {e}")
+                ScheduledJob.objects.filter(pk=job.pk).update(
+                    status='paused', next_run_at=None, last_run_error=str(e), updated_at=now
+                )
+                continue
+            # Only the scheduler that moves the slot it read fires it
+            if ScheduledJob.objects.filter(pk=job.pk, next_run_at=job.next_run_at).update(
+                next_run_at=next_run, updated_at=now
+            ):
+                claimed.append((job.pk, job.next_run_at))
+    return claimed
+
+
+def dispatch_job(job_id):
+    """Queue ``run_scheduled_job`` for a job"""
+    from apps.core.tasks import run_scheduled_job
+
+    run_scheduled_job.delay(job_id)
+
+
+def run_due_jobs(now=None):
+    """
+    One scheduler tick
+
+    Returns:
+        int: Number of dispatched jobs
+    """
+    schedule_new_jobs(now)
+    dispatched = 0
+    for job_id, slot in claim_due_jobs(now):
+        try:
+            dispatch_job(job_id)
+        except Exception as e:
+            # Put the slot back so the next tick retries it
+            logger.warning(f"Could not dispatch scheduled job {job_id}: {e}")
+            ScheduledJob.objects.filter(pk=job_id).update(next_run_at=slot)
+            continue
+        dispatched += 1
+    return dispatched
+
+
+def seconds_until_next_job(now=None):
+    """Seconds until the earliest ``next_run_at`` (None if nothing is scheduled)"""
+    now = now or timezone.now()
+    next_run = ScheduledJob.objects.filter(
+        status='active', next_run_at__isnull=False, deleted_at__isnull=True
+    ).order_by('next_run_at').values_list('next_run_at', flat=True).first()
+    if next_run is None:
+        return None
+    return max((next_run - now).total_seconds(), 0)
+
+
+def run_job(job_id):
+    """Execute a job's task in this process and record the outcome"""
+    try:
+        job = ScheduledJob.objects.get(pk=job_id, deleted_at__isnull=True)
+    except ScheduledJob.DoesNotExist:
+        return None
+
+    started = time.monotonic()
+    ScheduledJob.objects.filter(pk=job.pk).update(
+        last_run_at=timezone.now(), last_run_status='running', updated_at=timezone.now()
+    )
+    error = ''
+    try:
+        resolve_task(job.task_name)(**(job.task_params or {}))
+    except Exception as e:
+        logger.exception(f"Scheduled job '{job.name}' failed")
+        error = f"{type(e).__name__}: {e}"
+    succeeded = not error
+
+    ScheduledJob.objects.filter(pk=job.pk).update(
+        last_run_status='success' if succeeded else 'failed',
+        last_run_duration_seconds=round(time.monotonic() - started),
+        last_run_error=error,
+        total_runs=F('total_runs') + 1,
+        success_count=F('success_count') + int(succeeded),
+        failure_count=F('failure_count') + int(not succeeded),
+        updated_at=timezone.now(),
+    )
+    return succeeded
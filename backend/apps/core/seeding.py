@@ -0,0 +1,2500 @@
+"""
+Deterministic sample data at any scale
+
+``generate(scale)`` fills every app with realistic, referentially consistent
+rows using ``bulk_create``: roughly 10,000 rows per scale unit, so
+``seed_data --scale 1000`` writes about 10 million.
+
+* Tables are declared with ``@table(Model, count)`` in dependency order; the
+  decorated function returns the field values of row ``i``.
+* Primary keys are assigned up front (row ``i`` gets ``offset + i + 1``), so
+  rows point at their parents by arithmetic instead of lookups and the
+  chunks of one table can be inserted independently.
+* Every chunk of ``CHUNK_SIZE`` rows draws from its own ``random.Random``
+  seeded with (seed, table, chunk). Values two tables must agree on (an
+  invoice's total and its payment, an employee's salary and payroll) come
+  from per-row generators (``Plan.row_random``). The output depends on the
+  seed, the scale and the reference date only, never on the worker count.
+* With ``workers > 1`` the chunks of a table are spread over a forked
+  process pool; every worker opens its own database connection. SQLite is
+  always filled in-process.
+
+``bulk_create`` skips ``save()`` and signals, so the values those would
+maintain (totals, ledger balances, dashboard snapshots, SLA rollups, unread
+counters) are written or rebuilt here. ``created_at``/``updated_at`` keep
+the generated values so the history spreads over the past year.
+"""
+import hashlib
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from math import ceil
+from multiprocessing import get_all_start_methods, get_context
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, connections
+from django.db.models import Max, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from apps.analytics.models import (
+    Dashboard, DataExport, KPI, KPIValue, Report, ReportExecution, SavedFilter, Widget,
+)
+from apps.asset.models import (
+    Asset, AssetAssignment, AssetCategory, AssetMaintenance, License, Procurement,
+    ProcurementLine, Vendor,
+)
+from apps.authentication.models import AuditLog, Permission, Role, User, UserSession
+from apps.core.integration_models import (
+    APILog, EmailLog, EmailTemplate, ExternalService, Notification, ScheduledJob,
+    SystemSetting, Webhook, WebhookDelivery,
+)
+from apps.core.notifications import ALL_RECIPIENTS, UNREAD_KEY
+from apps.core.snapshot_models import DashboardMetric
+from apps.core.snapshots import snapshot_registry
+from apps.crm.models import Client, Contract, FollowUp, Lead, Opportunity, Quotation, QuotationLine
+from apps.dms.models import (
+    Document, DocumentAccess, DocumentActivity, DocumentApproval, DocumentCategory,
+    DocumentTemplate, DocumentVersion,
+)
+from apps.finance.models import (
+    Budget, BudgetLine, Expense, GeneralLedger, Invoice, InvoiceLine, JournalEntry,
+    JournalEntryLine, Payment, Tax,
+)
+from apps.finance.posting import balance_delta
+from apps.helpdesk.models import (
+    KnowledgeBase, SLAPolicy, Ticket, TicketComment, TicketEscalation, TicketSLADailyStats,
+    TicketTemplate,
+)
+from apps.helpdesk.sla_stats import refresh_sla_stats
+from apps.hr.models import (
+    Attendance, Department, Employee, Leave, LeaveBalance, Payroll, PerformanceReview, Position,
+)
+from apps.project.models import (
+    Project, ProjectMilestone, ProjectRisk, ProjectTeamMember, Sprint, Task, TaskComment, Timesheet,
+)
+
+DEFAULT_SEED = 42
+DEFAULT_PASSWORD = 'password123'
+
+# Rows built and inserted per task; a multiple of TASKS_PER_PROJECT so a
+# task's parent is always in the same chunk
+CHUNK_SIZE = 5000
+BATCH_SIZE = 1000
+
+TASKS_PER_PROJECT = 100
+ATTENDANCE_DAYS = 60
+TICKET_DAYS = 180
+
+YEAR_SECONDS = 365 * 24 * 3600
+
+# Seeded accounts kept from the original demo data: employee index -> email
+LEGACY_ACCOUNTS = {
+    0: 'manager@ikodio.com',
+    4: 'hr@ikodio.com',
+    8: 'employee1@ikodio.com',
+    9: 'employee2@ikodio.com',
+}
+
+
+# ----- Reference data -----
+
+MALE_NAMES = [
+    'Budi', 'Agus', 'Andi', 'Dedi', 'Eko', 'Fajar', 'Hendra', 'Irfan',
+    'Joko', 'Rizky', 'Yudi', 'Bayu', 'Dimas', 'Arief', 'Teguh', 'Wahyu',
+]
+FEMALE_NAMES = [
+    'Siti', 'Dewi', 'Ayu', 'Rina', 'Putri', 'Indah', 'Sri', 'Wulan',
+    'Maya', 'Nadia', 'Ratna', 'Fitri', 'Lestari', 'Anisa', 'Citra', 'Intan',
+]
+LAST_NAMES = [
+    'Santoso', 'Wijaya', 'Pratama', 'Saputra', 'Hidayat', 'Nugroho', 'Kurniawan', 'Setiawan',
+    'Gunawan', 'Siregar', 'Nasution', 'Halim', 'Susanto', 'Lubis', 'Hakim', 'Utomo',
+]
+CITIES = [
+    ('Jakarta Selatan', 'DKI Jakarta', '12190'),
+    ('Jakarta Pusat', 'DKI Jakarta', '10110'),
+    ('Bandung', 'Jawa Barat', '40115'),
+    ('Surabaya', 'Jawa Timur', '60271'),
+    ('Semarang', 'Jawa Tengah', '50132'),
+    ('Yogyakarta', 'DI Yogyakarta', '55221'),
+    ('Medan', 'Sumatera Utara', '20112'),
+    ('Denpasar', 'Bali', '80232'),
+    ('Makassar', 'Sulawesi Selatan', '90111'),
+    ('Tangerang', 'Banten', '15111'),
+]
+STREETS = [
+    'Jl. Sudirman', 'Jl. Thamrin', 'Jl. Gatot Subroto', 'Jl. Diponegoro',
+    'Jl. Ahmad Yani', 'Jl. Gajah Mada', 'Jl. Merdeka', 'Jl. Asia Afrika',
+]
+COMPANY_WORDS = [
+    'Nusantara', 'Mitra', 'Sejahtera', 'Abadi', 'Digital', 'Solusi', 'Teknologi', 'Karya',
+    'Global', 'Mandiri', 'Prima', 'Sentosa', 'Cipta', 'Data', 'Makmur', 'Andalan',
+]
+INDUSTRIES = [
+    'Banking', 'Retail', 'Manufacturing', 'Telecommunication', 'Government',
+    'Healthcare', 'Logistics', 'Education', 'Energy', 'Hospitality',
+]
+BANKS = ['BCA', 'Mandiri', 'BNI', 'BRI', 'CIMB Niaga']
+TOPICS = [
+    'ERP rollout', 'Mobile banking app', 'Data warehouse', 'Network upgrade', 'HR portal',
+    'E-commerce platform', 'Cloud migration', 'Point of sale', 'Fleet tracking', 'CRM integration',
+]
+TASK_VERBS = ['Design', 'Implement', 'Review', 'Test', 'Document', 'Deploy', 'Refactor', 'Integrate']
+TASK_SUBJECTS = [
+    'login flow', 'invoice export', 'reporting API', 'user roles', 'payment gateway',
+    'search index', 'notification service', 'audit trail', 'dashboard widgets', 'data import',
+]
+
+# name, code, job title of its staff
+DEPARTMENTS = [
+    ('Engineering', 'ENG', 'Software Engineer'),
+    ('Sales', 'SAL', 'Account Executive'),
+    ('Marketing', 'MKT', 'Marketing Specialist'),
+    ('Finance', 'FIN', 'Accountant'),
+    ('Human Resources', 'HR', 'HR Generalist'),
+    ('Operations', 'OPS', 'Operations Analyst'),
+    ('Customer Support', 'SUP', 'Support Engineer'),
+    ('Product', 'PRD', 'Product Manager'),
+]
+ENGINEERING, SALES, FINANCE, SUPPORT = 0, 1, 3, 6
+
+# Position level, minimum and maximum monthly salary (IDR)
+LEVELS = [
+    ('junior', 6_000_000, 10_000_000),
+    ('senior', 12_000_000, 20_000_000),
+    ('manager', 22_000_000, 35_000_000),
+]
+JUNIOR, SENIOR, MANAGER = 0, 1, 2
+
+RESOURCES = [key for key, _label in Permission.RESOURCE_CHOICES]
+ACTIONS = [key for key, _label in Permission.ACTION_CHOICES]
+# name, code, actions granted on every resource
+ROLES = [
+    ('Administrator', 'ADMIN', ACTIONS),
+    ('Manager', 'MANAGER', ['create', 'read', 'update', 'approve', 'export']),
+    ('Employee', 'EMPLOYEE', ['read']),
+]
+
+# code, name, account type, parent code (None for headers)
+CHART_OF_ACCOUNTS = [
+    ('1000', 'Assets', 'asset', None),
+    ('1100', 'Cash on Hand', 'asset', '1000'),
+    ('1110', 'Bank BCA', 'asset', '1000'),
+    ('1120', 'Bank Mandiri', 'asset', '1000'),
+    ('1200', 'Accounts Receivable', 'asset', '1000'),
+    ('1300', 'Prepaid Expenses', 'asset', '1000'),
+    ('1500', 'Fixed Assets', 'asset', '1000'),
+    ('2000', 'Liabilities', 'liability', None),
+    ('2100', 'Accounts Payable', 'liability', '2000'),
+    ('2200', 'Tax Payable', 'liability', '2000'),
+    ('2300', 'Accrued Salaries', 'liability', '2000'),
+    ('3000', 'Equity', 'equity', None),
+    ('3100', 'Share Capital', 'equity', '3000'),
+    ('3200', 'Retained Earnings', 'equity', '3000'),
+    ('4000', 'Revenue', 'revenue', None),
+    ('4100', 'Project Revenue', 'revenue', '4000'),
+    ('4200', 'Maintenance & Support Revenue', 'revenue', '4000'),
+    ('4300', 'License Revenue', 'revenue', '4000'),
+    ('5000', 'Expenses', 'expense', None),
+    ('5100', 'Salaries & Wages', 'expense', '5000'),
+    ('5200', 'Office Rent', 'expense', '5000'),
+    ('5300', 'Utilities', 'expense', '5000'),
+    ('5400', 'Travel', 'expense', '5000'),
+    ('5500', 'Marketing', 'expense', '5000'),
+    ('5600', 'Training', 'expense', '5000'),
+    ('5700', 'Software Subscriptions', 'expense', '5000'),
+    ('5800', 'Depreciation', 'expense', '5000'),
+]
+ACCOUNT_INDEX = {code: index for index, (code, *_rest) in enumerate(CHART_OF_ACCOUNTS)}
+REVENUE_ACCOUNTS = ['4100', '4200', '4300']
+BUDGET_ACCOUNTS = ['5100', '5200', '5300', '5400', '5500']
+EXPENSE_ACCOUNTS = {
+    'operational': '5300', 'travel': '5400', 'office': '5200', 'utilities': '5300',
+    'salaries': '5100', 'marketing': '5500', 'training': '5600', 'other': '5700',
+}
+
+PRIORITIES = ['low', 'medium', 'high', 'critical']
+# name, response hours, resolution hours per priority
+SLA_POLICIES = [
+    ('Standard', 24, 120),
+    ('Normal', 8, 72),
+    ('Priority', 4, 24),
+    ('Critical Incident', 1, 8),
+]
+
+# name, code, asset type, manufacturer, model, unit cost (IDR)
+ASSET_CATEGORIES = [
+    ('Laptop', 'LAP', 'hardware', 'Lenovo', 'ThinkPad T14', 18_000_000),
+    ('Desktop', 'DSK', 'hardware', 'Dell', 'OptiPlex 7010', 14_000_000),
+    ('Monitor', 'MON', 'accessory', 'LG', '27UL500', 4_500_000),
+    ('Mobile Device', 'MOB', 'hardware', 'Samsung', 'Galaxy A54', 6_000_000),
+    ('Network Equipment', 'NET', 'hardware', 'Cisco', 'Catalyst 1000', 25_000_000),
+    ('Server', 'SRV', 'hardware', 'HPE', 'ProLiant DL380', 120_000_000),
+    ('Software', 'SFT', 'software', 'Microsoft', 'Office 365', 2_500_000),
+    ('Furniture', 'FUR', 'accessory', 'Informa', 'Ergo Chair', 3_000_000),
+]
+SOFTWARE = [
+    ('Microsoft 365 Business', 'Microsoft'), ('Adobe Creative Cloud', 'Adobe'),
+    ('JetBrains All Products', 'JetBrains'), ('Slack Business+', 'Salesforce'),
+    ('Atlassian Jira', 'Atlassian'), ('Zoom Workplace', 'Zoom'),
+]
+
+# name, code, icon, color
+DOCUMENT_CATEGORIES = [
+    ('Policies', 'POL', 'shield', '#1E88E5'),
+    ('Proposals', 'PRP', 'file-text', '#43A047'),
+    ('Finance', 'FIN', 'dollar-sign', '#FB8C00'),
+    ('Legal', 'LEG', 'briefcase', '#8E24AA'),
+    ('Human Resources', 'HRD', 'users', '#E53935'),
+    ('Technical', 'TEC', 'code', '#546E7A'),
+]
+# document type, extension, mime type
+DOCUMENT_FORMATS = [
+    ('contract', 'pdf', 'application/pdf'),
+    ('proposal', 'docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+    ('report', 'pdf', 'application/pdf'),
+    ('policy', 'pdf', 'application/pdf'),
+    ('spreadsheet', 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    ('presentation', 'pptx', 'application/vnd.openxmlformats-officedocument.presentationml.presentation'),
+    ('image', 'png', 'image/png'),
+    ('form', 'pdf', 'application/pdf'),
+]
+
+KPI_TYPES = [
+    ('revenue', 'Monthly revenue', 'IDR', 2_500_000_000),
+    ('project_completion', 'Projects delivered on time', '%', 90),
+    ('client_satisfaction', 'Client satisfaction score', 'pts', 4),
+    ('employee_utilization', 'Billable utilization', '%', 75),
+    ('sales_conversion', 'Lead conversion rate', '%', 20),
+    ('ticket_resolution', 'Tickets resolved within SLA', '%', 95),
+]
+API_PATHS = [
+    '/api/v1/hr/employees/', '/api/v1/projects/tasks/', '/api/v1/finance/invoices/',
+    '/api/v1/crm/clients/', '/api/v1/helpdesk/tickets/', '/api/v1/dms/documents/',
+    '/api/v1/auth/login/', '/api/v1/analytics/dashboards/',
+]
+USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_2) Safari/605.1.15',
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) Mobile/15E148',
+    'okhttp/4.12.0',
+]
+
+
+# ----- Plan -----
+
+class Plan:
+    """Row counts, primary key offsets and shared values of one generation run"""
+
+    def __init__(self, scale, seed=DEFAULT_SEED, today=None):
+        self.scale = scale
+        self.seed = seed
+        self.today = today or timezone.localdate()
+        self.tz = timezone.get_current_timezone()
+        self.now = self.moment(self.today, 17)
+        self.workdays = [
+            day for day in (self.today - timedelta(days=ago) for ago in range(ATTENDANCE_DAYS, 0, -1))
+            if day.weekday() < 5
+        ]
+        self.password = make_password(DEFAULT_PASSWORD, salt=f"sampledata{seed}")
+        self.counts = {}
+        self.offsets = {}
+
+    def count(self, model):
+        return self.counts[model._meta.label]
+
+    def pk(self, model, index):
+        return self.offsets[model._meta.label] + index + 1
+
+    def pick(self, rng, model):
+        """Primary key of a random row of ``model``"""
+        return self.pk(model, rng.randrange(self.count(model)))
+
+    def random(self, model, chunk):
+        return random.Random(f"{self.seed}:{model._meta.label}:{chunk}")
+
+    def row_random(self, model, index):
+        """Generator of the values other tables must agree on for one row"""
+        return random.Random(f"{self.seed}:{model._meta.label}:row:{index}")
+
+    def moment(self, day, hour=9, minute=0):
+        return datetime.combine(day, time(hour, minute), tzinfo=self.tz)
+
+    def past(self, rng, seconds=YEAR_SECONDS):
+        """Random moment within ``seconds`` before ``now``"""
+        return self.now - timedelta(seconds=rng.randrange(seconds))
+
+    # ----- Employees -----
+
+    def in_department(self, rng, department):
+        """Random employee of a department (employee ``i`` works in ``i % 8``)"""
+        members = (self.count(Employee) - department + len(DEPARTMENTS) - 1) // len(DEPARTMENTS)
+        return self.pk(Employee, rng.randrange(members) * len(DEPARTMENTS) + department)
+
+    def manager_of(self, employee):
+        """Department head of employee index ``employee`` (heads report to employee 0)"""
+        head = employee % len(DEPARTMENTS)
+        return self.pk(Employee, 0 if head == employee else head)
+
+    # ----- Projects -----
+
+    def project_client(self, project):
+        return self.pk(Client, (project * 7) % self.count(Client))
+
+    def team_member(self, project, slot):
+        """Employee index of team slot 0..4 of a project (slot 0 manages it)"""
+        return (project * 5 + slot) % self.count(Employee)
+
+
+def account(plan, code):
+    return plan.pk(GeneralLedger, ACCOUNT_INDEX[code])
+
+
+def money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+
+def phone(rng):
+    return f"+62 8{rng.randrange(11, 99)} {rng.randrange(1000, 10000)} {rng.randrange(1000, 10000)}"
+
+
+def company_name(rng):
+    return f"PT {rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_WORDS)}"
+
+
+def street_address(rng):
+    return f"{rng.choice(STREETS)} No. {rng.randrange(1, 300)}"
+
+
+def slug(text):
+    return ''.join(char if char.isalnum() else '-' for char in text.lower()).strip('-')
+
+
+# ----- Per-row facts shared between tables -----
+
+@lru_cache(maxsize=4096)
+def person(plan, index):
+    """Identity, position and salary of employee ``index`` (also its user)"""
+    rng = plan.row_random(Employee, index)
+    gender = rng.choice(('male', 'female'))
+    first_name = rng.choice(MALE_NAMES if gender == 'male' else FEMALE_NAMES)
+    last_name = rng.choice(LAST_NAMES)
+    department = index % len(DEPARTMENTS)
+    if index < len(DEPARTMENTS):
+        level = MANAGER
+    elif index in LEGACY_ACCOUNTS:
+        level = JUNIOR
+    else:
+        level = rng.choices((JUNIOR, SENIOR, MANAGER), (70, 25, 5))[0]
+    _name, low, high = LEVELS[level]
+    email = LEGACY_ACCOUNTS.get(index) or f"{first_name}.{last_name}{index + 1}@ikodio.com".lower()
+    return {
+        'first_name': first_name,
+        'last_name': last_name,
+        'gender': gender,
+        'email': email,
+        'phone': phone(rng),
+        'department': department,
+        'level': level,
+        'salary': rng.randrange(low // 100_000, high // 100_000 + 1) * 100_000,
+        'join_date': plan.today - timedelta(days=rng.randrange(90, 3650)),
+        'birth_date': plan.today - timedelta(days=rng.randrange(22 * 365, 55 * 365)),
+        'city': rng.randrange(len(CITIES)),
+    }
+
+
+@lru_cache(maxsize=1024)
+def project_facts(plan, index):
+    rng = plan.row_random(Project, index)
+    status = rng.choices(
+        ('planning', 'active', 'on_hold', 'completed', 'cancelled'), (10, 55, 5, 25, 5)
+    )[0]
+    if status == 'planning':
+        start = plan.today + timedelta(days=rng.randrange(7, 60))
+    else:
+        start = plan.today - timedelta(days=rng.randrange(60, 720))
+    progress = {
+        'planning': 0, 'active': rng.randrange(10, 91), 'on_hold': rng.randrange(20, 61),
+        'completed': 100, 'cancelled': rng.randrange(5, 51),
+    }[status]
+    budget = rng.randrange(200, 5000) * 1_000_000
+    return {
+        'status': status,
+        'start': start,
+        'end': start + timedelta(days=rng.randrange(90, 360)),
+        'budget': budget,
+        'contract_value': budget * rng.randrange(110, 160) // 100,
+        'progress': progress,
+        'topic': rng.choice(TOPICS),
+    }
+
+
+@lru_cache(maxsize=1024)
+def opportunity_facts(plan, index):
+    rng = plan.row_random(Opportunity, index)
+    stage = rng.choices(
+        ('prospecting', 'qualification', 'proposal', 'negotiation', 'closed_won', 'closed_lost'),
+        (20, 15, 15, 10, 25, 15),
+    )[0]
+    project = index % plan.count(Project) if stage == 'closed_won' else None
+    if project is not None:
+        client = plan.project_client(project)
+    else:
+        client = plan.pk(Client, (index * 3) % plan.count(Client))
+    return {
+        'stage': stage,
+        'client': client,
+        'project': project,
+        'value': rng.randrange(50, 3000) * 1_000_000,
+        'created': plan.past(rng),
+    }
+
+
+def priced_lines(rng, count, low, high):
+    """(quantity, unit price, discount %, amount) lines in whole rupiah"""
+    lines = []
+    for _ in range(count):
+        quantity = rng.randrange(1, 11)
+        unit_price = rng.randrange(low, high) * 100_000
+        discount = rng.choice((0, 0, 0, 5, 10))
+        lines.append((quantity, unit_price, discount, quantity * unit_price * (100 - discount) // 100))
+    return lines
+
+
+@lru_cache(maxsize=1024)
+def invoice_facts(plan, index):
+    rng = plan.row_random(Invoice, index)
+    lines = priced_lines(rng, 3, 5, 200)
+    subtotal = sum(line[3] for line in lines)
+    tax = subtotal * 11 // 100
+    total = subtotal + tax
+    invoice_date = plan.today - timedelta(days=rng.randrange(0, 365))
+    due_date = invoice_date + timedelta(days=30)
+    kind = index % 6
+    if kind < 3:
+        status, paid = 'paid', total
+    elif kind == 3:
+        status, paid = 'partial', total // 2
+    elif kind == 4:
+        status, paid = ('overdue' if due_date < plan.today else 'sent'), 0
+    else:
+        status, paid = 'draft', 0
+    project = index % plan.count(Project)
+    return {
+        'project': project,
+        'client': plan.project_client(project),
+        'lines': lines,
+        'subtotal': subtotal,
+        'tax': tax,
+        'total': total,
+        'paid': paid,
+        'status': status,
+        'date': invoice_date,
+        'due_date': due_date,
+    }
+
+
+@lru_cache(maxsize=1024)
+def quotation_lines(plan, index):
+    return priced_lines(plan.row_random(Quotation, index), 3, 10, 500)
+
+
+@lru_cache(maxsize=1024)
+def procurement_lines(plan, index):
+    rng = plan.row_random(Procurement, index)
+    lines = []
+    for _ in range(3):
+        category = rng.randrange(len(ASSET_CATEGORIES))
+        quantity = rng.randrange(1, 21)
+        unit_price = ASSET_CATEGORIES[category][5]
+        lines.append((category, quantity, unit_price, quantity * unit_price))
+    return lines
+
+
+@lru_cache(maxsize=1024)
+def budget_lines(plan, index):
+    rng = plan.row_random(Budget, index)
+    return [rng.randrange(50, 2000) * 1_000_000 for _ in BUDGET_ACCOUNTS]
+
+
+@lru_cache(maxsize=1024)
+def journal_lines(plan, index):
+    """Three balanced (account code, debit, credit, description) lines"""
+    if index == 0:
+        capital = 40_000_000_000 * plan.scale
+        return 'Opening balance', [
+            ('1110', capital * 3 // 4, 0, 'Opening cash'),
+            ('1500', capital // 4, 0, 'Opening fixed assets'),
+            ('3100', 0, capital, 'Paid-in capital'),
+        ]
+    rng = plan.row_random(JournalEntry, index)
+    amount = rng.randrange(10, 5000) * 100_000
+    tax = amount * 11 // 100
+    kind = rng.randrange(4)
+    if kind == 0:
+        revenue = rng.choice(REVENUE_ACCOUNTS)
+        return 'Sales invoice', [
+            ('1200', amount + tax, 0, 'Receivable'),
+            (revenue, 0, amount, 'Revenue'),
+            ('2200', 0, tax, 'VAT output'),
+        ]
+    if kind == 1:
+        expense = rng.choice(list(EXPENSE_ACCOUNTS.values()))
+        withholding = amount * 2 // 100
+        return 'Supplier bill', [
+            (expense, amount, 0, 'Expense'),
+            ('1110', 0, amount - withholding, 'Bank payment'),
+            ('2200', 0, withholding, 'Withholding tax'),
+        ]
+    if kind == 2:
+        fee = 6_500
+        return 'Customer receipt', [
+            ('1110', amount, 0, 'Bank receipt'),
+            ('5700', fee, 0, 'Bank charges'),
+            ('1200', 0, amount + fee, 'Receivable settled'),
+        ]
+    income_tax = amount * 5 // 100
+    return 'Payroll accrual', [
+        ('5100', amount, 0, 'Salaries'),
+        ('2300', 0, amount - income_tax, 'Net salaries payable'),
+        ('2200', 0, income_tax, 'PPh 21 withheld'),
+    ]
+
+
+@lru_cache(maxsize=256)
+def kpi_target(plan, index):
+    _kind, _name, _unit, target = KPI_TYPES[index % len(KPI_TYPES)]
+    rng = plan.row_random(KPI, index)
+    return target * rng.randrange(80, 121) / 100
+
+
+# ----- Registry -----
+
+class Table:
+    def __init__(self, model, count, build, after=None):
+        self.model = model
+        self.count = count
+        self.build = build
+        self.after = after
+
+
+TABLES = []
+
+
+def table(model, count, after=None):
+    """
+    Register the row builder of ``model``
+
+    Args:
+        count: Number of rows, or ``count(plan)``
+        after: Optional ``after(plan)`` run once every chunk is inserted
+            (for references to rows created later)
+    """
+    def register(build):
+        TABLES.append(Table(model, count, build, after))
+        return build
+    return register
+
+
+def per_scale(rows):
+    return lambda plan: rows * plan.scale
+
+
+# ----- Authentication -----
+
+@table(Permission, len(RESOURCES) * len(ACTIONS))
+def build_permission(i, rng, plan):
+    resource, action = RESOURCES[i // len(ACTIONS)], ACTIONS[i % len(ACTIONS)]
+    return {
+        'resource': resource,
+        'action': action,
+        'code': f"{resource}.{action}",
+        'description': f"Can {action} {resource}",
+    }
+
+
+@table(Role, len(ROLES))
+def build_role(i, rng, plan):
+    name, code, _actions = ROLES[i]
+    return {'name': name, 'code': code, 'description': f"{name} role", 'is_system_role': True}
+
+
+ROLE_GRANTS = [
+    (role, resource * len(ACTIONS) + ACTIONS.index(action))
+    for role, (_name, _code, actions) in enumerate(ROLES)
+    for resource in range(len(RESOURCES))
+    for action in actions
+]
+
+
+@table(Role.permissions.through, len(ROLE_GRANTS))
+def build_role_permission(i, rng, plan):
+    role, permission = ROLE_GRANTS[i]
+    return {'role_id': plan.pk(Role, role), 'permission_id': plan.pk(Permission, permission)}
+
+
+@table(User, per_scale(20))
+def build_user(i, rng, plan):
+    facts = person(plan, i)
+    department, _code, title = DEPARTMENTS[facts['department']]
+    manager = facts['level'] == MANAGER
+    joined = plan.moment(facts['join_date'])
+    return {
+        'email': facts['email'],
+        'password': plan.password,
+        'first_name': facts['first_name'],
+        'last_name': facts['last_name'],
+        'phone': facts['phone'],
+        'department': department,
+        'position': f"{department} Manager" if manager else title,
+        'employee_id': f"EMP{i + 1:06d}",
+        'role_id': plan.pk(Role, 1 if manager else 2),
+        'is_staff': i < len(DEPARTMENTS),
+        'is_verified': True,
+        'email_verified_at': joined,
+        'date_joined': joined,
+        'last_login': plan.past(rng, 30 * 24 * 3600),
+        'created_at': joined,
+    }
+
+
+@table(UserSession, per_scale(40))
+def build_user_session(i, rng, plan):
+    started = plan.past(rng, 14 * 24 * 3600)
+    return {
+        'user_id': plan.pk(User, i // 2),
+        'token': f"seed-{plan.seed}-{i + 1}-{rng.getrandbits(64):016x}",
+        'ip_address': f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+        'user_agent': rng.choice(USER_AGENTS),
+        'device_type': rng.choice(('desktop', 'mobile', 'tablet')),
+        'location': CITIES[rng.randrange(len(CITIES))][0],
+        'is_active': started > plan.now - timedelta(days=7),
+        'expires_at': started + timedelta(days=7),
+        'last_activity': started + timedelta(minutes=rng.randrange(1, 600)),
+        'created_at': started,
+    }
+
+
+@table(AuditLog, per_scale(1000))
+def build_audit_log(i, rng, plan):
+    action = rng.choices(
+        ('login', 'logout', 'create', 'update', 'delete', 'approve', 'export'), (25, 15, 20, 25, 5, 5, 5)
+    )[0]
+    resource = rng.choice(RESOURCES)
+    return {
+        'user_id': plan.pick(rng, User),
+        'action': action,
+        'resource_type': 'session' if action in ('login', 'logout') else resource,
+        'resource_id': str(rng.randrange(1, 10_000)),
+        'description': f"{action.title()} {resource}",
+        'ip_address': f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+        'user_agent': rng.choice(USER_AGENTS),
+        'created_at': plan.past(rng, 90 * 24 * 3600),
+    }
+
+
+# ----- HR -----
+
+def set_department_heads(plan):
+    for department in range(len(DEPARTMENTS)):
+        Department.objects.filter(pk=plan.pk(Department, department)).update(
+            head_id=plan.pk(Employee, department)
+        )
+    employees = Employee.objects.filter(
+        pk__gte=plan.pk(Employee, 0), pk__lte=plan.pk(Employee, plan.count(Employee) - 1)
+    )
+    heads = [plan.pk(Employee, department) for department in range(len(DEPARTMENTS))]
+    employees.exclude(pk__in=heads).update(
+        reporting_to_id=Subquery(Department.objects.filter(pk=OuterRef('department_id')).values('head_id')[:1])
+    )
+    employees.filter(pk__in=heads[1:]).update(reporting_to_id=heads[0])
+
+
+@table(Department, len(DEPARTMENTS))
+def build_department(i, rng, plan):
+    name, code, _title = DEPARTMENTS[i]
+    return {'name': name, 'code': code, 'description': f"{name} department"}
+
+
+@table(Position, len(DEPARTMENTS) * len(LEVELS))
+def build_position(i, rng, plan):
+    department, level = divmod(i, len(LEVELS))
+    name, code, title = DEPARTMENTS[department]
+    level_name, low, high = LEVELS[level]
+    titles = {JUNIOR: title, SENIOR: f"Senior {title}", MANAGER: f"{name} Manager"}
+    return {
+        'title': titles[level],
+        'code': f"{code}-{level_name[:3].upper()}",
+        'level': level_name,
+        'department_id': plan.pk(Department, department),
+        'min_salary': money(low),
+        'max_salary': money(high),
+    }
+
+
+@table(Employee, per_scale(20), after=set_department_heads)
+def build_employee(i, rng, plan):
+    facts = person(plan, i)
+    city, province, postal_code = CITIES[facts['city']]
+    number = f"{i + 1:015d}"
+    employment_type = 'permanent' if facts['level'] != JUNIOR else rng.choice(('permanent', 'contract', 'probation'))
+    full_name = f"{facts['first_name']} {facts['last_name']}"
+    return {
+        'user_id': plan.pk(User, i),
+        'employee_id': f"EMP{i + 1:06d}",
+        'first_name': facts['first_name'],
+        'last_name': facts['last_name'],
+        'email': facts['email'],
+        'phone': facts['phone'],
+        'mobile': facts['phone'],
+        'date_of_birth': facts['birth_date'],
+        'gender': facts['gender'],
+        'marital_status': rng.choice(('single', 'married', 'married', 'divorced')),
+        'id_card_number': f"31{number[1:]}",
+        'tax_id': f"{number[:2]}.{number[2:5]}.{number[5:8]}.{number[8]}-{number[9:12]}.{number[12:]}",
+        'address': street_address(rng),
+        'city': city,
+        'province': province,
+        'postal_code': postal_code,
+        'employment_type': employment_type,
+        'join_date': facts['join_date'],
+        'probation_end_date': facts['join_date'] + timedelta(days=90),
+        'contract_end_date': facts['join_date'] + timedelta(days=730) if employment_type == 'contract' else None,
+        'department_id': plan.pk(Department, facts['department']),
+        'position_id': plan.pk(Position, facts['department'] * len(LEVELS) + facts['level']),
+        'base_salary': money(facts['salary']),
+        'bank_name': rng.choice(BANKS),
+        'bank_account_number': f"{rng.randrange(10 ** 9, 10 ** 10)}",
+        'bank_account_holder': full_name,
+        'emergency_contact_name': f"{rng.choice(MALE_NAMES + FEMALE_NAMES)} {facts['last_name']}",
+        'emergency_contact_relationship': rng.choice(('Spouse', 'Parent', 'Sibling')),
+        'emergency_contact_phone': phone(rng),
+        'created_at': plan.moment(facts['join_date']),
+    }
+
+
+@table(Attendance, lambda plan: plan.count(Employee) * len(plan.workdays))
+def build_attendance(i, rng, plan):
+    employee, day = divmod(i, len(plan.workdays))
+    date = plan.workdays[day]
+    status = rng.choices(
+        ('present', 'late', 'remote', 'absent', 'sick', 'leave'), (75, 8, 10, 2, 2, 3)
+    )[0]
+    values = {
+        'employee_id': plan.pk(Employee, employee),
+        'date': date,
+        'status': status,
+        'is_approved': True,
+        'approved_by_id': plan.manager_of(employee),
+        'approved_at': plan.moment(date, 18),
+        'created_at': plan.moment(date, 8),
+    }
+    if status in ('present', 'late', 'remote'):
+        start = 8 * 60 + (rng.randrange(20, 120) if status == 'late' else rng.randrange(-30, 15))
+        minutes = rng.randrange(8 * 60, 10 * 60 + 30)
+        end = start + minutes
+        location = 'Remote' if status == 'remote' else 'Head office'
+        values.update({
+            'clock_in': time(start // 60, start % 60),
+            'clock_out': time(end // 60, end % 60),
+            'clock_in_location': location,
+            'clock_out_location': location,
+            'working_hours': Decimal(minutes * 100 // 60) / 100,
+            'overtime_hours': Decimal(max(0, minutes - 9 * 60) * 100 // 60) / 100,
+            'created_at': plan.moment(date, start // 60, start % 60),
+        })
+    return values
+
+
+@table(Leave, per_scale(40))
+def build_leave(i, rng, plan):
+    employee = i // 2
+    leave_type = rng.choices(('annual', 'sick', 'emergency', 'unpaid', 'compensatory'), (60, 25, 7, 4, 4))[0]
+    start = plan.today + timedelta(days=rng.randrange(-300, 60))
+    days = rng.randrange(1, 6) if leave_type == 'annual' else rng.randrange(1, 3)
+    requested = plan.moment(start - timedelta(days=rng.randrange(3, 21)), 10)
+    status = 'pending' if start > plan.today else rng.choices(('approved', 'rejected', 'cancelled'), (85, 10, 5))[0]
+    values = {
+        'employee_id': plan.pk(Employee, employee),
+        'leave_type': leave_type,
+        'start_date': start,
+        'end_date': start + timedelta(days=days - 1),
+        'total_days': days,
+        'reason': {'annual': 'Family holiday', 'sick': 'Medical rest'}.get(leave_type, 'Personal matters'),
+        'status': status,
+        'created_at': min(requested, plan.now),
+    }
+    if status != 'pending':
+        values['reviewed_by_id'] = plan.manager_of(employee)
+        values['reviewed_at'] = min(requested + timedelta(days=1), plan.now)
+    return values
+
+
+@table(LeaveBalance, per_scale(20))
+def build_leave_balance(i, rng, plan):
+    return {
+        'employee_id': plan.pk(Employee, i),
+        'year': plan.today.year,
+        'annual_quota': 12,
+        'annual_used': rng.randrange(0, 9),
+        'sick_used': rng.randrange(0, 4),
+        'compensatory_used': rng.randrange(0, 2),
+        'created_at': plan.moment(plan.today.replace(month=1, day=1)),
+    }
+
+
+def months_back(plan, months):
+    """(year, month) ``months`` months before the current one"""
+    total = plan.today.year * 12 + plan.today.month - 1 - months
+    return total // 12, total % 12 + 1
+
+
+@table(Payroll, per_scale(240))
+def build_payroll(i, rng, plan):
+    employee, months = divmod(i, 12)
+    year, month = months_back(plan, months + 1)
+    basic = person(plan, employee)['salary']
+    allowances = basic // 10
+    overtime_hours = rng.randrange(0, 20)
+    overtime_pay = overtime_hours * basic // 173
+    bonus = basic if month == 12 else 0
+    gross = basic + allowances + overtime_pay + bonus
+    tax = gross * 5 // 100
+    insurance = basic // 100
+    pension = basic * 2 // 100
+    deductions = tax + insurance + pension
+    working_days = 21
+    processed = plan.moment(plan.today.replace(day=1) - timedelta(days=30 * months + 3), 10)
+    status = 'approved' if months == 0 else 'paid'
+    return {
+        'employee_id': plan.pk(Employee, employee),
+        'period_month': month,
+        'period_year': year,
+        'basic_salary': money(basic),
+        'allowances': money(allowances),
+        'overtime_pay': money(overtime_pay),
+        'bonus': money(bonus),
+        'tax': money(tax),
+        'insurance': money(insurance),
+        'pension': money(pension),
+        'gross_salary': money(gross),
+        'total_deductions': money(deductions),
+        'net_salary': money(gross - deductions),
+        'working_days': working_days,
+        'present_days': working_days - rng.choice((0, 0, 0, 1, 2)),
+        'overtime_hours': Decimal(overtime_hours),
+        'status': status,
+        'calculated_at': processed,
+        'approved_by_id': plan.pk(Employee, FINANCE),
+        'approved_at': processed + timedelta(days=1),
+        'paid_at': processed + timedelta(days=2) if status == 'paid' else None,
+        'created_at': processed,
+    }
+
+
+@table(PerformanceReview, per_scale(20))
+def build_performance_review(i, rng, plan):
+    year = plan.today.year - 1
+    ratings = {
+        name: rng.choices((2, 3, 4, 5), (5, 35, 45, 15))[0]
+        for name in (
+            'technical_skills', 'communication', 'teamwork', 'leadership',
+            'productivity', 'quality_of_work', 'attendance',
+        )
+    }
+    review_date = plan.today.replace(year=year + 1, month=1, day=15)
+    overall = Decimal(sum(ratings.values())) / len(ratings)
+    return {
+        'employee_id': plan.pk(Employee, i),
+        'reviewer_id': plan.manager_of(i),
+        'review_type': 'annual',
+        'review_period_start': review_date.replace(year=year, month=1, day=1),
+        'review_period_end': review_date.replace(year=year, month=12, day=31),
+        'review_date': review_date,
+        **ratings,
+        'overall_rating': overall.quantize(Decimal('0.01')),
+        'strengths': 'Reliable delivery and good collaboration',
+        'areas_for_improvement': 'Estimation and written communication',
+        'goals': 'Lead one project workstream next year',
+        'status': 'completed',
+        'submitted_at': plan.moment(review_date),
+        'completed_at': plan.moment(review_date + timedelta(days=7)),
+        'created_at': plan.moment(review_date - timedelta(days=7)),
+    }
+
+
+# ----- CRM: clients and leads -----
+
+def link_converted_leads(plan):
+    Lead.objects.filter(
+        pk__gte=plan.pk(Lead, 0), pk__lte=plan.pk(Lead, plan.count(Lead) - 1), status='converted'
+    ).update(
+        converted_opportunity_id=Subquery(
+            Opportunity.objects.filter(lead_id=OuterRef('pk')).order_by('pk').values('pk')[:1]
+        )
+    )
+
+
+@table(Client, per_scale(10))
+def build_client(i, rng, plan):
+    name = company_name(rng)
+    domain = f"{slug(name[3:])}{i + 1}.co.id"
+    city, province, postal_code = CITIES[rng.randrange(len(CITIES))]
+    contact = f"{rng.choice(MALE_NAMES + FEMALE_NAMES)} {rng.choice(LAST_NAMES)}"
+    return {
+        'code': f"CL{i + 1:06d}",
+        'name': name,
+        'client_type': rng.choices(('company', 'government', 'individual'), (80, 15, 5))[0],
+        'email': f"info@{domain}",
+        'phone': phone(rng),
+        'website': f"https://www.{domain}",
+        'address': street_address(rng),
+        'city': city,
+        'province': province,
+        'postal_code': postal_code,
+        'tax_id': f"{i + 1:015d}",
+        'industry': rng.choice(INDUSTRIES),
+        'contact_person_name': contact,
+        'contact_person_title': rng.choice(('IT Manager', 'CFO', 'Procurement Lead', 'Director')),
+        'contact_person_email': f"{slug(contact).replace('-', '.')}@{domain}",
+        'contact_person_phone': phone(rng),
+        'status': rng.choices(('active', 'inactive', 'suspended'), (85, 12, 3))[0],
+        'account_manager_id': plan.in_department(rng, SALES),
+        'credit_limit': money(rng.randrange(1, 50) * 100_000_000),
+        'payment_terms_days': rng.choice((14, 30, 30, 45, 60)),
+        'rating': rng.randrange(1, 6),
+        'created_at': plan.past(rng, 2 * YEAR_SECONDS),
+    }
+
+
+@table(Lead, per_scale(30))
+def build_lead(i, rng, plan):
+    converted = i < plan.count(Opportunity) and i % 2 == 0
+    status = 'converted' if converted else rng.choices(('new', 'contacted', 'qualified', 'lost'), (30, 30, 20, 20))[0]
+    created = plan.past(rng)
+    city, province, _postal_code = CITIES[rng.randrange(len(CITIES))]
+    contact = f"{rng.choice(MALE_NAMES + FEMALE_NAMES)} {rng.choice(LAST_NAMES)}"
+    qualified = status in ('qualified', 'converted')
+    return {
+        'lead_number': f"LD-{i + 1:07d}",
+        'company_name': company_name(rng),
+        'contact_name': contact,
+        'title': rng.choice(('IT Manager', 'Head of Operations', 'CTO', 'Finance Director')),
+        'email': f"{slug(contact).replace('-', '.')}{i + 1}@example.co.id",
+        'phone': phone(rng),
+        'city': city,
+        'province': province,
+        'source': rng.choice(('website', 'referral', 'social_media', 'cold_call', 'event', 'partner')),
+        'industry': rng.choice(INDUSTRIES),
+        'estimated_value': money(rng.randrange(50, 3000) * 1_000_000),
+        'assigned_to_id': plan.in_department(rng, SALES),
+        'status': status,
+        'is_qualified': qualified,
+        'qualified_at': min(created + timedelta(days=7), plan.now) if qualified else None,
+        'converted_at': min(created + timedelta(days=21), plan.now) if converted else None,
+        'description': f"Interested in {rng.choice(TOPICS).lower()}",
+        'created_at': created,
+    }
+
+
+# ----- Project -----
+
+@table(Project, per_scale(4))
+def build_project(i, rng, plan):
+    facts = project_facts(plan, i)
+    status = facts['status']
+    started = status != 'planning'
+    return {
+        'code': f"PRJ-{i + 1:05d}",
+        'name': f"{facts['topic']} {i + 1}",
+        'description': f"{facts['topic']} for the client",
+        'status': status,
+        'priority': rng.choices(PRIORITIES, (20, 45, 25, 10))[0],
+        'client_id': plan.project_client(i),
+        'start_date': facts['start'],
+        'end_date': facts['end'],
+        'actual_start_date': facts['start'] if started else None,
+        'actual_end_date': min(facts['end'], plan.today) if status == 'completed' else None,
+        'estimated_budget': money(facts['budget']),
+        'actual_cost': money(facts['budget'] * facts['progress'] * rng.randrange(80, 120) // 10_000),
+        'contract_value': money(facts['contract_value']),
+        'progress_percentage': Decimal(facts['progress']),
+        'project_manager_id': plan.pk(Employee, plan.team_member(i, 0)),
+        'category': rng.choice(('Implementation', 'Development', 'Consulting', 'Maintenance')),
+        'created_at': plan.moment(facts['start'] - timedelta(days=14)),
+    }
+
+
+TEAM_ROLES = ['project_manager', 'tech_lead', 'developer', 'designer', 'qa']
+
+
+@table(ProjectTeamMember, lambda plan: plan.count(Project) * len(TEAM_ROLES))
+def build_team_member(i, rng, plan):
+    project, slot = divmod(i, len(TEAM_ROLES))
+    facts = project_facts(plan, project)
+    return {
+        'project_id': plan.pk(Project, project),
+        'employee_id': plan.pk(Employee, plan.team_member(project, slot)),
+        'role': TEAM_ROLES[slot],
+        'allocation_percentage': rng.choice((50, 75, 100)),
+        'start_date': facts['start'],
+        'end_date': facts['end'],
+        'is_active': facts['status'] in ('planning', 'active', 'on_hold'),
+        'created_at': plan.moment(facts['start'] - timedelta(days=7)),
+    }
+
+
+SPRINTS_PER_PROJECT = 6
+SPRINT_DAYS = 14
+
+
+def sprint_dates(facts, number):
+    start = facts['start'] + timedelta(days=number * SPRINT_DAYS)
+    return start, start + timedelta(days=SPRINT_DAYS - 1)
+
+
+@table(Sprint, lambda plan: plan.count(Project) * SPRINTS_PER_PROJECT)
+def build_sprint(i, rng, plan):
+    project, number = divmod(i, SPRINTS_PER_PROJECT)
+    facts = project_facts(plan, project)
+    start, end = sprint_dates(facts, number)
+    if facts['status'] == 'cancelled' and start > plan.today:
+        status = 'cancelled'
+    elif end < plan.today:
+        status = 'completed'
+    else:
+        status = 'active' if start <= plan.today else 'planned'
+    planned = rng.randrange(20, 60)
+    return {
+        'project_id': plan.pk(Project, project),
+        'name': f"Sprint {number + 1}",
+        'goal': f"Deliver increment {number + 1}",
+        'start_date': start,
+        'end_date': end,
+        'status': status,
+        'planned_story_points': planned,
+        'completed_story_points': planned * rng.randrange(70, 101) // 100 if status == 'completed' else 0,
+        'created_at': plan.moment(start - timedelta(days=3)),
+    }
+
+
+def task_assignee(plan, task):
+    project, number = divmod(task, TASKS_PER_PROJECT)
+    return plan.team_member(project, number % len(TEAM_ROLES))
+
+
+@table(Task, lambda plan: plan.count(Project) * TASKS_PER_PROJECT)
+def build_task(i, rng, plan):
+    project, number = divmod(i, TASKS_PER_PROJECT)
+    facts = project_facts(plan, project)
+    sprint = number % SPRINTS_PER_PROJECT
+    start, due = sprint_dates(facts, sprint)
+    if facts['status'] == 'completed' or number < facts['progress']:
+        status = 'done'
+    elif facts['status'] == 'planning':
+        status = rng.choice(('backlog', 'todo'))
+    else:
+        status = rng.choices(('backlog', 'todo', 'in_progress', 'review', 'testing', 'blocked'), (20, 30, 25, 10, 10, 5))[0]
+    estimated = rng.randrange(2, 40)
+    done = status == 'done'
+    return {
+        'task_number': f"TSK-{i + 1:08d}",
+        'title': f"{rng.choice(TASK_VERBS)} {rng.choice(TASK_SUBJECTS)}",
+        'description': f"Part of {facts['topic'].lower()}",
+        'project_id': plan.pk(Project, project),
+        'sprint_id': plan.pk(Sprint, project * SPRINTS_PER_PROJECT + sprint),
+        # Every tenth task groups the three last tasks of its block as subtasks
+        'parent_task_id': plan.pk(Task, i - number % 10) if number % 10 >= 7 else None,
+        'assigned_to_id': plan.pk(Employee, task_assignee(plan, i)),
+        'status': status,
+        'priority': rng.choices(PRIORITIES, (25, 45, 22, 8))[0],
+        'start_date': start,
+        'due_date': due,
+        'completed_date': min(due, plan.today) if done else None,
+        'estimated_hours': Decimal(estimated),
+        'actual_hours': Decimal(estimated * rng.randrange(70, 140) // 100) if done else Decimal(0),
+        'progress_percentage': Decimal(100 if done else rng.choice((0, 0, 25, 50, 75))),
+        'story_points': rng.choice((1, 2, 3, 5, 8)),
+        'display_order': number,
+        'created_at': plan.moment(min(start, plan.today) - timedelta(days=2)),
+    }
+
+
+@table(Timesheet, lambda plan: plan.count(Task) * 2)
+def build_timesheet(i, rng, plan):
+    task = i // 2
+    employee = task_assignee(plan, task)
+    date = plan.workdays[rng.randrange(len(plan.workdays))]
+    approved = date < plan.today - timedelta(days=7)
+    return {
+        'employee_id': plan.pk(Employee, employee),
+        'task_id': plan.pk(Task, task),
+        'project_id': plan.pk(Project, task // TASKS_PER_PROJECT),
+        'date': date,
+        'hours': Decimal(rng.randrange(2, 17)) / 2,
+        'description': 'Development work',
+        'is_billable': rng.random() < 0.8,
+        'hourly_rate': money(person(plan, employee)['salary'] // 160),
+        'is_approved': approved,
+        'approved_by_id': plan.manager_of(employee) if approved else None,
+        'approved_at': plan.moment(date + timedelta(days=5)) if approved else None,
+        'created_at': plan.moment(date, 17),
+    }
+
+
+MILESTONES = ['Requirements sign-off', 'Design approval', 'User acceptance test', 'Go-live']
+
+
+@table(ProjectMilestone, lambda plan: plan.count(Project) * len(MILESTONES))
+def build_milestone(i, rng, plan):
+    project, number = divmod(i, len(MILESTONES))
+    facts = project_facts(plan, project)
+    due = facts['start'] + (facts['end'] - facts['start']) * (number + 1) // len(MILESTONES)
+    if due < plan.today:
+        status = 'completed' if facts['progress'] >= (number + 1) * 25 else 'delayed'
+    else:
+        status = 'in_progress' if number * 25 <= facts['progress'] else 'pending'
+    return {
+        'project_id': plan.pk(Project, project),
+        'name': MILESTONES[number],
+        'due_date': due,
+        'completed_date': due if status == 'completed' else None,
+        'status': status,
+        'deliverables': f"{MILESTONES[number]} documents",
+        'payment_percentage': Decimal(25),
+        'display_order': number,
+        'created_at': plan.moment(facts['start'] - timedelta(days=7)),
+    }
+
+
+@table(TaskComment, lambda plan: plan.count(Task))
+def build_task_comment(i, rng, plan):
+    project = i // TASKS_PER_PROJECT
+    return {
+        'task_id': plan.pk(Task, i),
+        'author_id': plan.pk(Employee, plan.team_member(project, rng.randrange(len(TEAM_ROLES)))),
+        'comment': rng.choice(('Looks good to me.', 'Blocked by the API change.', 'Pushed a fix, please review.')),
+        'created_at': plan.past(rng, 60 * 24 * 3600),
+    }
+
+
+@table(ProjectRisk, lambda plan: plan.count(Project) * 3)
+def build_project_risk(i, rng, plan):
+    project = i // 3
+    probability, impact = rng.randrange(1, 6), rng.randrange(1, 6)
+    identified = project_facts(plan, project)['start'] + timedelta(days=rng.randrange(0, 60))
+    status = rng.choice(('identified', 'analyzing', 'mitigating', 'resolved'))
+    return {
+        'project_id': plan.pk(Project, project),
+        'title': rng.choice(('Scope creep', 'Key staff turnover', 'Vendor delay', 'Integration complexity')),
+        'description': 'Raised during the weekly status meeting',
+        'severity': PRIORITIES[min((probability * impact - 1) // 6, 3)],
+        'probability': probability,
+        'impact': impact,
+        'mitigation_plan': 'Weekly review with the client',
+        'status': status,
+        'owner_id': plan.pk(Employee, plan.team_member(project, 0)),
+        'identified_date': min(identified, plan.today),
+        'resolved_date': plan.today if status == 'resolved' else None,
+    }
+
+
+# ----- CRM: pipeline (won opportunities point at projects) -----
+
+PROBABILITY = {
+    'prospecting': 10, 'qualification': 25, 'proposal': 50,
+    'negotiation': 75, 'closed_won': 100, 'closed_lost': 0,
+}
+
+
+@table(Opportunity, per_scale(20), after=link_converted_leads)
+def build_opportunity(i, rng, plan):
+    facts = opportunity_facts(plan, i)
+    stage = facts['stage']
+    closed = stage in ('closed_won', 'closed_lost')
+    close_date = (facts['created'] + timedelta(days=rng.randrange(30, 120))).date()
+    return {
+        'opportunity_number': f"OPP-{i + 1:07d}",
+        'name': f"{rng.choice(TOPICS)} deal",
+        'client_id': facts['client'],
+        'lead_id': plan.pk(Lead, i) if i % 2 == 0 else None,
+        'stage': stage,
+        'probability': PROBABILITY[stage],
+        'estimated_value': money(facts['value']),
+        'expected_revenue': money(facts['value'] * PROBABILITY[stage] // 100),
+        'expected_close_date': close_date,
+        'actual_close_date': min(close_date, plan.today) if closed else None,
+        'owner_id': plan.in_department(rng, SALES),
+        'is_won': stage == 'closed_won',
+        'win_loss_reason': {'closed_won': 'Best technical fit', 'closed_lost': 'Lost on price'}.get(stage, ''),
+        'project_id': plan.pk(Project, facts['project']) if facts['project'] is not None else None,
+        'created_at': facts['created'],
+    }
+
+
+@table(Contract, per_scale(8))
+def build_contract(i, rng, plan):
+    project = i % plan.count(Project)
+    facts = project_facts(plan, project)
+    status = {
+        'planning': 'sent', 'active': 'active', 'on_hold': 'active',
+        'completed': 'expired', 'cancelled': 'terminated',
+    }[facts['status']]
+    return {
+        'contract_number': f"CTR-{i + 1:07d}",
+        'contract_type': rng.choice(('po', 'sla', 'mou', 'nda')),
+        'title': f"{facts['topic']} agreement",
+        'client_id': plan.project_client(project),
+        'project_id': plan.pk(Project, project),
+        'start_date': facts['start'],
+        'end_date': facts['end'],
+        'signed_date': facts['start'] - timedelta(days=7) if status != 'sent' else None,
+        'contract_value': money(facts['contract_value']),
+        'status': status,
+        'payment_terms': '30% down payment, 70% on delivery',
+        'owner_id': plan.in_department(rng, SALES),
+        'created_at': plan.moment(facts['start'] - timedelta(days=14)),
+    }
+
+
+QUOTATION_STATUS = {
+    'prospecting': 'draft', 'qualification': 'draft', 'proposal': 'sent',
+    'negotiation': 'sent', 'closed_won': 'accepted', 'closed_lost': 'rejected',
+}
+
+
+@table(Quotation, lambda plan: plan.count(Opportunity))
+def build_quotation(i, rng, plan):
+    facts = opportunity_facts(plan, i)
+    subtotal = sum(line[3] for line in quotation_lines(plan, i))
+    tax = subtotal * 11 // 100
+    created = min(facts['created'] + timedelta(days=10), plan.now)
+    status = QUOTATION_STATUS[facts['stage']]
+    decided = min(created + timedelta(days=14), plan.now)
+    return {
+        'quotation_number': f"QT-{i + 1:07d}",
+        'title': f"Quotation for opportunity OPP-{i + 1:07d}",
+        'client_id': facts['client'],
+        'opportunity_id': plan.pk(Opportunity, i),
+        'quotation_date': created.date(),
+        'valid_until': created.date() + timedelta(days=30),
+        'subtotal': money(subtotal),
+        'tax_amount': money(tax),
+        'total_amount': money(subtotal + tax),
+        'tax_percentage': Decimal(11),
+        'status': status,
+        'prepared_by_id': plan.in_department(rng, SALES),
+        'accepted_at': decided if status == 'accepted' else None,
+        'rejected_at': decided if status == 'rejected' else None,
+        'rejection_reason': 'Budget constraints' if status == 'rejected' else '',
+        'payment_terms': 'Net 30',
+        'created_at': created,
+    }
+
+
+@table(QuotationLine, lambda plan: plan.count(Quotation) * 3)
+def build_quotation_line(i, rng, plan):
+    quotation, number = divmod(i, 3)
+    quantity, unit_price, discount, amount = quotation_lines(plan, quotation)[number]
+    return {
+        'quotation_id': plan.pk(Quotation, quotation),
+        'description': rng.choice(('Implementation services', 'Software license', 'Training', 'Support package')),
+        'quantity': Decimal(quantity),
+        'unit_price': money(unit_price),
+        'discount_percentage': Decimal(discount),
+        'amount': money(amount),
+        'line_number': number + 1,
+    }
+
+
+@table(FollowUp, per_scale(60))
+def build_follow_up(i, rng, plan):
+    scheduled = plan.now + timedelta(hours=rng.randrange(-24 * 180, 24 * 30))
+    target = i % 3
+    status = 'planned' if scheduled > plan.now else rng.choices(('completed', 'cancelled'), (90, 10))[0]
+    return {
+        'lead_id': plan.pick(rng, Lead) if target == 0 else None,
+        'opportunity_id': plan.pick(rng, Opportunity) if target == 1 else None,
+        'client_id': plan.pick(rng, Client) if target == 2 else None,
+        'activity_type': rng.choice(('call', 'email', 'meeting', 'demo', 'visit')),
+        'subject': rng.choice(('Discuss requirements', 'Send proposal', 'Product demo', 'Contract review')),
+        'scheduled_date': scheduled,
+        'completed_date': scheduled + timedelta(hours=1) if status == 'completed' else None,
+        'assigned_to_id': plan.in_department(rng, SALES),
+        'status': status,
+        'outcome': 'Client interested, follow up next week' if status == 'completed' else '',
+        'created_at': min(scheduled - timedelta(days=3), plan.now),
+    }
+
+
+# ----- Finance -----
+
+def update_ledger_balances(plan):
+    totals = JournalEntryLine.objects.filter(
+        journal_entry__status='posted'
+    ).values('account_id').annotate(debit=Sum('debit'), credit=Sum('credit'))
+    types = dict(GeneralLedger.objects.values_list('pk', 'account_type'))
+    for row in totals:
+        GeneralLedger.objects.filter(pk=row['account_id']).update(
+            balance=balance_delta(types[row['account_id']], row['debit'], row['credit'])
+        )
+
+
+@table(GeneralLedger, len(CHART_OF_ACCOUNTS))
+def build_ledger_account(i, rng, plan):
+    code, name, account_type, parent = CHART_OF_ACCOUNTS[i]
+    return {
+        'code': code,
+        'name': name,
+        'account_type': account_type,
+        'parent_id': account(plan, parent) if parent else None,
+        'is_header': parent is None,
+        'created_at': plan.now - timedelta(days=3 * 365),
+    }
+
+
+@table(JournalEntry, per_scale(300))
+def build_journal_entry(i, rng, plan):
+    description, _lines = journal_lines(plan, i)
+    entry_date = plan.today - timedelta(days=365 if i == 0 else rng.randrange(0, 365))
+    posted = i == 0 or rng.random() < 0.85
+    created = plan.moment(entry_date, 10)
+    return {
+        'entry_number': f"JE-{i + 1:08d}",
+        'entry_date': entry_date,
+        'description': description,
+        'reference_number': f"REF-{rng.randrange(10 ** 7):07d}",
+        'status': 'posted' if posted else 'draft',
+        'posted_by_id': plan.in_department(rng, FINANCE) if posted else None,
+        'posted_at': min(created + timedelta(hours=4), plan.now) if posted else None,
+        'created_at': created,
+    }
+
+
+@table(JournalEntryLine, lambda plan: plan.count(JournalEntry) * 3, after=update_ledger_balances)
+def build_journal_line(i, rng, plan):
+    entry, number = divmod(i, 3)
+    code, debit, credit, description = journal_lines(plan, entry)[1][number]
+    return {
+        'journal_entry_id': plan.pk(JournalEntry, entry),
+        'account_id': account(plan, code),
+        'description': description,
+        'debit': money(debit),
+        'credit': money(credit),
+    }
+
+
+@table(Invoice, per_scale(60))
+def build_invoice(i, rng, plan):
+    facts = invoice_facts(plan, i)
+    return {
+        'invoice_number': f"INV-{i + 1:08d}",
+        'invoice_type': 'sales',
+        'invoice_date': facts['date'],
+        'due_date': facts['due_date'],
+        'client_id': facts['client'],
+        'project_id': plan.pk(Project, facts['project']),
+        'subtotal': money(facts['subtotal']),
+        'tax_amount': money(facts['tax']),
+        'total_amount': money(facts['total']),
+        'paid_amount': money(facts['paid']),
+        'outstanding_amount': money(facts['total'] - facts['paid']),
+        'tax_percentage': Decimal(11),
+        'status': facts['status'],
+        'payment_terms': 'Net 30',
+        'created_at': plan.moment(facts['date'], 10),
+    }
+
+
+@table(InvoiceLine, lambda plan: plan.count(Invoice) * 3)
+def build_invoice_line(i, rng, plan):
+    invoice, number = divmod(i, 3)
+    quantity, unit_price, discount, amount = invoice_facts(plan, invoice)['lines'][number]
+    return {
+        'invoice_id': plan.pk(Invoice, invoice),
+        'description': rng.choice(('Implementation milestone', 'Monthly support', 'License renewal', 'Consulting days')),
+        'quantity': Decimal(quantity),
+        'unit_price': money(unit_price),
+        'discount_percentage': Decimal(discount),
+        'tax_percentage': Decimal(11),
+        'amount': money(amount),
+        'account_id': account(plan, REVENUE_ACCOUNTS[number]),
+        'line_number': number + 1,
+    }
+
+
+def paid_invoice(payment):
+    """Invoice index of payment ``payment`` (invoices ``i % 6 < 4`` are paid or partial)"""
+    return (payment // 4) * 6 + payment % 4
+
+
+@table(Payment, lambda plan: plan.count(Invoice) // 6 * 4 + min(plan.count(Invoice) % 6, 4))
+def build_payment(i, rng, plan):
+    invoice = paid_invoice(i)
+    facts = invoice_facts(plan, invoice)
+    paid_on = min(facts['date'] + timedelta(days=rng.randrange(1, 40)), plan.today)
+    return {
+        'payment_number': f"PAY-{i + 1:08d}",
+        'payment_type': 'receipt',
+        'payment_date': paid_on,
+        'client_id': facts['client'],
+        'invoice_id': plan.pk(Invoice, invoice),
+        'amount': money(facts['paid']),
+        'payment_method': 'bank_transfer',
+        'reference_number': f"TRF{rng.randrange(10 ** 9):09d}",
+        'bank_name': 'BCA',
+        'bank_account': '1234567890',
+        'status': 'completed',
+        'account_id': account(plan, '1110'),
+        'created_at': plan.moment(paid_on, 14),
+    }
+
+
+@table(Expense, per_scale(100))
+def build_expense(i, rng, plan):
+    employee = rng.randrange(plan.count(Employee))
+    category = rng.choices(list(EXPENSE_ACCOUNTS), (20, 25, 15, 5, 5, 10, 10, 10))[0]
+    spent_on = plan.today - timedelta(days=rng.randrange(0, 365))
+    status = rng.choices(('draft', 'submitted', 'approved', 'rejected', 'paid'), (5, 15, 20, 5, 55))[0]
+    approved = status in ('approved', 'paid')
+    return {
+        'expense_number': f"EXP-{i + 1:08d}",
+        'expense_date': spent_on,
+        'employee_id': plan.pk(Employee, employee),
+        'category': category,
+        'description': f"{category.title()} expense",
+        'amount': money(rng.randrange(5, 500) * 10_000),
+        'project_id': plan.pick(rng, Project) if rng.random() < 0.3 else None,
+        'department_id': plan.pk(Department, employee % len(DEPARTMENTS)),
+        'account_id': account(plan, EXPENSE_ACCOUNTS[category]),
+        'status': status,
+        'approved_by_id': plan.manager_of(employee) if approved else None,
+        'approved_at': min(plan.moment(spent_on + timedelta(days=2)), plan.now) if approved else None,
+        'paid_at': min(plan.moment(spent_on + timedelta(days=5)), plan.now) if status == 'paid' else None,
+        'created_at': plan.moment(spent_on, 18),
+    }
+
+
+@table(Budget, per_scale(2))
+def build_budget(i, rng, plan):
+    department = i % len(DEPARTMENTS)
+    year = plan.today.year - (i // len(DEPARTMENTS)) % 2
+    allocated = sum(budget_lines(plan, i))
+    current = year == plan.today.year
+    return {
+        'name': f"{DEPARTMENTS[department][0]} budget {year}",
+        'fiscal_year': year,
+        'start_date': plan.today.replace(year=year, month=1, day=1),
+        'end_date': plan.today.replace(year=year, month=12, day=31),
+        'department_id': plan.pk(Department, department),
+        'total_budget': money(allocated),
+        'total_spent': money(allocated * rng.randrange(30, 95) // 100),
+        'status': 'active' if current else 'closed',
+        'approved_by_id': plan.pk(Employee, FINANCE),
+        'approved_at': plan.moment(plan.today.replace(year=year - 1, month=12, day=15)),
+        'created_at': plan.moment(plan.today.replace(year=year - 1, month=12, day=1)),
+    }
+
+
+@table(BudgetLine, lambda plan: plan.count(Budget) * len(BUDGET_ACCOUNTS))
+def build_budget_line(i, rng, plan):
+    budget, number = divmod(i, len(BUDGET_ACCOUNTS))
+    allocated = budget_lines(plan, budget)[number]
+    return {
+        'budget_id': plan.pk(Budget, budget),
+        'account_id': account(plan, BUDGET_ACCOUNTS[number]),
+        'allocated_amount': money(allocated),
+        'spent_amount': money(allocated * rng.randrange(20, 100) // 100),
+        'committed_amount': money(allocated * rng.randrange(0, 10) // 100),
+    }
+
+
+TAX_TYPES = [('pph21', 5), ('pph23', 2), ('pph25', 1), ('ppn', 11), ('other', 10)]
+
+
+@table(Tax, per_scale(12))
+def build_tax(i, rng, plan):
+    months, kind = divmod(i, len(TAX_TYPES))
+    year, month = months_back(plan, months + 1)
+    tax_type, rate = TAX_TYPES[kind]
+    taxable = rng.randrange(100, 5000) * 1_000_000
+    status = 'calculated' if months == 0 else 'paid'
+    due = plan.today.replace(year=year, month=month, day=1) + timedelta(days=45)
+    return {
+        'tax_number': f"TAX-{i + 1:08d}",
+        'tax_type': tax_type,
+        'tax_period_month': month,
+        'tax_period_year': year,
+        'taxable_amount': money(taxable),
+        'tax_rate': Decimal(rate),
+        'tax_amount': money(taxable * rate // 100),
+        'status': status,
+        'filing_date': due if status == 'paid' else None,
+        'payment_date': due if status == 'paid' else None,
+        'reference_number': f"NTPN{rng.randrange(10 ** 12):012d}" if status == 'paid' else '',
+    }
+
+
+# ----- Asset -----
+
+@table(AssetCategory, len(ASSET_CATEGORIES))
+def build_asset_category(i, rng, plan):
+    name, code, *_rest = ASSET_CATEGORIES[i]
+    return {'name': name, 'code': code, 'description': f"{name} assets"}
+
+
+@table(Vendor, per_scale(5))
+def build_vendor(i, rng, plan):
+    name = company_name(rng)
+    domain = f"{slug(name[3:])}{i + 1}.co.id"
+    city, province, postal_code = CITIES[rng.randrange(len(CITIES))]
+    contact = f"{rng.choice(MALE_NAMES + FEMALE_NAMES)} {rng.choice(LAST_NAMES)}"
+    return {
+        'code': f"VND-{i + 1:05d}",
+        'name': name,
+        'email': f"sales@{domain}",
+        'phone': phone(rng),
+        'website': f"https://{domain}",
+        'address': street_address(rng),
+        'city': city,
+        'province': province,
+        'postal_code': postal_code,
+        'tax_id': f"{i + 1:015d}",
+        'contact_person_name': contact,
+        'contact_person_phone': phone(rng),
+        'contact_person_email': f"{slug(contact).replace('-', '.')}@{domain}",
+        'status': rng.choices(('active', 'inactive'), (90, 10))[0],
+        'rating': rng.randrange(1, 6),
+        'payment_terms_days': rng.choice((14, 30, 45)),
+    }
+
+
+def asset_holder(plan, asset):
+    """Employee index holding asset ``asset`` (assets ``i % 3 == 2`` are unassigned)"""
+    return (asset * 7) % plan.count(Employee)
+
+
+@table(Asset, per_scale(60))
+def build_asset(i, rng, plan):
+    category = i % len(ASSET_CATEGORIES)
+    name, code, asset_type, manufacturer, model_number, cost = ASSET_CATEGORIES[category]
+    purchased = plan.today - timedelta(days=rng.randrange(30, 4 * 365))
+    assigned = i % 3 != 2
+    age_years = (plan.today - purchased).days / 365
+    current = max(cost * (1 - age_years / 4), cost / 10)
+    return {
+        'asset_number': f"AST-{code}-{i + 1:07d}",
+        'name': f"{manufacturer} {model_number}",
+        'asset_type': asset_type,
+        'category_id': plan.pk(AssetCategory, category),
+        'manufacturer': manufacturer,
+        'model_number': model_number,
+        'serial_number': f"SN{plan.seed}{i + 1:010d}",
+        'vendor_id': plan.pick(rng, Vendor),
+        'purchase_date': purchased,
+        'purchase_cost': money(cost),
+        'warranty_start': purchased,
+        'warranty_end': purchased + timedelta(days=3 * 365),
+        'warranty_provider': manufacturer,
+        'assigned_to_id': plan.pk(Employee, asset_holder(plan, i)) if assigned else None,
+        'assigned_date': purchased + timedelta(days=7) if assigned else None,
+        'location': 'Head office',
+        'status': rng.choice(('assigned', 'in_use')) if assigned else rng.choices(
+            ('available', 'maintenance', 'retired', 'damaged'), (70, 15, 10, 5)
+        )[0],
+        'depreciation_method': 'straight_line',
+        'useful_life_years': 4,
+        'salvage_value': money(cost // 10),
+        'current_value': money(int(current)),
+        'created_at': plan.moment(purchased),
+    }
+
+
+@table(AssetAssignment, lambda plan: plan.count(Asset) // 3 * 2 + min(plan.count(Asset) % 3, 2))
+def build_asset_assignment(i, rng, plan):
+    asset = (i // 2) * 3 + i % 2
+    purchased = plan.today - timedelta(days=rng.randrange(7, 365))
+    return {
+        'asset_id': plan.pk(Asset, asset),
+        'employee_id': plan.pk(Employee, asset_holder(plan, asset)),
+        'assigned_date': purchased,
+        'location': 'Head office',
+        'condition_at_assignment': 'Good',
+        'is_active': True,
+        'created_at': plan.moment(purchased),
+    }
+
+
+@table(AssetMaintenance, per_scale(30))
+def build_asset_maintenance(i, rng, plan):
+    scheduled = plan.today + timedelta(days=rng.randrange(-300, 60))
+    status = 'scheduled' if scheduled > plan.today else rng.choices(
+        ('completed', 'in_progress', 'cancelled'), (80, 10, 10)
+    )[0]
+    estimated = rng.randrange(5, 100) * 50_000
+    return {
+        'asset_id': plan.pick(rng, Asset),
+        'maintenance_number': f"MNT-{i + 1:07d}",
+        'maintenance_type': rng.choice(('preventive', 'corrective', 'upgrade')),
+        'title': rng.choice(('Quarterly check', 'Replace battery', 'Memory upgrade', 'Fan cleaning')),
+        'scheduled_date': scheduled,
+        'start_date': scheduled if status != 'scheduled' else None,
+        'completion_date': scheduled + timedelta(days=1) if status == 'completed' else None,
+        'assigned_to_id': plan.in_department(rng, ENGINEERING),
+        'vendor_id': plan.pick(rng, Vendor),
+        'status': status,
+        'estimated_cost': money(estimated),
+        'actual_cost': money(estimated * rng.randrange(80, 130) // 100) if status == 'completed' else None,
+        'created_at': plan.moment(min(scheduled, plan.today) - timedelta(days=14)),
+    }
+
+
+@table(Procurement, per_scale(10))
+def build_procurement(i, rng, plan):
+    employee = rng.randrange(plan.count(Employee))
+    requested = plan.today - timedelta(days=rng.randrange(0, 365))
+    status = rng.choices(('draft', 'submitted', 'approved', 'ordered', 'received', 'rejected'), (5, 10, 10, 15, 55, 5))[0]
+    approved = status in ('approved', 'ordered', 'received')
+    return {
+        'procurement_number': f"PR-{i + 1:07d}",
+        'title': f"{ASSET_CATEGORIES[procurement_lines(plan, i)[0][0]][0]} purchase",
+        'requested_by_id': plan.pk(Employee, employee),
+        'department_id': plan.pk(Department, employee % len(DEPARTMENTS)),
+        'vendor_id': plan.pick(rng, Vendor),
+        'priority': rng.choice(('low', 'medium', 'high', 'urgent')),
+        'status': status,
+        'request_date': requested,
+        'required_date': requested + timedelta(days=30),
+        'ordered_date': requested + timedelta(days=7) if status in ('ordered', 'received') else None,
+        'received_date': requested + timedelta(days=21) if status == 'received' else None,
+        'total_amount': money(sum(line[3] for line in procurement_lines(plan, i))),
+        'budget_id': plan.pick(rng, Budget),
+        'approved_by_id': plan.manager_of(employee) if approved else None,
+        'approved_at': plan.moment(requested + timedelta(days=3)) if approved else None,
+        'po_number': f"PO-{i + 1:07d}" if status in ('ordered', 'received') else '',
+        'created_at': plan.moment(requested),
+    }
+
+
+@table(ProcurementLine, lambda plan: plan.count(Procurement) * 3)
+def build_procurement_line(i, rng, plan):
+    procurement, number = divmod(i, 3)
+    category, quantity, unit_price, amount = procurement_lines(plan, procurement)[number]
+    return {
+        'procurement_id': plan.pk(Procurement, procurement),
+        'description': ASSET_CATEGORIES[category][0],
+        'quantity': Decimal(quantity),
+        'unit_price': money(unit_price),
+        'amount': money(amount),
+        'asset_category_id': plan.pk(AssetCategory, category),
+        'line_number': number + 1,
+    }
+
+
+@table(License, per_scale(5))
+def build_license(i, rng, plan):
+    software, publisher = SOFTWARE[i % len(SOFTWARE)]
+    seats = rng.choice((10, 25, 50, 100))
+    purchased = plan.today - timedelta(days=rng.randrange(0, 3 * 365))
+    end = purchased + timedelta(days=365 * rng.randrange(1, 4))
+    annual = seats * rng.randrange(5, 40) * 100_000
+    return {
+        'license_number': f"LIC-{i + 1:06d}",
+        'software_name': software,
+        'version': str(plan.today.year),
+        'publisher': publisher,
+        'license_type': 'subscription',
+        'license_key': f"{rng.getrandbits(80):020X}",
+        'total_seats': seats,
+        'used_seats': seats * rng.randrange(40, 101) // 100,
+        'purchase_date': purchased,
+        'start_date': purchased,
+        'end_date': end,
+        'status': 'active' if end >= plan.today else 'expired',
+        'purchase_cost': money(annual),
+        'annual_cost': money(annual),
+        'vendor_id': plan.pick(rng, Vendor),
+        'owner_id': plan.in_department(rng, ENGINEERING),
+        'created_at': plan.moment(purchased),
+    }
+
+
+# ----- Helpdesk -----
+
+@table(SLAPolicy, len(SLA_POLICIES))
+def build_sla_policy(i, rng, plan):
+    name, response, resolution = SLA_POLICIES[i]
+    return {
+        'name': name,
+        'description': f"SLA for {PRIORITIES[i]} priority tickets",
+        'priority': PRIORITIES[i],
+        'response_time_hours': response,
+        'resolution_time_hours': resolution,
+        'is_business_hours_only': False,
+        'include_weekends': True,
+    }
+
+
+@table(Ticket, per_scale(200))
+def build_ticket(i, rng, plan):
+    created = plan.past(rng, TICKET_DAYS * 24 * 3600)
+    priority = rng.choices(range(len(PRIORITIES)), (30, 40, 22, 8))[0]
+    _name, response_hours, resolution_hours = SLA_POLICIES[priority]
+    requester = rng.randrange(plan.count(Employee))
+    if plan.now - created > timedelta(days=14):
+        status = rng.choices(('closed', 'resolved', 'cancelled'), (70, 25, 5))[0]
+    else:
+        status = rng.choices(('new', 'open', 'in_progress', 'pending', 'resolved', 'closed'), (15, 20, 25, 10, 20, 10))[0]
+    responded = None
+    if status not in ('new', 'cancelled'):
+        responded = min(created + timedelta(minutes=rng.randrange(5, response_hours * 90)), plan.now)
+    resolved = closed = None
+    if status in ('resolved', 'closed'):
+        resolved = min(max(created + timedelta(minutes=rng.randrange(30, resolution_hours * 90)), responded), plan.now)
+        if status == 'closed':
+            closed = min(resolved + timedelta(days=1), plan.now)
+    rated = resolved is not None and rng.random() < 0.7
+    return {
+        'ticket_number': f"TKT-{i + 1:08d}",
+        'subject': rng.choice(('Cannot log in', 'VPN disconnects', 'Report shows wrong totals', 'Request new laptop', 'Email not syncing')),
+        'description': 'Reported through the service portal',
+        'category': rng.choice(('technical', 'access', 'bug', 'feature', 'question', 'incident')),
+        'priority': PRIORITIES[priority],
+        'requester_id': plan.pk(Employee, requester),
+        'requester_email': person(plan, requester)['email'],
+        'requester_phone': person(plan, requester)['phone'],
+        'client_id': plan.pick(rng, Client) if rng.random() < 0.2 else None,
+        'assigned_to_id': plan.in_department(rng, SUPPORT) if status != 'new' else None,
+        'assigned_team_id': plan.pk(Department, SUPPORT),
+        'status': status,
+        'sla_policy_id': plan.pk(SLAPolicy, priority),
+        'due_date': created + timedelta(hours=resolution_hours),
+        'response_due': created + timedelta(hours=response_hours),
+        'resolution_due': created + timedelta(hours=resolution_hours),
+        'first_response_at': responded,
+        'resolved_at': resolved,
+        'closed_at': closed,
+        'resolution': 'Issue fixed and confirmed by the requester' if resolved else '',
+        'resolution_time_hours': money((resolved - created).total_seconds() / 3600) if resolved else None,
+        'satisfaction_rating': rng.choices((3, 4, 5), (20, 40, 40))[0] if rated else None,
+        'created_at': created,
+        'updated_at': closed or resolved or responded or created,
+    }
+
+
+@table(TicketComment, lambda plan: plan.count(Ticket) * 3)
+def build_ticket_comment(i, rng, plan):
+    return {
+        'ticket_id': plan.pk(Ticket, i // 3),
+        'author_id': plan.in_department(rng, SUPPORT),
+        'comment': rng.choice(('Looking into it.', 'Could you share a screenshot?', 'Fixed, please confirm.')),
+        'is_internal': rng.random() < 0.2,
+        'created_at': plan.past(rng, TICKET_DAYS * 24 * 3600),
+    }
+
+
+@table(TicketEscalation, lambda plan: plan.count(Ticket) // 10)
+def build_ticket_escalation(i, rng, plan):
+    return {
+        'ticket_id': plan.pk(Ticket, i * 10),
+        'escalated_from_id': plan.in_department(rng, SUPPORT),
+        'escalated_to_id': plan.pk(Employee, SUPPORT),
+        'reason': 'Response time at risk',
+        'escalation_level': rng.choice((1, 1, 2)),
+        'resolved': rng.random() < 0.7,
+        'created_at': plan.past(rng, TICKET_DAYS * 24 * 3600),
+    }
+
+
+@table(KnowledgeBase, per_scale(10))
+def build_knowledge_base(i, rng, plan):
+    subject = rng.choice(TASK_SUBJECTS)
+    published = rng.random() < 0.8
+    created = plan.past(rng, 2 * YEAR_SECONDS)
+    return {
+        'article_number': f"KB-{i + 1:06d}",
+        'title': f"How to troubleshoot the {subject}",
+        'content': f"Step by step guide for the {subject}.",
+        'summary': f"Troubleshooting the {subject}",
+        'category': rng.choice(('faq', 'how_to', 'troubleshooting', 'policy', 'guide')),
+        'author_id': plan.in_department(rng, SUPPORT),
+        'status': 'published' if published else 'draft',
+        'published_at': created + timedelta(days=1) if published else None,
+        'view_count': rng.randrange(0, 2000) if published else 0,
+        'helpful_count': rng.randrange(0, 100) if published else 0,
+        'keywords': subject,
+        'created_at': created,
+    }
+
+
+TICKET_TEMPLATES = ['Password reset', 'New laptop request', 'VPN access', 'Software installation', 'Bug report']
+
+
+@table(TicketTemplate, len(TICKET_TEMPLATES))
+def build_ticket_template(i, rng, plan):
+    return {
+        'name': TICKET_TEMPLATES[i],
+        'subject_template': f"{TICKET_TEMPLATES[i]}: {{summary}}",
+        'description_template': 'Please describe the request.',
+        'default_category': 'access' if i < 3 else 'technical',
+        'default_priority': 'medium',
+        'default_assigned_team_id': plan.pk(Department, SUPPORT),
+        'sla_policy_id': plan.pk(SLAPolicy, 1),
+        'usage_count': rng.randrange(0, 500),
+    }
+
+
+# ----- Documents -----
+
+@table(DocumentCategory, len(DOCUMENT_CATEGORIES))
+def build_document_category(i, rng, plan):
+    name, code, icon, color = DOCUMENT_CATEGORIES[i]
+    return {
+        'name': name,
+        'code': code,
+        'description': f"{name} documents",
+        'icon': icon,
+        'color': color,
+        'is_restricted': code in ('LEG', 'HRD'),
+    }
+
+
+def document_owner(plan, document):
+    return (document * 11) % plan.count(Employee)
+
+
+def document_file(plan, document, created):
+    _type, extension, _mime = DOCUMENT_FORMATS[document % len(DOCUMENT_FORMATS)]
+    return f"documents/{created:%Y/%m}/doc-{document + 1:08d}.{extension}"
+
+
+def document_checksum(plan, document):
+    return hashlib.sha256(f"{plan.seed}:document:{document}".encode()).hexdigest()
+
+
+def document_created(plan, document):
+    return plan.past(plan.row_random(Document, document))
+
+
+@table(Document, per_scale(150))
+def build_document(i, rng, plan):
+    document_type, extension, mime_type = DOCUMENT_FORMATS[i % len(DOCUMENT_FORMATS)]
+    created = document_created(plan, i)
+    owner = document_owner(plan, i)
+    status = rng.choices(('draft', 'pending_approval', 'approved', 'rejected', 'archived'), (15, 10, 65, 5, 5))[0]
+    title = f"{rng.choice(TOPICS)} {document_type}"
+    return {
+        'document_number': f"DOC-{i + 1:08d}",
+        'title': title,
+        'description': f"{title} prepared by the team",
+        'document_type': document_type,
+        'file': document_file(plan, i, created),
+        'file_name': f"{slug(title)}.{extension}",
+        'file_size': rng.randrange(20_000, 20_000_000),
+        'file_extension': extension,
+        'mime_type': mime_type,
+        'version': '1.0',
+        'category_id': plan.pick(rng, DocumentCategory),
+        'tags': document_type,
+        'owner_id': plan.pk(Employee, owner),
+        'status': status,
+        'is_public': rng.random() < 0.3,
+        'is_confidential': rng.random() < 0.1,
+        'department_id': plan.pk(Department, owner % len(DEPARTMENTS)),
+        'project_id': plan.pick(rng, Project) if rng.random() < 0.4 else None,
+        'client_id': plan.pick(rng, Client) if rng.random() < 0.2 else None,
+        'download_count': rng.randrange(0, 50),
+        'view_count': rng.randrange(0, 300),
+        'checksum': document_checksum(plan, i),
+        'created_at': created,
+    }
+
+
+@table(DocumentVersion, lambda plan: plan.count(Document))
+def build_document_version(i, rng, plan):
+    created = document_created(plan, i)
+    return {
+        'document_id': plan.pk(Document, i),
+        'version_number': '1.0',
+        'file': document_file(plan, i, created).replace('documents/', 'documents/versions/', 1),
+        'file_size': rng.randrange(20_000, 20_000_000),
+        'checksum': document_checksum(plan, i),
+        'change_summary': 'Initial version',
+        'uploaded_by_id': plan.pk(Employee, document_owner(plan, i)),
+        'created_at': created,
+    }
+
+
+@table(DocumentApproval, lambda plan: plan.count(Document) // 3)
+def build_document_approval(i, rng, plan):
+    document = i * 3
+    created = document_created(plan, document)
+    status = rng.choices(('pending', 'approved', 'rejected'), (20, 70, 10))[0]
+    return {
+        'document_id': plan.pk(Document, document),
+        'approver_id': plan.manager_of(document_owner(plan, document)),
+        'status': status,
+        'approval_level': 1,
+        'due_date': (created + timedelta(days=7)).date(),
+        'approved_at': min(created + timedelta(days=2), plan.now) if status == 'approved' else None,
+        'comments': 'Approved' if status == 'approved' else '',
+        'created_at': created,
+    }
+
+
+@table(DocumentAccess, lambda plan: plan.count(Document) // 3)
+def build_document_access(i, rng, plan):
+    document = i * 3 + 1
+    return {
+        'document_id': plan.pk(Document, document),
+        'employee_id': plan.pick(rng, Employee),
+        'can_view': True,
+        'can_download': True,
+        'can_edit': rng.random() < 0.3,
+        'granted_by_id': plan.pk(Employee, document_owner(plan, document)),
+        'created_at': document_created(plan, document),
+    }
+
+
+DOCUMENT_TEMPLATES = [
+    ('Service agreement', 'contract', 'docx'),
+    ('Sales invoice', 'invoice', 'xlsx'),
+    ('Project proposal', 'proposal', 'docx'),
+    ('Monthly report', 'report', 'docx'),
+    ('Leave request form', 'form', 'pdf'),
+]
+
+
+@table(DocumentTemplate, len(DOCUMENT_TEMPLATES))
+def build_document_template(i, rng, plan):
+    name, template_type, extension = DOCUMENT_TEMPLATES[i]
+    return {
+        'name': name,
+        'description': f"{name} template",
+        'template_type': template_type,
+        'file': f"templates/{slug(name)}.{extension}",
+        'file_extension': extension,
+        'variables': ['client_name', 'date'],
+        'usage_count': rng.randrange(0, 200),
+    }
+
+
+@table(DocumentActivity, lambda plan: plan.count(Document) * 4)
+def build_document_activity(i, rng, plan):
+    document = i // 4
+    created = document_created(plan, document)
+    activity = 'created' if i % 4 == 0 else rng.choices(('viewed', 'downloaded', 'edited', 'shared'), (55, 30, 10, 5))[0]
+    return {
+        'document_id': plan.pk(Document, document),
+        'user_id': plan.pk(Employee, document_owner(plan, document)) if activity == 'created' else plan.pick(rng, Employee),
+        'activity_type': activity,
+        'description': f"Document {activity}",
+        'ip_address': f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+        'user_agent': rng.choice(USER_AGENTS),
+        'created_at': created if activity == 'created' else created + (plan.now - created) * rng.random(),
+    }
+
+
+# ----- Analytics -----
+
+DASHBOARD_TYPES = ['executive', 'sales', 'hr', 'project', 'finance', 'operations']
+WIDGET_TYPES = ['kpi_card', 'line_chart', 'bar_chart', 'pie_chart', 'table']
+
+
+@table(Dashboard, per_scale(3))
+def build_dashboard(i, rng, plan):
+    dashboard_type = DASHBOARD_TYPES[i % len(DASHBOARD_TYPES)]
+    return {
+        'name': f"{dashboard_type.title()} overview {i + 1}",
+        'description': f"Key {dashboard_type} figures",
+        'dashboard_type': dashboard_type,
+        'owner_id': plan.pick(rng, Employee),
+        'is_public': rng.random() < 0.5,
+        'display_order': i,
+        'is_default': i < len(DASHBOARD_TYPES),
+    }
+
+
+@table(Widget, lambda plan: plan.count(Dashboard) * len(WIDGET_TYPES))
+def build_widget(i, rng, plan):
+    dashboard, number = divmod(i, len(WIDGET_TYPES))
+    return {
+        'dashboard_id': plan.pk(Dashboard, dashboard),
+        'title': rng.choice(('Revenue', 'Open tickets', 'Active projects', 'Headcount', 'Pipeline')),
+        'widget_type': WIDGET_TYPES[number],
+        'data_source': rng.choice(('invoices', 'tickets', 'projects', 'employees', 'opportunities')),
+        'position_x': (number % 3) * 4,
+        'position_y': (number // 3) * 4,
+        'width': 4,
+        'height': 4,
+        'display_order': number,
+    }
+
+
+REPORT_TYPES = ['project_status', 'financial', 'hr_metrics', 'sales_pipeline', 'timesheet', 'expense', 'asset_inventory', 'ticket_summary']
+EXECUTIONS_PER_REPORT = 20
+
+
+@table(Report, per_scale(5))
+def build_report(i, rng, plan):
+    report_type = REPORT_TYPES[i % len(REPORT_TYPES)]
+    return {
+        'name': f"{report_type.replace('_', ' ').title()} report {i + 1}",
+        'description': f"Periodic {report_type.replace('_', ' ')} report",
+        'report_type': report_type,
+        'owner_id': plan.pick(rng, Employee),
+        'data_source': report_type,
+        'default_format': rng.choice(('pdf', 'excel', 'csv')),
+        'is_scheduled': rng.random() < 0.3,
+        'run_count': EXECUTIONS_PER_REPORT,
+        'last_run_at': plan.past(rng, 7 * 24 * 3600),
+    }
+
+
+@table(ReportExecution, lambda plan: plan.count(Report) * EXECUTIONS_PER_REPORT)
+def build_report_execution(i, rng, plan):
+    started = plan.past(rng, 90 * 24 * 3600)
+    failed = rng.random() < 0.05
+    duration = rng.randrange(1, 120)
+    return {
+        'report_id': plan.pk(Report, i // EXECUTIONS_PER_REPORT),
+        'executed_by_id': plan.pick(rng, Employee),
+        'status': 'failed' if failed else 'completed',
+        'started_at': started,
+        'completed_at': started + timedelta(seconds=duration),
+        'duration_seconds': duration,
+        'output_format': 'pdf',
+        'row_count': 0 if failed else rng.randrange(10, 50_000),
+        'error_message': 'Query timed out' if failed else '',
+        'created_at': started,
+    }
+
+
+KPI_DAYS = 30
+
+
+@table(KPI, per_scale(5))
+def build_kpi(i, rng, plan):
+    kpi_type, name, unit, _target = KPI_TYPES[i % len(KPI_TYPES)]
+    target = kpi_target(plan, i)
+    department = i % len(DEPARTMENTS)
+    return {
+        'name': f"{name} ({DEPARTMENTS[department][1]})",
+        'description': name,
+        'kpi_type': kpi_type,
+        'owner_id': plan.pk(Employee, department),
+        'department_id': plan.pk(Department, department),
+        'calculation_method': 'Daily aggregate',
+        'data_source': kpi_type,
+        'target_value': money(target),
+        'current_value': money(target * rng.randrange(70, 120) / 100),
+        'threshold_red': money(target * 0.7),
+        'threshold_yellow': money(target * 0.9),
+        'threshold_green': money(target),
+        'unit': unit,
+        'frequency': 'daily',
+        'period_start': plan.today - timedelta(days=KPI_DAYS),
+        'period_end': plan.today,
+        'last_calculated_at': plan.now,
+    }
+
+
+@table(KPIValue, lambda plan: plan.count(KPI) * KPI_DAYS)
+def build_kpi_value(i, rng, plan):
+    kpi, day = divmod(i, KPI_DAYS)
+    target = kpi_target(plan, kpi)
+    value = target * rng.randrange(60, 130) / 100
+    variance = value - target
+    percentage = variance * 100 / target
+    period_date = plan.today - timedelta(days=day + 1)
+    return {
+        'kpi_id': plan.pk(KPI, kpi),
+        'period_date': period_date,
+        'value': money(value),
+        'target_value': money(target),
+        'variance': money(variance),
+        'variance_percentage': money(percentage),
+        'status': 'green' if percentage >= 0 else 'yellow' if percentage >= -10 else 'red',
+        'created_at': plan.moment(period_date + timedelta(days=1), 1),
+    }
+
+
+EXPORT_TYPES = ['employees', 'attendance', 'projects', 'tasks', 'invoices', 'expenses', 'clients', 'tickets', 'assets']
+
+
+@table(DataExport, per_scale(10))
+def build_data_export(i, rng, plan):
+    started = plan.past(rng, 30 * 24 * 3600)
+    export_type = EXPORT_TYPES[i % len(EXPORT_TYPES)]
+    return {
+        'export_type': export_type,
+        'export_format': rng.choice(('csv', 'excel', 'json')),
+        'requested_by_id': plan.pick(rng, Employee),
+        'status': 'completed',
+        'file_size_bytes': rng.randrange(10_000, 50_000_000),
+        'row_count': rng.randrange(100, 100_000),
+        'started_at': started,
+        'completed_at': started + timedelta(seconds=rng.randrange(2, 300)),
+        'expires_at': started + timedelta(days=7),
+        'created_at': started,
+    }
+
+
+FILTER_TYPES = ['employees', 'projects', 'tasks', 'clients', 'invoices', 'tickets', 'assets']
+
+
+@table(SavedFilter, per_scale(10))
+def build_saved_filter(i, rng, plan):
+    filter_type = FILTER_TYPES[i % len(FILTER_TYPES)]
+    return {
+        'name': f"My {filter_type} {i + 1}",
+        'filter_type': filter_type,
+        'owner_id': plan.pick(rng, Employee),
+        'filter_config': {'status': 'active', 'ordering': '-created_at'},
+        'is_public': rng.random() < 0.2,
+        'usage_count': rng.randrange(0, 100),
+        'last_used_at': plan.past(rng, 30 * 24 * 3600),
+    }
+
+
+# ----- Integrations -----
+
+EMAIL_TEMPLATES = [key for key, _label in EmailTemplate.TEMPLATE_TYPE_CHOICES]
+
+
+@table(EmailTemplate, len(EMAIL_TEMPLATES))
+def build_email_template(i, rng, plan):
+    template_type = EMAIL_TEMPLATES[i]
+    title = template_type.replace('_', ' ').capitalize()
+    return {
+        'name': f"{title} email",
+        'template_type': template_type,
+        'subject': f"{title}: {{{{ subject }}}}",
+        'body_html': f"<p>Dear {{{{ name }}}},</p><p>{title}.</p>",
+        'body_text': f"Dear {{{{ name }}}},\n\n{title}.",
+        'variables': ['name', 'subject'],
+    }
+
+
+@table(EmailLog, per_scale(200))
+def build_email_log(i, rng, plan):
+    recipient = rng.randrange(plan.count(Employee))
+    facts = person(plan, recipient)
+    status = rng.choices(('sent', 'failed', 'pending'), (92, 5, 3))[0]
+    created = plan.past(rng, 90 * 24 * 3600)
+    template = i % len(EMAIL_TEMPLATES)
+    title = EMAIL_TEMPLATES[template].replace('_', ' ').capitalize()
+    return {
+        'recipient_email': facts['email'],
+        'recipient_name': f"{facts['first_name']} {facts['last_name']}",
+        'subject': title,
+        'body_html': f"<p>{title}</p>",
+        'body_text': title,
+        'template_id': plan.pk(EmailTemplate, template),
+        'status': status,
+        'sent_at': created + timedelta(seconds=rng.randrange(1, 60)) if status == 'sent' else None,
+        'error_message': 'SMTP connection refused' if status == 'failed' else '',
+        'retry_count': 3 if status == 'failed' else 0,
+        'created_at': created,
+    }
+
+
+@table(Notification, per_scale(400))
+def build_notification(i, rng, plan):
+    created = plan.past(rng, 30 * 24 * 3600)
+    is_read = rng.random() < 0.7
+    kind = rng.choice(('task', 'approval', 'info', 'mention', 'warning'))
+    return {
+        'recipient_id': plan.pick(rng, Employee),
+        'notification_type': kind,
+        'title': {'task': 'Task assigned', 'approval': 'Approval needed', 'mention': 'You were mentioned'}.get(kind, 'Update'),
+        'message': 'Open the item for details',
+        'related_model': 'task' if kind in ('task', 'mention') else '',
+        'related_id': plan.pick(rng, Task) if kind in ('task', 'mention') else None,
+        'is_read': is_read,
+        'read_at': min(created + timedelta(hours=rng.randrange(1, 48)), plan.now) if is_read else None,
+        'is_important': kind == 'approval',
+        'created_at': created,
+    }
+
+
+WEBHOOKS = [
+    ('Accounting sync', ['invoice.created', 'invoice.paid']),
+    ('Chat alerts', ['ticket.created', 'ticket.resolved']),
+    ('Data lake feed', ['employee.created', 'project.updated']),
+]
+
+
+@table(Webhook, len(WEBHOOKS))
+def build_webhook(i, rng, plan):
+    name, events = WEBHOOKS[i]
+    return {
+        'name': name,
+        'url': f"https://hooks.example.com/{slug(name)}",
+        'events': events,
+        'auth_type': 'none',
+        'secret': f"{rng.getrandbits(128):032x}",
+        # Sample endpoints are not reachable; keep them from receiving deliveries
+        'is_active': False,
+        'success_count': rng.randrange(100, 1000),
+        'failure_count': rng.randrange(0, 20),
+    }
+
+
+@table(WebhookDelivery, per_scale(100))
+def build_webhook_delivery(i, rng, plan):
+    webhook = i % len(WEBHOOKS)
+    name, events = WEBHOOKS[webhook]
+    event = rng.choice(events)
+    sent = plan.past(rng, 90 * 24 * 3600)
+    success = rng.random() < 0.95
+    return {
+        'webhook_id': plan.pk(Webhook, webhook),
+        'event': event,
+        'payload': {'event': event, 'id': rng.randrange(1, 10_000)},
+        'request_url': f"https://hooks.example.com/{slug(name)}",
+        'request_body': f'{{"event": "{event}"}}',
+        'response_status_code': 200 if success else 500,
+        'status': 'success' if success else 'failed',
+        'sent_at': sent,
+        'duration_ms': rng.randrange(50, 2000),
+        'error_message': '' if success else 'Internal Server Error',
+        'created_at': sent,
+    }
+
+
+EXTERNAL_SERVICES = [
+    ('Object storage', 'storage', 'https://storage.example.com'),
+    ('Payment gateway', 'payment', 'https://payments.example.com'),
+    ('SMS gateway', 'sms', 'https://sms.example.com'),
+    ('WhatsApp Business', 'whatsapp', 'https://whatsapp.example.com'),
+    ('Uptime monitor', 'monitoring', 'https://status.example.com'),
+]
+
+
+@table(ExternalService, len(EXTERNAL_SERVICES))
+def build_external_service(i, rng, plan):
+    name, service_type, base_url = EXTERNAL_SERVICES[i]
+    return {
+        'name': name,
+        'service_type': service_type,
+        'description': f"{name} integration",
+        'base_url': base_url,
+        'auth_type': 'api_key',
+        'is_active': False,
+    }
+
+
+@table(APILog, per_scale(1000))
+def build_api_log(i, rng, plan):
+    method = rng.choices(('GET', 'POST', 'PATCH', 'DELETE'), (75, 15, 8, 2))[0]
+    status_code = rng.choices((200, 201, 400, 403, 404, 500), (80, 8, 5, 2, 4, 1))[0]
+    return {
+        'method': method,
+        'path': rng.choice(API_PATHS),
+        'user_id': plan.pick(rng, Employee),
+        'status_code': status_code,
+        'duration_ms': int(rng.lognormvariate(4, 0.8)),
+        'ip_address': f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+        'user_agent': rng.choice(USER_AGENTS),
+        'created_at': plan.past(rng, 30 * 24 * 3600),
+    }
+
+
+SCHEDULED_JOBS = [
+    ('Daily sales report', 'report_generation', '0 7 * * *', 'apps.analytics.tasks.run_report'),
+    ('Weekly employee export', 'data_export', '0 6 * * 1', 'apps.analytics.tasks.run_data_export'),
+    ('Webhook retries', 'sync', '*/5 * * * *', 'apps.core.tasks.deliver_webhooks'),
+    ('Email outbox', 'notification', '* * * * *', 'apps.core.tasks.drain_email_outbox'),
+]
+
+
+@table(ScheduledJob, len(SCHEDULED_JOBS))
+def build_scheduled_job(i, rng, plan):
+    name, job_type, cron, task_name = SCHEDULED_JOBS[i]
+    return {
+        'name': name,
+        'description': name,
+        'job_type': job_type,
+        'schedule_cron': cron,
+        'task_name': task_name,
+        # Sample jobs must not start running against the generated data
+        'status': 'paused',
+    }
+
+
+SYSTEM_SETTINGS = [
+    ('company_name', 'PT Ikodio Teknologi Indonesia', 'general', 'string'),
+    ('default_currency', 'IDR', 'general', 'string'),
+    ('timezone', 'Asia/Jakarta', 'general', 'string'),
+    ('fiscal_year_start_month', '1', 'general', 'integer'),
+    ('smtp_sender', 'noreply@ikodio.com', 'email', 'string'),
+    ('email_digest_enabled', 'true', 'notification', 'boolean'),
+    ('password_min_length', '8', 'security', 'integer'),
+    ('session_timeout_minutes', '60', 'security', 'integer'),
+    ('storage_provider', 'local', 'integration', 'string'),
+    ('primary_color', '#1E88E5', 'appearance', 'string'),
+]
+
+
+@table(SystemSetting, len(SYSTEM_SETTINGS))
+def build_system_setting(i, rng, plan):
+    key, value, category, value_type = SYSTEM_SETTINGS[i]
+    return {
+        'key': key,
+        'value': value,
+        'category': category,
+        'description': key.replace('_', ' ').capitalize(),
+        'value_type': value_type,
+    }
+
+
+# ----- Generation -----
+
+_plan = None
+
+
+@contextmanager
+def historical_timestamps(model):
+    """Let ``bulk_create`` write the generated ``created_at``/``updated_at``"""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def build_rows(table_no, chunk):
+    plan = _plan
+    spec = TABLES[table_no]
+    model = spec.model
+    field_names = {field.name for field in model._meta.concrete_fields}
+    rng = plan.random(model, chunk)
+    start = chunk * CHUNK_SIZE
+    stop = min(start + CHUNK_SIZE, plan.count(model))
+    rows = []
+    for index in range(start, stop):
+        values = spec.build(index, rng, plan)
+        if 'created_at' in field_names:
+            values.setdefault('created_at', plan.past(rng))
+            if 'updated_at' in field_names:
+                values.setdefault('updated_at', values['created_at'])
+        rows.append(model(pk=plan.pk(model, index), **values))
+    return rows
+
+
+def insert_chunk(task):
+    """Build and insert one chunk (runs in the pool workers)"""
+    table_no, chunk = task
+    model = TABLES[table_no].model
+    rows = build_rows(table_no, chunk)
+    with historical_timestamps(model):
+        model._base_manager.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+def plan_tables(plan):
+    """Fill in the row count and primary key offset of every table"""
+    for spec in TABLES:
+        label = spec.model._meta.label
+        plan.counts[label] = spec.count(plan) if callable(spec.count) else spec.count
+        plan.offsets[label] = spec.model._base_manager.aggregate(top=Max('pk'))['top'] or 0
+
+
+def generate(scale, seed=DEFAULT_SEED, today=None, workers=1, progress=None):
+    """
+    Insert the sample data for ``scale``
+
+    Args:
+        workers: Processes per table (1, or SQLite: insert in-process)
+        progress: Optional ``progress(model, rows)`` called after each table
+
+    Returns:
+        int: Rows inserted
+    """
+    global _plan
+    plan = _plan = Plan(scale, seed, today)
+    plan_tables(plan)
+    if connection.vendor == 'sqlite' or 'fork' not in get_all_start_methods():
+        workers = 1
+
+    total = 0
+    for table_no, spec in enumerate(TABLES):
+        tasks = [(table_no, chunk) for chunk in range(ceil(plan.count(spec.model) / CHUNK_SIZE))]
+        if workers > 1 and len(tasks) > 1:
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            with get_context('fork').Pool(min(workers, len(tasks))) as pool:
+                rows = sum(pool.imap_unordered(insert_chunk, tasks))
+        else:
+            rows = sum(map(insert_chunk, tasks))
+        if spec.after is not None:
+            spec.after(plan)
+        total += rows
+        if progress is not None:
+            progress(spec.model, rows)
+
+    refresh_derived_data(plan)
+    return total
+
+
+def generated_models():
+    """Generated models and the M2M tables pointing at them (not the users' groups)"""
+    models = [spec.model for spec in TABLES]
+    for model in list(models):
+        if model is User:
+            continue
+        models.extend(
+            field.remote_field.through for field in model._meta.local_many_to_many
+            if field.remote_field.through._meta.auto_created and field.remote_field.through not in models
+        )
+    return models
+
+
+def refresh_derived_data(plan):
+    """Rebuild what signals would have maintained and reset the PK sequences"""
+    statements = connection.ops.sequence_reset_sql(no_style(), generated_models())
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    for snapshot in snapshot_registry.values():
+        snapshot.rebuild()
+    refresh_sla_stats((plan.now - timedelta(days=TICKET_DAYS)).date(), plan.today)
+
+    employees = range(plan.pk(Employee, 0), plan.pk(Employee, plan.count(Employee)))
+    cache.delete_many([UNREAD_KEY.format(ALL_RECIPIENTS)] + [UNREAD_KEY.format(pk) for pk in employees])
+
+
+def populated_tables():
+    """Names of generated tables that already hold data (superusers do not count)"""
+    populated = []
+    for model in generated_models():
+        rows = model._base_manager.all()
+        if model is User:
+            rows = rows.filter(is_superuser=False)
+        if rows.exists():
+            populated.append(model._meta.db_table)
+    return populated
+
+
+def clear():
+    """Delete every generated table's rows and the rollups derived from them (superusers are kept)"""
+    models = [model for model in generated_models() if model is not User]
+    tables = [model._meta.db_table for model in models + [DashboardMetric, TicketSLADailyStats]]
+    connection.ops.execute_sql_flush(
+        connection.ops.sql_flush(no_style(), tables, reset_sequences=True, allow_cascade=True)
+    )
+    User.objects.filter(is_superuser=False).delete()
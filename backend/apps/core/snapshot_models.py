@@ -0,0 +1,29 @@
+"""
+Materialized dashboard snapshot models
+"""
+from django.db import models
+from apps.core.models import TimeStampedModel
+
+
+class DashboardMetric(TimeStampedModel):
+    """
+    Pre-aggregated dashboard counter
+
+    One row per (dashboard, metric). Rows are adjusted incrementally by the
+    signal handlers in ``apps.core.snapshots`` and can be rebuilt from the
+    source tables with ``manage.py rebuild_dashboard_snapshots``.
+    """
+
+    dashboard = models.CharField(max_length=50)
+    metric = models.CharField(max_length=200)
+    value = models.DecimalField(max_digits=24, decimal_places=4, default=0)
+
+    class Meta:
+        db_table = 'dashboard_metrics'
+        verbose_name = 'Dashboard Metric'
+        verbose_name_plural = 'Dashboard Metrics'
+        ordering = ['dashboard', 'metric']
+        unique_together = [['dashboard', 'metric']]
+
+    def __str__(self):
+        return f"{self.dashboard}.{self.metric} = {self.value}"
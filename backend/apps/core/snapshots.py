@@ -0,0 +1,385 @@
+"""
+Materialized dashboard snapshots maintained incrementally on model writes
+
+A ``DashboardSnapshot`` is a named set of ``SnapshotMetric`` definitions.
+Each metric describes a count or sum over one model using simple field
+lookups, which lets the same definition be used two ways:
+
+* ``rebuild()`` evaluates every metric in SQL and rewrites the counters
+* post_save/post_delete handlers evaluate the metric against the old and new
+  version of a row in Python and apply only the difference with ``F()``
+
+Dashboard reads then cost one query against ``DashboardMetric`` regardless of
+how many rows the source tables hold.
+
+Usage (``apps/<app>/snapshots.py`` is auto-discovered on startup):
+
+    finance_snapshot = DashboardSnapshot('finance')
+    finance_snapshot.track(
+        Invoice,
+        SnapshotMetric('revenue', field='total_amount', status='paid'),
+        SnapshotMetric('overdue_count', status='overdue'),
+    )
+
+    values = finance_snapshot.read()
+    values['revenue']
+
+Changes made through ``QuerySet.update()``/``bulk_create()`` bypass signals;
+run ``manage.py rebuild_dashboard_snapshots`` after such maintenance.
+
+Inside a transaction the previous version of an updated row is read with
+``SELECT ... FOR UPDATE``, so concurrent updates of the same row each apply
+their own difference. Saves in autocommit mode cannot hold that lock across
+the signals; wrap such writes in ``transaction.atomic()`` when they race.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Marker metric written by rebuild(); its absence means the snapshot is cold
+BUILT_MARKER = '__built__'
+
+# Registered snapshots by name
+snapshot_registry = {}
+
+# model -> list of (snapshot, metric) pairs
+_model_metrics = defaultdict(list)
+
+
+_LOOKUPS = {
+    'exact': lambda value, expected: value == expected,
+    'in': lambda value, expected: value in expected,
+    'isnull': lambda value, expected: (value is None) == bool(expected),
+    'gt': lambda value, expected: value is not None and value > expected,
+    'gte': lambda value, expected: value is not None and value >= expected,
+    'lt': lambda value, expected: value is not None and value < expected,
+    'lte': lambda value, expected: value is not None and value <= expected,
+}
+
+
+def _matches(instance, lookups):
+    """
+    Evaluate simple ORM lookups against an in-memory instance
+
+    Only local concrete fields and the lookups in ``_LOOKUPS`` are supported.
+    """
+    for key, expected in lookups.items():
+        field_name, _, lookup = key.partition('__')
+        try:
+            test = _LOOKUPS[lookup or 'exact']
+        except KeyError:
+            raise ValueError(f"Unsupported snapshot lookup: {key}")
+        if not test(getattr(instance, field_name), expected):
+            return False
+    return True
+
+
+class SnapshotMetric:
+    """
+    Declarative count/sum over one model
+
+    Args:
+        name: Metric name (group keys are appended as ``name:group``)
+        field: Field to sum; counts rows when omitted
+        value: Callable computing the per-row value in Python (with ``expression``)
+        expression: SQL expression equivalent of ``value`` used by rebuild()
+        group_by: Local field whose value splits the metric into groups
+        by_month: Date field bucketing the metric per ``YYYY-MM``
+        **lookups: Row filter, e.g. ``status='paid'``, ``deleted_at__isnull=True``
+    """
+
+    def __init__(self, name, field=None, value=None, expression=None,
+                 group_by=None, by_month=None, **lookups):
+        if value is not None and expression is None:
+            raise ValueError('A value callable needs an equivalent SQL expression')
+        self.name = name
+        self.field = field
+        self.value = value
+        self.expression = expression
+        self.group_by = group_by
+        self.by_month = by_month
+        self.lookups = lookups
+
+    @property
+    def source_fields(self):
+        """Local fields read by this metric (used to load the previous row)"""
+        fields = {key.split('__')[0] for key in self.lookups}
+        if self.field:
+            fields.add(self.field)
+        if self.group_by:
+            fields.add(self.group_by)
+        if self.by_month:
+            fields.add(self.by_month)
+        if self.expression is not None:
+            fields.update(self.expression_fields)
+        return fields
+
+    @property
+    def expression_fields(self):
+        """Field names referenced by ``expression``"""
+        names = set()
+        stack = [self.expression]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, F):
+                names.add(node.name)
+            elif isinstance(node, Q):
+                for child in node.children:
+                    if isinstance(child, tuple):
+                        names.add(child[0].split('__')[0])
+                        stack.append(child[1])
+                    else:
+                        stack.append(child)
+            elif hasattr(node, 'get_source_expressions'):
+                stack.extend(node.get_source_expressions())
+        return names
+
+    def _key(self, group):
+        return self.name if group is None else f"{self.name}:{group}"
+
+    def _row_value(self, instance):
+        if self.value is not None:
+            return Decimal(self.value(instance) or 0)
+        if self.field:
+            return Decimal(getattr(instance, self.field) or 0)
+        return Decimal(1)
+
+    def _row_group(self, instance):
+        if self.by_month:
+            bucket = getattr(instance, self.by_month)
+            if bucket is None:
+                return None
+            if hasattr(bucket, 'tzinfo') and timezone.is_aware(bucket):
+                bucket = timezone.localtime(bucket)
+            return bucket.strftime('%Y-%m')
+        if self.group_by:
+            return getattr(instance, self.group_by)
+        return None
+
+    def contribution(self, instance):
+        """Return ``{key: value}`` this row adds to the snapshot"""
+        if instance is None or not _matches(instance, self.lookups):
+            return {}
+        if (self.by_month or self.group_by) and self._row_group(instance) is None:
+            return {}
+        return {self._key(self._row_group(instance)): self._row_value(instance)}
+
+    def compute(self, model):
+        """Evaluate the metric from scratch in SQL"""
+        queryset = model._base_manager.filter(**self.lookups).order_by()
+        if self.expression is not None:
+            aggregate = Sum(self.expression, output_field=models.DecimalField())
+        elif self.field:
+            aggregate = Sum(self.field)
+        else:
+            aggregate = Count('pk')
+
+        if not (self.by_month or self.group_by):
+            total = queryset.aggregate(total=aggregate)['total']
+            return {self.name: Decimal(total or 0)}
+
+        if self.by_month:
+            queryset = queryset.annotate(group=TruncMonth(self.by_month))
+        else:
+            queryset = queryset.annotate(group=F(self.group_by))
+        results = {}
+        for row in queryset.exclude(group__isnull=True).values('group').annotate(total=aggregate):
+            group = row['group']
+            if self.by_month:
+                group = group.strftime('%Y-%m')
+            results[self._key(group)] = Decimal(row['total'] or 0)
+        return results
+
+
+class DashboardSnapshot:
+    """Named group of metrics stored in ``DashboardMetric``"""
+
+    def __init__(self, name):
+        self.name = name
+        self.sources = defaultdict(list)
+        snapshot_registry[name] = self
+
+    def track(self, model, *metrics):
+        """Register metrics over ``model`` and connect the delta handlers"""
+        self.sources[model].extend(metrics)
+        for metric in metrics:
+            _model_metrics[model].append((self, metric))
+        _connect(model)
+
+    # ----- Reads -----
+
+    def read(self):
+        """Return all counters as ``{metric: Decimal}`` (rebuilding if cold)"""
+        from apps.core.models import DashboardMetric
+
+        values = dict(
+            DashboardMetric.objects.filter(dashboard=self.name).values_list('metric', 'value')
+        )
+        if BUILT_MARKER not in values:
+            values = self.rebuild(if_cold=True)
+        return SnapshotValues(values)
+
+    # ----- Writes -----
+
+    def rebuild(self, if_cold=False):
+        """
+        Recompute every metric from the source tables
+
+        The stored rows are locked before computing, so concurrent rebuilds
+        run one after the other and a delta written meanwhile waits and is
+        applied on top of the new counters. With ``if_cold``, a snapshot
+        built by someone else while waiting is returned as it is.
+        """
+        from apps.core.models import DashboardMetric
+
+        attempts = 3
+        for attempt in range(1, attempts + 1):
+            try:
+                with transaction.atomic():
+                    stored = dict(
+                        DashboardMetric.objects.select_for_update()
+                        .filter(dashboard=self.name).values_list('metric', 'value')
+                    )
+                    if if_cold and BUILT_MARKER in stored:
+                        return stored
+
+                    values = {}
+                    for model, metrics in self.sources.items():
+                        for metric in metrics:
+                            values.update(metric.compute(model))
+                    values[BUILT_MARKER] = Decimal(1)
+
+                    DashboardMetric.objects.filter(dashboard=self.name).delete()
+                    DashboardMetric.objects.bulk_create([
+                        DashboardMetric(dashboard=self.name, metric=metric, value=value)
+                        for metric, value in values.items()
+                    ])
+                return values
+            except IntegrityError:
+                # A row appeared that was not locked (a first delta or another
+                # cold rebuild): lock it too on the next attempt
+                if attempt == attempts:
+                    raise
+
+    def apply(self, deltas):
+        """Add ``{metric: delta}`` to the stored counters"""
+        from apps.core.models import DashboardMetric
+
+        for metric, delta in deltas.items():
+            if not delta:
+                continue
+            rows = DashboardMetric.objects.filter(dashboard=self.name, metric=metric)
+            if rows.update(value=F('value') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    DashboardMetric.objects.create(dashboard=self.name, metric=metric, value=delta)
+            except IntegrityError:
+                # Created concurrently by another writer
+                rows.update(value=F('value') + delta)
+
+
+class SnapshotValues(dict):
+    """Snapshot read result with helpers for typed access"""
+
+    def count(self, metric):
+        return int(self.get(metric, 0))
+
+    def amount(self, metric):
+        return float(self.get(metric, 0))
+
+    def group(self, metric):
+        """Return ``{group: value}`` for a grouped/monthly metric"""
+        prefix = f"{metric}:"
+        return {
+            key[len(prefix):]: value
+            for key, value in self.items()
+            if key.startswith(prefix)
+        }
+
+    def months(self, metric, year):
+        """Return ``[(month, value)]`` of a ``by_month`` metric for one year"""
+        prefix = f"{year}-"
+        return sorted(
+            (int(key[len(prefix):]), value)
+            for key, value in self.group(metric).items()
+            if key.startswith(prefix) and value
+        )
+
+
+# ----- Signal handlers -----
+
+def _contributions(model, instance):
+    deltas = defaultdict(lambda: defaultdict(Decimal))
+    for snapshot, metric in _model_metrics[model]:
+        for key, value in metric.contribution(instance).items():
+            deltas[snapshot][key] += value
+    return deltas
+
+
+def _tracked_fields(model):
+    fields = set()
+    for _snapshot, metric in _model_metrics[model]:
+        fields.update(metric.source_fields)
+    return fields
+
+
+def _snapshot_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._snapshot_previous = None
+    instance._snapshot_skip = False
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    tracked = _tracked_fields(sender)
+    if update_fields is not None and not tracked.intersection(update_fields):
+        # e.g. download_count bumps that touch no tracked field
+        instance._snapshot_skip = True
+        return
+    previous = sender._base_manager.filter(pk=instance.pk).only(*tracked)
+    if transaction.get_connection(router.db_for_write(sender)).in_atomic_block:
+        # Concurrent updates of the row wait, then see this one as previous
+        previous = previous.select_for_update()
+    instance._snapshot_previous = previous.first()
+
+
+def _snapshot_post_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw or getattr(instance, '_snapshot_skip', False):
+        return
+    previous = _contributions(sender, getattr(instance, '_snapshot_previous', None))
+    current = _contributions(sender, instance)
+    instance._snapshot_previous = None
+    _apply_difference(current, previous)
+
+
+def _snapshot_post_delete(sender, instance, **kwargs):
+    _apply_difference({}, _contributions(sender, instance))
+
+
+def _apply_difference(current, previous):
+    for snapshot in set(current) | set(previous):
+        new = current.get(snapshot, {})
+        old = previous.get(snapshot, {})
+        deltas = {
+            key: new.get(key, Decimal(0)) - old.get(key, Decimal(0))
+            for key in set(new) | set(old)
+        }
+        try:
+            with transaction.atomic():
+                snapshot.apply(deltas)
+        except Exception as e:
+            # Never fail the user's write because of a dashboard counter
+            logger.error(f"Failed to update dashboard snapshot '{snapshot.name}': {e}")
+
+
+def _connect(model):
+    uid = f"dashboard_snapshot:{model._meta.label}"
+    pre_save.connect(_snapshot_pre_save, sender=model, dispatch_uid=uid)
+    post_save.connect(_snapshot_post_save, sender=model, dispatch_uid=uid)
+    post_delete.connect(_snapshot_post_delete, sender=model, dispatch_uid=uid)
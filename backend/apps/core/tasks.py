@@ -0,0 +1,53 @@
+"""
+Celery tasks for the core app
+"""
+from celery import shared_task
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=5)
+def write_log_records(self, writer_name, records):
+    """Bulk insert a batch of buffered log records (``AUDIT_LOG_WRITER = 'celery'``)"""
+    from apps.core.audit import DATABASE_UNAVAILABLE, writer_registry
+
+    try:
+        writer_registry[writer_name].write(records)
+    except DATABASE_UNAVAILABLE as e:
+        # Retry only the records that did not make it, backing off 5s, 10s, 20s...
+        raise self.retry(
+            args=(writer_name, getattr(e, 'unwritten', records)), exc=e,
+            countdown=5 * 2 ** self.request.retries
+        )
+
+
+@shared_task(ignore_result=True)
+def deliver_webhooks():
+    """Deliver due webhook deliveries and schedule a wake-up for the next retry"""
+    from django.core.cache import cache
+    from apps.core.webhooks import deliver_due_webhooks, next_retry_at, wake_worker
+
+    deliver_due_webhooks()
+    eta = next_retry_at()
+    # One scheduled wake-up per due second, however many workers saw it
+    if eta is not None and cache.add(f"webhooks:wakeup:{int(eta.timestamp())}", 1, timeout=24 * 3600):
+        wake_worker(eta=eta)
+
+
+@shared_task(ignore_result=True)
+def drain_email_outbox():
+    """Send due outbox emails over one SMTP connection and schedule a wake-up for the next retry"""
+    from django.core.cache import cache
+    from apps.core.outbox import drain_outbox, next_attempt_at, wake_outbox
+
+    drain_outbox()
+    eta = next_attempt_at()
+    # One scheduled wake-up per due second, however many workers saw it
+    if eta is not None and cache.add(f"outbox:wakeup:{int(eta.timestamp())}", 1, timeout=24 * 3600):
+        wake_outbox(eta=eta)
+
+
+@shared_task(ignore_result=True)
+def run_scheduled_job(job_id):
+    """Run a ``ScheduledJob`` and record its duration and outcome"""
+    from apps.core.scheduler import run_job
+
+    run_job(job_id)
@@ -0,0 +1,85 @@
+"""
+Buffered audit log writer
+"""
+import pytest
+from celery.signals import worker_process_shutdown
+from django.db import OperationalError
+from django.test import RequestFactory
+
+from apps.authentication.models import AuditLog
+from apps.core.audit import BufferedLogWriter, writer_registry
+from apps.core.metrics import metrics_view
+from apps.core.middleware import AuditLogMiddleware
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def writer():
+    writer = BufferedLogWriter('test_audit', 'authentication.AuditLog')
+    yield writer
+    del writer_registry['test_audit']
+
+
+def record(resource_id, **fields):
+    return {
+        'action': 'update', 'resource_type': 'Project', 'resource_id': resource_id,
+        'description': '', **fields,
+    }
+
+
+def test_rejected_batch_falls_back_to_single_rows(writer):
+    writer.write([record('1'), record('2', resource_type=None), record('3')])
+
+    assert sorted(AuditLog.objects.values_list('resource_id', flat=True)) == ['1', '3']
+    assert writer.stats()['written'] == 2
+    assert writer.stats()['dropped'] == 1
+
+
+def test_unavailable_database_requeues_then_quarantines(writer, settings, monkeypatch):
+    settings.AUDIT_LOG_MAX_ATTEMPTS = 2
+
+    def unavailable(records):
+        raise OperationalError('database is locked')
+
+    monkeypatch.setattr(writer, 'write', unavailable)
+    writer._records.extend([record('1'), record('2')])
+
+    assert writer.flush() == 0
+    assert writer.stats()['pending'] == 2
+
+    assert writer.flush() == 0
+    stats = writer.stats()
+    assert stats['pending'] == 0
+    assert stats['quarantined'] == 2
+    assert stats['failed_flushes'] == 2
+
+
+def test_worker_process_shutdown_flushes_the_buffer(writer):
+    writer._records.append(record('1'))
+
+    worker_process_shutdown.send(sender=None, pid=1, exitcode=0)
+
+    assert AuditLog.objects.filter(resource_id='1').exists()
+    assert writer.stats()['pending'] == 0
+
+
+def test_forwarded_for_must_be_an_ip_address():
+    factory = RequestFactory()
+    spoofed = factory.get('/api/', HTTP_X_FORWARDED_FOR="'; DROP TABLE--, 10.0.0.1", REMOTE_ADDR='192.0.2.7')
+    forwarded = factory.get('/api/', HTTP_X_FORWARDED_FOR='2001:db8::1, 10.0.0.1', REMOTE_ADDR='192.0.2.7')
+
+    assert AuditLogMiddleware.get_client_ip(spoofed) == '192.0.2.7'
+    assert AuditLogMiddleware.get_client_ip(forwarded) == '2001:db8::1'
+
+
+def test_metrics_publish_log_buffer_stats(writer, settings):
+    settings.METRICS_TOKEN = 'scrape'
+    writer.write([record('1')])
+
+    request = RequestFactory().get('/metrics', HTTP_AUTHORIZATION='Bearer scrape')
+    body = metrics_view(request).content.decode()
+
+    assert 'writer="test_audit"} 1' in body
+    assert '# TYPE erp_log_buffer_dropped_total counter' in body
+    assert '# TYPE erp_log_buffer_pending gauge' in body
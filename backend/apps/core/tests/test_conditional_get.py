@@ -0,0 +1,67 @@
+"""
+Conditional GET validators
+"""
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+from rest_framework import generics, serializers
+from rest_framework.permissions import AllowAny
+from rest_framework.test import APIRequestFactory
+
+from apps.authentication.models import AuditLog
+from apps.core.mixins import ConditionalGetMixin
+from apps.core.pagination import KeysetPagination
+
+pytestmark = pytest.mark.django_db
+
+
+class AuditLogRowSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditLog
+        fields = ['id', 'action', 'resource_type', 'updated_at']
+
+
+class AuditLogPageView(ConditionalGetMixin, generics.ListAPIView):
+    """Row-validated list checked by its page (no table-wide aggregate)"""
+    permission_classes = [AllowAny]
+    serializer_class = AuditLogRowSerializer
+    pagination_class = KeysetPagination
+    ordering = ['-created_at']
+    etag_from_page = True
+    queryset = AuditLog.objects.all()
+
+
+def get(**headers):
+    request = APIRequestFactory().get('/audit-logs/', {'page_size': 2}, **headers)
+    return AuditLogPageView.as_view()(request)
+
+
+def log(minutes_ago):
+    entry = AuditLog.objects.create(action='login', resource_type='User', description='')
+    AuditLog.objects.filter(pk=entry.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+    return entry
+
+
+def test_page_etag_changes_when_a_next_page_appears():
+    log(1)
+    log(2)
+
+    first = get()
+    assert first.data['next'] is None
+
+    # Older than both: the first page keeps its rows but gains a next link
+    log(3)
+    second = get(HTTP_IF_NONE_MATCH=first['ETag'])
+
+    assert second.status_code == 200
+    assert second.data['next'] is not None
+    assert second['ETag'] != first['ETag']
+
+
+def test_unchanged_page_is_not_modified():
+    log(1)
+
+    first = get()
+
+    assert get(HTTP_IF_NONE_MATCH=first['ETag']).status_code == 304
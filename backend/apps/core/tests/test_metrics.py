@@ -0,0 +1,53 @@
+"""
+Request metrics aggregated across worker processes
+"""
+import json
+
+import pytest
+
+from apps.core.metrics import RequestMetrics
+
+
+@pytest.fixture
+def multiproc(settings, tmp_path):
+    settings.METRICS_MULTIPROC_DIR = str(tmp_path)
+    settings.METRICS_DUMP_INTERVAL = 0
+    return tmp_path
+
+
+def other_worker(directory, pid, observations):
+    """Dump of a second process that saw ``observations``"""
+    worker = RequestMetrics()
+    for view, method, status_code, duration in observations:
+        worker.observe(view, method, status_code, duration, 0.001, 2)
+    (directory / f"metrics-{pid}.json").write_text(json.dumps(worker.state()))
+
+
+def test_scrape_sums_every_worker(multiproc):
+    metrics = RequestMetrics()
+    metrics.observe('project-list', 'GET', 200, 0.02, 0.001, 3)
+    other_worker(multiproc, 1, [('project-list', 'GET', 200, 0.3), ('project-list', 'GET', 500, 0.01)])
+
+    body = metrics.render()
+
+    assert 'erp_requests_total{view="project-list",method="GET",status="200"} 2' in body
+    assert 'erp_requests_total{view="project-list",method="GET",status="500"} 1' in body
+    assert 'erp_request_duration_seconds_bucket{view="project-list",method="GET",le="0.025"} 2' in body
+    assert 'erp_request_duration_seconds_count{view="project-list",method="GET"} 3' in body
+    assert 'pid=' not in body
+
+
+def test_observations_are_dumped_for_the_other_workers(multiproc):
+    metrics = RequestMetrics()
+    metrics.observe('project-list', 'GET', 200, 0.02, 0.001, 3)
+
+    [dumped] = multiproc.glob('metrics-*.json')
+    assert json.loads(dumped.read_text())['requests'] == [['project-list', 'GET', 200, 1]]
+
+
+def test_single_process_without_a_directory(settings):
+    settings.METRICS_MULTIPROC_DIR = ''
+    metrics = RequestMetrics()
+    metrics.observe('project-list', 'GET', 200, 0.02, 0.001, 3)
+
+    assert 'erp_requests_total{view="project-list",method="GET",status="200"} 1' in metrics.render()
@@ -0,0 +1,125 @@
+"""
+Email outbox draining (locmem email backend)
+"""
+from datetime import timedelta
+
+import pytest
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.utils import timezone
+
+from apps.core import outbox
+from apps.core.integration_models import EmailLog
+from apps.core.tasks import drain_email_outbox
+
+
+@pytest.fixture(autouse=True)
+def locmem_email(settings):
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+    settings.EMAIL_MAX_RETRIES = 3
+
+
+def pending(recipient, **fields):
+    return EmailLog.objects.create(
+        recipient_email=recipient, subject='Payslip', body_text='Your payslip is ready',
+        body_html='', status='pending', **fields
+    )
+
+
+def refuse(recipient, monkeypatch):
+    """Make the locmem backend fail for ``recipient``"""
+    send_messages = EmailBackend.send_messages
+
+    def flaky(self, messages):
+        if any(recipient in to for message in messages for to in message.to):
+            raise ConnectionRefusedError('mailbox unavailable')
+        return send_messages(self, messages)
+
+    monkeypatch.setattr(EmailBackend, 'send_messages', flaky)
+
+
+@pytest.mark.django_db
+def test_drain_sends_pending_messages(mailoutbox):
+    email_log = pending('ana@example.com')
+
+    assert outbox.drain_outbox() == {'sent': 1, 'failed': 0}
+
+    assert [message.to for message in mailoutbox] == [['ana@example.com']]
+    email_log.refresh_from_db()
+    assert email_log.status == 'sent'
+    assert email_log.next_attempt_at is None
+
+
+@pytest.mark.django_db
+def test_failure_is_rescheduled_with_backoff(mailoutbox, monkeypatch):
+    refuse('bad@example.com', monkeypatch)
+    bad = pending('bad@example.com')
+    pending('ana@example.com')
+
+    assert outbox.drain_outbox() == {'sent': 1, 'failed': 1}
+
+    bad.refresh_from_db()
+    assert bad.status == 'pending'
+    assert bad.retry_count == 1
+    assert bad.next_attempt_at > timezone.now() + timedelta(seconds=30)
+    assert outbox.next_attempt_at() == bad.next_attempt_at
+
+    # Not due yet: a second drain leaves it alone
+    assert outbox.drain_outbox() == {'sent': 0, 'failed': 0}
+    assert len(mailoutbox) == 1
+
+
+@pytest.mark.django_db
+def test_last_retry_marks_the_message_failed(monkeypatch):
+    refuse('bad@example.com', monkeypatch)
+    bad = pending('bad@example.com', retry_count=3)
+
+    outbox.drain_outbox()
+
+    bad.refresh_from_db()
+    assert bad.status == 'failed'
+    assert bad.next_attempt_at is None
+    assert outbox.next_attempt_at() is None
+
+
+@pytest.mark.django_db
+def test_expired_lease_is_claimed_again(mailoutbox):
+    # A worker died mid-batch; its lease ran out a minute ago
+    pending('ana@example.com', next_attempt_at=timezone.now() - timedelta(minutes=1))
+    # Still leased by a live worker
+    pending('bo@example.com', next_attempt_at=timezone.now() + outbox.CLAIM_LEASE)
+
+    assert outbox.drain_outbox() == {'sent': 1, 'failed': 0}
+    assert [message.to for message in mailoutbox] == [['ana@example.com']]
+
+
+@pytest.mark.django_db
+def test_task_schedules_a_wake_up_for_the_next_retry(monkeypatch):
+    refuse('bad@example.com', monkeypatch)
+    bad = pending('bad@example.com')
+    wake_ups = []
+    monkeypatch.setattr(outbox, 'wake_outbox', lambda eta=None: wake_ups.append(eta))
+
+    drain_email_outbox()
+
+    bad.refresh_from_db()
+    assert wake_ups == [bad.next_attempt_at]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_messages_are_sent_outside_a_transaction(monkeypatch):
+    in_transaction = []
+    send_messages = EmailBackend.send_messages
+
+    def recording(self, messages):
+        in_transaction.append(connection.in_atomic_block)
+        return send_messages(self, messages)
+
+    monkeypatch.setattr(EmailBackend, 'send_messages', recording)
+    email_log = pending('ana@example.com')
+
+    outbox.drain_outbox()
+
+    assert in_transaction == [False]
+    email_log.refresh_from_db()
+    assert email_log.status == 'sent'
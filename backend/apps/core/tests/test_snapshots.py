@@ -0,0 +1,67 @@
+"""
+Dashboard snapshot rebuilds
+"""
+from decimal import Decimal
+
+import pytest
+from django.db import IntegrityError
+
+from apps.core.models import DashboardMetric
+from apps.core.snapshots import BUILT_MARKER, DashboardSnapshot, SnapshotMetric, snapshot_registry
+from apps.hr.models import Department
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def snapshot():
+    # Sources only, no signal handlers: the test decides when counters change
+    snapshot = DashboardSnapshot('test')
+    snapshot.sources[Department].append(SnapshotMetric('departments'))
+    yield snapshot
+    del snapshot_registry['test']
+
+
+def stored(name='test'):
+    return dict(DashboardMetric.objects.filter(dashboard=name).values_list('metric', 'value'))
+
+
+def test_cold_read_builds_the_snapshot(snapshot):
+    Department.objects.create(name='Engineering', code='ENG')
+
+    assert snapshot.read().count('departments') == 1
+    assert stored() == {'departments': Decimal(1), BUILT_MARKER: Decimal(1)}
+
+
+def test_cold_rebuild_returns_a_snapshot_built_meanwhile(snapshot):
+    DashboardMetric.objects.create(dashboard='test', metric='departments', value=5)
+    DashboardMetric.objects.create(dashboard='test', metric=BUILT_MARKER, value=1)
+
+    assert snapshot.rebuild(if_cold=True)['departments'] == 5
+    assert snapshot.rebuild()['departments'] == 0
+
+
+def test_rebuild_retries_when_a_row_appears(snapshot, monkeypatch):
+    bulk_create = DashboardMetric.objects.bulk_create
+    calls = []
+
+    def racing_bulk_create(objs, *args, **kwargs):
+        calls.append(len(objs))
+        if len(calls) == 1:
+            raise IntegrityError('UNIQUE constraint failed')
+        return bulk_create(objs, *args, **kwargs)
+
+    monkeypatch.setattr(DashboardMetric.objects, 'bulk_create', racing_bulk_create)
+
+    assert snapshot.read().count('departments') == 0
+    assert len(calls) == 2
+    assert BUILT_MARKER in stored()
+
+
+def test_deltas_apply_on_top_of_a_rebuild(snapshot):
+    snapshot.rebuild()
+    Department.objects.create(name='Engineering', code='ENG')
+    snapshot.apply({'departments': Decimal(1)})
+
+    assert snapshot.read().count('departments') == 1
+    assert snapshot.rebuild()['departments'] == 1
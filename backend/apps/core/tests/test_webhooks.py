@@ -0,0 +1,185 @@
+"""
+Webhook delivery against local HTTP stub servers
+"""
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from apps.core import webhooks
+from apps.core.integration_models import Webhook, WebhookDelivery
+from apps.project.models import Project
+
+
+class StubServer:
+    """HTTP server on a free local port recording the webhook requests it gets"""
+
+    def __init__(self, status=200, delay=0):
+        self.status = status
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/hook"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                with stub.lock:
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                time.sleep(stub.delay)
+                with stub.lock:
+                    stub.active -= 1
+                    stub.requests.append({'headers': dict(self.headers), 'body': body.decode('utf-8')})
+                self.send_response(stub.status)
+                self.send_header('Content-Length', '2')
+                self.end_headers()
+                self.wfile.write(b'ok')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(**options):
+        servers.append(StubServer(**options))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+@pytest.fixture
+def no_wakeup(monkeypatch):
+    monkeypatch.setattr(webhooks, 'wake_worker', lambda eta=None: None)
+
+
+def make_webhook(url, **fields):
+    return Webhook.objects.create(name='Test hook', url=url, events=['all'], **fields)
+
+
+def test_serialize_instance_sends_file_names():
+    project = Project(code='PRJ-1', name='Project', contract_document='projects/contracts/contract.pdf')
+
+    data = webhooks.serialize_instance(project)
+
+    assert data['contract_document'] == 'projects/contracts/contract.pdf'
+    assert json.loads(json.dumps(data, cls=DjangoJSONEncoder))['contract_document'] == data['contract_document']
+    assert webhooks.serialize_instance(Project(code='PRJ-2'))['contract_document'] is None
+
+
+@pytest.mark.django_db
+def test_delivery_is_signed_and_recorded(stub_server):
+    server = stub_server()
+    webhook = make_webhook(server.url, secret='s3cret')
+    delivery, = webhooks.dispatch_event('invoice.created', {'id': 7}, webhooks=[webhook], queue=False)
+
+    outcomes = webhooks.deliver([delivery])
+
+    assert outcomes == {'success': 1}
+    request, = server.requests
+    assert json.loads(request['body'])['data'] == {'id': 7}
+    timestamp, digest = [part.split('=', 1)[1] for part in request['headers']['X-Webhook-Signature'].split(',')]
+    expected = hmac.new(b's3cret', f"{timestamp}.{request['body']}".encode('utf-8'), hashlib.sha256).hexdigest()
+    assert digest == expected
+
+    delivery.refresh_from_db()
+    webhook.refresh_from_db()
+    assert delivery.status == 'success'
+    assert delivery.response_status_code == 200
+    assert delivery.next_retry_at is None
+    assert webhook.success_count == 1
+
+
+@pytest.mark.django_db
+def test_payload_is_serialized_once_for_every_subscriber(stub_server):
+    first, second = stub_server(), stub_server()
+    hooks = [make_webhook(first.url), make_webhook(second.url)]
+
+    deliveries = webhooks.dispatch_event('invoice.created', {'id': 7}, webhooks=hooks, queue=False)
+    webhooks.deliver(deliveries)
+
+    assert first.requests[0]['body'] == second.requests[0]['body'] == deliveries[0].request_body
+
+
+@pytest.mark.django_db
+def test_failures_are_retried_with_backoff_until_the_limit(stub_server, settings):
+    settings.WEBHOOK_MAX_RETRIES = 1
+    server = stub_server(status=500)
+    webhook = make_webhook(server.url)
+    delivery, = webhooks.dispatch_event('invoice.created', {'id': 7}, webhooks=[webhook], queue=False)
+
+    assert webhooks.deliver([delivery]) == {'retrying': 1}
+    delivery.refresh_from_db()
+    assert delivery.retry_count == 1
+    assert delivery.error_message == 'HTTP 500'
+    assert delivery.next_retry_at >= timezone.now() + timedelta(seconds=settings.WEBHOOK_RETRY_BASE_SECONDS - 1)
+
+    assert webhooks.deliver([delivery]) == {'failed': 1}
+    delivery.refresh_from_db()
+    webhook.refresh_from_db()
+    assert delivery.next_retry_at is None
+    assert webhook.failure_count == 2
+
+
+@pytest.mark.django_db
+def test_in_flight_requests_are_capped_per_host(stub_server, settings, no_wakeup):
+    settings.WEBHOOK_PER_HOST_CONCURRENCY = 2
+    server = stub_server(delay=0.2)
+    webhook = make_webhook(server.url)
+    for number in range(6):
+        webhooks.dispatch_event('invoice.created', {'id': number}, webhooks=[webhook])
+
+    assert webhooks.deliver_due_webhooks() == {'success': 6}
+    assert len(server.requests) == 6
+    assert server.max_active == 2
+
+
+@pytest.mark.django_db
+def test_slow_host_does_not_stall_other_hosts(stub_server, settings, no_wakeup):
+    settings.WEBHOOK_PER_HOST_CONCURRENCY = 2
+    settings.WEBHOOK_PER_HOST_BATCH = 2
+    settings.WEBHOOK_BATCH_SIZE = 4
+    slow, fast = stub_server(delay=1.5), stub_server()
+    slow_hook, fast_hook = make_webhook(slow.url), make_webhook(fast.url)
+    webhooks.dispatch_event('invoice.created', {'id': 1}, webhooks=[slow_hook, fast_hook])
+    for number in range(2, 7):
+        webhooks.dispatch_event('invoice.created', {'id': number}, webhooks=[fast_hook])
+
+    started = timezone.now()
+    assert webhooks.deliver_due_webhooks() == {'success': 7}
+
+    fast_sent = WebhookDelivery.objects.filter(webhook=fast_hook).values_list('sent_at', flat=True)
+    slow_sent, = WebhookDelivery.objects.filter(webhook=slow_hook).values_list('sent_at', flat=True)
+    assert len(fast.requests) == 6
+    assert all((sent_at - started).total_seconds() < 1 for sent_at in fast_sent)
+    assert (slow_sent - started).total_seconds() >= 1.5
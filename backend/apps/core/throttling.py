@@ -36,3 +36,11 @@ class SustainedRateThrottle(UserRateThrottle):
     """
     scope = 'sustained'
     rate = '1000/hour'
+
+
+class UploadChunkRateThrottle(UserRateThrottle):
+    """
+    Throttle for resumable upload chunks, counted apart from other requests
+    Limits: 3000 chunks per hour by default (about 24GB at 8MB)
+    """
+    scope = 'upload_chunk'
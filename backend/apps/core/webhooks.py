@@ -0,0 +1,508 @@
+"""
+Webhook event dispatch and delivery
+
+Domain events are declared next to the models that raise them
+(``apps/<app>/webhooks.py`` is auto-discovered on startup):
+
+    track_event('invoice.created', Invoice, created=True)
+    track_event('invoice.paid', Invoice, status='paid')
+
+An event fires on creation (``created=True``), on every update
+(``updated=True``) or when a row starts matching the given lookups. After
+the transaction commits, ``dispatch_event`` serializes the payload once and
+stores it as one ``WebhookDelivery`` per subscribed webhook, then wakes the
+delivery worker.
+
+``deliver_due_webhooks`` claims due deliveries (``SKIP LOCKED`` on
+PostgreSQL) and sends them from an asyncio loop on a background thread,
+recording each delivery as soon as it completes and claiming more while
+others are still in flight:
+
+* HTTP goes through one shared ``requests.Session`` (urllib3 keep-alive
+  pools per host) on a bounded thread pool
+* an ``asyncio.Semaphore`` per target host caps a worker's in-flight
+  requests, and only a few deliveries per host are claimed at a time, so a
+  slow endpoint only ever occupies its own slots
+* bodies are signed with ``Webhook.secret``:
+  ``X-Webhook-Signature: t=<unix time>,v1=<hex HMAC-SHA256 of "<t>.<body>">``
+* failures are retried with exponential backoff via ``retry_count`` and
+  ``next_retry_at`` until ``WEBHOOK_MAX_RETRIES`` is reached
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import F, Min
+from django.db.models.fields.files import FieldFile
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+
+from apps.core.integration_models import Webhook, WebhookDelivery
+from apps.core.snapshots import _matches
+
+logger = logging.getLogger(__name__)
+
+# How long a claimed delivery is hidden from other workers while it is sent
+CLAIM_LEASE = timedelta(minutes=5)
+
+RESPONSE_BODY_LIMIT = 2000
+
+# model -> list of event definitions
+_model_events = defaultdict(list)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ----- Event declaration -----
+
+class WebhookEvent:
+    """When a model write raises ``name``"""
+
+    def __init__(self, name, model, created=False, updated=False, serialize=None, **lookups):
+        self.name = name
+        self.model = model
+        self.created = created
+        self.updated = updated
+        self.lookups = lookups
+        self.serialize = serialize or serialize_instance
+
+    def fires(self, previous, instance, created):
+        if created:
+            return self.created or (bool(self.lookups) and _matches(instance, self.lookups))
+        if self.updated:
+            return True
+        if not self.lookups:
+            return False
+        return _matches(instance, self.lookups) and (
+            previous is None or not _matches(previous, self.lookups)
+        )
+
+
+def serialize_instance(instance):
+    """Concrete field values of a model instance (foreign keys as ids, files as names)"""
+    data = {}
+    for field in instance._meta.concrete_fields:
+        value = field.value_from_object(instance)
+        if isinstance(value, FieldFile):
+            value = value.name or None
+        data[field.attname] = value
+    return data
+
+
+def track_event(name, model, **options):
+    """Declare that writes to ``model`` raise the webhook event ``name``"""
+    if not _model_events[model]:
+        pre_save.connect(_remember_previous, sender=model, dispatch_uid=f"webhooks:{model._meta.label}")
+        post_save.connect(_raise_events, sender=model, dispatch_uid=f"webhooks:{model._meta.label}")
+    _model_events[model].append(WebhookEvent(name, model, **options))
+
+
+def _remember_previous(sender, instance, raw=False, **kwargs):
+    instance._webhook_previous = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if any(event.lookups for event in _model_events[sender]):
+        instance._webhook_previous = sender._base_manager.filter(pk=instance.pk).first()
+
+
+def _raise_events(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_webhook_previous', None)
+    instance._webhook_previous = None
+    for event in _model_events[sender]:
+        if event.fires(previous, instance, created):
+            data = event.serialize(instance)
+            transaction.on_commit(lambda name=event.name, data=data: _dispatch_safely(name, data))
+
+
+def _dispatch_safely(event, data):
+    try:
+        dispatch_event(event, data)
+    except Exception as e:
+        # Never fail the user's write because of a webhook
+        logger.error(f"Failed to dispatch webhook event {event}: {e}")
+
+
+# ----- Dispatch -----
+
+def subscribed_webhooks(event):
+    return [
+        webhook for webhook in Webhook.objects.filter(is_active=True, deleted_at__isnull=True)
+        if event in (webhook.events or []) or 'all' in (webhook.events or [])
+    ]
+
+
+def dispatch_event(event, data, webhooks=None, queue=True):
+    """
+    Queue ``event`` for every subscribed webhook
+
+    The payload is serialized once and the same body is stored for (and sent
+    to) every subscriber. With ``queue=False`` the deliveries are left for
+    the caller to ``deliver()`` (the worker only picks them up for retries).
+
+    Returns:
+        list: The created ``WebhookDelivery`` rows
+    """
+    webhooks = subscribed_webhooks(event) if webhooks is None else webhooks
+    if not webhooks:
+        return []
+
+    now = timezone.now()
+    payload = {'event': event, 'timestamp': now.isoformat(), 'data': data}
+    body = json.dumps(payload, cls=DjangoJSONEncoder)
+    payload = json.loads(body)
+
+    deliveries = WebhookDelivery.objects.bulk_create([
+        WebhookDelivery(
+            webhook=webhook,
+            event=event,
+            payload=payload,
+            request_url=webhook.url,
+            request_body=body,
+            status='pending',
+            next_retry_at=now if queue else None,
+        )
+        for webhook in webhooks
+    ])
+    if queue:
+        wake_worker()
+    return deliveries
+
+
+def wake_worker(eta=None):
+    """Ask the Celery worker to deliver due webhooks (now or at ``eta``)"""
+    from apps.core.tasks import deliver_webhooks
+
+    try:
+        if eta is None:
+            deliver_webhooks.delay()
+        else:
+            deliver_webhooks.apply_async(eta=eta)
+    except Exception as e:
+        # run_webhook_worker or the next wake-up picks the deliveries up
+        logger.warning(f"Could not wake the webhook worker: {e}")
+
+
+# ----- Delivery -----
+
+_session = None
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        per_host = _setting('WEBHOOK_PER_HOST_CONCURRENCY', 4)
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=100, pool_maxsize=per_host)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['User-Agent'] = 'Ikodio-ERP-Webhooks/1.0'
+        _session = session
+    return _session
+
+
+def sign(secret, timestamp, body):
+    """Signature header value for ``body`` sent at ``timestamp``"""
+    digest = hmac.new(
+        secret.encode('utf-8'), f"{timestamp}.{body}".encode('utf-8'), hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def build_headers(webhook, delivery):
+    timestamp = int(time.time())
+    headers = {
+        'Content-Type': 'application/json',
+        'X-Webhook-Event': delivery.event,
+        'X-Webhook-Delivery': str(delivery.pk),
+    }
+    if webhook.secret:
+        headers['X-Webhook-Signature'] = sign(webhook.secret, timestamp, delivery.request_body)
+
+    credentials = webhook.auth_credentials or {}
+    if webhook.auth_type == 'bearer' and credentials.get('token'):
+        headers['Authorization'] = f"Bearer {credentials['token']}"
+    elif webhook.auth_type == 'api_key' and credentials.get('api_key'):
+        headers[credentials.get('header', 'X-API-Key')] = credentials['api_key']
+
+    for name, value in (webhook.custom_headers or {}).items():
+        headers[str(name)] = str(value)
+    return headers
+
+
+def _secret_headers(webhook):
+    """Lower-cased names of headers not to store with the delivery"""
+    credentials = webhook.auth_credentials or {}
+    return {'authorization', str(credentials.get('header', 'X-API-Key')).lower()}
+
+
+def _auth(webhook):
+    credentials = webhook.auth_credentials or {}
+    if webhook.auth_type == 'basic' and credentials.get('username'):
+        return credentials['username'], credentials.get('password', '')
+    return None
+
+
+def _send(url, body, headers, auth):
+    """Blocking HTTP POST (runs on the sender's thread pool)"""
+    started = time.monotonic()
+    try:
+        response = _get_session().post(
+            url,
+            data=body.encode('utf-8'),
+            headers=headers,
+            auth=auth,
+            timeout=_setting('WEBHOOK_TIMEOUT', 10),
+            allow_redirects=False,
+        )
+    except requests.RequestException as e:
+        return {'error': str(e) or e.__class__.__name__, 'duration_ms': _elapsed_ms(started)}
+    return {
+        'status_code': response.status_code,
+        'headers': dict(response.headers),
+        'body': response.text[:RESPONSE_BODY_LIMIT],
+        'duration_ms': _elapsed_ms(started),
+    }
+
+
+def _elapsed_ms(started):
+    return int((time.monotonic() - started) * 1000)
+
+
+def _host(delivery):
+    return urlsplit(delivery.request_url).netloc
+
+
+class _Sender:
+    """
+    asyncio loop on a background thread that sends deliveries
+
+    Each target host has its own ``asyncio.Semaphore`` of
+    ``WEBHOOK_PER_HOST_CONCURRENCY`` slots, so requests to a slow host wait
+    only for that host. ``submit`` returns a ``concurrent.futures.Future``
+    and the caller records each delivery as soon as its future completes;
+    all database work stays on the caller's thread.
+    """
+
+    def __init__(self):
+        self.per_host = _setting('WEBHOOK_PER_HOST_CONCURRENCY', 4)
+        self.host_slots = {}
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=_setting('WEBHOOK_MAX_CONCURRENCY', 32))
+        self.thread = threading.Thread(target=self.loop.run_forever, name='webhook-sender', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.executor.shutdown()
+
+    def submit(self, delivery, headers):
+        """Start sending ``delivery``; the future resolves to the ``_send`` result"""
+        request = (delivery.request_url, delivery.request_body, headers, _auth(delivery.webhook))
+        return asyncio.run_coroutine_threadsafe(self._post(_host(delivery), request), self.loop)
+
+    async def _post(self, host, request):
+        if host not in self.host_slots:
+            self.host_slots[host] = asyncio.Semaphore(self.per_host)
+        async with self.host_slots[host]:
+            return await self.loop.run_in_executor(self.executor, _send, *request)
+
+
+def retry_delay(retry_count):
+    """Exponential backoff with jitter for the ``retry_count``-th retry"""
+    base = _setting('WEBHOOK_RETRY_BASE_SECONDS', 30)
+    delay = min(base * (2 ** (retry_count - 1)), _setting('WEBHOOK_RETRY_MAX_SECONDS', 6 * 3600))
+    return timedelta(seconds=delay * random.uniform(1.0, 1.25))
+
+
+def _record(sent):
+    """
+    Store the outcome of ``sent`` ``(delivery, headers, result)`` triples
+
+    Returns:
+        Counter: number of deliveries per resulting status
+    """
+    now = timezone.now()
+    max_retries = _setting('WEBHOOK_MAX_RETRIES', 5)
+    outcomes = Counter()
+    webhook_stats = defaultdict(Counter)
+    deliveries = []
+    for delivery, headers, result in sent:
+        delivery.sent_at = now
+        delivery.updated_at = now
+        delivery.duration_ms = result['duration_ms']
+        secret_headers = _secret_headers(delivery.webhook)
+        delivery.request_headers = {
+            name: '***' if name.lower() in secret_headers else value
+            for name, value in headers.items()
+        }
+        delivery.response_status_code = result.get('status_code')
+        delivery.response_headers = result.get('headers')
+        delivery.response_body = result.get('body', '')
+
+        if delivery.response_status_code is not None and 200 <= delivery.response_status_code < 300:
+            delivery.status = 'success'
+            delivery.error_message = ''
+            delivery.next_retry_at = None
+            webhook_stats[delivery.webhook_id]['success'] += 1
+        else:
+            delivery.error_message = result.get('error') or f"HTTP {delivery.response_status_code}"
+            webhook_stats[delivery.webhook_id]['failure'] += 1
+            if delivery.retry_count < max_retries:
+                delivery.retry_count += 1
+                delivery.status = 'retrying'
+                delivery.next_retry_at = now + retry_delay(delivery.retry_count)
+            else:
+                delivery.status = 'failed'
+                delivery.next_retry_at = None
+        outcomes[delivery.status] += 1
+        deliveries.append(delivery)
+
+    WebhookDelivery.objects.bulk_update(deliveries, [
+        'status', 'sent_at', 'duration_ms', 'request_headers', 'response_status_code',
+        'response_headers', 'response_body', 'error_message', 'retry_count',
+        'next_retry_at', 'updated_at',
+    ])
+    for webhook_id, counts in webhook_stats.items():
+        Webhook.objects.filter(pk=webhook_id).update(
+            success_count=F('success_count') + counts['success'],
+            failure_count=F('failure_count') + counts['failure'],
+            last_triggered_at=now,
+        )
+    return outcomes
+
+
+class _InFlight:
+    """Deliveries submitted to a ``_Sender`` and not recorded yet"""
+
+    def __init__(self, sender):
+        self.sender = sender
+        self.futures = {}
+        self.hosts = Counter()
+
+    def __len__(self):
+        return len(self.futures)
+
+    def submit(self, deliveries):
+        for delivery in deliveries:
+            headers = build_headers(delivery.webhook, delivery)
+            self.futures[self.sender.submit(delivery, headers)] = (delivery, headers)
+            self.hosts[_host(delivery)] += 1
+
+    def record_completed(self):
+        """Wait for at least one delivery to finish and record all finished ones"""
+        done, _ = wait(self.futures, return_when=FIRST_COMPLETED)
+        sent = []
+        for future in done:
+            delivery, headers = self.futures.pop(future)
+            self.hosts[_host(delivery)] -= 1
+            sent.append((delivery, headers, future.result()))
+        return _record(sent)
+
+
+def deliver(deliveries):
+    """
+    Send ``deliveries`` now and record the outcome of each as it completes
+
+    Returns:
+        Counter: number of deliveries per resulting status
+    """
+    deliveries = list(deliveries)
+    outcomes = Counter()
+    if not deliveries:
+        return outcomes
+
+    with _Sender() as sender:
+        in_flight = _InFlight(sender)
+        in_flight.submit(deliveries)
+        while in_flight:
+            outcomes.update(in_flight.record_completed())
+    return outcomes
+
+
+def claim_due_deliveries(limit, busy=None):
+    """
+    Lease up to ``limit`` due deliveries to this worker
+
+    At most ``WEBHOOK_PER_HOST_BATCH`` deliveries per target host are taken,
+    less the ``busy`` count (host -> deliveries) the worker still has in
+    flight, so one slow endpoint cannot fill a batch on its own; its
+    remaining deliveries stay due for later or another worker.
+    """
+    per_host = _setting('WEBHOOK_PER_HOST_BATCH', 2 * _setting('WEBHOOK_PER_HOST_CONCURRENCY', 4))
+    busy = busy or Counter()
+    now = timezone.now()
+    with transaction.atomic():
+        due = WebhookDelivery.objects.filter(
+            status__in=['pending', 'retrying'], next_retry_at__lte=now
+        ).order_by('next_retry_at')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+
+        ids = []
+        per_host_counts = Counter(busy)
+        for pk, url in due.values_list('pk', 'request_url')[:limit * 4]:
+            host = urlsplit(url).netloc
+            if per_host_counts[host] < per_host:
+                per_host_counts[host] += 1
+                ids.append(pk)
+                if len(ids) == limit:
+                    break
+        WebhookDelivery.objects.filter(pk__in=ids).update(next_retry_at=now + CLAIM_LEASE)
+    return list(WebhookDelivery.objects.filter(pk__in=ids).select_related('webhook'))
+
+
+def deliver_due_webhooks(max_batches=None):
+    """
+    Deliver everything currently due
+
+    Deliveries are claimed in batches of up to ``WEBHOOK_BATCH_SIZE`` and
+    recorded as they complete. Whenever at most half a batch is in flight the
+    free room is claimed again, so a slow host's requests still being sent
+    never hold up deliveries to other hosts.
+
+    Returns:
+        Counter: number of deliveries per resulting status
+    """
+    batch_size = _setting('WEBHOOK_BATCH_SIZE', 200)
+    totals = Counter()
+    batches = 0
+    with _Sender() as sender:
+        in_flight = _InFlight(sender)
+        while True:
+            if len(in_flight) <= batch_size // 2 and (max_batches is None or batches < max_batches):
+                in_flight.submit(claim_due_deliveries(batch_size - len(in_flight), busy=+in_flight.hosts))
+                batches += 1
+            if not in_flight:
+                break
+            totals.update(in_flight.record_completed())
+    return totals
+
+
+def next_retry_at():
+    """When the earliest waiting retry becomes due (None if nothing waits)"""
+    return WebhookDelivery.objects.filter(status='retrying').aggregate(
+        next_at=Min('next_retry_at')
+    )['next_at']
@@ -3,9 +3,17 @@ CRM & Sales serializers
 """
 from rest_framework import serializers
 from django.db.models import Sum, Count, Q
+from apps.core.computed import ComputedField, count_related, sum_related
 from apps.crm.models import (
     Client, Lead, Opportunity, Contract, Quotation, QuotationLine, FollowUp
 )
+from apps.finance.models import Invoice
+
+OPEN_STAGES = ['prospecting', 'qualification', 'proposal', 'negotiation']
+
+
+def _money(total):
+    return float(total or 0)
 
 
 # ============ Client ============
@@ -13,8 +21,10 @@ from apps.crm.models import (
 class ClientListSerializer(serializers.ModelSerializer):
     """Lightweight client list"""
     account_manager_name = serializers.CharField(source='account_manager.full_name', read_only=True)
-    opportunity_count = serializers.SerializerMethodField()
-    total_revenue = serializers.SerializerMethodField()
+    opportunity_count = ComputedField(count_related(Opportunity, 'client'))
+    total_revenue = ComputedField(
+        sum_related(Invoice, 'client', 'total_amount', status='paid'), transform=_money
+    )
     
     class Meta:
         model = Client
@@ -25,25 +35,16 @@ class ClientListSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
-    
-    def get_opportunity_count(self, obj):
-        return obj.opportunities.count()
-    
-    def get_total_revenue(self, obj):
-        from apps.finance.models import Invoice
-        total = Invoice.objects.filter(
-            client=obj,
-            status='paid'
-        ).aggregate(total=Sum('total_amount'))['total']
-        return float(total or 0)
 
 
 class ClientSerializer(serializers.ModelSerializer):
     """Full client serializer"""
     account_manager_name = serializers.CharField(source='account_manager.full_name', read_only=True)
-    opportunity_count = serializers.SerializerMethodField()
-    active_contracts = serializers.SerializerMethodField()
-    total_revenue = serializers.SerializerMethodField()
+    opportunity_count = ComputedField(count_related(Opportunity, 'client', stage__in=OPEN_STAGES))
+    active_contracts = ComputedField(count_related(Contract, 'client', status='active'))
+    total_revenue = ComputedField(
+        sum_related(Invoice, 'client', 'total_amount', status='paid'), transform=_money
+    )
     
     class Meta:
         model = Client
@@ -59,20 +60,6 @@ class ClientSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'deleted_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'deleted_at']
-    
-    def get_opportunity_count(self, obj):
-        return obj.opportunities.filter(stage__in=['prospecting', 'qualification', 'proposal', 'negotiation']).count()
-    
-    def get_active_contracts(self, obj):
-        return obj.contracts.filter(status='active').count()
-    
-    def get_total_revenue(self, obj):
-        from apps.finance.models import Invoice
-        total = Invoice.objects.filter(
-            client=obj,
-            status='paid'
-        ).aggregate(total=Sum('total_amount'))['total']
-        return float(total or 0)
 
 
 # ============ Lead ============
@@ -104,7 +91,7 @@ class LeadSerializer(serializers.ModelSerializer):
         source='converted_opportunity.opportunity_number', read_only=True
     )
     days_since_created = serializers.SerializerMethodField()
-    follow_up_count = serializers.SerializerMethodField()
+    follow_up_count = ComputedField(count_related(FollowUp, 'lead'))
     
     class Meta:
         model = Lead
@@ -123,9 +110,6 @@ class LeadSerializer(serializers.ModelSerializer):
     def get_days_since_created(self, obj):
         from django.utils import timezone
         return (timezone.now() - obj.created_at).days
-    
-    def get_follow_up_count(self, obj):
-        return obj.follow_ups.count()
 
 
 # ============ Opportunity ============
@@ -164,7 +148,7 @@ class OpportunitySerializer(serializers.ModelSerializer):
     project_name = serializers.CharField(source='project.name', read_only=True)
     weighted_value = serializers.SerializerMethodField()
     days_in_stage = serializers.SerializerMethodField()
-    quotation_count = serializers.SerializerMethodField()
+    quotation_count = ComputedField(count_related(Quotation, 'opportunity'))
     
     class Meta:
         model = Opportunity
@@ -188,9 +172,6 @@ class OpportunitySerializer(serializers.ModelSerializer):
     def get_days_in_stage(self, obj):
         from django.utils import timezone
         return (timezone.now() - obj.updated_at).days
-    
-    def get_quotation_count(self, obj):
-        return obj.quotations.count()
 
 
 # ============ Contract ============
@@ -0,0 +1,55 @@
+"""
+Dashboard snapshot metrics for the CRM dashboard
+"""
+from django.db.models import F
+
+from apps.core.snapshots import DashboardSnapshot, SnapshotMetric
+from apps.crm.models import Client, Lead, Opportunity, Contract
+
+CLOSED_STAGES = ['closed_won', 'closed_lost']
+OPEN_STAGES = [key for key, _label in Opportunity.STAGE_CHOICES if key not in CLOSED_STAGES]
+
+crm_snapshot = DashboardSnapshot('crm')
+
+crm_snapshot.track(
+    Lead,
+    SnapshotMetric('leads', deleted_at__isnull=True),
+    SnapshotMetric('qualified_leads', is_qualified=True, deleted_at__isnull=True),
+    SnapshotMetric('converted_leads', status='converted', deleted_at__isnull=True),
+    SnapshotMetric('leads_by_source', group_by='source', deleted_at__isnull=True),
+)
+
+crm_snapshot.track(
+    Opportunity,
+    SnapshotMetric('opportunities', deleted_at__isnull=True),
+    SnapshotMetric('active_opportunities', stage__in=OPEN_STAGES, deleted_at__isnull=True),
+    SnapshotMetric(
+        'pipeline_value', field='estimated_value',
+        stage__in=OPEN_STAGES, deleted_at__isnull=True
+    ),
+    SnapshotMetric(
+        'weighted_pipeline',
+        value=lambda opportunity: opportunity.estimated_value * opportunity.probability / 100,
+        expression=F('estimated_value') * F('probability') / 100,
+        stage__in=OPEN_STAGES, deleted_at__isnull=True
+    ),
+    SnapshotMetric('won_opportunities', is_won=True, deleted_at__isnull=True),
+    SnapshotMetric('won_revenue', field='estimated_value', is_won=True, deleted_at__isnull=True),
+    SnapshotMetric('closed_opportunities', stage__in=CLOSED_STAGES, deleted_at__isnull=True),
+    SnapshotMetric('opportunities_by_stage', group_by='stage', deleted_at__isnull=True),
+    SnapshotMetric(
+        'opportunity_value_by_stage', field='estimated_value', group_by='stage',
+        deleted_at__isnull=True
+    ),
+)
+
+crm_snapshot.track(
+    Client,
+    SnapshotMetric('clients', deleted_at__isnull=True),
+    SnapshotMetric('active_clients', status='active', deleted_at__isnull=True),
+)
+
+crm_snapshot.track(
+    Contract,
+    SnapshotMetric('active_contracts', status='active', deleted_at__isnull=True),
+)
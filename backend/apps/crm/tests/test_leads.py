@@ -0,0 +1,82 @@
+"""
+Cached lead list: per-user scope and invalidation
+"""
+from datetime import date
+
+import pytest
+from rest_framework.test import APIClient
+
+from apps.authentication.models import User
+from apps.crm.models import Lead
+from apps.hr.models import Department, Employee, Position
+
+pytestmark = pytest.mark.django_db
+
+
+def make_employee(email):
+    department, _ = Department.objects.get_or_create(code='SLS', defaults={'name': 'Sales'})
+    position, _ = Position.objects.get_or_create(
+        code='AE', defaults={
+            'title': 'Account Executive', 'level': 'staff', 'department': department,
+            'min_salary': 1, 'max_salary': 2,
+        },
+    )
+    user = User.objects.create_user(email=email, password='password123')
+    return Employee.objects.create(
+        user=user, employee_id=email.split('@')[0], first_name='Test', last_name='User', email=email,
+        phone='1', date_of_birth=date(1990, 1, 1), gender='male', marital_status='single',
+        id_card_number=email, tax_id=email, address='-', city='-', province='-', postal_code='1',
+        employment_type='permanent', join_date=date(2020, 1, 1), department=department, position=position,
+        base_salary=1000, bank_name='-', bank_account_number='1', bank_account_holder='-',
+        emergency_contact_name='-', emergency_contact_relationship='-', emergency_contact_phone='1',
+    )
+
+
+def client_for(employee):
+    client = APIClient()
+    client.force_authenticate(User.objects.get(pk=employee.user_id))
+    return client
+
+
+def make_lead(number, employee):
+    return Lead.objects.create(
+        lead_number=number, contact_name=f"Contact {number}", email='lead@example.com',
+        phone='1', source='website', assigned_to=employee,
+    )
+
+
+def lead_numbers(response):
+    return sorted(lead['lead_number'] for lead in response.json()['results'])
+
+
+def test_each_user_gets_their_own_cached_list():
+    ana, bo = make_employee('ana@example.com'), make_employee('bo@example.com')
+    make_lead('L-1', ana)
+    make_lead('L-2', bo)
+
+    assert lead_numbers(client_for(ana).get('/api/v1/crm/leads/')) == ['L-1']
+    assert lead_numbers(client_for(bo).get('/api/v1/crm/leads/')) == ['L-2']
+
+
+def test_changes_outside_the_view_invalidate_the_list(django_capture_on_commit_callbacks):
+    ana = make_employee('ana@example.com')
+    lead = make_lead('L-1', ana)
+    client = client_for(ana)
+    assert client.get('/api/v1/crm/leads/').json()['results'][0]['contact_name'] == 'Contact L-1'
+
+    with django_capture_on_commit_callbacks(execute=True):
+        client.patch(f'/api/v1/crm/leads/{lead.pk}/', {'contact_name': 'Renamed'}, format='json')
+
+    assert client.get('/api/v1/crm/leads/').json()['results'][0]['contact_name'] == 'Renamed'
+
+
+def test_cache_hit_answers_conditional_requests():
+    ana = make_employee('ana@example.com')
+    make_lead('L-1', ana)
+    client = client_for(ana)
+    first = client.get('/api/v1/crm/leads/')
+
+    cached = client.get('/api/v1/crm/leads/', HTTP_IF_NONE_MATCH=first['ETag'])
+
+    assert cached.status_code == 304
+    assert cached['ETag'] == first['ETag']
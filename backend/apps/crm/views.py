@@ -12,6 +12,9 @@ from datetime import timedelta
 from decimal import Decimal
 
 from apps.authentication.permissions import IsAdminOrReadOnly
+from apps.core.aggregates import aggregate_metrics, count_if
+from apps.core.mixins import CachedQueryMixin, ComputedFieldsMixin, ConditionalGetMixin
+from apps.core.query_inspector import query_budget
 from apps.crm.models import (
     Client, Lead, Opportunity, Contract, Quotation, QuotationLine, FollowUp
 )
@@ -23,14 +26,16 @@ from apps.crm.serializers import (
     QuotationListSerializer, QuotationSerializer, QuotationLineSerializer,
     FollowUpListSerializer, FollowUpSerializer
 )
+from apps.crm.snapshots import crm_snapshot
 
 
 # ============ Client ============
 
-class ClientListView(generics.ListCreateAPIView):
+class ClientListView(ComputedFieldsMixin, ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create clients"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = ClientListSerializer
+    query_budget = 4
     
     def get_queryset(self):
         queryset = Client.objects.filter(deleted_at__isnull=True)
@@ -62,10 +67,11 @@ class ClientListView(generics.ListCreateAPIView):
         return queryset.select_related('account_manager')
 
 
-class ClientDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ClientDetailView(ComputedFieldsMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete client"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = ClientSerializer
+    query_budget = 4
     
     def get_queryset(self):
         return Client.objects.filter(deleted_at__isnull=True)
@@ -78,10 +84,13 @@ class ClientDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============ Lead ============
 
-class LeadListView(generics.ListCreateAPIView):
-    """List and create leads"""
+class LeadListView(CachedQueryMixin, ConditionalGetMixin, generics.ListCreateAPIView):
+    """List and create leads (cached per staff/own-leads scope)"""
     permission_classes = [IsAuthenticated]
     serializer_class = LeadListSerializer
+    query_budget = 4
+    cache_key_prefix = 'leads'
+    cache_invalidated_by = ['crm.Lead', 'hr.Employee']
     
     def get_queryset(self):
         queryset = Lead.objects.filter(deleted_at__isnull=True)
@@ -124,10 +133,11 @@ class LeadListView(generics.ListCreateAPIView):
         return queryset.select_related('assigned_to')
 
 
-class LeadDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LeadDetailView(ComputedFieldsMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete lead"""
     permission_classes = [IsAuthenticated]
     serializer_class = LeadSerializer
+    query_budget = 4
     
     def get_queryset(self):
         queryset = Lead.objects.filter(deleted_at__isnull=True)
@@ -191,10 +201,11 @@ def lead_convert(request, pk):
 
 # ============ Opportunity ============
 
-class OpportunityListView(generics.ListCreateAPIView):
+class OpportunityListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create opportunities"""
     permission_classes = [IsAuthenticated]
     serializer_class = OpportunityListSerializer
+    query_budget = 4
     
     def get_queryset(self):
         queryset = Opportunity.objects.filter(deleted_at__isnull=True)
@@ -235,10 +246,11 @@ class OpportunityListView(generics.ListCreateAPIView):
         return queryset.select_related('client', 'owner')
 
 
-class OpportunityDetailView(generics.RetrieveUpdateDestroyAPIView):
+class OpportunityDetailView(ComputedFieldsMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete opportunity"""
     permission_classes = [IsAuthenticated]
     serializer_class = OpportunitySerializer
+    query_budget = 4
     
     def get_queryset(self):
         queryset = Opportunity.objects.filter(deleted_at__isnull=True)
@@ -305,7 +317,7 @@ def opportunity_move_stage(request, pk):
 
 # ============ Contract ============
 
-class ContractListView(generics.ListCreateAPIView):
+class ContractListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create contracts"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = ContractListSerializer
@@ -349,7 +361,7 @@ class ContractListView(generics.ListCreateAPIView):
         return queryset.select_related('client', 'owner')
 
 
-class ContractDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ContractDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete contract"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = ContractSerializer
@@ -365,7 +377,7 @@ class ContractDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============ Quotation ============
 
-class QuotationListView(generics.ListCreateAPIView):
+class QuotationListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create quotations"""
     permission_classes = [IsAuthenticated]
     serializer_class = QuotationListSerializer
@@ -404,10 +416,11 @@ class QuotationListView(generics.ListCreateAPIView):
         return queryset.select_related('client', 'prepared_by')
 
 
-class QuotationDetailView(generics.RetrieveUpdateDestroyAPIView):
+class QuotationDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete quotation"""
     permission_classes = [IsAuthenticated]
     serializer_class = QuotationSerializer
+    etag_related = ['lines']
     
     def get_queryset(self):
         queryset = Quotation.objects.filter(deleted_at__isnull=True)
@@ -482,7 +495,7 @@ def quotation_reject(request, pk):
 
 # ============ Follow Up ============
 
-class FollowUpListView(generics.ListCreateAPIView):
+class FollowUpListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create follow-ups"""
     permission_classes = [IsAuthenticated]
     serializer_class = FollowUpListSerializer
@@ -529,7 +542,7 @@ class FollowUpListView(generics.ListCreateAPIView):
         return queryset.select_related('assigned_to', 'client', 'lead', 'opportunity')
 
 
-class FollowUpDetailView(generics.RetrieveUpdateDestroyAPIView):
+class FollowUpDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete follow-up"""
     permission_classes = [IsAuthenticated]
     serializer_class = FollowUpSerializer
@@ -581,6 +594,7 @@ def followup_complete(request, pk):
 
 # ============ Dashboard ============
 
+@query_budget(6)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def crm_dashboard(request):
@@ -588,76 +602,63 @@ def crm_dashboard(request):
     today = timezone.now().date()
     current_month_start = today.replace(day=1)
     
-    # Lead metrics
-    leads = Lead.objects.filter(deleted_at__isnull=True)
-    
-    total_leads = leads.count()
-    new_leads_this_month = leads.filter(created_at__gte=current_month_start).count()
-    qualified_leads = leads.filter(is_qualified=True).count()
-    conversion_rate = (leads.filter(status='converted').count() / total_leads * 100) if total_leads > 0 else 0
+    # Running totals from the materialized snapshot
+    snapshot = crm_snapshot.read()
     
-    leads_by_source = leads.values('source').annotate(count=Count('id')).order_by('-count')
+    # Lead metrics
+    total_leads = snapshot.count('leads')
+    qualified_leads = snapshot.count('qualified_leads')
+    conversion_rate = (snapshot.count('converted_leads') / total_leads * 100) if total_leads > 0 else 0
+    
+    leads_by_source = sorted(
+        (
+            {'source': source, 'count': int(count)}
+            for source, count in snapshot.group('leads_by_source').items()
+            if count
+        ),
+        key=lambda item: -item['count']
+    )
     
     # Opportunity metrics
-    opportunities = Opportunity.objects.filter(deleted_at__isnull=True)
-    
-    total_opportunities = opportunities.count()
-    active_opportunities = opportunities.exclude(stage__in=['closed_won', 'closed_lost']).count()
-    
-    pipeline_value = opportunities.exclude(stage__in=['closed_won', 'closed_lost']).aggregate(
-        total=Coalesce(Sum('estimated_value'), Decimal('0'), output_field=DecimalField())
-    )['total']
-    
-    weighted_pipeline = opportunities.exclude(stage__in=['closed_won', 'closed_lost']).aggregate(
-        total=Coalesce(
-            Sum(F('estimated_value') * F('probability') / 100, output_field=DecimalField()),
-            Decimal('0'),
-            output_field=DecimalField()
-        )
-    )['total']
-    
-    won_revenue = opportunities.filter(is_won=True).aggregate(
-        total=Coalesce(Sum('estimated_value'), Decimal('0'), output_field=DecimalField())
-    )['total']
-    
-    win_rate = (opportunities.filter(is_won=True).count() / 
-                opportunities.filter(stage__in=['closed_won', 'closed_lost']).count() * 100) \
-                if opportunities.filter(stage__in=['closed_won', 'closed_lost']).count() > 0 else 0
-    
-    opportunities_by_stage = opportunities.values('stage').annotate(
-        count=Count('id'),
-        value=Coalesce(Sum('estimated_value'), Decimal('0'), output_field=DecimalField())
-    ).order_by('stage')
-    
-    # Client metrics
-    clients = Client.objects.filter(deleted_at__isnull=True)
-    
-    total_clients = clients.count()
-    active_clients = clients.filter(status='active').count()
-    
-    # Contract metrics
-    contracts = Contract.objects.filter(deleted_at__isnull=True)
+    closed_opportunities = snapshot.count('closed_opportunities')
+    win_rate = (snapshot.count('won_opportunities') / closed_opportunities * 100) \
+                if closed_opportunities > 0 else 0
+    
+    stage_values = snapshot.group('opportunity_value_by_stage')
+    opportunities_by_stage = [
+        {
+            'stage': stage,
+            'count': int(count),
+            'value': float(stage_values.get(stage, 0))
+        }
+        for stage, count in sorted(snapshot.group('opportunities_by_stage').items())
+        if count
+    ]
+    
+    # Date-relative metrics are computed live
+    new_leads_this_month = Lead.objects.filter(
+        deleted_at__isnull=True,
+        created_at__gte=current_month_start
+    ).count()
     
-    active_contracts = contracts.filter(status='active').count()
-    expiring_contracts = contracts.filter(
+    expiring_contracts = Contract.objects.filter(
+        deleted_at__isnull=True,
         status='active',
         end_date__gte=today,
         end_date__lte=today + timedelta(days=30)
     ).count()
     
     # Follow-up metrics
-    followups = FollowUp.objects.filter(deleted_at__isnull=True)
-    
-    upcoming_followups = followups.filter(
-        status='planned',
-        scheduled_date__gte=today,
-        scheduled_date__lte=today + timedelta(days=7)
-    ).count()
-    
-    overdue_followups = followups.filter(
-        status='planned',
-        scheduled_date__lt=today
-    ).count()
+    followup_metrics = aggregate_metrics(
+        FollowUp.objects.filter(deleted_at__isnull=True, status='planned'),
+        {
+            'upcoming': count_if(
+                scheduled_date__gte=today,
+                scheduled_date__lte=today + timedelta(days=7)
+            ),
+            'overdue': count_if(scheduled_date__lt=today),
+        }
+    )
     
     return Response({
         'leads': {
@@ -665,40 +666,27 @@ def crm_dashboard(request):
             'new_this_month': new_leads_this_month,
             'qualified': qualified_leads,
             'conversion_rate': round(conversion_rate, 2),
-            'by_source': [
-                {
-                    'source': item['source'],
-                    'count': item['count']
-                }
-                for item in leads_by_source
-            ]
+            'by_source': leads_by_source
         },
         'opportunities': {
-            'total': total_opportunities,
-            'active': active_opportunities,
-            'pipeline_value': float(pipeline_value),
-            'weighted_pipeline': float(weighted_pipeline),
-            'won_revenue': float(won_revenue),
+            'total': snapshot.count('opportunities'),
+            'active': snapshot.count('active_opportunities'),
+            'pipeline_value': snapshot.amount('pipeline_value'),
+            'weighted_pipeline': snapshot.amount('weighted_pipeline'),
+            'won_revenue': snapshot.amount('won_revenue'),
             'win_rate': round(win_rate, 2),
-            'by_stage': [
-                {
-                    'stage': item['stage'],
-                    'count': item['count'],
-                    'value': float(item['value'])
-                }
-                for item in opportunities_by_stage
-            ]
+            'by_stage': opportunities_by_stage
         },
         'clients': {
-            'total': total_clients,
-            'active': active_clients
+            'total': snapshot.count('clients'),
+            'active': snapshot.count('active_clients')
         },
         'contracts': {
-            'active': active_contracts,
+            'active': snapshot.count('active_contracts'),
             'expiring_soon': expiring_contracts
         },
         'follow_ups': {
-            'upcoming_7_days': upcoming_followups,
-            'overdue': overdue_followups
+            'upcoming_7_days': followup_metrics['upcoming'],
+            'overdue': followup_metrics['overdue']
         }
     })
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class DmsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.dms'
+    verbose_name = 'Document Management'
+
+    def ready(self):
+        # Connect the file reference counting and text extraction handlers
+        # (blobs first: it fills in the checksums extraction reads)
+        from apps.dms import blobs, extraction  # noqa: F401
@@ -0,0 +1,265 @@
+"""
+Reference counting and garbage collection of stored document files
+
+Document and version files live in content-addressed storage
+(``apps/dms/storage.py``), one blob per distinct content. ``FileBlob``
+counts the ``Document`` and ``DocumentVersion`` rows pointing at each blob:
+
+* creating a row, or replacing its file, adds a reference (and fills in
+  ``checksum`` when the upload did not carry one)
+* deleting a row, or replacing its file, releases one; at zero the blob is
+  marked orphaned
+
+Soft-deleting a document keeps its file. ``purge_deleted_documents`` hard
+deletes documents soft-deleted more than ``DMS_PURGE_AFTER_DAYS`` ago (their
+versions cascade) and then runs ``collect_blobs``, which removes blobs
+orphaned for longer than ``BLOB_GRACE`` after checking that no row points
+at them any more. It deletes each file while holding the blob's row lock,
+the same lock ``ContentAddressedStorage.store`` and ``add_reference`` take
+before reusing a blob, so an upload of the same content either keeps the
+blob or writes it again. Run it with
+``python manage.py purge_deleted_documents`` or schedule
+``apps.dms.blobs.purge_deleted_documents`` as a ``ScheduledJob``.
+
+``dedupe_stored_files`` moves files uploaded before content addressing
+into blob storage.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from apps.dms.models import Document, DocumentVersion, FileBlob
+from apps.dms.storage import document_storage
+
+logger = logging.getLogger(__name__)
+
+# How long an unreferenced blob is kept; an upload of the same content
+# within it reuses the blob instead of racing its deletion
+BLOB_GRACE = timedelta(hours=1)
+
+BATCH_SIZE = 500
+
+# Models whose ``file`` is stored in ``document_storage``
+FILE_MODELS = (Document, DocumentVersion)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ----- Reference counting -----
+
+def add_reference(name, size=0):
+    """Count one more row using the blob ``name`` (no-op for files outside blob storage)"""
+    if not document_storage.is_blob(name):
+        return
+    with transaction.atomic():
+        # Waits for a collect_blobs deleting the blob; the upload wrote it again then
+        blob, created = FileBlob.objects.select_for_update().get_or_create(
+            name=name,
+            defaults={'checksum': document_storage.checksum(name), 'size': size, 'ref_count': 1},
+        )
+        if not created:
+            FileBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1, orphaned_at=None)
+
+
+def track_unreferenced(name, size=0):
+    """Make a stored blob no row uses yet known to ``collect_blobs``"""
+    if not document_storage.is_blob(name):
+        return
+    try:
+        with transaction.atomic():
+            FileBlob.objects.get_or_create(
+                name=name,
+                defaults={
+                    'checksum': document_storage.checksum(name),
+                    'size': size,
+                    'orphaned_at': timezone.now(),
+                },
+            )
+    except IntegrityError:
+        # Created by a concurrent upload, which counts its own reference
+        pass
+
+
+def release_reference(name):
+    """Count one row less using the blob ``name``; at zero it is orphaned"""
+    if not document_storage.is_blob(name):
+        return
+    FileBlob.objects.filter(name=name).update(ref_count=F('ref_count') - 1)
+    FileBlob.objects.filter(name=name, ref_count__lte=0, orphaned_at__isnull=True).update(
+        orphaned_at=timezone.now()
+    )
+
+
+def _file_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and 'file' not in update_fields:
+        return
+    instance._blob_previous = sender._base_manager.filter(pk=instance.pk).values_list('file', flat=True).first()
+
+
+def _file_post_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    name = instance.file.name
+    previous = instance.__dict__.pop('_blob_previous', None)
+    if not created and (previous is None or previous == name):
+        return
+
+    add_reference(name, instance.file_size)
+    if previous:
+        release_reference(previous)
+
+    if document_storage.is_blob(name) and instance.checksum != document_storage.checksum(name):
+        instance.checksum = document_storage.checksum(name)
+        sender._base_manager.filter(pk=instance.pk).update(checksum=instance.checksum)
+
+
+def _file_post_delete(sender, instance, **kwargs):
+    release_reference(instance.file.name)
+
+
+for model in FILE_MODELS:
+    uid = f"dms_blobs_{model._meta.model_name}"
+    pre_save.connect(_file_pre_save, sender=model, dispatch_uid=uid)
+    post_save.connect(_file_post_save, sender=model, dispatch_uid=uid)
+    post_delete.connect(_file_post_delete, sender=model, dispatch_uid=uid)
+
+
+# ----- Garbage collection -----
+
+def references(name):
+    """Rows pointing at the stored file ``name``"""
+    return sum(model._base_manager.filter(file=name).count() for model in FILE_MODELS)
+
+
+def collect_blobs(grace=BLOB_GRACE):
+    """
+    Delete blobs without references that were orphaned more than ``grace`` ago
+
+    Returns:
+        tuple: (blobs deleted, bytes freed)
+    """
+    deleted = freed = 0
+    cutoff = timezone.now() - grace
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            orphans = FileBlob.objects.filter(
+                pk__gt=last_pk, ref_count__lte=0, orphaned_at__lte=cutoff
+            ).order_by('pk')
+            if connection.features.has_select_for_update_skip_locked:
+                orphans = orphans.select_for_update(skip_locked=True)
+            batch = list(orphans[:BATCH_SIZE])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            for blob in batch:
+                count = references(blob.name)
+                if count:
+                    # The count drifted (e.g. rows written with bulk_create): trust the rows
+                    logger.warning(f"Blob {blob.name} is still used by {count} rows; keeping it")
+                    FileBlob.objects.filter(pk=blob.pk).update(ref_count=count, orphaned_at=None)
+                    continue
+
+                # The file goes while the row is locked: store() waits for it
+                # and then writes the content again instead of reusing it
+                try:
+                    with transaction.atomic():
+                        if not FileBlob.objects.filter(
+                            pk=blob.pk, ref_count__lte=0, orphaned_at__lte=cutoff
+                        ).delete()[0]:
+                            continue
+                        document_storage.backend.delete(blob.name)
+                except Exception as e:
+                    logger.error(f"Failed to delete blob {blob.name}: {e}")
+                    continue
+                deleted += 1
+                freed += blob.size
+    return deleted, freed
+
+
+def purge_deleted_documents(days=None):
+    """
+    Hard delete documents soft-deleted more than ``days`` ago, then collect unused blobs
+
+    Returns:
+        dict: documents purged, blobs deleted, bytes freed
+    """
+    if days is None:
+        days = _setting('DMS_PURGE_AFTER_DAYS', 30)
+    cutoff = timezone.now() - timedelta(days=days)
+
+    purged = 0
+    while True:
+        ids = list(
+            Document.objects.filter(deleted_at__isnull=False, deleted_at__lte=cutoff)
+            .values_list('pk', flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            # The collector sends post_delete for every document and cascaded
+            # version, which releases their file references
+            _, counts = Document.objects.filter(pk__in=ids).delete()
+        purged += counts.get(Document._meta.label, 0)
+
+    blobs, freed = collect_blobs()
+    return {'documents': purged, 'blobs': blobs, 'bytes': freed}
+
+
+# ----- Files stored before content addressing -----
+
+def dedupe_stored_files(model, batch_size=BATCH_SIZE):
+    """
+    Move ``model`` files stored under their upload name into blob storage
+
+    Each file is hashed and stored once (if its content is not stored
+    already), the row is pointed at the blob and the old copy is deleted
+    once no row uses it. Missing files are left as they are.
+
+    Returns:
+        tuple: (files moved, files missing, bytes freed)
+    """
+    moved = missing = freed = 0
+    last_pk = 0
+    while True:
+        rows = list(
+            model._base_manager.filter(pk__gt=last_pk)
+            .exclude(file='')
+            .exclude(file__startswith=f"{document_storage.location}/")
+            .order_by('pk')
+            .values_list('pk', 'file')[:batch_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+
+        for pk, name in rows:
+            backend = document_storage.backend
+            try:
+                with backend.open(name, 'rb') as stored:
+                    blob, written = document_storage.store(name, stored)
+                size = backend.size(name)
+            except FileNotFoundError:
+                logger.info(f"{model._meta.label} {pk}: {name} is missing")
+                missing += 1
+                continue
+
+            with transaction.atomic():
+                model._base_manager.filter(pk=pk).update(file=blob, checksum=document_storage.checksum(blob))
+                add_reference(blob, size)
+            if not references(name):
+                backend.delete(name)
+                if not written:
+                    freed += size
+            moved += 1
+    return moved, missing, freed
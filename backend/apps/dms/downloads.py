@@ -0,0 +1,204 @@
+"""
+Document file downloads
+
+``POST /dms/documents/<id>/download/`` checks the caller's access once,
+counts and logs the download and answers with a short-lived signed link:
+
+    /api/v1/dms/documents/<id>/file/?expires=<unix time>&signature=<hex>
+
+The signature is an HMAC-SHA256 (keyed by ``SECRET_KEY``) of the document
+id, its stored file name and the expiry, so the link stops working after
+``DMS_DOWNLOAD_URL_TTL`` seconds or once the file is replaced. Following it
+costs one primary key lookup and no access query, however many range
+requests a download manager makes within that time.
+
+The bytes are not sent by Python when a front proxy can do it
+(``DMS_SENDFILE_BACKEND``):
+
+* ``nginx``: ``X-Accel-Redirect`` to ``DMS_SENDFILE_URL`` + file name, an
+  ``internal`` location aliasing ``MEDIA_ROOT``
+* ``apache``: ``X-Sendfile`` with the file's path (mod_xsendfile)
+* storage without local files (S3): a redirect to the storage URL
+
+The proxy or the object store then handles ``Range`` requests. Conditional
+requests (``If-None-Match`` on the content checksum, ``If-Modified-Since``)
+are answered here first. Without a backend (development), Django streams
+the file itself and serves single byte ranges (``206``) too.
+"""
+import mimetypes
+import re
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from apps.dms.models import Document
+from apps.dms.storage import document_storage
+
+SIGNING_SALT = 'apps.dms.downloads'
+
+# Bytes read per iteration when Django streams a range itself
+STREAM_BLOCK = 64 * 1024
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ----- Signed links -----
+
+def sign(document_id, file_name, expires):
+    message = f"{document_id}:{file_name}:{expires}"
+    return salted_hmac(SIGNING_SALT, message, algorithm='sha256').hexdigest()
+
+
+def signed_url(request, document, ttl=None):
+    """
+    Absolute download link for ``document``, valid for ``ttl`` seconds
+
+    Returns:
+        tuple: (url, expiry datetime)
+    """
+    expires = int(time.time()) + (ttl or _setting('DMS_DOWNLOAD_URL_TTL', 300))
+    query = urlencode({'expires': expires, 'signature': sign(document.pk, document.file.name, expires)})
+    path = reverse('dms:document-file', args=[document.pk])
+    return request.build_absolute_uri(f"{path}?{query}"), datetime.fromtimestamp(expires, tz=timezone.utc)
+
+
+def document_file(request, pk):
+    """Serve a document file to a link signed by ``document_download``"""
+    if request.method not in ('GET', 'HEAD'):
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    try:
+        expires = int(request.GET.get('expires', ''))
+    except ValueError:
+        expires = 0
+    if expires < time.time():
+        return JsonResponse({'error': 'Download link expired'}, status=403)
+
+    document = Document.objects.filter(pk=pk, deleted_at__isnull=True).only(
+        'file', 'file_name', 'mime_type', 'checksum', 'updated_at'
+    ).first()
+    signature = request.GET.get('signature', '')
+    if document is None or not constant_time_compare(sign(pk, document.file.name, expires), signature):
+        return JsonResponse({'error': 'Invalid download link'}, status=403)
+    return serve(request, document)
+
+
+# ----- Serving -----
+
+def serve(request, document):
+    """Response sending ``document``'s file, offloaded where possible"""
+    name = document.file.name
+    # Content-addressed files never change under the same checksum
+    etag = f'"{document.checksum}"' if document.checksum else None
+    last_modified = int(document.updated_at.timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    try:
+        path = document_storage.path(name)
+    except NotImplementedError:
+        # Object storage serves ranges itself; its URLs are signed as well
+        return HttpResponseRedirect(document_storage.url(name))
+
+    backend = _setting('DMS_SENDFILE_BACKEND', '')
+    if backend == 'nginx':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = quote(f"{_setting('DMS_SENDFILE_URL', '/protected-media/')}{name}")
+    elif backend == 'apache':
+        response = HttpResponse()
+        response['X-Sendfile'] = path
+    else:
+        response = _stream(request, document, etag, last_modified)
+
+    content_type = document.mime_type or mimetypes.guess_type(document.file_name)[0]
+    response['Content-Type'] = content_type or 'application/octet-stream'
+    response['Content-Disposition'] = content_disposition_header(True, document.file_name)
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private'
+    if etag:
+        response['ETag'] = etag
+    return response
+
+
+def byte_range(request, size, etag, last_modified):
+    """
+    ``(start, length)`` of the single byte range requested, if any
+
+    Returns None to send the whole file: no or several ranges, or an
+    ``If-Range`` that no longer matches. Raises ValueError when the range
+    cannot be satisfied.
+    """
+    header = request.META.get('HTTP_RANGE', '').replace(' ', '')
+    match = _RANGE.match(header)
+    if not match or match.groups() == ('', ''):
+        return None
+
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range:
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            if if_range != etag:
+                return None
+        elif parse_http_date_safe(if_range) != last_modified:
+            return None
+
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = min(int(last), size)
+        if not length:
+            raise ValueError('Empty suffix range')
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Range starts past the end of the file')
+    return start, end - start + 1
+
+
+def _stream(request, document, etag, last_modified):
+    file = document_storage.open(document.file.name, 'rb')
+    size = file.size
+    try:
+        requested = byte_range(request, size, etag, last_modified)
+    except ValueError:
+        file.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f"bytes */{size}"
+        return response
+
+    if requested is None:
+        # Whole file: the WSGI server's file wrapper may use sendfile()
+        response = FileResponse(file)
+    else:
+        start, length = requested
+        response = StreamingHttpResponse(_read_range(file, start, length), status=206)
+        response['Content-Range'] = f"bytes {start}-{start + length - 1}/{size}"
+        response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _read_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            data = file.read(min(STREAM_BLOCK, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        file.close()
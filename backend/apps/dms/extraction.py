@@ -0,0 +1,424 @@
+"""
+Text extraction for uploaded documents
+
+A new ``Document`` (or a changed ``Document.file``) and every new
+``DocumentVersion`` mark the document's ``DocumentContent`` row pending and
+wake the extraction worker after the transaction commits. The worker claims
+pending rows (``SKIP LOCKED`` on PostgreSQL, plus a lease) and for each:
+
+* streams the file from storage once to compute its SHA-256; when it equals
+  the ``checksum`` of the text already stored, the file is not parsed again
+* picks an extractor by file extension: PDF (pypdf, page by page), DOCX
+  (``word/document.xml`` parsed incrementally), XLSX (openpyxl read-only,
+  row by row) and plain text (decoded in chunks); other files are marked
+  ``unsupported``
+* normalizes the text (NFKC, control characters dropped, whitespace
+  collapsed) and stops reading at ``DMS_EXTRACTION_MAX_CHARS``
+
+The text lives in its own table so ``documents`` rows stay small; on
+PostgreSQL a trigger adds it to ``Document.search_vector`` at weight D
+(migration ``dms.0004_document_content``).
+
+``run_extraction_worker`` spreads the files over a forked process pool.
+The Celery task extracts in its worker process: prefork workers are
+daemonic and cannot fork a pool of their own, the Celery pool is the
+parallelism there.
+"""
+import codecs
+import hashlib
+import logging
+import os
+import re
+import signal
+import threading
+import unicodedata
+import zipfile
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from multiprocessing import TimeoutError as PoolTimeoutError, get_all_start_methods, get_context
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, connections, transaction
+from django.db.models import F, Q
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from apps.dms.models import Document, DocumentContent, DocumentVersion
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from storage at a time
+READ_CHUNK = 1024 * 1024
+
+# Rows claimed per batch for each worker process
+CLAIM_PER_WORKER = 4
+
+_CONTROL = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f\u200b-\u200d\u2060\ufeff]')
+_SPACES = re.compile(r'[^\S\n]+')
+_BREAKS = re.compile(r' ?\n\s*')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class ExtractionTimeout(Exception):
+    """A file took longer than ``DMS_EXTRACTION_TIMEOUT`` to extract"""
+
+
+# ----- Extractors -----
+
+# file extension -> function(file) yielding pieces of text
+EXTRACTORS = {}
+
+
+def extractor(*extensions):
+    """Register the decorated generator for the given file extensions"""
+    def register(func):
+        for extension in extensions:
+            EXTRACTORS[extension] = func
+        return func
+    return register
+
+
+@extractor('pdf')
+def extract_pdf(file):
+    from pypdf import PdfReader
+
+    reader = PdfReader(file)
+    if reader.is_encrypted:
+        # Only PDFs protected by an owner password (empty user password) open
+        reader.decrypt('')
+    for page in reader.pages:
+        yield page.extract_text() or ''
+
+
+_WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+@extractor('docx')
+def extract_docx(file):
+    with zipfile.ZipFile(file) as archive, archive.open('word/document.xml') as xml:
+        paragraph = []
+        for _event, element in ElementTree.iterparse(xml, events=('end',)):
+            if element.tag == f'{_WORD_NS}t':
+                paragraph.append(element.text or '')
+            elif element.tag in (f'{_WORD_NS}tab', f'{_WORD_NS}br'):
+                paragraph.append(' ')
+            elif element.tag == f'{_WORD_NS}p':
+                yield ''.join(paragraph)
+                paragraph = []
+                element.clear()
+
+
+@extractor('xlsx')
+def extract_xlsx(file):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield sheet.title
+            for row in sheet.iter_rows(values_only=True):
+                yield ' '.join(str(value) for value in row if value is not None)
+    finally:
+        workbook.close()
+
+
+@extractor('txt', 'text', 'csv', 'tsv', 'md', 'log', 'json', 'xml')
+def extract_plain_text(file):
+    # Undecodable bytes become U+FFFD instead of failing the file
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    for chunk in iter(lambda: file.read(READ_CHUNK), b''):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+
+def file_extension(name):
+    return os.path.splitext(name)[1].lstrip('.').lower()
+
+
+def file_checksum(file):
+    """SHA-256 of ``file``, read in chunks; leaves it rewound"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(READ_CHUNK), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def normalize_text(text):
+    """NFKC, no control characters, single spaces and single line breaks"""
+    text = unicodedata.normalize('NFKC', text)
+    text = _CONTROL.sub(' ', text)
+    text = _SPACES.sub(' ', text)
+    return _BREAKS.sub('\n', text).strip()
+
+
+def read_text(pieces, limit):
+    """
+    Normalized text of the ``pieces`` an extractor yields, up to ``limit`` characters
+
+    Stops consuming the extractor once the limit is reached, so the rest
+    of a large file is never read.
+
+    Returns:
+        tuple: (text, whether it was truncated)
+    """
+    parts = []
+    length = 0
+    truncated = False
+    for piece in pieces:
+        piece = normalize_text(piece)
+        if not piece:
+            continue
+        parts.append(piece)
+        length += len(piece) + 1
+        if length > limit:
+            truncated = True
+            break
+    pieces.close()
+    text = normalize_text('\n'.join(parts))
+    return text[:limit], truncated or len(text) > limit
+
+
+@contextmanager
+def time_limit(seconds):
+    """
+    Raise ``ExtractionTimeout`` in the block after ``seconds``
+
+    Uses ``SIGALRM``, so it only applies on the main thread (pool workers,
+    Celery prefork children, the worker command) of Unix processes.
+    """
+    if (
+        not seconds
+        or not hasattr(signal, 'SIGALRM')
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def expire(signum, frame):
+        raise ExtractionTimeout(f"Extraction took longer than {seconds}s")
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+# ----- Queueing -----
+
+def queue_extraction(document_id, file_name, checksum=''):
+    """
+    Mark a document's text as due for extraction from ``file_name``
+
+    Args:
+        file_name: Storage name of the file holding the current content
+        checksum: SHA-256 of that file if known; when it matches the
+            checksum of the stored text, nothing is queued
+
+    Returns:
+        bool: Whether the row was queued
+    """
+    if not file_name:
+        return False
+    content, created = DocumentContent.objects.get_or_create(
+        document_id=document_id, defaults={'source_file': file_name}
+    )
+    if not created:
+        if content.source_file == file_name and content.status != 'failed':
+            return False
+        if checksum and checksum == content.checksum and content.status in ('extracted', 'unsupported'):
+            # Same bytes under another name: the stored text still applies
+            DocumentContent.objects.filter(pk=content.pk).update(
+                source_file=file_name, updated_at=timezone.now()
+            )
+            return False
+        DocumentContent.objects.filter(pk=content.pk).update(
+            source_file=file_name,
+            status='pending',
+            attempts=0,
+            leased_until=None,
+            error='',
+            updated_at=timezone.now(),
+        )
+    transaction.on_commit(wake_extraction)
+    return True
+
+
+def wake_extraction():
+    """Ask a Celery worker to extract pending documents"""
+    from apps.dms.tasks import extract_document_contents
+
+    try:
+        extract_document_contents.delay()
+    except Exception as e:
+        # Pending rows are picked up by the next worker pass
+        logger.warning(f"Could not wake the document extraction worker: {e}")
+
+
+def _document_saved(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if not created and update_fields is not None and 'file' not in update_fields:
+        return
+    # An uploaded file comes with its checksum; a replaced one is hashed by the worker
+    queue_extraction(instance.pk, instance.file.name, instance.checksum if created else '')
+
+
+def _version_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw or not created:
+        return
+    queue_extraction(instance.document_id, instance.file.name, instance.checksum)
+
+
+post_save.connect(_document_saved, sender=Document, dispatch_uid='dms_document_extraction')
+post_save.connect(_version_saved, sender=DocumentVersion, dispatch_uid='dms_version_extraction')
+
+
+# ----- Worker -----
+
+def claim_lease():
+    """How long claimed rows stay hidden from other workers: a batch per worker, with room"""
+    return timedelta(seconds=(CLAIM_PER_WORKER + 1) * _setting('DMS_EXTRACTION_TIMEOUT', 60))
+
+
+def claim_pending_contents(limit):
+    """
+    Lease up to ``limit`` pending rows to this worker
+
+    Every claim counts as an attempt, so a file that crashes or hangs its
+    worker is given up on after ``DMS_EXTRACTION_MAX_ATTEMPTS`` leases.
+
+    Returns:
+        list: Claimed ``DocumentContent`` ids
+    """
+    max_attempts = _setting('DMS_EXTRACTION_MAX_ATTEMPTS', 3)
+    now = timezone.now()
+    with transaction.atomic():
+        DocumentContent.objects.filter(
+            status='pending', attempts__gte=max_attempts, leased_until__lte=now
+        ).update(
+            status='failed',
+            error=f"Gave up after {max_attempts} attempts",
+            leased_until=None,
+            updated_at=now,
+        )
+
+        due = DocumentContent.objects.filter(
+            Q(leased_until__isnull=True) | Q(leased_until__lte=now),
+            status='pending',
+            attempts__lt=max_attempts,
+        ).order_by('updated_at')
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+
+        ids = list(due.values_list('pk', flat=True)[:limit])
+        DocumentContent.objects.filter(pk__in=ids).update(
+            attempts=F('attempts') + 1, leased_until=now + claim_lease()
+        )
+    return ids
+
+
+def extract_content(content_id):
+    """
+    Extract the text of one claimed row (runs in the pool workers)
+
+    Returns:
+        str: 'extracted', 'unchanged', 'unsupported', 'failed', 'retrying'
+        or 'skipped' (no longer pending)
+    """
+    content = DocumentContent.objects.filter(pk=content_id, status='pending').first()
+    if content is None:
+        return 'skipped'
+
+    source = content.source_file
+    extract = EXTRACTORS.get(file_extension(source))
+    fields = {
+        'status': 'extracted' if extract else 'unsupported',
+        'leased_until': None,
+        'error': '',
+    }
+    outcome = fields['status']
+    try:
+        with time_limit(_setting('DMS_EXTRACTION_TIMEOUT', 60)), default_storage.open(source, 'rb') as file:
+            checksum = file_checksum(file)
+            if checksum == content.checksum and content.extracted_at is not None:
+                outcome = 'unchanged'
+            elif extract is None:
+                fields.update(text='', is_truncated=False)
+            else:
+                fields['text'], fields['is_truncated'] = read_text(
+                    extract(file), _setting('DMS_EXTRACTION_MAX_CHARS', 200000)
+                )
+        fields.update(checksum=checksum, extracted_at=timezone.now())
+    except Exception as e:
+        logger.warning(f"Could not extract text from {source} (document {content.document_id}): {e}")
+        gave_up = content.attempts >= _setting('DMS_EXTRACTION_MAX_ATTEMPTS', 3)
+        # A retry waits for the lease to run out
+        fields = {'status': 'failed' if gave_up else 'pending', 'error': str(e)[:2000] or type(e).__name__}
+        outcome = 'failed' if gave_up else 'retrying'
+
+    # Skip the write when the document was queued again with another file meanwhile
+    DocumentContent.objects.filter(pk=content.pk, source_file=source, status='pending').update(
+        **fields, updated_at=timezone.now()
+    )
+    return outcome
+
+
+def drain(workers=1, max_batches=None):
+    """
+    Extract pending contents, one claimed batch at a time, until none are due
+
+    Args:
+        workers: Processes to extract in (1, or SQLite: in this process)
+
+    Returns:
+        Counter: number of rows per outcome
+    """
+    if connection.vendor == 'sqlite' or 'fork' not in get_all_start_methods():
+        workers = 1
+
+    totals = Counter()
+    batches = 0
+    pool = None
+    try:
+        while max_batches is None or batches < max_batches:
+            ids = claim_pending_contents(workers * CLAIM_PER_WORKER)
+            if not ids:
+                break
+            batches += 1
+            if workers == 1:
+                totals.update(map(extract_content, ids))
+                continue
+
+            # Forked workers, including replacements for crashed ones, must
+            # not share the parent's database connections
+            connections.close_all()
+            if pool is None:
+                pool = get_context('fork').Pool(workers)
+            results = [pool.apply_async(extract_content, (pk,)) for pk in ids]
+            deadline = timezone.now() + claim_lease()
+            lost = False
+            for result in results:
+                try:
+                    totals[result.get(timeout=max((deadline - timezone.now()).total_seconds(), 0))] += 1
+                except PoolTimeoutError:
+                    # The worker died or hung; the row is claimed again once its lease runs out
+                    lost = True
+            if lost:
+                pool.terminate()
+                pool.join()
+                pool = None
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return totals
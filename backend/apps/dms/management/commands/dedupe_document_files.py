@@ -0,0 +1,18 @@
+"""
+Management command to move document files into content-addressed storage
+"""
+from django.core.management.base import BaseCommand
+
+from apps.dms.blobs import FILE_MODELS, dedupe_stored_files
+
+
+class Command(BaseCommand):
+    help = 'Store existing document and version files once per content (safe to rerun)'
+
+    def handle(self, *args, **options):
+        for model in FILE_MODELS:
+            moved, missing, freed = dedupe_stored_files(model)
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: {moved} files moved, {missing} missing, "
+                f"{freed / (1024 * 1024):.1f} MB freed"
+            )
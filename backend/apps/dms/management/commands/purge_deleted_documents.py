@@ -0,0 +1,27 @@
+"""
+Management command to purge soft-deleted documents, their unused files and expired uploads
+"""
+from django.core.management.base import BaseCommand
+
+from apps.dms.blobs import purge_deleted_documents
+from apps.dms.uploads import purge_expired_uploads
+
+
+class Command(BaseCommand):
+    help = 'Hard delete documents soft-deleted long ago, remove files nothing uses and drop expired uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Purge documents deleted more than this many days ago (default: DMS_PURGE_AFTER_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        expired = purge_expired_uploads()
+        result = purge_deleted_documents(days=options['days'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {result['documents']} documents; deleted {result['blobs']} unused files "
+            f"({result['bytes'] / (1024 * 1024):.1f} MB) and {expired} expired uploads"
+        ))
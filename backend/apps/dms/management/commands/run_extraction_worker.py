@@ -0,0 +1,45 @@
+"""
+Management command to run the document text extraction worker in the foreground
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.dms.extraction import drain
+
+
+class Command(BaseCommand):
+    help = 'Extract the text of pending documents in a process pool (use --once for a single pass)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Extraction processes (default: one per CPU; SQLite always uses one)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Extract what is pending now and exit',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when nothing is pending (default: 5)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            outcomes = drain(workers=max(options['workers'], 1))
+            if outcomes:
+                summary = ', '.join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items()))
+                self.stdout.write(f"Extracted documents: {summary}")
+            if options['once']:
+                return
+            if not outcomes:
+                time.sleep(options['poll_interval'])
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dms', '0001_initial'),
+        ('hr', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentactivity',
+            index=models.Index(fields=['created_at', 'id'], name='document_ac_created_f8801f_idx'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:33
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Rows re-indexed per UPDATE while backfilling, so no statement locks the archive for long
+BACKFILL_BATCH = 10000
+
+SEARCH_TRIGGER_SQL = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE OR REPLACE FUNCTION documents_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.document_number, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.tags, '') || ' ' || coalesce(NEW.keywords, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(NEW.file_name, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS documents_search_vector_trigger ON documents;
+CREATE TRIGGER documents_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF document_number, title, tags, keywords, description, file_name
+    ON documents FOR EACH ROW EXECUTE FUNCTION documents_search_vector_update();
+"""
+
+SEARCH_INDEXES_SQL = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS documents_search_vector_gin ON documents USING gin (search_vector)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS documents_number_trgm ON documents USING gin (document_number gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS documents_file_name_trgm ON documents USING gin (file_name gin_trgm_ops)",
+]
+
+DROP_SEARCH_SQL = [
+    "DROP INDEX CONCURRENTLY IF EXISTS documents_search_vector_gin",
+    "DROP INDEX CONCURRENTLY IF EXISTS documents_number_trgm",
+    "DROP INDEX CONCURRENTLY IF EXISTS documents_file_name_trgm",
+    "DROP TRIGGER IF EXISTS documents_search_vector_trigger ON documents",
+    "DROP FUNCTION IF EXISTS documents_search_vector_update()",
+]
+
+
+def install_search(apps, schema_editor):
+    """Trigger, backfill and GIN indexes (PostgreSQL only; SQLite keeps ILIKE search)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(SEARCH_TRIGGER_SQL)
+        cursor.execute("SELECT coalesce(min(id), 0), coalesce(max(id), -1) FROM documents")
+        low, high = cursor.fetchone()
+        # Naming a column in SET fires the trigger for the row
+        for start in range(low, high + 1, BACKFILL_BATCH):
+            cursor.execute(
+                "UPDATE documents SET title = title WHERE id >= %s AND id < %s",
+                [start, start + BACKFILL_BATCH],
+            )
+        for statement in SEARCH_INDEXES_SQL:
+            cursor.execute(statement)
+
+
+def remove_search(apps, schema_editor):
+    """Drop what install_search created; pg_trgm stays installed"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP_SEARCH_SQL:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('dms', '0002_document_activity_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(install_search, remove_search),
+    ]
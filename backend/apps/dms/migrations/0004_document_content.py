@@ -0,0 +1,104 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The document trigger of 0003 with the extracted text added at weight D
+CONTENT_SEARCH_SQL = """
+CREATE OR REPLACE FUNCTION documents_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.document_number, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.tags, '') || ' ' || coalesce(NEW.keywords, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(NEW.file_name, '')), 'D') ||
+        setweight(to_tsvector('simple', coalesce(
+            (SELECT text FROM document_contents WHERE document_id = NEW.id), ''
+        )), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+-- New or changed text re-indexes its document through the trigger above
+CREATE OR REPLACE FUNCTION document_contents_reindex() RETURNS trigger AS $$
+BEGIN
+    UPDATE documents SET title = title
+    WHERE id = (CASE WHEN TG_OP = 'DELETE' THEN OLD.document_id ELSE NEW.document_id END);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS document_contents_reindex_trigger ON document_contents;
+CREATE TRIGGER document_contents_reindex_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF text ON document_contents
+    FOR EACH ROW EXECUTE FUNCTION document_contents_reindex();
+"""
+
+METADATA_SEARCH_SQL = """
+DROP TRIGGER IF EXISTS document_contents_reindex_trigger ON document_contents;
+DROP FUNCTION IF EXISTS document_contents_reindex();
+
+CREATE OR REPLACE FUNCTION documents_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.document_number, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(NEW.tags, '') || ' ' || coalesce(NEW.keywords, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(NEW.file_name, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+def install_content_search(apps, schema_editor):
+    """Index the extracted text with the document (PostgreSQL only)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CONTENT_SEARCH_SQL)
+
+
+def remove_content_search(apps, schema_editor):
+    """Back to the metadata-only trigger"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(METADATA_SEARCH_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dms', '0003_document_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('source_file', models.CharField(max_length=255)),
+                ('checksum', models.CharField(blank=True, max_length=64)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('extracted', 'Extracted'), ('unsupported', 'Unsupported'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('text', models.TextField(blank=True)),
+                ('is_truncated', models.BooleanField(default=False)),
+                ('attempts', models.IntegerField(default=0)),
+                ('leased_until', models.DateTimeField(blank=True, null=True)),
+                ('extracted_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('document', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='content', to='dms.document')),
+            ],
+            options={
+                'verbose_name': 'Document Content',
+                'verbose_name_plural': 'Document Contents',
+                'db_table': 'document_contents',
+                'indexes': [models.Index(fields=['status', 'leased_until'], name='document_co_status_2bb5f0_idx')],
+            },
+        ),
+        migrations.RunPython(install_content_search, remove_content_search),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:44
+
+import apps.dms.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dms', '0004_document_content'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='file',
+            field=models.FileField(db_index=True, storage=apps.dms.storage.ContentAddressedStorage(), upload_to='documents/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='documentversion',
+            name='file',
+            field=models.FileField(db_index=True, storage=apps.dms.storage.ContentAddressedStorage(), upload_to='documents/versions/%Y/%m/'),
+        ),
+        migrations.CreateModel(
+            name='FileBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('checksum', models.CharField(db_index=True, max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('orphaned_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'File Blob',
+                'verbose_name_plural': 'File Blobs',
+                'db_table': 'document_file_blobs',
+                'indexes': [models.Index(fields=['ref_count', 'orphaned_at'], name='document_fi_ref_cou_468660_idx')],
+            },
+        ),
+    ]
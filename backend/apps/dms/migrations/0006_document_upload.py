@@ -0,0 +1,39 @@
+# Generated by Django 5.0.1 on 2026-10-17 04:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dms', '0005_file_blobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentUpload',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_size', models.BigIntegerField()),
+                ('mime_type', models.CharField(blank=True, max_length=100)),
+                ('offset', models.BigIntegerField(default=0)),
+                ('parts', models.JSONField(default=list)),
+                ('status', models.CharField(choices=[('uploading', 'Uploading'), ('completing', 'Completing'), ('completed', 'Completed'), ('aborted', 'Aborted')], default='uploading', max_length=20)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_uploads', to=settings.AUTH_USER_MODEL)),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='dms.document')),
+            ],
+            options={
+                'verbose_name': 'Document Upload',
+                'verbose_name_plural': 'Document Uploads',
+                'db_table': 'document_uploads',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -2,8 +2,10 @@
 Document Management System (DMS) models
 """
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import FileExtensionValidator
 from apps.core.models import BaseModel, TimeStampedModel
+from apps.dms.storage import document_storage
 
 
 class Document(BaseModel):
@@ -37,7 +39,7 @@ class Document(BaseModel):
     document_type = models.CharField(max_length=50, choices=DOCUMENT_TYPE_CHOICES)
     
     # File
-    file = models.FileField(upload_to='documents/%Y/%m/')
+    file = models.FileField(upload_to='documents/%Y/%m/', storage=document_storage, db_index=True)
     file_name = models.CharField(max_length=255)
     file_size = models.BigIntegerField()  # in bytes
     file_extension = models.CharField(max_length=10)
@@ -115,6 +117,9 @@ class Document(BaseModel):
     # Checksum for integrity
     checksum = models.CharField(max_length=64, blank=True)
     
+    # Weighted full-text index, filled by a PostgreSQL trigger (see apps/dms/search.py)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     class Meta:
         db_table = 'documents'
         verbose_name = 'Document'
@@ -176,7 +181,7 @@ class DocumentVersion(TimeStampedModel):
     )
     
     version_number = models.CharField(max_length=20)
-    file = models.FileField(upload_to='documents/versions/%Y/%m/')
+    file = models.FileField(upload_to='documents/versions/%Y/%m/', storage=document_storage, db_index=True)
     file_size = models.BigIntegerField()
     checksum = models.CharField(max_length=64, blank=True)
     
@@ -199,6 +204,114 @@ class DocumentVersion(TimeStampedModel):
         return f"{self.document.title} v{self.version_number}"
 
 
+class DocumentUpload(TimeStampedModel):
+    """A resumable upload, sent in chunks before it becomes a document (see apps/dms/uploads.py)"""
+    
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('completing', 'Completing'),
+        ('completed', 'Completed'),
+        ('aborted', 'Aborted'),
+    ]
+    
+    created_by = models.ForeignKey(
+        'authentication.User',
+        on_delete=models.CASCADE,
+        related_name='document_uploads'
+    )
+    
+    file_name = models.CharField(max_length=255)
+    file_size = models.BigIntegerField()  # declared total, in bytes
+    mime_type = models.CharField(max_length=100, blank=True)
+    
+    # Bytes received so far, and the stored chunks as [storage name, size, sha256]
+    offset = models.BigIntegerField(default=0)
+    parts = models.JSONField(default=list)
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading')
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'document_uploads'
+        verbose_name = 'Document Upload'
+        verbose_name_plural = 'Document Uploads'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.file_name} ({self.offset}/{self.file_size})"
+
+
+class FileBlob(TimeStampedModel):
+    """A stored file content and how many documents and versions use it (see apps/dms/blobs.py)"""
+    
+    name = models.CharField(max_length=255, unique=True)  # storage name
+    checksum = models.CharField(max_length=64, db_index=True)  # SHA-256
+    size = models.BigIntegerField()  # in bytes
+    
+    ref_count = models.IntegerField(default=0)
+    orphaned_at = models.DateTimeField(null=True, blank=True)  # when ref_count dropped to 0
+    
+    class Meta:
+        db_table = 'document_file_blobs'
+        verbose_name = 'File Blob'
+        verbose_name_plural = 'File Blobs'
+        indexes = [
+            models.Index(fields=['ref_count', 'orphaned_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} references)"
+
+
+class DocumentContent(TimeStampedModel):
+    """Text extracted from a document's file (see apps/dms/extraction.py)"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('extracted', 'Extracted'),
+        ('unsupported', 'Unsupported'),
+        ('failed', 'Failed'),
+    ]
+    
+    document = models.OneToOneField(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='content'
+    )
+    
+    # Storage name of the file the text is (to be) extracted from
+    source_file = models.CharField(max_length=255)
+    checksum = models.CharField(max_length=64, blank=True)  # SHA-256 of the extracted file
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    text = models.TextField(blank=True)
+    is_truncated = models.BooleanField(default=False)
+    
+    # Worker bookkeeping
+    attempts = models.IntegerField(default=0)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    extracted_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    
+    class Meta:
+        db_table = 'document_contents'
+        verbose_name = 'Document Content'
+        verbose_name_plural = 'Document Contents'
+        indexes = [
+            models.Index(fields=['status', 'leased_until']),
+        ]
+    
+    def __str__(self):
+        return f"{self.document_id} - {self.status}"
+
+
 class DocumentApproval(BaseModel):
     """Document approval workflow"""
     
@@ -421,6 +534,7 @@ class DocumentActivity(TimeStampedModel):
         indexes = [
             models.Index(fields=['document', 'activity_type']),
             models.Index(fields=['user', 'activity_type']),
+            models.Index(fields=['created_at', 'id']),
         ]
     
     def __str__(self):
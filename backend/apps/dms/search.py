@@ -0,0 +1,109 @@
+"""
+Document search
+
+On PostgreSQL, ``Document.search_vector`` is a weighted ``tsvector`` that a
+trigger rebuilds whenever a searchable column changes (migration
+``dms.0003_document_search_vector``), also for ``bulk_create``:
+
+* A: ``document_number``, ``title``
+* B: ``tags``, ``keywords``
+* C: ``description``
+* D: ``file_name`` and the text extracted from the file
+  (``DocumentContent``, see ``apps/dms/extraction.py``)
+
+It is GIN-indexed, so ``?search=`` is an index lookup instead of six
+``ILIKE '%term%'`` scans. Every word of the search must match, as a prefix
+(``quart rep`` finds "Quarterly report"); results are ordered by
+``SearchRank`` and carry a ``search_headline`` with the matches in
+``<mark>``. When nothing matches, trigram word similarity on
+``document_number`` and ``file_name`` (GIN-indexed too) catches typos such
+as ``DOC-2024-0123`` for ``DOC-2024-00123``.
+
+The ``simple`` configuration lowercases without stemming, since documents
+mix Indonesian and English. Other databases keep DRF's ``SearchFilter``.
+"""
+import re
+
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, TrigramWordSimilarity,
+)
+from django.db import connections
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat, Greatest
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+SEARCH_CONFIG = 'simple'
+
+# Characters of a tsquery lexeme; everything else separates words
+_WORD = re.compile(r'[^\W_]+')
+
+
+def search_query(text):
+    """Prefix ``SearchQuery`` requiring every word of ``text`` (None without words)"""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return None
+    return SearchQuery(
+        ' & '.join(f"{word}:*" for word in words), config=SEARCH_CONFIG, search_type='raw'
+    )
+
+
+def search_documents(queryset, text):
+    """
+    Documents of ``queryset`` matching ``text``, annotated with ``search_rank``
+
+    Full-text matches also get a ``search_headline``; without any, falls
+    back to trigram similarity on the document number and file name.
+    Call on PostgreSQL only.
+    """
+    query = search_query(text)
+    if query is None:
+        return queryset
+
+    matches = queryset.filter(search_vector=query)
+    if matches.exists():
+        return matches.annotate(
+            search_rank=SearchRank(F('search_vector'), query),
+            search_headline=SearchHeadline(
+                Concat('title', Value('. '), 'description'),
+                query,
+                config=SEARCH_CONFIG,
+                start_sel='<mark>',
+                stop_sel='</mark>',
+                max_words=30,
+                min_words=10,
+                max_fragments=2,
+            ),
+        )
+
+    text = text.strip()
+    return queryset.filter(
+        Q(document_number__trigram_word_similar=text) | Q(file_name__trigram_word_similar=text)
+    ).annotate(
+        search_rank=Greatest(
+            TrigramWordSimilarity(Value(text), 'document_number'),
+            TrigramWordSimilarity(Value(text), 'file_name'),
+        ),
+    )
+
+
+class DocumentSearchFilter(SearchFilter):
+    """
+    ``SearchFilter`` backed by the full-text index on PostgreSQL
+
+    List it after ``OrderingFilter``: without an explicit ``?ordering=``
+    results come best match first.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms or connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        results = search_documents(queryset, ' '.join(terms))
+        ranked = 'search_rank' in results.query.annotations
+        if ranked and api_settings.ORDERING_PARAM not in request.query_params:
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+            results = results.order_by('-search_rank', *ordering)
+        return results
@@ -2,12 +2,14 @@
 Document Management System serializers
 """
 from rest_framework import serializers
+from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 from apps.dms.models import (
     Document, DocumentCategory, DocumentVersion, DocumentApproval,
-    DocumentAccess, DocumentTemplate, DocumentActivity
+    DocumentAccess, DocumentTemplate, DocumentActivity, DocumentUpload
 )
+from apps.dms.uploads import chunk_size
 
 
 # ============= Document Category Serializers =============
@@ -52,6 +54,9 @@ class DocumentListSerializer(serializers.ModelSerializer):
     is_expiring_soon = serializers.SerializerMethodField()
     days_until_expiry = serializers.SerializerMethodField()
     version_count = serializers.SerializerMethodField()
+    # Only present on searches (annotated by apps.dms.search)
+    search_rank = serializers.FloatField(read_only=True)
+    search_headline = serializers.CharField(read_only=True)
     
     class Meta:
         model = Document
@@ -67,6 +72,7 @@ class DocumentListSerializer(serializers.ModelSerializer):
             'expiry_date', 'is_expired', 'is_expiring_soon', 'days_until_expiry',
             'is_public', 'is_confidential',
             'view_count', 'download_count', 'version_count',
+            'search_rank', 'search_headline',
             'created_at', 'updated_at'
         ]
     
@@ -111,7 +117,9 @@ class DocumentSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Document
-        fields = '__all__'
+        exclude = ['search_vector']
+        # Files are only fetched through signed download links
+        extra_kwargs = {'file': {'write_only': True}}
     
     def get_file_size_mb(self, obj):
         """File size in MB"""
@@ -139,6 +147,43 @@ class DocumentSerializer(serializers.ModelSerializer):
         return DocumentApprovalSerializer(approvals, many=True).data
 
 
+class DocumentUploadCompleteSerializer(DocumentSerializer):
+    """Document fields completing a resumable upload; the file fields come from the upload"""
+    
+    class Meta(DocumentSerializer.Meta):
+        exclude = DocumentSerializer.Meta.exclude + [
+            'file', 'file_name', 'file_size', 'file_extension', 'mime_type', 'checksum'
+        ]
+
+
+# ============= Resumable Upload Serializers =============
+
+class DocumentUploadSerializer(serializers.ModelSerializer):
+    """Serializer for resumable uploads"""
+    
+    chunk_size = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = DocumentUpload
+        fields = [
+            'id', 'file_name', 'file_size', 'mime_type',
+            'offset', 'chunk_size', 'status', 'document',
+            'expires_at', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['offset', 'status', 'document', 'expires_at']
+    
+    def get_chunk_size(self, obj):
+        """Largest chunk a PUT may carry"""
+        return chunk_size()
+    
+    def validate_file_size(self, value):
+        """Within 0 and DMS_UPLOAD_MAX_SIZE"""
+        max_size = settings.DMS_UPLOAD_MAX_SIZE
+        if value < 0 or value > max_size:
+            raise serializers.ValidationError(f"File size must be between 0 and {max_size} bytes")
+        return value
+
+
 # ============= Document Version Serializers =============
 
 class DocumentVersionSerializer(serializers.ModelSerializer):
@@ -157,6 +202,7 @@ class DocumentVersionSerializer(serializers.ModelSerializer):
             'uploaded_by', 'uploaded_by_name',
             'created_at'
         ]
+        extra_kwargs = {'file': {'write_only': True}}
     
     def get_file_size_mb(self, obj):
         """File size in MB"""
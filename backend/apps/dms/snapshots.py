@@ -0,0 +1,37 @@
+"""
+Dashboard snapshot metrics for the DMS dashboard
+"""
+from apps.core.snapshots import DashboardSnapshot, SnapshotMetric
+from apps.dms.models import Document, DocumentApproval
+
+dms_snapshot = DashboardSnapshot('dms')
+
+dms_snapshot.track(
+    Document,
+    SnapshotMetric('documents', is_latest_version=True, deleted_at__isnull=True),
+    SnapshotMetric(
+        'documents_by_status', group_by='status',
+        is_latest_version=True, deleted_at__isnull=True
+    ),
+    SnapshotMetric(
+        'documents_by_type', group_by='document_type',
+        is_latest_version=True, deleted_at__isnull=True
+    ),
+    SnapshotMetric(
+        'documents_by_category', group_by='category_id',
+        is_latest_version=True, deleted_at__isnull=True
+    ),
+    SnapshotMetric(
+        'expired_documents', is_expired=True,
+        is_latest_version=True, deleted_at__isnull=True
+    ),
+    SnapshotMetric(
+        'storage_bytes', field='file_size',
+        is_latest_version=True, deleted_at__isnull=True
+    ),
+)
+
+dms_snapshot.track(
+    DocumentApproval,
+    SnapshotMetric('pending_approvals', status='pending', deleted_at__isnull=True),
+)
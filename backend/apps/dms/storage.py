@@ -0,0 +1,123 @@
+"""
+Content-addressed storage for document files
+
+``Document.file`` and ``DocumentVersion.file`` are saved under the SHA-256
+of their content instead of the upload name:
+
+    documents/blobs/3f/a9/3fa9...e1.pdf
+
+An upload whose content is already stored is not written again, so a
+template or signed PDF uploaded thousands of times takes the space of one.
+The bytes go to the default storage (local disk or S3); the original file
+name stays in ``Document.file_name``.
+
+Blobs are shared, so ``delete()`` here does nothing: references are
+counted in ``FileBlob`` and unreferenced blobs are removed by
+``apps.dms.blobs.collect_blobs``.
+"""
+import os
+
+from django.core.files.storage import Storage, default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from apps.core.utils import generate_file_hash
+
+
+@deconstructible
+class ContentAddressedStorage(Storage):
+    """Stores every distinct content once, named by its SHA-256"""
+
+    def __init__(self, location='documents/blobs'):
+        self.location = location
+
+    @property
+    def backend(self):
+        return default_storage
+
+    def blob_name(self, checksum, name=''):
+        """Storage name of the content with ``checksum``, keeping the extension of ``name``"""
+        extension = os.path.splitext(name)[1].lower()[:10]
+        return f"{self.location}/{checksum[:2]}/{checksum[2:4]}/{checksum}{extension}"
+
+    def is_blob(self, name):
+        return bool(name) and name.startswith(f"{self.location}/")
+
+    def checksum(self, name):
+        """SHA-256 of a blob, read from its name"""
+        return os.path.splitext(os.path.basename(name))[0]
+
+    def get_available_name(self, name, max_length=None):
+        # The final name depends on the content only, see _save
+        return name
+
+    def store(self, name, content):
+        """
+        Store ``content`` unless the same content is stored already
+
+        The blob's ``FileBlob`` row is locked (and created, unreferenced, if
+        missing) before checking for the file. ``collect_blobs`` deletes
+        files while holding that lock, so a blob is either kept, with its
+        grace period restarted, or written again.
+
+        Returns:
+            tuple: (blob name, whether it was written)
+        """
+        from apps.dms.models import FileBlob
+
+        checksum = generate_file_hash(content)
+        blob = self.blob_name(checksum, name)
+        now = timezone.now()
+        with transaction.atomic():
+            row, created = FileBlob.objects.select_for_update().get_or_create(
+                name=blob,
+                defaults={'checksum': checksum, 'size': getattr(content, 'size', None) or 0, 'orphaned_at': now},
+            )
+            if not created and row.ref_count <= 0:
+                # Keep it until the row being saved counts its reference
+                FileBlob.objects.filter(pk=row.pk).update(orphaned_at=now)
+            if self.backend.exists(blob):
+                return blob, False
+            saved = self.backend.save(blob, content)
+        if saved != blob:
+            # Another upload stored the same content in the meantime
+            self.backend.delete(saved)
+            return blob, False
+        return blob, True
+
+    def _save(self, name, content):
+        return self.store(name, content)[0]
+
+    def _open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def delete(self, name):
+        pass
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def url(self, name):
+        return self.backend.url(name)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def get_accessed_time(self, name):
+        return self.backend.get_accessed_time(name)
+
+    def get_created_time(self, name):
+        return self.backend.get_created_time(name)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+
+document_storage = ContentAddressedStorage()
@@ -0,0 +1,15 @@
+"""
+Celery tasks for the DMS app
+"""
+from celery import shared_task
+
+from apps.dms.extraction import drain
+
+
+@shared_task(ignore_result=True)
+def extract_document_contents():
+    """Extract the text of one batch of pending documents, then hand the rest to the next task"""
+    # One batch per task keeps it well inside the task time limit and lets
+    # other workers pick up the following batches
+    if drain(max_batches=1):
+        extract_document_contents.delay()
@@ -0,0 +1,80 @@
+"""
+Blob storage and garbage collection racing uploads of the same content
+"""
+from datetime import timedelta
+
+import pytest
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from apps.dms import blobs
+from apps.dms.models import FileBlob
+from apps.dms.storage import document_storage
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+def store(content=b'signed contract'):
+    return document_storage.store('contract.pdf', ContentFile(content))
+
+
+def expire(name):
+    FileBlob.objects.filter(name=name).update(orphaned_at=timezone.now() - blobs.BLOB_GRACE - timedelta(minutes=1))
+
+
+def test_store_tracks_a_new_blob_as_unreferenced():
+    name, written = store()
+
+    blob = FileBlob.objects.get(name=name)
+    assert written
+    assert blob.ref_count == 0
+    assert blob.orphaned_at is not None
+    assert blob.size == len(b'signed contract')
+
+
+def test_reusing_an_expired_orphan_keeps_it_from_the_collector():
+    name, _ = store()
+    expire(name)
+
+    assert store() == (name, False)
+    assert blobs.collect_blobs() == (0, 0)
+    blobs.add_reference(name)
+
+    assert document_storage.exists(name)
+    assert FileBlob.objects.get(name=name).ref_count == 1
+
+
+def test_collected_blob_is_written_again():
+    name, _ = store()
+    expire(name)
+
+    assert blobs.collect_blobs() == (1, len(b'signed contract'))
+    assert not document_storage.exists(name)
+    assert not FileBlob.objects.filter(name=name).exists()
+
+    assert store() == (name, True)
+    assert document_storage.exists(name)
+
+
+def test_row_left_without_its_file_is_written_again():
+    name, _ = store()
+    document_storage.backend.delete(name)
+
+    assert store() == (name, True)
+    assert document_storage.exists(name)
+
+
+def test_referenced_blobs_are_not_collected():
+    name, _ = store()
+    blobs.add_reference(name)
+    blobs.release_reference(name)
+    blobs.add_reference(name)
+    expire(name)
+
+    assert blobs.collect_blobs() == (0, 0)
+    assert document_storage.exists(name)
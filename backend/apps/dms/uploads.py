@@ -0,0 +1,304 @@
+"""
+Resumable chunked uploads
+
+Large files do not fit the 10MB request limit of
+``RequestValidationMiddleware`` and should not be buffered by
+``MultiPartParser``, so they are sent in chunks:
+
+1. ``POST /dms/uploads/`` with ``file_name``, ``file_size`` and optionally
+   ``mime_type`` starts an upload; the response has its ``id``, ``offset``
+   and the ``chunk_size`` to use
+2. ``PUT /dms/uploads/<id>/`` with the raw bytes and
+   ``Content-Range: bytes <start>-<end>/<total>`` appends a chunk; ``start``
+   must be the current ``offset``. An optional
+   ``Content-Digest: sha-256=:<base64>:`` is checked against the bytes
+3. ``GET /dms/uploads/<id>/`` returns the ``offset`` to resume from after
+   an interrupted chunk (a 409 on ``PUT`` carries it too)
+4. ``POST /dms/uploads/<id>/complete/`` with the document fields (as for
+   ``POST /dms/documents/``, without the file) creates the ``Document``
+
+Each chunk is streamed from the request into its own part in storage while
+its SHA-256 is computed, so a worker holds at most a read buffer of it.
+Completing streams the parts back to back into content-addressed storage
+(``apps/dms/storage.py``), hashing the whole file on the way, and deletes
+them. ``DELETE /dms/uploads/<id>/`` aborts. Uploads untouched for
+``DMS_UPLOAD_EXPIRY_HOURS`` are removed by ``purge_expired_uploads``.
+"""
+import base64
+import hashlib
+import io
+import logging
+import mimetypes
+import re
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.middleware import RequestValidationMiddleware
+from apps.dms.blobs import track_unreferenced
+from apps.dms.models import DocumentUpload
+from apps.dms.storage import document_storage
+
+logger = logging.getLogger(__name__)
+
+PARTS_LOCATION = 'uploads'
+
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+_CONTENT_DIGEST = re.compile(r'sha-256=:([A-Za-z0-9+/=]+):')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class UploadError(Exception):
+    """A chunk or completion that cannot be accepted; carries the HTTP status"""
+
+    def __init__(self, message, status_code=400, offset=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.offset = offset
+
+
+def chunk_size():
+    """Largest chunk accepted, leaving room under the request size limit"""
+    return min(
+        _setting('DMS_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024),
+        RequestValidationMiddleware.MAX_REQUEST_SIZE - 64 * 1024,
+    )
+
+
+def expiry():
+    return timezone.now() + timedelta(hours=_setting('DMS_UPLOAD_EXPIRY_HOURS', 24))
+
+
+def start_upload(user, file_name, file_size, mime_type=''):
+    return DocumentUpload.objects.create(
+        created_by=user,
+        file_name=file_name,
+        file_size=file_size,
+        mime_type=mime_type or mimetypes.guess_type(file_name)[0] or 'application/octet-stream',
+        expires_at=expiry(),
+    )
+
+
+# ----- Chunks -----
+
+class HashingReader:
+    """Reads at most ``size`` bytes of ``stream``, counting and hashing them"""
+
+    closed = False
+
+    def __init__(self, stream, size):
+        self.stream = stream
+        self.size = size
+        self.received = 0
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        remaining = self.size - self.received
+        if remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        data = self.stream.read(size)
+        self.received += len(data)
+        self.digest.update(data)
+        return data
+
+    def seekable(self):
+        return False
+
+
+def parse_content_range(header, file_size):
+    """
+    ``(start, length)`` of a ``Content-Range: bytes <start>-<end>/<total>`` header
+
+    Raises:
+        UploadError: malformed, or not within the declared file size
+    """
+    match = _CONTENT_RANGE.match(header or '')
+    if not match:
+        raise UploadError('Content-Range header "bytes <start>-<end>/<total>" is required')
+    start, end, total = match.groups()
+    start, end = int(start), int(end)
+    if end < start or end >= file_size or total not in ('*', str(file_size)):
+        raise UploadError(f"Content-Range does not fit the declared file size of {file_size} bytes", 416)
+    return start, end - start + 1
+
+
+def write_chunk(upload, start, length, stream, content_digest=None):
+    """
+    Store ``length`` bytes of ``stream`` as the part of ``upload`` at ``start``
+
+    Returns:
+        tuple: (new offset, hex SHA-256 of the chunk)
+
+    Raises:
+        UploadError: 409 (with the current offset) when the chunk does not
+            continue the upload, 400 when it is short or fails its digest
+    """
+    if upload.status != 'uploading':
+        raise UploadError(f"Upload is {upload.status}", 409, upload.offset)
+    if start != upload.offset:
+        raise UploadError(f"Chunk must start at offset {upload.offset}", 409, upload.offset)
+    if length > chunk_size():
+        raise UploadError(f"Chunks may be at most {chunk_size()} bytes", 413)
+
+    reader = HashingReader(stream, length)
+    name = f"{PARTS_LOCATION}/{upload.pk}/{start:015d}-{uuid.uuid4().hex[:8]}.part"
+    name = default_storage.save(name, File(reader, name=name))
+
+    error = None
+    if reader.received != length:
+        error = UploadError(f"Chunk ended after {reader.received} of {length} bytes", 400, upload.offset)
+    elif content_digest is not None:
+        match = _CONTENT_DIGEST.search(content_digest)
+        if match is None or base64.b64decode(match.group(1)) != reader.digest.digest():
+            error = UploadError('Chunk does not match its Content-Digest', 400, upload.offset)
+    if error is None:
+        checksum = reader.digest.hexdigest()
+        # Compare-and-set on the offset: of two clients sending the same chunk, one wins
+        updated = DocumentUpload.objects.filter(pk=upload.pk, status='uploading', offset=start).update(
+            offset=start + length,
+            parts=[*upload.parts, [name, length, checksum]],
+            expires_at=expiry(),
+            updated_at=timezone.now(),
+        )
+        if updated:
+            return start + length, checksum
+        upload.refresh_from_db(fields=['offset'])
+        error = UploadError(f"Chunk must start at offset {upload.offset}", 409, upload.offset)
+
+    default_storage.delete(name)
+    raise error
+
+
+# ----- Completion -----
+
+class PartsReader:
+    """The stored parts of an upload, read back to back as one file"""
+
+    closed = False
+
+    def __init__(self, names, size):
+        self.names = names
+        self.size = size
+        self._current = None
+        self.seek(0)
+
+    def read(self, size=-1):
+        while True:
+            if self._current is None:
+                if not self._pending:
+                    return b''
+                self._current = default_storage.open(self._pending.pop(0), 'rb')
+            data = self._current.read(size)
+            if data:
+                self._position += len(data)
+                return data
+            self._current.close()
+            self._current = None
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation('Upload parts can only be read again from the start')
+        self.close()
+        self._pending = list(self.names)
+        self._position = 0
+        return 0
+
+    def tell(self):
+        return self._position
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
+
+
+def assemble(upload):
+    """
+    Store the complete file of ``upload`` and return its blob name
+
+    The upload is ``completing`` afterwards; ``finish`` or ``reopen`` it.
+
+    Raises:
+        UploadError: 409 when the upload is not complete (or being completed)
+    """
+    claimed = DocumentUpload.objects.filter(
+        pk=upload.pk, status='uploading', offset=upload.file_size
+    ).update(status='completing', expires_at=expiry(), updated_at=timezone.now())
+    if not claimed:
+        raise UploadError(
+            f"Upload has {upload.offset} of {upload.file_size} bytes or is {upload.status}", 409, upload.offset
+        )
+
+    reader = PartsReader([part[0] for part in upload.parts], upload.file_size)
+    try:
+        blob = document_storage.save(upload.file_name, File(reader, name=upload.file_name))
+    except Exception:
+        reopen(upload)
+        raise
+    finally:
+        reader.close()
+    # Collected unless the document that uses it is created in time
+    track_unreferenced(blob, upload.file_size)
+    return blob
+
+
+def reopen(upload):
+    """Back to ``uploading`` after a failed completion, so it can be retried"""
+    DocumentUpload.objects.filter(pk=upload.pk, status='completing').update(
+        status='uploading', updated_at=timezone.now()
+    )
+
+
+def finish(upload, document):
+    """Mark ``upload`` completed by ``document``; its parts are deleted after commit"""
+    DocumentUpload.objects.filter(pk=upload.pk).update(
+        status='completed', document=document, parts=[], updated_at=timezone.now()
+    )
+    parts = [part[0] for part in upload.parts]
+    transaction.on_commit(lambda: delete_parts(parts))
+
+
+def abort(upload):
+    DocumentUpload.objects.filter(pk=upload.pk).update(
+        status='aborted', parts=[], updated_at=timezone.now()
+    )
+    parts = [part[0] for part in upload.parts]
+    transaction.on_commit(lambda: delete_parts(parts))
+
+
+def delete_parts(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except Exception as e:
+            logger.warning(f"Failed to delete upload part {name}: {e}")
+
+
+def purge_expired_uploads():
+    """
+    Delete uploads (and their parts) untouched since they expired
+
+    Returns:
+        int: Uploads deleted
+    """
+    expired = DocumentUpload.objects.filter(expires_at__lte=timezone.now())
+    deleted = 0
+    for upload in expired.iterator():
+        # Unless a chunk arrived in the meantime
+        if DocumentUpload.objects.filter(pk=upload.pk, updated_at=upload.updated_at).delete()[0]:
+            delete_parts([part[0] for part in upload.parts])
+            deleted += 1
+    return deleted
@@ -2,7 +2,7 @@
 Document Management System URLs
 """
 from django.urls import path
-from apps.dms import views
+from apps.dms import downloads, views
 
 app_name = 'dms'
 
@@ -18,8 +18,14 @@ urlpatterns = [
     path('documents/', views.DocumentListView.as_view(), name='document-list'),
     path('documents/<int:pk>/', views.DocumentDetailView.as_view(), name='document-detail'),
     path('documents/<int:pk>/download/', views.document_download, name='document-download'),
+    path('documents/<int:pk>/file/', downloads.document_file, name='document-file'),
     path('documents/<int:pk>/share/', views.document_share, name='document-share'),
     
+    # Resumable Uploads
+    path('uploads/', views.upload_start, name='upload-start'),
+    path('uploads/<int:pk>/', views.DocumentUploadView.as_view(), name='upload-detail'),
+    path('uploads/<int:pk>/complete/', views.upload_complete, name='upload-complete'),
+    
     # Document Versions
     path('documents/<int:document_id>/versions/', views.DocumentVersionListView.as_view(), name='document-version-list'),
     
@@ -1,22 +1,28 @@
 """
 Document Management System views
 """
+import os
+
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q, Count, Sum, Avg
 from datetime import timedelta
 
 from apps.dms.models import (
     Document, DocumentCategory, DocumentVersion, DocumentApproval,
-    DocumentAccess, DocumentTemplate, DocumentActivity
+    DocumentAccess, DocumentTemplate, DocumentActivity, DocumentUpload
 )
 from apps.dms.serializers import (
     DocumentListSerializer, DocumentSerializer,
+    DocumentUploadSerializer, DocumentUploadCompleteSerializer,
     DocumentCategorySerializer,
     DocumentVersionSerializer,
     DocumentApprovalSerializer,
@@ -24,12 +30,64 @@ from apps.dms.serializers import (
     DocumentTemplateListSerializer, DocumentTemplateSerializer,
     DocumentActivitySerializer
 )
+from apps.dms import downloads, uploads
+from apps.dms.search import DocumentSearchFilter
+from apps.dms.snapshots import dms_snapshot
+from apps.dms.storage import document_storage
 from apps.core.permissions import IsAdminOrReadOnly
+from apps.core.mixins import ConditionalGetMixin
+from apps.core.pagination import KeysetPagination
+from apps.core.throttling import UploadChunkRateThrottle
+
+
+def _employee(user):
+    """Employee profile of ``user`` (None for accounts without one)"""
+    return getattr(user, 'employee_profile', None)
+
+
+def _granted(employee, **permissions):
+    """Unexpired access grants to ``employee`` or their department"""
+    grantee = Q(employee=employee)
+    if employee.department_id:
+        grantee |= Q(department_id=employee.department_id)
+    return DocumentAccess.objects.filter(
+        grantee, Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()), **permissions
+    )
+
+
+def _accessible(queryset, user):
+    """
+    Documents of ``queryset`` that ``user`` may see
+
+    Staff see everything; others see public documents, their own and those
+    shared with them or their department. Accounts without an employee
+    profile only see public documents.
+    """
+    if user.is_staff:
+        return queryset
+    employee = _employee(user)
+    if employee is None:
+        return queryset.filter(is_public=True)
+    return queryset.filter(
+        Q(is_public=True) |
+        Q(owner=employee) |
+        Q(pk__in=_granted(employee, can_view=True).values('document_id'))
+    )
+
+
+def _may(user, document, permission):
+    """Whether ``user`` owns ``document`` or holds the ``permission`` grant on it (staff always may)"""
+    if user.is_staff:
+        return True
+    employee = _employee(user)
+    if employee is None:
+        return False
+    return document.owner_id == employee.pk or _granted(employee, document=document, **{permission: True}).exists()
 
 
 # ============= Document Category Views =============
 
-class DocumentCategoryListView(generics.ListCreateAPIView):
+class DocumentCategoryListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create document categories"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = DocumentCategorySerializer
@@ -51,7 +109,7 @@ class DocumentCategoryListView(generics.ListCreateAPIView):
         return queryset
 
 
-class DocumentCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DocumentCategoryDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a document category"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = DocumentCategorySerializer
@@ -65,11 +123,13 @@ class DocumentCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============= Document Views =============
 
-class DocumentListView(generics.ListCreateAPIView):
+class DocumentListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create documents"""
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    # Search last: it orders by rank unless ?ordering= is given
+    filter_backends = [DjangoFilterBackend, OrderingFilter, DocumentSearchFilter]
     filterset_fields = ['status', 'document_type', 'category', 'owner', 'department', 'project', 'client', 'is_public']
+    # ILIKE fallback off PostgreSQL (see apps/dms/search.py)
     search_fields = ['document_number', 'title', 'description', 'tags', 'keywords', 'file_name']
     ordering_fields = ['created_at', 'title', 'file_size', 'download_count', 'view_count']
     ordering = ['-created_at']
@@ -84,19 +144,7 @@ class DocumentListView(generics.ListCreateAPIView):
         
         # Access control
         user = self.request.user
-        if not user.is_staff:
-            # Non-admin users see:
-            # 1. Public documents
-            # 2. Documents they own
-            # 3. Documents with explicit access
-            if hasattr(user, 'employee'):
-                queryset = queryset.filter(
-                    Q(is_public=True) |
-                    Q(owner=user.employee) |
-                    Q(access_permissions__employee=user.employee) |
-                    Q(access_permissions__department=user.employee.department) |
-                    Q(access_permissions__role__in=user.roles.all())
-                ).distinct()
+        queryset = _accessible(queryset, user)
         
         # Filter expiring documents
         if self.request.query_params.get('expiring_soon', None) == 'true':
@@ -113,19 +161,20 @@ class DocumentListView(generics.ListCreateAPIView):
         
         # Filter my documents
         if self.request.query_params.get('my_documents', None) == 'true':
-            if hasattr(user, 'employee'):
-                queryset = queryset.filter(owner=user.employee)
+            employee = _employee(user)
+            queryset = queryset.filter(owner=employee) if employee else queryset.none()
         
         # Filter pending approval
         if self.request.query_params.get('pending_approval', None) == 'true':
             queryset = queryset.filter(status='pending_approval')
         
+        # The search vector is only read by the database
         return queryset.select_related(
             'owner', 'category', 'department', 'project', 'client'
-        )
+        ).defer('search_vector')
 
 
-class DocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DocumentDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a document"""
     permission_classes = [IsAuthenticated]
     serializer_class = DocumentSerializer
@@ -134,20 +183,12 @@ class DocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
         queryset = Document.objects.filter(deleted_at__isnull=True)
         
         # Access control
-        user = self.request.user
-        if not user.is_staff:
-            if hasattr(user, 'employee'):
-                queryset = queryset.filter(
-                    Q(is_public=True) |
-                    Q(owner=user.employee) |
-                    Q(access_permissions__employee=user.employee) |
-                    Q(access_permissions__department=user.employee.department) |
-                    Q(access_permissions__role__in=user.roles.all())
-                ).distinct()
+        queryset = _accessible(queryset, self.request.user)
         
+        # The search vector is only read by the database
         return queryset.select_related(
             'owner', 'category', 'department', 'project', 'client'
-        )
+        ).defer('search_vector')
     
     def retrieve(self, request, *args, **kwargs):
         # Log view activity
@@ -156,10 +197,11 @@ class DocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
         instance.save(update_fields=['view_count'])
         
         # Create activity log
-        if hasattr(request.user, 'employee'):
+        employee = _employee(request.user)
+        if employee is not None:
             DocumentActivity.objects.create(
                 document=instance,
-                user=request.user.employee,
+                user=employee,
                 activity_type='viewed',
                 ip_address=request.META.get('REMOTE_ADDR'),
                 user_agent=request.META.get('HTTP_USER_AGENT', '')[:500]
@@ -168,16 +210,25 @@ class DocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
+    def perform_update(self, serializer):
+        if not _may(self.request.user, serializer.instance, 'can_edit'):
+            raise PermissionDenied('Edit permission denied')
+        serializer.save()
+    
     def perform_destroy(self, instance):
+        if not _may(self.request.user, instance, 'can_delete'):
+            raise PermissionDenied('Delete permission denied')
+        
         # Soft delete
         instance.deleted_at = timezone.now()
         instance.save()
         
         # Log deletion activity
-        if hasattr(self.request.user, 'employee'):
+        employee = _employee(self.request.user)
+        if employee is not None:
             DocumentActivity.objects.create(
                 document=instance,
-                user=self.request.user.employee,
+                user=employee,
                 activity_type='deleted',
                 ip_address=self.request.META.get('REMOTE_ADDR'),
                 user_agent=self.request.META.get('HTTP_USER_AGENT', '')[:500]
@@ -187,7 +238,7 @@ class DocumentDetailView(generics.RetrieveUpdateDestroyAPIView):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def document_download(request, pk):
-    """Download a document"""
+    """Authorize a download and return a short-lived signed link to the file"""
     try:
         document = Document.objects.get(pk=pk, deleted_at__isnull=True)
     except Document.DoesNotExist:
@@ -195,37 +246,30 @@ def document_download(request, pk):
     
     # Check download permission
     user = request.user
-    if not document.is_public and not user.is_staff:
-        if hasattr(user, 'employee'):
-            has_access = DocumentAccess.objects.filter(
-                document=document,
-                can_download=True
-            ).filter(
-                Q(employee=user.employee) |
-                Q(department=user.employee.department) |
-                Q(role__in=user.roles.all())
-            ).exists()
-            
-            if not has_access and document.owner != user.employee:
-                return Response({'error': 'Download permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    if not document.is_public and not _may(user, document, 'can_download'):
+        return Response({'error': 'Download permission denied'}, status=status.HTTP_403_FORBIDDEN)
     
     # Increment download count
     document.download_count += 1
     document.save(update_fields=['download_count'])
     
     # Log download activity
-    if hasattr(user, 'employee'):
+    employee = _employee(user)
+    if employee is not None:
         DocumentActivity.objects.create(
             document=document,
-            user=user.employee,
+            user=employee,
             activity_type='downloaded',
             ip_address=request.META.get('REMOTE_ADDR'),
             user_agent=request.META.get('HTTP_USER_AGENT', '')[:500]
         )
     
+    # The link is signed, so fetching the file does not check access again
+    file_url, expires_at = downloads.signed_url(request, document)
     return Response({
-        'file_url': document.file.url,
-        'file_name': document.file_name
+        'file_url': file_url,
+        'file_name': document.file_name,
+        'expires_at': expires_at,
     })
 
 
@@ -240,9 +284,9 @@ def document_share(request, pk):
     
     # Check share permission
     user = request.user
-    if not user.is_staff and hasattr(user, 'employee'):
-        if document.owner != user.employee:
-            return Response({'error': 'Only owner can share document'}, status=status.HTTP_403_FORBIDDEN)
+    employee = _employee(user)
+    if not _may(user, document, 'can_share'):
+        return Response({'error': 'Share permission denied'}, status=status.HTTP_403_FORBIDDEN)
     
     # Create access permissions
     employee_ids = request.data.get('employee_ids', [])
@@ -256,7 +300,7 @@ def document_share(request, pk):
         access = DocumentAccess.objects.create(
             document=document,
             employee_id=emp_id,
-            granted_by=user.employee if hasattr(user, 'employee') else document.owner,
+            granted_by=employee or document.owner,
             can_view=permissions.get('can_view', True),
             can_download=permissions.get('can_download', False),
             can_edit=permissions.get('can_edit', False),
@@ -269,7 +313,7 @@ def document_share(request, pk):
         access = DocumentAccess.objects.create(
             document=document,
             department_id=dept_id,
-            granted_by=user.employee if hasattr(user, 'employee') else document.owner,
+            granted_by=employee or document.owner,
             can_view=permissions.get('can_view', True),
             can_download=permissions.get('can_download', False),
             can_edit=permissions.get('can_edit', False),
@@ -282,7 +326,7 @@ def document_share(request, pk):
         access = DocumentAccess.objects.create(
             document=document,
             role_id=role_id,
-            granted_by=user.employee if hasattr(user, 'employee') else document.owner,
+            granted_by=employee or document.owner,
             can_view=permissions.get('can_view', True),
             can_download=permissions.get('can_download', False),
             can_edit=permissions.get('can_edit', False),
@@ -292,10 +336,10 @@ def document_share(request, pk):
         accesses_created.append(access)
     
     # Log share activity
-    if hasattr(user, 'employee'):
+    if employee is not None:
         DocumentActivity.objects.create(
             document=document,
-            user=user.employee,
+            user=employee,
             activity_type='shared',
             description=f"Shared with {len(accesses_created)} recipients",
             ip_address=request.META.get('REMOTE_ADDR'),
@@ -306,23 +350,123 @@ def document_share(request, pk):
     return Response(serializer.data)
 
 
+# ============= Resumable Upload Views =============
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_start(request):
+    """Start a resumable upload (see apps/dms/uploads.py)"""
+    serializer = DocumentUploadSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    upload = uploads.start_upload(
+        request.user,
+        serializer.validated_data['file_name'],
+        serializer.validated_data['file_size'],
+        serializer.validated_data.get('mime_type', ''),
+    )
+    return Response(DocumentUploadSerializer(upload).data, status=status.HTTP_201_CREATED)
+
+
+class DocumentUploadView(APIView):
+    """Resume state (GET), next chunk (PUT) and abort (DELETE) of an upload"""
+    permission_classes = [IsAuthenticated]
+    
+    def get_throttles(self):
+        # A large file takes hundreds of chunks
+        if self.request.method == 'PUT':
+            return [UploadChunkRateThrottle()]
+        return super().get_throttles()
+    
+    def get_upload(self, request, pk):
+        return DocumentUpload.objects.filter(pk=pk, created_by=request.user).first()
+    
+    def get(self, request, pk):
+        upload = self.get_upload(request, pk)
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(DocumentUploadSerializer(upload).data)
+    
+    def put(self, request, pk):
+        upload = self.get_upload(request, pk)
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            start, length = uploads.parse_content_range(request.headers.get('Content-Range'), upload.file_size)
+            if int(request.headers.get('Content-Length') or 0) != length:
+                raise uploads.UploadError('Content-Length must match the Content-Range')
+            # The raw request stream: nothing buffers the body
+            offset, checksum = uploads.write_chunk(
+                upload, start, length, request.stream, request.headers.get('Content-Digest')
+            )
+        except uploads.UploadError as e:
+            return Response({'error': str(e), 'offset': e.offset}, status=e.status_code)
+        
+        return Response({'offset': offset, 'sha256': checksum, 'complete': offset == upload.file_size})
+    
+    def delete(self, request, pk):
+        upload = self.get_upload(request, pk)
+        if upload is None:
+            return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+        if upload.status not in ('uploading', 'aborted'):
+            return Response({'error': f"Upload is {upload.status}"}, status=status.HTTP_409_CONFLICT)
+        uploads.abort(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def upload_complete(request, pk):
+    """Create the document of a fully received upload"""
+    upload = DocumentUpload.objects.filter(pk=pk, created_by=request.user).first()
+    if upload is None:
+        return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    # Validate the document fields before the file is assembled
+    serializer = DocumentUploadCompleteSerializer(data=request.data, context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    
+    try:
+        blob = uploads.assemble(upload)
+    except uploads.UploadError as e:
+        return Response({'error': str(e), 'offset': e.offset}, status=e.status_code)
+    
+    try:
+        with transaction.atomic():
+            document = serializer.save(
+                file=blob,
+                file_name=upload.file_name,
+                file_size=upload.file_size,
+                file_extension=os.path.splitext(upload.file_name)[1].lstrip('.').lower()[:10],
+                mime_type=upload.mime_type[:100],
+                checksum=document_storage.checksum(blob),
+            )
+            uploads.finish(upload, document)
+    except Exception:
+        uploads.reopen(upload)
+        raise
+    
+    return Response(DocumentSerializer(document, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+
 # ============= Document Version Views =============
 
-class DocumentVersionListView(generics.ListCreateAPIView):
+class DocumentVersionListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create document versions"""
     permission_classes = [IsAuthenticated]
     serializer_class = DocumentVersionSerializer
     
     def get_queryset(self):
         document_id = self.kwargs.get('document_id')
+        documents = _accessible(Document.objects.filter(pk=document_id, deleted_at__isnull=True), self.request.user)
         return DocumentVersion.objects.filter(
-            document_id=document_id
+            document__in=documents
         ).select_related('document', 'uploaded_by').order_by('-created_at')
 
 
 # ============= Document Approval Views =============
 
-class DocumentApprovalListView(generics.ListCreateAPIView):
+class DocumentApprovalListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create document approvals"""
     permission_classes = [IsAuthenticated]
     serializer_class = DocumentApprovalSerializer
@@ -335,21 +479,22 @@ class DocumentApprovalListView(generics.ListCreateAPIView):
         
         # Filter by user permissions
         user = self.request.user
+        employee = _employee(user)
         if not user.is_staff:
-            if hasattr(user, 'employee'):
-                # Show approvals assigned to user or created by user
-                queryset = queryset.filter(
-                    Q(approver=user.employee) |
-                    Q(document__owner=user.employee)
-                )
+            if employee is None:
+                return queryset.none()
+            # Show approvals assigned to user or created by user
+            queryset = queryset.filter(
+                Q(approver=employee) |
+                Q(document__owner=employee)
+            )
         
         # Filter pending approvals for current user
         if self.request.query_params.get('my_pending', None) == 'true':
-            if hasattr(user, 'employee'):
-                queryset = queryset.filter(
-                    approver=user.employee,
-                    status='pending'
-                )
+            queryset = queryset.filter(
+                approver=employee,
+                status='pending'
+            )
         
         return queryset.select_related('document', 'approver')
 
@@ -364,8 +509,8 @@ def approval_approve(request, pk):
         return Response({'error': 'Approval not found'}, status=status.HTTP_404_NOT_FOUND)
     
     # Check if current user is the approver
-    user = request.user
-    if hasattr(user, 'employee') and approval.approver != user.employee:
+    employee = _employee(request.user)
+    if not request.user.is_staff and (employee is None or approval.approver_id != employee.pk):
         return Response({'error': 'Only assigned approver can approve'}, status=status.HTTP_403_FORBIDDEN)
     
     if approval.status != 'pending':
@@ -404,8 +549,8 @@ def approval_reject(request, pk):
         return Response({'error': 'Approval not found'}, status=status.HTTP_404_NOT_FOUND)
     
     # Check if current user is the approver
-    user = request.user
-    if hasattr(user, 'employee') and approval.approver != user.employee:
+    employee = _employee(request.user)
+    if not request.user.is_staff and (employee is None or approval.approver_id != employee.pk):
         return Response({'error': 'Only assigned approver can reject'}, status=status.HTTP_403_FORBIDDEN)
     
     if approval.status != 'pending':
@@ -429,7 +574,7 @@ def approval_reject(request, pk):
 
 # ============= Document Access Views =============
 
-class DocumentAccessListView(generics.ListCreateAPIView):
+class DocumentAccessListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create document access permissions"""
     permission_classes = [IsAuthenticated]
     serializer_class = DocumentAccessSerializer
@@ -442,18 +587,26 @@ class DocumentAccessListView(generics.ListCreateAPIView):
         # Filter by user permissions
         user = self.request.user
         if not user.is_staff:
-            if hasattr(user, 'employee'):
-                # Show accesses for documents user owns
-                queryset = queryset.filter(document__owner=user.employee)
+            employee = _employee(user)
+            if employee is None:
+                return queryset.none()
+            # Show accesses for documents user owns
+            queryset = queryset.filter(document__owner=employee)
         
         return queryset.select_related(
             'document', 'employee', 'department', 'role', 'granted_by'
         )
+    
+    def perform_create(self, serializer):
+        document = serializer.validated_data['document']
+        if not _may(self.request.user, document, 'can_share'):
+            raise PermissionDenied('Share permission denied')
+        serializer.save(granted_by=_employee(self.request.user) or document.owner)
 
 
 # ============= Document Template Views =============
 
-class DocumentTemplateListView(generics.ListCreateAPIView):
+class DocumentTemplateListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create document templates"""
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -477,7 +630,7 @@ class DocumentTemplateListView(generics.ListCreateAPIView):
         return queryset.select_related('category')
 
 
-class DocumentTemplateDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DocumentTemplateDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a document template"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = DocumentTemplateSerializer
@@ -491,13 +644,15 @@ class DocumentTemplateDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============= Document Activity Views =============
 
-class DocumentActivityListView(generics.ListAPIView):
+class DocumentActivityListView(ConditionalGetMixin, generics.ListAPIView):
     """List document activities"""
     permission_classes = [IsAuthenticated]
     serializer_class = DocumentActivitySerializer
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['document', 'user', 'activity_type']
     ordering = ['-created_at']
+    pagination_class = KeysetPagination
+    etag_from_page = True
     
     def get_queryset(self):
         document_id = self.kwargs.get('document_id', None)
@@ -509,12 +664,14 @@ class DocumentActivityListView(generics.ListAPIView):
         # Filter by user permissions
         user = self.request.user
         if not user.is_staff:
-            if hasattr(user, 'employee'):
-                # Show activities for documents user owns or has access to
-                queryset = queryset.filter(
-                    Q(document__owner=user.employee) |
-                    Q(user=user.employee)
-                )
+            employee = _employee(user)
+            if employee is None:
+                return queryset.none()
+            # Show activities for documents user owns or their own
+            queryset = queryset.filter(
+                Q(document__owner=employee) |
+                Q(user=employee)
+            )
         
         return queryset.select_related('document', 'user')
 
@@ -529,29 +686,32 @@ def dms_dashboard(request):
     # Document metrics
     all_documents = Document.objects.filter(deleted_at__isnull=True, is_latest_version=True)
     
+    # Running totals from the materialized snapshot
+    snapshot = dms_snapshot.read()
+    
     # Count by status
+    status_counts = snapshot.group('documents_by_status')
     doc_by_status = {}
     for status_key, status_label in Document.STATUS_CHOICES:
-        count = all_documents.filter(status=status_key).count()
         doc_by_status[status_key] = {
             'label': status_label,
-            'count': count
+            'count': int(status_counts.get(status_key, 0))
         }
     
     # Count by type
+    type_counts = snapshot.group('documents_by_type')
     doc_by_type = {}
     for type_key, type_label in Document.DOCUMENT_TYPE_CHOICES:
-        count = all_documents.filter(document_type=type_key).count()
         doc_by_type[type_key] = {
             'label': type_label,
-            'count': count
+            'count': int(type_counts.get(type_key, 0))
         }
     
     # Storage metrics
-    total_storage_bytes = all_documents.aggregate(total=Sum('file_size'))['total'] or 0
+    total_storage_bytes = snapshot.count('storage_bytes')
     total_storage_gb = round(total_storage_bytes / (1024 ** 3), 2)
     
-    # Expiring documents
+    # Date-relative metrics are computed live
     thirty_days_later = timezone.now().date() + timedelta(days=30)
     expiring_soon = all_documents.filter(
         expiry_date__isnull=False,
@@ -559,14 +719,6 @@ def dms_dashboard(request):
         is_expired=False
     ).count()
     
-    expired_count = all_documents.filter(is_expired=True).count()
-    
-    # Approval metrics
-    pending_approvals = DocumentApproval.objects.filter(
-        deleted_at__isnull=True,
-        status='pending'
-    ).count()
-    
     # Activity metrics
     today = timezone.now().date()
     activities_today = DocumentActivity.objects.filter(
@@ -574,17 +726,17 @@ def dms_dashboard(request):
     ).count()
     
     # Top categories
-    category_stats = []
-    for category in DocumentCategory.objects.filter(deleted_at__isnull=True, is_active=True)[:10]:
-        doc_count = category.documents.filter(
-            deleted_at__isnull=True,
-            is_latest_version=True
-        ).count()
-        category_stats.append({
-            'id': category.id,
-            'name': category.name,
-            'document_count': doc_count
-        })
+    category_counts = snapshot.group('documents_by_category')
+    category_stats = [
+        {
+            'id': category['id'],
+            'name': category['name'],
+            'document_count': int(category_counts.get(str(category['id']), 0))
+        }
+        for category in DocumentCategory.objects.filter(
+            deleted_at__isnull=True, is_active=True
+        ).values('id', 'name')[:10]
+    ]
     
     # Recent documents
     recent_documents = all_documents.select_related('owner', 'category').order_by('-created_at')[:10]
@@ -596,18 +748,18 @@ def dms_dashboard(request):
     
     return Response({
         'documents': {
-            'total': all_documents.count(),
+            'total': snapshot.count('documents'),
             'by_status': doc_by_status,
             'by_type': doc_by_type,
             'expiring_soon': expiring_soon,
-            'expired': expired_count,
+            'expired': snapshot.count('expired_documents'),
         },
         'storage': {
             'total_bytes': total_storage_bytes,
             'total_gb': total_storage_gb,
         },
         'approvals': {
-            'pending': pending_approvals,
+            'pending': snapshot.count('pending_approvals'),
         },
         'activity': {
             'today': activities_today,
@@ -0,0 +1,17 @@
+"""
+Webhook events raised by the DMS app
+"""
+from apps.core.webhooks import serialize_instance, track_event
+from apps.dms.models import Document
+from apps.dms.storage import document_storage
+
+
+def document_payload(document):
+    """Document fields, with the checksum of its blob even before ``blobs`` fills it in"""
+    data = serialize_instance(document)
+    if not data['checksum'] and document_storage.is_blob(document.file.name):
+        data['checksum'] = document_storage.checksum(document.file.name)
+    return data
+
+
+track_event('document.uploaded', Document, created=True, serialize=document_payload)
@@ -0,0 +1,163 @@
+"""
+Journal entry posting
+
+Posting a journal entry marks it ``posted`` and moves the balances of the GL
+accounts its lines touch. ``post_journal_entries`` does this for any number
+of entries with a fixed number of queries per batch:
+
+* one grouped query validates that every entry is balanced
+* one grouped query sums debit/credit per account across all lines
+* the net change per account is applied with a single ``F()``-based UPDATE
+
+Entries and accounts are locked with ``select_for_update`` in primary key
+order so concurrent postings touching the same accounts serialize instead
+of losing updates or deadlocking.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.utils import timezone
+
+from apps.finance.models import GeneralLedger, JournalEntry, JournalEntryLine
+
+# Accounts whose balance increases with debits; all others increase with credits
+DEBIT_NORMAL_TYPES = ['asset', 'expense']
+
+# Keeps ``IN (...)`` lists below database parameter limits
+QUERY_BATCH_SIZE = 1000
+
+
+class JournalPostingError(Exception):
+    """Raised when entries cannot be posted; ``errors`` maps entry id -> reason"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} journal entries cannot be posted")
+
+
+def _batches(values, size=QUERY_BATCH_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def balance_delta(account_type, debit, credit):
+    """Signed change to an account balance for the given debit/credit totals"""
+    if account_type in DEBIT_NORMAL_TYPES:
+        return debit - credit
+    return credit - debit
+
+
+def _validate(entry_ids):
+    """Return ``{entry_id: reason}`` for entries that cannot be posted"""
+    errors = {}
+    statuses = {}
+    for batch in _batches(entry_ids):
+        statuses.update(
+            JournalEntry.objects.select_for_update()
+            .filter(pk__in=batch, deleted_at__isnull=True)
+            .order_by('pk')
+            .values_list('pk', 'status')
+        )
+
+    for entry_id in entry_ids:
+        if entry_id not in statuses:
+            errors[entry_id] = 'Journal entry not found'
+        elif statuses[entry_id] != 'draft':
+            errors[entry_id] = 'Only draft entries can be posted'
+
+    for batch in _batches([entry_id for entry_id in entry_ids if entry_id not in errors]):
+        totals = (
+            JournalEntryLine.objects.filter(journal_entry_id__in=batch)
+            .order_by()
+            .values('journal_entry_id')
+            .annotate(total_debit=Sum('debit'), total_credit=Sum('credit'))
+        )
+        for row in totals:
+            if row['total_debit'] != row['total_credit']:
+                errors[row['journal_entry_id']] = (
+                    f"Journal entry is not balanced. "
+                    f"Debit: {row['total_debit']}, Credit: {row['total_credit']}"
+                )
+    return errors
+
+
+def _account_deltas(entry_ids):
+    """Net balance change per account across all lines of ``entry_ids``"""
+    deltas = defaultdict(Decimal)
+    for batch in _batches(entry_ids):
+        totals = (
+            JournalEntryLine.objects.filter(journal_entry_id__in=batch)
+            .order_by()
+            .values('account_id', 'account__account_type')
+            .annotate(total_debit=Sum('debit'), total_credit=Sum('credit'))
+        )
+        for row in totals:
+            deltas[row['account_id']] += balance_delta(
+                row['account__account_type'], row['total_debit'], row['total_credit']
+            )
+    return {account_id: delta for account_id, delta in deltas.items() if delta}
+
+
+def _apply_account_deltas(deltas):
+    """Lock the accounts in pk order and add their deltas in one UPDATE per batch"""
+    account_ids = sorted(deltas)
+    now = timezone.now()
+    for batch in _batches(account_ids):
+        list(
+            GeneralLedger.objects.select_for_update()
+            .filter(pk__in=batch)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+        GeneralLedger.objects.filter(pk__in=batch).update(
+            balance=F('balance') + Case(
+                *[When(pk=account_id, then=Value(deltas[account_id])) for account_id in batch],
+                output_field=DecimalField(max_digits=15, decimal_places=2),
+            ),
+            updated_at=now,
+        )
+
+
+def post_journal_entries(entry_ids, posted_by=None, partial=False):
+    """
+    Post draft journal entries and update GL balances in one transaction
+
+    Args:
+        entry_ids: Primary keys of the entries to post
+        posted_by: Employee recorded as the poster
+        partial: Post the valid entries and report the rest instead of
+            rejecting the whole batch
+
+    Returns:
+        dict: ``posted`` (ids), ``failed`` ({id: reason}) and ``accounts_updated``
+
+    Raises:
+        JournalPostingError: Some entries are invalid and ``partial`` is False
+    """
+    entry_ids = sorted(set(entry_ids))
+
+    with transaction.atomic():
+        errors = _validate(entry_ids)
+        if errors and not partial:
+            raise JournalPostingError(errors)
+
+        posted = [entry_id for entry_id in entry_ids if entry_id not in errors]
+        deltas = _account_deltas(posted)
+        _apply_account_deltas(deltas)
+
+        now = timezone.now()
+        for batch in _batches(posted):
+            JournalEntry.objects.filter(pk__in=batch).update(
+                status='posted',
+                posted_at=now,
+                posted_by=posted_by,
+                updated_at=now,
+            )
+
+    return {
+        'posted': posted,
+        'failed': errors,
+        'accounts_updated': len(deltas),
+    }
@@ -0,0 +1,42 @@
+"""
+Dashboard snapshot metrics for the Finance dashboard
+"""
+from apps.core.snapshots import DashboardSnapshot, SnapshotMetric
+from apps.finance.models import Invoice, Expense, Tax
+
+OPEN_INVOICE_STATUSES = [
+    key for key, _label in Invoice.STATUS_CHOICES if key not in ('paid', 'cancelled')
+]
+
+finance_snapshot = DashboardSnapshot('finance')
+
+finance_snapshot.track(
+    Invoice,
+    SnapshotMetric(
+        'revenue', field='total_amount',
+        invoice_type='sales', status='paid', deleted_at__isnull=True
+    ),
+    SnapshotMetric(
+        'monthly_revenue', field='total_amount', by_month='invoice_date',
+        invoice_type='sales', status='paid', deleted_at__isnull=True
+    ),
+    SnapshotMetric(
+        'outstanding_ar', field='outstanding_amount',
+        invoice_type='sales', status__in=OPEN_INVOICE_STATUSES, deleted_at__isnull=True
+    ),
+)
+
+finance_snapshot.track(
+    Expense,
+    SnapshotMetric('expenses', field='amount', status='paid', deleted_at__isnull=True),
+    SnapshotMetric(
+        'monthly_expenses', field='amount', by_month='expense_date',
+        status='paid', deleted_at__isnull=True
+    ),
+    SnapshotMetric('pending_expenses', status='submitted', deleted_at__isnull=True),
+)
+
+finance_snapshot.track(
+    Tax,
+    SnapshotMetric('pending_taxes', field='tax_amount', status='calculated', deleted_at__isnull=True),
+)
@@ -18,6 +18,7 @@ urlpatterns = [
     path('journal-entries/', views.JournalEntryListView.as_view(), name='journal-list'),
     path('journal-entries/<int:pk>/', views.JournalEntryDetailView.as_view(), name='journal-detail'),
     path('journal-entries/<int:pk>/post/', views.journal_entry_post, name='journal-post'),
+    path('journal-entries/bulk-post/', views.journal_entry_bulk_post, name='journal-bulk-post'),
     
     # Invoices
     path('invoices/', views.InvoiceListView.as_view(), name='invoice-list'),
@@ -12,6 +12,9 @@ from datetime import timedelta
 from decimal import Decimal
 
 from apps.authentication.permissions import IsAdminOrReadOnly
+from apps.core.aggregates import aggregate_metrics, sum_if
+from apps.core.mixins import CachedQueryMixin, ConditionalGetMixin
+from apps.core.query_inspector import query_budget
 from apps.finance.models import (
     GeneralLedger, JournalEntry, JournalEntryLine,
     Invoice, InvoiceLine, Payment, Expense,
@@ -26,14 +29,17 @@ from apps.finance.serializers import (
     BudgetListSerializer, BudgetSerializer, BudgetLineSerializer,
     TaxSerializer
 )
+from apps.finance.posting import JournalPostingError, post_journal_entries
+from apps.finance.snapshots import finance_snapshot
 
 
 # ============ General Ledger ============
 
-class GeneralLedgerListView(generics.ListCreateAPIView):
+class GeneralLedgerListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create GL accounts"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = GeneralLedgerListSerializer
+    etag_related = ['sub_accounts', 'journal_lines']
     
     def get_queryset(self):
         queryset = GeneralLedger.objects.filter(deleted_at__isnull=True)
@@ -64,10 +70,11 @@ class GeneralLedgerListView(generics.ListCreateAPIView):
         return queryset.select_related('parent').order_by('code')
 
 
-class GeneralLedgerDetailView(generics.RetrieveUpdateDestroyAPIView):
+class GeneralLedgerDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete GL account"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = GeneralLedgerSerializer
+    etag_related = ['sub_accounts']
     
     def get_queryset(self):
         return GeneralLedger.objects.filter(deleted_at__isnull=True)
@@ -80,10 +87,11 @@ class GeneralLedgerDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============ Journal Entry ============
 
-class JournalEntryListView(generics.ListCreateAPIView):
+class JournalEntryListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create journal entries"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = JournalEntryListSerializer
+    etag_related = ['lines']
     
     def get_queryset(self):
         queryset = JournalEntry.objects.filter(deleted_at__isnull=True)
@@ -112,10 +120,11 @@ class JournalEntryListView(generics.ListCreateAPIView):
         return queryset.select_related('posted_by').prefetch_related('lines')
 
 
-class JournalEntryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class JournalEntryDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete journal entry"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = JournalEntrySerializer
+    etag_related = ['lines']
     
     def get_queryset(self):
         return JournalEntry.objects.filter(deleted_at__isnull=True)
@@ -144,44 +153,64 @@ def journal_entry_post(request, pk):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Validate balanced entry
-    total_debit = journal_entry.lines.aggregate(total=Sum('debit'))['total'] or 0
-    total_credit = journal_entry.lines.aggregate(total=Sum('credit'))['total'] or 0
-    
-    if total_debit != total_credit:
+    try:
+        post_journal_entries([journal_entry.pk], posted_by=request.user.employee_profile)
+    except JournalPostingError as e:
         return Response(
-            {'error': f'Journal entry is not balanced. Debit: {total_debit}, Credit: {total_credit}'},
+            {'error': e.errors[journal_entry.pk]},
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Post the entry
-    journal_entry.status = 'posted'
-    journal_entry.posted_at = timezone.now()
-    journal_entry.posted_by = request.user.employee_profile
-    journal_entry.save()
-    
-    # Update GL account balances
-    for line in journal_entry.lines.all():
-        account = line.account
-        if line.debit > 0:
-            if account.account_type in ['asset', 'expense']:
-                account.balance += line.debit
-            else:
-                account.balance -= line.debit
-        if line.credit > 0:
-            if account.account_type in ['asset', 'expense']:
-                account.balance -= line.credit
-            else:
-                account.balance += line.credit
-        account.save()
-    
+    journal_entry.refresh_from_db()
     serializer = JournalEntrySerializer(journal_entry)
     return Response(serializer.data)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def journal_entry_bulk_post(request):
+    """
+    Post many draft journal entries in one transaction
+    
+    Body: {"ids": [1, 2, ...], "partial": false}
+    With partial=false (default) nothing is posted if any entry is invalid.
+    """
+    entry_ids = request.data.get('ids')
+    try:
+        entry_ids = [int(entry_id) for entry_id in entry_ids] if isinstance(entry_ids, list) else []
+    except (TypeError, ValueError):
+        entry_ids = []
+    if not entry_ids:
+        return Response(
+            {'error': 'ids must be a non-empty list of journal entry IDs'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    partial = str(request.data.get('partial', '')).lower() in ('1', 'true', 'yes')
+    
+    try:
+        result = post_journal_entries(
+            entry_ids,
+            posted_by=getattr(request.user, 'employee_profile', None),
+            partial=partial
+        )
+    except JournalPostingError as e:
+        return Response(
+            {'error': str(e), 'details': e.errors},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response({
+        'posted_count': len(result['posted']),
+        'posted': result['posted'],
+        'failed': result['failed'],
+        'accounts_updated': result['accounts_updated'],
+    })
+
+
 # ============ Invoice ============
 
-class InvoiceListView(generics.ListCreateAPIView):
+class InvoiceListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create invoices"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = InvoiceListSerializer
@@ -231,10 +260,11 @@ class InvoiceListView(generics.ListCreateAPIView):
         return queryset.select_related('client', 'project').prefetch_related('lines')
 
 
-class InvoiceDetailView(generics.RetrieveUpdateDestroyAPIView):
+class InvoiceDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete invoice"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = InvoiceSerializer
+    etag_related = ['lines']
     
     def get_queryset(self):
         return Invoice.objects.filter(deleted_at__isnull=True)
@@ -247,7 +277,7 @@ class InvoiceDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============ Payment ============
 
-class PaymentListView(generics.ListCreateAPIView):
+class PaymentListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create payments"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = PaymentListSerializer
@@ -294,7 +324,7 @@ class PaymentListView(generics.ListCreateAPIView):
         return queryset.select_related('client', 'invoice', 'account')
 
 
-class PaymentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PaymentDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete payment"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = PaymentSerializer
@@ -350,10 +380,12 @@ def payment_confirm(request, pk):
 
 # ============ Expense ============
 
-class ExpenseListView(generics.ListCreateAPIView):
-    """List and create expenses"""
+class ExpenseListView(CachedQueryMixin, ConditionalGetMixin, generics.ListCreateAPIView):
+    """List and create expenses (cached per staff/own-expenses scope)"""
     permission_classes = [IsAuthenticated]
     serializer_class = ExpenseListSerializer
+    cache_key_prefix = 'expenses'
+    cache_invalidated_by = ['finance.Expense', 'hr.Employee', 'hr.Department', 'project.Project']
     
     def get_queryset(self):
         queryset = Expense.objects.filter(deleted_at__isnull=True)
@@ -409,7 +441,7 @@ class ExpenseListView(generics.ListCreateAPIView):
         )
 
 
-class ExpenseDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ExpenseDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete expense"""
     permission_classes = [IsAuthenticated]
     serializer_class = ExpenseSerializer
@@ -490,7 +522,7 @@ def expense_reject(request, pk):
 
 # ============ Budget ============
 
-class BudgetListView(generics.ListCreateAPIView):
+class BudgetListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create budgets"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = BudgetListSerializer
@@ -529,10 +561,11 @@ class BudgetListView(generics.ListCreateAPIView):
         return queryset.select_related('department', 'project', 'approved_by')
 
 
-class BudgetDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BudgetDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete budget"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = BudgetSerializer
+    etag_related = ['lines']
     
     def get_queryset(self):
         return Budget.objects.filter(deleted_at__isnull=True)
@@ -545,7 +578,7 @@ class BudgetDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============ Tax ============
 
-class TaxListView(generics.ListCreateAPIView):
+class TaxListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create taxes"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = TaxSerializer
@@ -581,7 +614,7 @@ class TaxListView(generics.ListCreateAPIView):
         return queryset.order_by('-tax_period_year', '-tax_period_month')
 
 
-class TaxDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TaxDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, delete tax"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = TaxSerializer
@@ -597,6 +630,7 @@ class TaxDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============ Dashboard ============
 
+@query_budget(6)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def finance_dashboard(request):
@@ -605,50 +639,24 @@ def finance_dashboard(request):
     current_month_start = today.replace(day=1)
     current_year = today.year
     
-    # Revenue metrics (from invoices)
-    invoices = Invoice.objects.filter(
+    # Running totals (revenue, AR, expenses, taxes) from the materialized snapshot
+    snapshot = finance_snapshot.read()
+    total_revenue = snapshot.get('revenue', Decimal('0'))
+    outstanding_ar = snapshot.get('outstanding_ar', Decimal('0'))
+    total_expenses = snapshot.get('expenses', Decimal('0'))
+    pending_expenses = snapshot.count('pending_expenses')
+    pending_taxes = snapshot.get('pending_taxes', Decimal('0'))
+    monthly_revenue = snapshot.months('monthly_revenue', current_year)
+    monthly_expenses = snapshot.months('monthly_expenses', current_year)
+    
+    # Date-relative metrics are computed live
+    overdue_invoices = Invoice.objects.filter(
         deleted_at__isnull=True,
-        invoice_type='sales'
-    )
-    
-    total_revenue = invoices.filter(status='paid').aggregate(
-        total=Coalesce(Sum('total_amount'), Decimal('0'), output_field=DecimalField())
-    )['total']
-    
-    outstanding_ar = invoices.exclude(status__in=['paid', 'cancelled']).aggregate(
-        total=Coalesce(Sum('outstanding_amount'), Decimal('0'), output_field=DecimalField())
-    )['total']
-    
-    overdue_invoices = invoices.filter(
+        invoice_type='sales',
         due_date__lt=today,
         status__in=['sent', 'partial']
     ).count()
     
-    # Monthly revenue trend
-    monthly_revenue = invoices.filter(
-        invoice_date__year=current_year,
-        status='paid'
-    ).values('invoice_date__month').annotate(
-        revenue=Coalesce(Sum('total_amount'), Decimal('0'), output_field=DecimalField())
-    ).order_by('invoice_date__month')
-    
-    # Expense metrics
-    expenses = Expense.objects.filter(deleted_at__isnull=True)
-    
-    total_expenses = expenses.filter(status='paid').aggregate(
-        total=Coalesce(Sum('amount'), Decimal('0'), output_field=DecimalField())
-    )['total']
-    
-    pending_expenses = expenses.filter(status='submitted').count()
-    
-    # Monthly expenses
-    monthly_expenses = expenses.filter(
-        expense_date__year=current_year,
-        status='paid'
-    ).values('expense_date__month').annotate(
-        amount=Coalesce(Sum('amount'), Decimal('0'), output_field=DecimalField())
-    ).order_by('expense_date__month')
-    
     # Budget utilization
     active_budgets = Budget.objects.filter(
         deleted_at__isnull=True,
@@ -664,31 +672,19 @@ def finance_dashboard(request):
     )
     
     # Cash flow (simplified)
-    cash_in = Payment.objects.filter(
-        deleted_at__isnull=True,
-        payment_type='receipt',
-        status='completed',
-        payment_date__gte=current_month_start
-    ).aggregate(
-        total=Coalesce(Sum('amount'), Decimal('0'), output_field=DecimalField())
-    )['total']
-    
-    cash_out = Payment.objects.filter(
-        deleted_at__isnull=True,
-        payment_type='payment',
-        status='completed',
-        payment_date__gte=current_month_start
-    ).aggregate(
-        total=Coalesce(Sum('amount'), Decimal('0'), output_field=DecimalField())
-    )['total']
-    
-    # Tax obligations
-    pending_taxes = Tax.objects.filter(
-        deleted_at__isnull=True,
-        status='calculated'
-    ).aggregate(
-        total=Coalesce(Sum('tax_amount'), Decimal('0'), output_field=DecimalField())
-    )['total']
+    cash_flow = aggregate_metrics(
+        Payment.objects.filter(
+            deleted_at__isnull=True,
+            status='completed',
+            payment_date__gte=current_month_start
+        ),
+        {
+            'cash_in': sum_if('amount', payment_type='receipt'),
+            'cash_out': sum_if('amount', payment_type='payment'),
+        }
+    )
+    cash_in = cash_flow['cash_in']
+    cash_out = cash_flow['cash_out']
     
     return Response({
         'revenue': {
@@ -697,10 +693,10 @@ def finance_dashboard(request):
             'overdue_invoices': overdue_invoices,
             'monthly_trend': [
                 {
-                    'month': item['invoice_date__month'],
-                    'revenue': float(item['revenue'])
+                    'month': month,
+                    'revenue': float(revenue)
                 }
-                for item in monthly_revenue
+                for month, revenue in monthly_revenue
             ]
         },
         'expenses': {
@@ -708,10 +704,10 @@ def finance_dashboard(request):
             'pending_approval': pending_expenses,
             'monthly_trend': [
                 {
-                    'month': item['expense_date__month'],
-                    'amount': float(item['amount'])
+                    'month': month,
+                    'amount': float(amount)
                 }
-                for item in monthly_expenses
+                for month, amount in monthly_expenses
             ]
         },
         'budget': {
@@ -0,0 +1,8 @@
+"""
+Webhook events raised by the Finance app
+"""
+from apps.core.webhooks import track_event
+from apps.finance.models import Invoice
+
+track_event('invoice.created', Invoice, created=True)
+track_event('invoice.paid', Invoice, status='paid')
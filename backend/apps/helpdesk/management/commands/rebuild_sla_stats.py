@@ -0,0 +1,54 @@
+"""
+Management command to rebuild the daily ticket SLA rollup
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+from apps.helpdesk.models import Ticket, TicketSLADailyStats
+from apps.helpdesk.sla_stats import refresh_sla_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute TicketSLADailyStats from the tickets table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Rebuild only the last N days (default: full history)',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Number of days recomputed per transaction (default: 31)',
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+
+        if options['days']:
+            first_day = today - timedelta(days=options['days'] - 1)
+        else:
+            earliest = Ticket._base_manager.aggregate(first=Min('created_at'))['first']
+            if earliest is None:
+                deleted, _ = TicketSLADailyStats.objects.all().delete()
+                self.stdout.write(self.style.SUCCESS(f"No tickets; cleared {deleted} rows"))
+                return
+            first_day = timezone.localtime(earliest, timezone.get_default_timezone()).date()
+            TicketSLADailyStats.objects.exclude(date__range=(first_day, today)).delete()
+
+        rows = 0
+        chunk = timedelta(days=max(options['chunk_days'], 1))
+        start = first_day
+        while start <= today:
+            end = min(start + chunk - timedelta(days=1), today)
+            rows += refresh_sla_stats(start, end)
+            start = end + timedelta(days=1)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt ticket SLA stats from {first_day} to {today} ({rows} rows)")
+        )
@@ -0,0 +1,67 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('asset', '0003_initial'),
+        ('crm', '0002_initial'),
+        ('helpdesk', '0001_initial'),
+        ('hr', '0001_initial'),
+        ('project', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketSLADailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField(db_index=True)),
+                ('priority', models.CharField(max_length=20)),
+                ('created_count', models.IntegerField(default=0)),
+                ('responded_count', models.IntegerField(default=0)),
+                ('first_response_seconds', models.BigIntegerField(default=0)),
+                ('resolved_count', models.IntegerField(default=0)),
+                ('resolution_hours_count', models.IntegerField(default=0)),
+                ('resolution_hours_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('sla_tracked_count', models.IntegerField(default=0)),
+                ('sla_met_count', models.IntegerField(default=0)),
+                ('rated_count', models.IntegerField(default=0)),
+                ('satisfaction_total', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Ticket SLA Daily Stats',
+                'verbose_name_plural': 'Ticket SLA Daily Stats',
+                'db_table': 'ticket_sla_daily_stats',
+                'ordering': ['-date', 'priority'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['first_response_at'], name='tickets_first_r_f1f7c3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['resolved_at'], name='tickets_resolve_d6269e_idx'),
+        ),
+        migrations.AddField(
+            model_name='ticketsladailystats',
+            name='sla_policy',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='helpdesk.slapolicy'),
+        ),
+        migrations.AddConstraint(
+            model_name='ticketsladailystats',
+            constraint=models.UniqueConstraint(fields=('date', 'priority', 'sla_policy'), name='unique_ticket_sla_daily_stats'),
+        ),
+        migrations.AddConstraint(
+            model_name='ticketsladailystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('sla_policy__isnull', True)), fields=('date', 'priority'), name='unique_ticket_sla_daily_stats_no_policy'),
+        ),
+    ]
@@ -144,6 +144,8 @@ class Ticket(BaseModel):
             models.Index(fields=['priority']),
             models.Index(fields=['assigned_to']),
             models.Index(fields=['requester']),
+            models.Index(fields=['first_response_at']),
+            models.Index(fields=['resolved_at']),
         ]
     
     def __str__(self):
@@ -365,3 +367,63 @@ class TicketTemplate(BaseModel):
     
     def __str__(self):
         return self.name
+
+
+class TicketSLADailyStats(TimeStampedModel):
+    """
+    Daily SLA/performance rollup of tickets per (date, priority, SLA policy)
+    
+    Each fact is bucketed on the day it happened: responses on the date of
+    ``first_response_at``, resolutions/SLA outcomes/ratings on the date of
+    ``resolved_at``. Rows are refreshed by ``apps.helpdesk.sla_stats``.
+    """
+    
+    date = models.DateField(db_index=True)
+    priority = models.CharField(max_length=20)
+    sla_policy = models.ForeignKey(
+        SLAPolicy,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='daily_stats'
+    )
+    
+    # Tickets opened
+    created_count = models.IntegerField(default=0)
+    
+    # First response
+    responded_count = models.IntegerField(default=0)
+    first_response_seconds = models.BigIntegerField(default=0)
+    
+    # Resolution
+    resolved_count = models.IntegerField(default=0)
+    resolution_hours_count = models.IntegerField(default=0)
+    resolution_hours_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    
+    # SLA compliance (resolved tickets with an SLA policy)
+    sla_tracked_count = models.IntegerField(default=0)
+    sla_met_count = models.IntegerField(default=0)
+    
+    # Satisfaction
+    rated_count = models.IntegerField(default=0)
+    satisfaction_total = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'ticket_sla_daily_stats'
+        verbose_name = 'Ticket SLA Daily Stats'
+        verbose_name_plural = 'Ticket SLA Daily Stats'
+        ordering = ['-date', 'priority']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'priority', 'sla_policy'],
+                name='unique_ticket_sla_daily_stats'
+            ),
+            models.UniqueConstraint(
+                fields=['date', 'priority'],
+                condition=models.Q(sla_policy__isnull=True),
+                name='unique_ticket_sla_daily_stats_no_policy'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} - {self.priority} - {self.sla_policy_id or 'no SLA'}"
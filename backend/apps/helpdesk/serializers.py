@@ -3,6 +3,7 @@ Helpdesk/Support/Ticketing System serializers
 """
 from rest_framework import serializers
 from django.utils import timezone
+from django.db.models import Count, F, Q
 from datetime import timedelta
 from apps.helpdesk.models import (
     Ticket, TicketComment, SLAPolicy, TicketEscalation,
@@ -92,7 +93,7 @@ class TicketListSerializer(serializers.ModelSerializer):
     
     def get_comment_count(self, obj):
         """Count ticket comments"""
-        return obj.comments.filter(deleted_at__isnull=True).count()
+        return obj.comments.count()
 
 
 class TicketSerializer(serializers.ModelSerializer):
@@ -137,7 +138,7 @@ class TicketSerializer(serializers.ModelSerializer):
     
     def get_comments(self, obj):
         """Get ticket comments"""
-        comments = obj.comments.filter(deleted_at__isnull=True).order_by('created_at')
+        comments = obj.comments.order_by('created_at')
         return TicketCommentSerializer(comments, many=True).data
 
 
@@ -205,16 +206,19 @@ class SLAPolicySerializer(serializers.ModelSerializer):
             status__in=['resolved', 'closed']
         )
         
-        total_count = resolved_tickets.count()
+        counts = resolved_tickets.aggregate(
+            total=Count('pk'),
+            compliant=Count('pk', filter=Q(
+                resolution_due__isnull=False,
+                resolved_at__lte=F('resolution_due')
+            ))
+        )
+        total_count = counts['total']
         if total_count == 0:
             return None
         
         # Count tickets resolved within SLA
-        compliant_count = 0
-        for ticket in resolved_tickets:
-            if ticket.resolved_at and ticket.resolution_due:
-                if ticket.resolved_at <= ticket.resolution_due:
-                    compliant_count += 1
+        compliant_count = counts['compliant']
         
         return round((compliant_count / total_count) * 100, 2)
 
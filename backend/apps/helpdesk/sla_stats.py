@@ -0,0 +1,238 @@
+"""
+Daily SLA/performance rollup for helpdesk tickets
+
+``TicketSLADailyStats`` holds one row per (date, priority, SLA policy) with
+the sums and counts needed for the dashboard averages, so "last N days"
+questions are answered from a table of a few rows per day instead of the
+tickets table.
+
+Rows are recomputed in SQL for whole days: ticket writes refresh the days
+touched by the old and new version of the row (after commit), and
+``manage.py rebuild_sla_stats`` backfills history.
+
+Changes made through ``QuerySet.update()``/``bulk_create()`` bypass signals;
+run ``manage.py rebuild_sla_stats`` after such maintenance.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from apps.helpdesk.models import Ticket, TicketSLADailyStats
+
+logger = logging.getLogger(__name__)
+
+RESOLVED_STATUSES = ['resolved', 'closed']
+
+# Ticket fields that feed the rollup; saves touching none of them are ignored
+TRACKED_FIELDS = [
+    'priority', 'sla_policy', 'status', 'deleted_at', 'created_at',
+    'first_response_at', 'resolved_at', 'resolution_due',
+    'resolution_time_hours', 'satisfaction_rating',
+]
+
+# Ticket timestamps whose date selects the bucket a fact is counted in
+BUCKET_FIELDS = ['created_at', 'first_response_at', 'resolved_at']
+
+FIRST_RESPONSE_DURATION = ExpressionWrapper(
+    F('first_response_at') - F('created_at'), output_field=DurationField()
+)
+SLA_TRACKED = Q(sla_policy__isnull=False)
+SLA_MET = SLA_TRACKED & Q(resolution_due__isnull=False, resolved_at__lte=F('resolution_due'))
+
+STAT_FIELDS = [
+    'created_count', 'responded_count', 'first_response_seconds',
+    'resolved_count', 'resolution_hours_count', 'resolution_hours_total',
+    'sla_tracked_count', 'sla_met_count', 'rated_count', 'satisfaction_total',
+]
+
+
+def _local_date(value):
+    return timezone.localtime(value, timezone.get_default_timezone()).date()
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_default_timezone())
+
+
+def _bucketed(date_field, start, end, **filters):
+    """Tickets whose ``date_field`` falls in [start, end), grouped per bucket"""
+    return Ticket._base_manager.filter(
+        deleted_at__isnull=True,
+        **{f"{date_field}__gte": start, f"{date_field}__lt": end},
+        **filters
+    ).order_by().annotate(
+        day=TruncDate(date_field, tzinfo=timezone.get_default_timezone())
+    ).values('day', 'priority', 'sla_policy')
+
+
+def compute_sla_stats(first_day, last_day):
+    """Aggregate ticket facts for ``first_day``..``last_day`` (inclusive) in SQL"""
+    start, end = _day_start(first_day), _day_start(last_day + timedelta(days=1))
+    buckets = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+
+    def merge(rows):
+        for row in rows:
+            key = (row.pop('day'), row.pop('priority'), row.pop('sla_policy'))
+            buckets[key].update({name: value or 0 for name, value in row.items()})
+
+    merge(_bucketed('created_at', start, end).annotate(created_count=Count('pk')))
+    merge(
+        _bucketed('first_response_at', start, end).annotate(
+            responded_count=Count('pk'),
+            first_response=Sum(FIRST_RESPONSE_DURATION),
+        )
+    )
+    merge(
+        _bucketed('resolved_at', start, end, status__in=RESOLVED_STATUSES).annotate(
+            resolved_count=Count('pk'),
+            resolution_hours_count=Count('resolution_time_hours'),
+            resolution_hours_total=Sum('resolution_time_hours'),
+            sla_tracked_count=Count('pk', filter=SLA_TRACKED),
+            sla_met_count=Count('pk', filter=SLA_MET),
+            rated_count=Count('satisfaction_rating'),
+            satisfaction_total=Sum('satisfaction_rating'),
+        )
+    )
+
+    stats = []
+    for (day, priority, sla_policy_id), values in buckets.items():
+        first_response = values.pop('first_response', None)
+        if first_response:
+            values['first_response_seconds'] = int(first_response.total_seconds())
+        stats.append(TicketSLADailyStats(
+            date=day, priority=priority, sla_policy_id=sla_policy_id, **values
+        ))
+    return stats
+
+
+def refresh_sla_stats(first_day, last_day=None):
+    """Recompute and replace the rollup rows for ``first_day``..``last_day``"""
+    last_day = last_day or first_day
+    for attempt in range(2):
+        stats = compute_sla_stats(first_day, last_day)
+        try:
+            with transaction.atomic():
+                TicketSLADailyStats.objects.filter(
+                    date__gte=first_day, date__lte=last_day
+                ).delete()
+                TicketSLADailyStats.objects.bulk_create(stats, batch_size=1000)
+            return len(stats)
+        except IntegrityError:
+            # Another writer refreshed the same day concurrently; recompute once
+            if attempt:
+                raise
+
+
+def summarize_sla_stats(days=None):
+    """
+    Dashboard performance metrics from the rollup
+
+    Args:
+        days: Only include the last ``days`` days (today inclusive); all history if None
+    """
+    queryset = TicketSLADailyStats.objects.order_by()
+    if days:
+        queryset = queryset.filter(date__gt=timezone.localdate() - timedelta(days=days))
+
+    totals = queryset.aggregate(**{name: Sum(name) for name in STAT_FIELDS})
+    totals = {name: value or 0 for name, value in totals.items()}
+
+    sla_by_priority = {}
+    for row in queryset.filter(sla_tracked_count__gt=0).values('priority').annotate(
+        tracked=Sum('sla_tracked_count'), met=Sum('sla_met_count')
+    ):
+        sla_by_priority[row['priority']] = _rate(row['met'], row['tracked'])
+
+    return {
+        'tickets_created': totals['created_count'],
+        'tickets_resolved': totals['resolved_count'],
+        'avg_first_response_hours': _average(
+            totals['first_response_seconds'] / 3600, totals['responded_count']
+        ),
+        'avg_resolution_hours': _average(
+            totals['resolution_hours_total'], totals['resolution_hours_count']
+        ),
+        'avg_satisfaction_rating': _average(totals['satisfaction_total'], totals['rated_count']),
+        'sla_compliance_rate': _rate(totals['sla_met_count'], totals['sla_tracked_count']),
+        'sla_compliance_by_priority': sla_by_priority,
+    }
+
+
+def _average(total, count):
+    if not count:
+        return None
+    return round(float(total) / count, 2)
+
+
+def _rate(met, tracked):
+    if not tracked:
+        return None
+    return round(met / tracked * 100, 2)
+
+
+# ----- Signal handlers -----
+
+def _affected_days(ticket):
+    if ticket is None:
+        return set()
+    return {
+        _local_date(getattr(ticket, field))
+        for field in BUCKET_FIELDS
+        if getattr(ticket, field) is not None
+    }
+
+
+def _ticket_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._sla_stats_previous = None
+    instance._sla_stats_skip = False
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(TRACKED_FIELDS).intersection(update_fields):
+        instance._sla_stats_skip = True
+        return
+    previous = sender._base_manager.filter(pk=instance.pk).only(*TRACKED_FIELDS).first()
+    if previous is not None and all(
+        getattr(previous, field.attname) == getattr(instance, field.attname)
+        for field in (sender._meta.get_field(name) for name in TRACKED_FIELDS)
+    ):
+        instance._sla_stats_skip = True
+        return
+    instance._sla_stats_previous = previous
+
+
+def _ticket_post_save(sender, instance, raw=False, **kwargs):
+    if raw or getattr(instance, '_sla_stats_skip', False):
+        return
+    days = _affected_days(instance) | _affected_days(getattr(instance, '_sla_stats_previous', None))
+    instance._sla_stats_previous = None
+    _schedule_refresh(days)
+
+
+def _ticket_post_delete(sender, instance, **kwargs):
+    _schedule_refresh(_affected_days(instance))
+
+
+def _schedule_refresh(days):
+    if not days:
+        return
+
+    def refresh():
+        for day in sorted(days):
+            try:
+                refresh_sla_stats(day)
+            except Exception as e:
+                # Never fail the user's write because of the rollup
+                logger.error(f"Failed to refresh ticket SLA stats for {day}: {e}")
+
+    transaction.on_commit(refresh)
+
+
+pre_save.connect(_ticket_pre_save, sender=Ticket, dispatch_uid='ticket_sla_stats')
+post_save.connect(_ticket_post_save, sender=Ticket, dispatch_uid='ticket_sla_stats')
+post_delete.connect(_ticket_post_delete, sender=Ticket, dispatch_uid='ticket_sla_stats')
@@ -0,0 +1,25 @@
+"""
+Dashboard snapshot metrics for the Helpdesk dashboard
+"""
+from apps.core.snapshots import DashboardSnapshot, SnapshotMetric
+from apps.helpdesk.models import Ticket, KnowledgeBase
+
+# Connects the daily SLA rollup handlers alongside the snapshot handlers
+from apps.helpdesk import sla_stats  # noqa: F401
+
+helpdesk_snapshot = DashboardSnapshot('helpdesk')
+
+helpdesk_snapshot.track(
+    Ticket,
+    SnapshotMetric('tickets', deleted_at__isnull=True),
+    SnapshotMetric('tickets_by_status', group_by='status', deleted_at__isnull=True),
+    SnapshotMetric('tickets_by_priority', group_by='priority', deleted_at__isnull=True),
+    SnapshotMetric('tickets_by_category', group_by='category', deleted_at__isnull=True),
+)
+
+helpdesk_snapshot.track(
+    KnowledgeBase,
+    SnapshotMetric('kb_articles', deleted_at__isnull=True),
+    SnapshotMetric('kb_published', status='published', deleted_at__isnull=True),
+    SnapshotMetric('kb_views', field='view_count', deleted_at__isnull=True),
+)
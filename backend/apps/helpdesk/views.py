@@ -24,12 +24,15 @@ from apps.helpdesk.serializers import (
     KnowledgeBaseListSerializer, KnowledgeBaseSerializer,
     TicketTemplateListSerializer, TicketTemplateSerializer
 )
+from apps.helpdesk.snapshots import helpdesk_snapshot
+from apps.helpdesk.sla_stats import summarize_sla_stats
 from apps.core.permissions import IsAdminOrReadOnly
+from apps.core.mixins import ConditionalGetMixin
 
 
 # ============= Ticket Views =============
 
-class TicketListView(generics.ListCreateAPIView):
+class TicketListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create tickets"""
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -37,6 +40,7 @@ class TicketListView(generics.ListCreateAPIView):
     search_fields = ['ticket_number', 'subject', 'description', 'requester_email']
     ordering_fields = ['created_at', 'priority', 'status', 'due_date']
     ordering = ['-created_at']
+    etag_related = ['comments']
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -78,10 +82,11 @@ class TicketListView(generics.ListCreateAPIView):
         )
 
 
-class TicketDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TicketDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a ticket"""
     permission_classes = [IsAuthenticated]
     serializer_class = TicketSerializer
+    etag_related = ['comments']
     
     def get_queryset(self):
         queryset = Ticket.objects.filter(deleted_at__isnull=True)
@@ -250,7 +255,7 @@ def ticket_rate(request, pk):
 
 # ============= Ticket Comment Views =============
 
-class TicketCommentListView(generics.ListCreateAPIView):
+class TicketCommentListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create ticket comments"""
     permission_classes = [IsAuthenticated]
     serializer_class = TicketCommentSerializer
@@ -285,7 +290,7 @@ class TicketCommentListView(generics.ListCreateAPIView):
 
 # ============= SLA Policy Views =============
 
-class SLAPolicyListView(generics.ListCreateAPIView):
+class SLAPolicyListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create SLA policies"""
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [SearchFilter, OrderingFilter]
@@ -308,7 +313,7 @@ class SLAPolicyListView(generics.ListCreateAPIView):
         return queryset
 
 
-class SLAPolicyDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SLAPolicyDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete an SLA policy"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = SLAPolicySerializer
@@ -322,7 +327,7 @@ class SLAPolicyDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============= Ticket Escalation Views =============
 
-class TicketEscalationListView(generics.ListCreateAPIView):
+class TicketEscalationListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create ticket escalations"""
     permission_classes = [IsAuthenticated]
     serializer_class = TicketEscalationSerializer
@@ -363,7 +368,7 @@ def escalation_resolve(request, pk):
 
 # ============= Knowledge Base Views =============
 
-class KnowledgeBaseListView(generics.ListCreateAPIView):
+class KnowledgeBaseListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create knowledge base articles"""
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -388,7 +393,7 @@ class KnowledgeBaseListView(generics.ListCreateAPIView):
         return queryset.select_related('author')
 
 
-class KnowledgeBaseDetailView(generics.RetrieveUpdateDestroyAPIView):
+class KnowledgeBaseDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a knowledge base article"""
     permission_classes = [IsAuthenticated]
     serializer_class = KnowledgeBaseSerializer
@@ -462,7 +467,7 @@ def knowledge_base_publish(request, pk):
 
 # ============= Ticket Template Views =============
 
-class TicketTemplateListView(generics.ListCreateAPIView):
+class TicketTemplateListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List and create ticket templates"""
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [SearchFilter, OrderingFilter]
@@ -485,7 +490,7 @@ class TicketTemplateListView(generics.ListCreateAPIView):
         return queryset.select_related('default_assigned_team', 'sla_policy')
 
 
-class TicketTemplateDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TicketTemplateDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a ticket template"""
     permission_classes = [IsAdminOrReadOnly]
     serializer_class = TicketTemplateSerializer
@@ -499,6 +504,10 @@ class TicketTemplateDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ============= Dashboard =============
 
+OPEN_STATUSES = ['new', 'open', 'in_progress', 'pending']
+RESOLVED_STATUSES = ['resolved', 'closed']
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def helpdesk_dashboard(request):
@@ -506,104 +515,73 @@ def helpdesk_dashboard(request):
     
     # Ticket metrics
     all_tickets = Ticket.objects.filter(deleted_at__isnull=True)
-    open_tickets = all_tickets.filter(status__in=['new', 'open', 'in_progress', 'pending'])
+    open_tickets = all_tickets.filter(status__in=OPEN_STATUSES)
+    
+    # Running totals from the materialized snapshot
+    snapshot = helpdesk_snapshot.read()
     
     # Count by status
+    status_counts = snapshot.group('tickets_by_status')
     ticket_by_status = {}
     for status_key, status_label in Ticket.STATUS_CHOICES:
-        count = all_tickets.filter(status=status_key).count()
         ticket_by_status[status_key] = {
             'label': status_label,
-            'count': count
+            'count': int(status_counts.get(status_key, 0))
         }
     
     # Count by priority
+    priority_counts = snapshot.group('tickets_by_priority')
     ticket_by_priority = {}
     for priority_key, priority_label in Ticket.PRIORITY_CHOICES:
-        count = all_tickets.filter(priority=priority_key).count()
         ticket_by_priority[priority_key] = {
             'label': priority_label,
-            'count': count
+            'count': int(priority_counts.get(priority_key, 0))
         }
     
     # Overdue tickets
     now = timezone.now()
     overdue_tickets = open_tickets.filter(resolution_due__lt=now).count()
     
-    # Response time metrics
-    tickets_with_response = all_tickets.exclude(first_response_at__isnull=True)
-    avg_first_response_hours = None
-    if tickets_with_response.exists():
-        total_seconds = sum([
-            (t.first_response_at - t.created_at).total_seconds()
-            for t in tickets_with_response
-        ])
-        avg_first_response_hours = round(total_seconds / tickets_with_response.count() / 3600, 2)
-    
-    # Resolution time metrics
-    resolved_tickets = all_tickets.filter(status__in=['resolved', 'closed'])
-    avg_resolution_hours = resolved_tickets.aggregate(
-        avg=Avg('resolution_time_hours')
-    )['avg']
-    if avg_resolution_hours:
-        avg_resolution_hours = round(float(avg_resolution_hours), 2)
-    
-    # Satisfaction metrics
-    rated_tickets = all_tickets.exclude(satisfaction_rating__isnull=True)
-    avg_satisfaction = rated_tickets.aggregate(avg=Avg('satisfaction_rating'))['avg']
-    if avg_satisfaction:
-        avg_satisfaction = round(float(avg_satisfaction), 2)
-    
-    # SLA compliance
-    tickets_with_sla = resolved_tickets.exclude(sla_policy__isnull=True)
-    sla_met_count = 0
-    for ticket in tickets_with_sla:
-        if ticket.resolved_at and ticket.resolution_due:
-            if ticket.resolved_at <= ticket.resolution_due:
-                sla_met_count += 1
-    
-    sla_compliance_rate = None
-    if tickets_with_sla.count() > 0:
-        sla_compliance_rate = round((sla_met_count / tickets_with_sla.count()) * 100, 2)
+    # Response/resolution/SLA metrics from the daily rollup (optionally windowed)
+    period_days = request.query_params.get('period_days')
+    if period_days is not None:
+        if not period_days.isdigit() or int(period_days) < 1:
+            return Response(
+                {'error': 'period_days must be a positive number of days'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        period_days = int(period_days)
+    performance = summarize_sla_stats(days=period_days)
+    performance['period_days'] = period_days
     
     # Top categories
+    category_counts = snapshot.group('tickets_by_category')
     ticket_by_category = {}
     for category_key, category_label in Ticket.CATEGORY_CHOICES:
-        count = all_tickets.filter(category=category_key).count()
         ticket_by_category[category_key] = {
             'label': category_label,
-            'count': count
+            'count': int(category_counts.get(category_key, 0))
         }
     
-    # Knowledge base metrics
-    kb_articles = KnowledgeBase.objects.filter(deleted_at__isnull=True)
-    kb_published = kb_articles.filter(status='published').count()
-    kb_total_views = kb_articles.aggregate(total=Sum('view_count'))['total'] or 0
-    
     # Recent tickets
     recent_tickets = open_tickets.order_by('-created_at')[:10]
     recent_tickets_data = TicketListSerializer(recent_tickets, many=True).data
     
     return Response({
         'tickets': {
-            'total': all_tickets.count(),
-            'open': open_tickets.count(),
-            'resolved': resolved_tickets.count(),
+            'total': snapshot.count('tickets'),
+            'open': sum(ticket_by_status[key]['count'] for key in OPEN_STATUSES),
+            'resolved': sum(ticket_by_status[key]['count'] for key in RESOLVED_STATUSES),
             'overdue': overdue_tickets,
             'by_status': ticket_by_status,
             'by_priority': ticket_by_priority,
             'by_category': ticket_by_category,
         },
-        'performance': {
-            'avg_first_response_hours': avg_first_response_hours,
-            'avg_resolution_hours': avg_resolution_hours,
-            'avg_satisfaction_rating': avg_satisfaction,
-            'sla_compliance_rate': sla_compliance_rate,
-        },
+        'performance': performance,
         'knowledge_base': {
-            'total_articles': kb_articles.count(),
-            'published_articles': kb_published,
-            'total_views': kb_total_views,
+            'total_articles': snapshot.count('kb_articles'),
+            'published_articles': snapshot.count('kb_published'),
+            'total_views': snapshot.count('kb_views'),
         },
         'recent_tickets': recent_tickets_data,
     })
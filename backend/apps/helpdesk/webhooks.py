@@ -0,0 +1,8 @@
+"""
+Webhook events raised by the Helpdesk app
+"""
+from apps.core.webhooks import track_event
+from apps.helpdesk.models import Ticket
+
+track_event('ticket.created', Ticket, created=True)
+track_event('ticket.resolved', Ticket, status='resolved')
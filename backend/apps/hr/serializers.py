@@ -1,6 +1,8 @@
 """
 HR & Talent Management Serializers
 """
+from datetime import datetime
+
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from .models import (
@@ -79,24 +81,24 @@ class EmployeeSerializer(serializers.ModelSerializer):
             'id', 'user', 'user_email', 'employee_id', 'first_name', 'last_name',
             'full_name', 'email', 'phone', 'mobile', 'photo',
             'date_of_birth', 'gender', 'marital_status', 'nationality',
-            'id_number', 'tax_id', 'address', 'city', 'state', 'postal_code', 'country',
+            'id_card_number', 'passport_number', 'tax_id',
+            'address', 'city', 'province', 'postal_code',
             'department', 'department_name', 'position', 'position_title',
-            'manager', 'manager_name', 'join_date', 'contract_start', 'contract_end',
-            'employment_type', 'employment_status', 'work_location',
-            'salary', 'bank_name', 'bank_account', 'bpjs_kesehatan',
-            'bpjs_ketenagakerjaan', 'npwp', 'emergency_contact_name',
-            'emergency_contact_phone', 'emergency_contact_relation',
+            'reporting_to', 'manager_name', 'join_date', 'probation_end_date',
+            'contract_end_date', 'resign_date', 'employment_type', 'employment_status',
+            'base_salary', 'bank_name', 'bank_account_number', 'bank_account_holder',
+            'emergency_contact_name', 'emergency_contact_phone', 'emergency_contact_relationship',
             'notes', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
         extra_kwargs = {
-            'salary': {'write_only': True},
-            'bank_account': {'write_only': True},
+            'base_salary': {'write_only': True},
+            'bank_account_number': {'write_only': True},
         }
     
     def get_manager_name(self, obj):
-        if obj.manager:
-            return f"{obj.manager.first_name} {obj.manager.last_name}"
+        if obj.reporting_to:
+            return f"{obj.reporting_to.first_name} {obj.reporting_to.last_name}"
         return None
     
     def get_full_name(self, obj):
@@ -113,10 +115,10 @@ class AttendanceSerializer(serializers.ModelSerializer):
         model = Attendance
         fields = [
             'id', 'employee', 'employee_id', 'employee_name', 'date',
-            'check_in', 'check_in_location', 'check_in_ip',
-            'check_out', 'check_out_location', 'check_out_ip',
-            'duration', 'work_hours', 'overtime_hours', 'status',
-            'attendance_type', 'notes', 'created_at', 'updated_at'
+            'clock_in', 'clock_in_location',
+            'clock_out', 'clock_out_location',
+            'duration', 'working_hours', 'overtime_hours', 'status',
+            'is_approved', 'approved_by', 'approved_at', 'notes', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
@@ -124,8 +126,8 @@ class AttendanceSerializer(serializers.ModelSerializer):
         return f"{obj.employee.first_name} {obj.employee.last_name}"
     
     def get_duration(self, obj):
-        if obj.check_in and obj.check_out:
-            delta = obj.check_out - obj.check_in
+        if obj.clock_in and obj.clock_out:
+            delta = datetime.combine(obj.date, obj.clock_out) - datetime.combine(obj.date, obj.clock_in)
             hours = delta.total_seconds() / 3600
             return round(hours, 2)
         return None
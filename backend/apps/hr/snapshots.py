@@ -0,0 +1,19 @@
+"""
+Dashboard snapshot metrics for the HR dashboard
+"""
+from apps.core.snapshots import DashboardSnapshot, SnapshotMetric
+
+from .models import Employee, Leave
+
+hr_snapshot = DashboardSnapshot('hr')
+
+hr_snapshot.track(
+    Employee,
+    SnapshotMetric('active_employees', employment_status='active', deleted_at__isnull=True),
+    SnapshotMetric('department_employees', group_by='department_id', employment_status='active'),
+)
+
+hr_snapshot.track(
+    Leave,
+    SnapshotMetric('pending_leaves', status='pending', deleted_at__isnull=True),
+)
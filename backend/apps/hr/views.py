@@ -21,11 +21,14 @@ from .serializers import (
     AttendanceSerializer, LeaveSerializer, LeaveBalanceSerializer,
     PayrollSerializer, PerformanceReviewSerializer
 )
+from .snapshots import hr_snapshot
 from apps.authentication.permissions import IsAdminOrReadOnly
+from apps.core.mixins import ConditionalGetMixin
+from apps.core.pagination import KeysetPagination
 
 
 # Department Views
-class DepartmentListView(generics.ListCreateAPIView):
+class DepartmentListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all departments or create new department"""
     queryset = Department.objects.filter(deleted_at__isnull=True).select_related('head')
     serializer_class = DepartmentSerializer
@@ -53,7 +56,7 @@ class DepartmentListView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class DepartmentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class DepartmentDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a department"""
     queryset = Department.objects.filter(deleted_at__isnull=True).select_related('head')
     serializer_class = DepartmentSerializer
@@ -96,7 +99,7 @@ class DepartmentDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Position Views
-class PositionListView(generics.ListCreateAPIView):
+class PositionListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all positions or create new position"""
     queryset = Position.objects.filter(deleted_at__isnull=True).select_related('department')
     serializer_class = PositionSerializer
@@ -124,7 +127,7 @@ class PositionListView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class PositionDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PositionDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a position"""
     queryset = Position.objects.filter(deleted_at__isnull=True).select_related('department')
     serializer_class = PositionSerializer
@@ -159,11 +162,11 @@ class PositionDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Employee Views
-class EmployeeListView(generics.ListCreateAPIView):
+class EmployeeListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all employees or create new employee"""
     queryset = Employee.objects.filter(
         deleted_at__isnull=True
-    ).select_related('user', 'department', 'position', 'manager')
+    ).select_related('user', 'department', 'position', 'reporting_to')
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_fields = ['employment_status', 'employment_type', 'department', 'position', 'gender']
@@ -193,11 +196,11 @@ class EmployeeListView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class EmployeeDetailView(generics.RetrieveUpdateDestroyAPIView):
+class EmployeeDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete an employee"""
     queryset = Employee.objects.filter(
         deleted_at__isnull=True
-    ).select_related('user', 'department', 'position', 'manager')
+    ).select_related('user', 'department', 'position', 'reporting_to')
     serializer_class = EmployeeSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
     
@@ -231,15 +234,17 @@ class EmployeeDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Attendance Views
-class AttendanceListView(generics.ListCreateAPIView):
+class AttendanceListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all attendance records or create new record"""
     serializer_class = AttendanceSerializer
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
-    filterset_fields = ['employee', 'status', 'attendance_type', 'date']
+    filterset_fields = ['employee', 'status', 'date']
     search_fields = ['employee__first_name', 'employee__last_name', 'employee__employee_id']
-    ordering_fields = ['date', 'check_in', 'created_at']
+    ordering_fields = ['date', 'clock_in', 'created_at']
     ordering = ['-date']
+    pagination_class = KeysetPagination
+    etag_from_page = True
     
     def get_queryset(self):
         queryset = Attendance.objects.all().select_related('employee')
@@ -284,7 +289,7 @@ class AttendanceListView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class AttendanceDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AttendanceDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete attendance record"""
     queryset = Attendance.objects.all().select_related('employee')
     serializer_class = AttendanceSerializer
@@ -313,7 +318,7 @@ class AttendanceDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Leave Views
-class LeaveListView(generics.ListCreateAPIView):
+class LeaveListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all leave requests or create new request"""
     serializer_class = LeaveSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -355,7 +360,7 @@ class LeaveListView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class LeaveDetailView(generics.RetrieveUpdateDestroyAPIView):
+class LeaveDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete leave request"""
     queryset = Leave.objects.filter(deleted_at__isnull=True).select_related('employee', 'approver')
     serializer_class = LeaveSerializer
@@ -451,7 +456,7 @@ class LeaveApprovalView(APIView):
 
 
 # Leave Balance Views
-class LeaveBalanceListView(generics.ListCreateAPIView):
+class LeaveBalanceListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all leave balances or create new balance"""
     serializer_class = LeaveBalanceSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -492,7 +497,7 @@ class LeaveBalanceListView(generics.ListCreateAPIView):
 
 
 # Payroll Views
-class PayrollListView(generics.ListCreateAPIView):
+class PayrollListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all payroll records or create new record"""
     serializer_class = PayrollSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
@@ -532,7 +537,7 @@ class PayrollListView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class PayrollDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PayrollDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete payroll record"""
     queryset = Payroll.objects.filter(deleted_at__isnull=True).select_related('employee')
     serializer_class = PayrollSerializer
@@ -564,7 +569,7 @@ class PayrollDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 
 # Performance Review Views
-class PerformanceReviewListView(generics.ListCreateAPIView):
+class PerformanceReviewListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all performance reviews or create new review"""
     serializer_class = PerformanceReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -604,7 +609,7 @@ class PerformanceReviewListView(generics.ListCreateAPIView):
         return super().post(request, *args, **kwargs)
 
 
-class PerformanceReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PerformanceReviewDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete performance review"""
     queryset = PerformanceReview.objects.filter(
         deleted_at__isnull=True
@@ -652,12 +657,12 @@ class HRDashboardView(APIView):
         current_month = today.month
         current_year = today.year
         
-        # Employee statistics
-        total_employees = Employee.objects.filter(
-            employment_status='active',
-            deleted_at__isnull=True
-        ).count()
+        # Running totals from the materialized snapshot
+        snapshot = hr_snapshot.read()
+        total_employees = snapshot.count('active_employees')
+        pending_leaves = snapshot.count('pending_leaves')
         
+        # Date-relative metrics are computed live
         new_employees_this_month = Employee.objects.filter(
             join_date__year=current_year,
             join_date__month=current_month,
@@ -667,14 +672,7 @@ class HRDashboardView(APIView):
         # Attendance statistics
         present_today = Attendance.objects.filter(
             date=today,
-            status='present',
-            deleted_at__isnull=True
-        ).count()
-        
-        # Leave statistics
-        pending_leaves = Leave.objects.filter(
-            status='pending',
-            deleted_at__isnull=True
+            status='present'
         ).count()
         
         on_leave_today = Leave.objects.filter(
@@ -685,12 +683,17 @@ class HRDashboardView(APIView):
         ).count()
         
         # Department breakdown
-        department_stats = Department.objects.filter(
-            deleted_at__isnull=True,
-            is_active=True
-        ).annotate(
-            employee_count=Count('employees', filter=Q(employees__employment_status='active'))
-        ).values('name', 'employee_count')
+        department_counts = snapshot.group('department_employees')
+        department_stats = [
+            {
+                'name': department['name'],
+                'employee_count': int(department_counts.get(str(department['id']), 0))
+            }
+            for department in Department.objects.filter(
+                deleted_at__isnull=True,
+                is_active=True
+            ).values('id', 'name')
+        ]
         
         return Response({
             'total_employees': total_employees,
@@ -698,5 +701,5 @@ class HRDashboardView(APIView):
             'present_today': present_today,
             'on_leave_today': on_leave_today,
             'pending_leaves': pending_leaves,
-            'department_breakdown': list(department_stats)
+            'department_breakdown': department_stats
         })
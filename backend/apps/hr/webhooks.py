@@ -0,0 +1,24 @@
+"""
+Webhook events raised by the HR app
+"""
+from apps.core.webhooks import track_event
+
+from .models import Employee
+
+
+def employee_payload(employee):
+    """Public employee fields only (no salary or identity documents)"""
+    return {
+        'id': employee.pk,
+        'employee_id': employee.employee_id,
+        'first_name': employee.first_name,
+        'last_name': employee.last_name,
+        'email': employee.email,
+        'department_id': employee.department_id,
+        'position_id': employee.position_id,
+        'employment_type': employee.employment_type,
+        'join_date': employee.join_date,
+    }
+
+
+track_event('employee.created', Employee, created=True, serialize=employee_payload)
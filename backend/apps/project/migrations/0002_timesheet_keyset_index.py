@@ -0,0 +1,20 @@
+# Generated by Django 5.0.1 on 2026-10-17 03:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr', '0001_initial'),
+        ('project', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timesheet',
+            index=models.Index(fields=['date', 'id'], name='timesheets_date_4bff69_idx'),
+        ),
+    ]
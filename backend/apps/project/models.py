@@ -326,6 +326,7 @@ class Timesheet(BaseModel):
             models.Index(fields=['employee', 'date']),
             models.Index(fields=['project', 'date']),
             models.Index(fields=['task']),
+            models.Index(fields=['date', 'id']),
         ]
     
     def __str__(self):
@@ -0,0 +1,27 @@
+"""
+Dashboard snapshot metrics for the Project dashboard (organisation-wide view)
+"""
+from apps.core.snapshots import DashboardSnapshot, SnapshotMetric
+from apps.project.models import Project, Task, Timesheet
+
+project_snapshot = DashboardSnapshot('project')
+
+project_snapshot.track(
+    Project,
+    SnapshotMetric('projects', deleted_at__isnull=True),
+    SnapshotMetric('projects_by_status', group_by='status', deleted_at__isnull=True),
+    SnapshotMetric('total_budget', field='estimated_budget', deleted_at__isnull=True),
+    SnapshotMetric('total_cost', field='actual_cost', deleted_at__isnull=True),
+    SnapshotMetric('total_contract', field='contract_value', deleted_at__isnull=True),
+)
+
+project_snapshot.track(
+    Task,
+    SnapshotMetric('tasks', deleted_at__isnull=True),
+    SnapshotMetric('tasks_by_status', group_by='status', deleted_at__isnull=True),
+)
+
+project_snapshot.track(
+    Timesheet,
+    SnapshotMetric('pending_timesheets', is_approved=False, deleted_at__isnull=True),
+)
@@ -22,11 +22,15 @@ from apps.project.serializers import (
     TaskCommentSerializer, ProjectRiskSerializer
 )
 from apps.authentication.permissions import IsAdminOrReadOnly
+from apps.core.aggregates import aggregate_metrics, choice_counts, count_if, sum_if
+from apps.core.mixins import ConditionalGetMixin
+from apps.core.pagination import KeysetPagination
+from apps.project.snapshots import project_snapshot
 
 
 # ===== PROJECT VIEWS =====
 
-class ProjectListView(generics.ListCreateAPIView):
+class ProjectListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all projects or create new project"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -58,7 +62,7 @@ class ProjectListView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
-class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a project"""
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
     serializer_class = ProjectSerializer
@@ -88,7 +92,7 @@ class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ===== PROJECT TEAM MEMBER VIEWS =====
 
-class ProjectTeamMemberListView(generics.ListCreateAPIView):
+class ProjectTeamMemberListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all project team members or add new member"""
     serializer_class = ProjectTeamMemberSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
@@ -110,7 +114,7 @@ class ProjectTeamMemberListView(generics.ListCreateAPIView):
         return queryset
 
 
-class ProjectTeamMemberDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectTeamMemberDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a project team member"""
     serializer_class = ProjectTeamMemberSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
@@ -129,7 +133,7 @@ class ProjectTeamMemberDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ===== TASK VIEWS =====
 
-class TaskListView(generics.ListCreateAPIView):
+class TaskListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all tasks or create new task (Kanban)"""
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -162,7 +166,7 @@ class TaskListView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
-class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TaskDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a task"""
     permission_classes = [IsAuthenticated]
     serializer_class = TaskSerializer
@@ -226,7 +230,7 @@ def task_move(request, pk):
 
 # ===== SPRINT VIEWS =====
 
-class SprintListView(generics.ListCreateAPIView):
+class SprintListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all sprints or create new sprint"""
     serializer_class = SprintSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
@@ -251,7 +255,7 @@ class SprintListView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
-class SprintDetailView(generics.RetrieveUpdateDestroyAPIView):
+class SprintDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a sprint"""
     serializer_class = SprintSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
@@ -279,7 +283,7 @@ class SprintDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ===== TIMESHEET VIEWS =====
 
-class TimesheetListView(generics.ListCreateAPIView):
+class TimesheetListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all timesheets or create new timesheet"""
     serializer_class = TimesheetSerializer
     permission_classes = [IsAuthenticated]
@@ -288,6 +292,8 @@ class TimesheetListView(generics.ListCreateAPIView):
     search_fields = ['description']
     ordering_fields = ['date', 'hours']
     ordering = ['-date']
+    pagination_class = KeysetPagination
+    etag_from_page = True
     
     def get_queryset(self):
         queryset = Timesheet.objects.filter(deleted_at__isnull=True).select_related(
@@ -309,7 +315,7 @@ class TimesheetListView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
-class TimesheetDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TimesheetDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a timesheet"""
     serializer_class = TimesheetSerializer
     permission_classes = [IsAuthenticated]
@@ -385,7 +391,7 @@ def timesheet_approve(request, pk):
 
 # ===== PROJECT MILESTONE VIEWS =====
 
-class ProjectMilestoneListView(generics.ListCreateAPIView):
+class ProjectMilestoneListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all milestones or create new milestone"""
     serializer_class = ProjectMilestoneSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
@@ -410,7 +416,7 @@ class ProjectMilestoneListView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
-class ProjectMilestoneDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectMilestoneDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a milestone"""
     serializer_class = ProjectMilestoneSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
@@ -438,7 +444,7 @@ class ProjectMilestoneDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ===== TASK COMMENT VIEWS =====
 
-class TaskCommentListView(generics.ListCreateAPIView):
+class TaskCommentListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all comments or create new comment"""
     serializer_class = TaskCommentSerializer
     permission_classes = [IsAuthenticated]
@@ -461,7 +467,7 @@ class TaskCommentListView(generics.ListCreateAPIView):
         return queryset
 
 
-class TaskCommentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TaskCommentDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a comment"""
     serializer_class = TaskCommentSerializer
     permission_classes = [IsAuthenticated]
@@ -479,7 +485,7 @@ class TaskCommentDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ===== PROJECT RISK VIEWS =====
 
-class ProjectRiskListView(generics.ListCreateAPIView):
+class ProjectRiskListView(ConditionalGetMixin, generics.ListCreateAPIView):
     """List all risks or create new risk"""
     serializer_class = ProjectRiskSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
@@ -506,7 +512,7 @@ class ProjectRiskListView(generics.ListCreateAPIView):
         serializer.save(created_by=self.request.user)
 
 
-class ProjectRiskDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectRiskDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update or delete a risk"""
     serializer_class = ProjectRiskSerializer
     permission_classes = [IsAuthenticated, IsAdminOrReadOnly]
@@ -536,6 +542,12 @@ class ProjectRiskDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 # ===== PROJECT DASHBOARD =====
 
+def _snapshot_choice_counts(snapshot, metric, choices):
+    """Expand a grouped snapshot metric into ``{choice: count}`` for every choice"""
+    counts = snapshot.group(metric)
+    return {value: int(counts.get(value, 0)) for value, _label in choices}
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def project_dashboard(request):
@@ -565,66 +577,66 @@ def project_dashboard(request):
             deleted_at__isnull=True
         ).distinct()
     
-    # Project metrics
-    total_projects = projects.count()
-    active_projects = projects.filter(status='active').count()
-    completed_projects = projects.filter(status='completed').count()
-    delayed_projects = projects.filter(
-        status__in=['active', 'on_hold'],
-        end_date__lt=timezone.now().date()
-    ).count()
-    
-    # Task metrics
-    total_tasks = tasks.count()
-    tasks_by_status = {
-        'backlog': tasks.filter(status='backlog').count(),
-        'todo': tasks.filter(status='todo').count(),
-        'in_progress': tasks.filter(status='in_progress').count(),
-        'review': tasks.filter(status='review').count(),
-        'testing': tasks.filter(status='testing').count(),
-        'done': tasks.filter(status='done').count(),
-        'blocked': tasks.filter(status='blocked').count(),
-    }
-    overdue_tasks = tasks.filter(
-        status__in=['backlog', 'todo', 'in_progress', 'review', 'testing'],
-        due_date__lt=timezone.now().date()
-    ).count()
-    
-    # My tasks (for non-admin)
-    my_tasks = 0
-    if not user.is_staff:
-        try:
-            employee = user.employee
-            my_tasks = tasks.filter(assigned_to=employee).count()
-        except:
-            pass
-    
-    # Timesheet metrics
     today = timezone.now().date()
     week_start = today - timedelta(days=today.weekday())
     week_end = week_start + timedelta(days=6)
     
-    hours_this_week = timesheets.filter(
-        date__range=[week_start, week_end]
-    ).aggregate(total=Sum('hours'))['total'] or 0
-    
-    pending_approval = timesheets.filter(is_approved=False).count()
-    
-    # Budget metrics
-    budget_data = projects.aggregate(
-        total_budget=Sum('estimated_budget'),
-        total_cost=Sum('actual_cost'),
-        total_contract=Sum('contract_value')
-    )
+    open_task_statuses = ['backlog', 'todo', 'in_progress', 'review', 'testing']
     
-    # Project by status
-    projects_by_status = {
-        'planning': projects.filter(status='planning').count(),
-        'active': projects.filter(status='active').count(),
-        'on_hold': projects.filter(status='on_hold').count(),
-        'completed': projects.filter(status='completed').count(),
-        'cancelled': projects.filter(status='cancelled').count(),
-    }
+    if user.is_staff:
+        # Organisation-wide running totals come from the materialized snapshot;
+        # only the date-relative metrics are aggregated live
+        snapshot = project_snapshot.read()
+        project_metrics = aggregate_metrics(projects, {
+            'delayed': count_if(status__in=['active', 'on_hold'], end_date__lt=today),
+        })
+        project_metrics.update({
+            'total': snapshot.count('projects'),
+            'total_budget': snapshot.get('total_budget', 0),
+            'total_cost': snapshot.get('total_cost', 0),
+            'total_contract': snapshot.get('total_contract', 0),
+        })
+        projects_by_status = _snapshot_choice_counts(
+            snapshot, 'projects_by_status', Project.STATUS_CHOICES
+        )
+        
+        task_metrics = aggregate_metrics(tasks, {
+            'overdue': count_if(status__in=open_task_statuses, due_date__lt=today),
+        })
+        task_metrics.update({
+            'total': snapshot.count('tasks'),
+            'by_status': _snapshot_choice_counts(snapshot, 'tasks_by_status', Task.STATUS_CHOICES),
+        })
+        
+        timesheet_metrics = aggregate_metrics(timesheets, {
+            'hours_this_week': sum_if('hours', date__range=[week_start, week_end]),
+        })
+        timesheet_metrics['pending_approval'] = snapshot.count('pending_timesheets')
+    else:
+        # Project metrics (single aggregate query)
+        project_metrics = aggregate_metrics(projects, {
+            'total': count_if(),
+            'delayed': count_if(status__in=['active', 'on_hold'], end_date__lt=today),
+            'by_status': choice_counts('status', Project.STATUS_CHOICES),
+            'total_budget': sum_if('estimated_budget'),
+            'total_cost': sum_if('actual_cost'),
+            'total_contract': sum_if('contract_value'),
+        })
+        projects_by_status = project_metrics['by_status']
+        
+        # Task metrics (single aggregate query)
+        task_metrics = aggregate_metrics(tasks, {
+            'total': count_if(),
+            'by_status': choice_counts('status', Task.STATUS_CHOICES),
+            'overdue': count_if(status__in=open_task_statuses, due_date__lt=today),
+            'my_tasks': count_if(assigned_to__user=user),
+        })
+        
+        # Timesheet metrics (single aggregate query)
+        timesheet_metrics = aggregate_metrics(timesheets, {
+            'hours_this_week': sum_if('hours', date__range=[week_start, week_end]),
+            'pending_approval': count_if(is_approved=False),
+        })
     
     # Recent activities
     recent_tasks = tasks.order_by('-updated_at')[:5].values(
@@ -633,27 +645,27 @@ def project_dashboard(request):
     
     return Response({
         'projects': {
-            'total': total_projects,
-            'active': active_projects,
-            'completed': completed_projects,
-            'delayed': delayed_projects,
+            'total': project_metrics['total'],
+            'active': projects_by_status['active'],
+            'completed': projects_by_status['completed'],
+            'delayed': project_metrics['delayed'],
             'by_status': projects_by_status,
         },
         'tasks': {
-            'total': total_tasks,
-            'by_status': tasks_by_status,
-            'overdue': overdue_tasks,
-            'my_tasks': my_tasks,
+            'total': task_metrics['total'],
+            'by_status': task_metrics['by_status'],
+            'overdue': task_metrics['overdue'],
+            'my_tasks': task_metrics.get('my_tasks', 0),
         },
         'timesheets': {
-            'hours_this_week': float(hours_this_week),
-            'pending_approval': pending_approval,
+            'hours_this_week': float(timesheet_metrics['hours_this_week']),
+            'pending_approval': timesheet_metrics['pending_approval'],
         },
         'budget': {
-            'total_budget': float(budget_data['total_budget'] or 0),
-            'total_cost': float(budget_data['total_cost'] or 0),
-            'total_contract': float(budget_data['total_contract'] or 0),
-            'variance': float((budget_data['total_cost'] or 0) - (budget_data['total_budget'] or 0)),
+            'total_budget': float(project_metrics['total_budget']),
+            'total_cost': float(project_metrics['total_cost']),
+            'total_contract': float(project_metrics['total_contract']),
+            'variance': float(project_metrics['total_cost']) - float(project_metrics['total_budget']),
         },
         'recent_activities': list(recent_tasks),
     })
@@ -0,0 +1,10 @@
+"""
+Webhook events raised by the Project app
+"""
+from apps.core.webhooks import track_event
+from apps.project.models import Project, Task
+
+track_event('project.created', Project, created=True)
+track_event('project.updated', Project, updated=True)
+track_event('task.created', Task, created=True)
+track_event('task.completed', Task, status='done')
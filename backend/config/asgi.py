@@ -2,6 +2,9 @@
 ASGI config for Ikodio ERP project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests (including the notification SSE stream) go to Django;
+WebSocket connections go to the notification stream
+(``apps.core.notification_stream``).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -13,4 +16,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up
+from apps.core.notification_stream import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -40,6 +40,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Full-text and trigram search lookups (no-op on SQLite)
 ]
 
 THIRD_PARTY_APPS = [
@@ -67,6 +68,9 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    # First, so the time and queries of all other middleware are measured
+    'apps.core.metrics.RequestMetricsMiddleware',
+    'apps.core.query_inspector.QueryInspectorMiddleware',  # N+1 warnings, QUERY_INSPECTOR_ENABLED only
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -240,6 +244,7 @@ REST_FRAMEWORK = {
         'user': config('THROTTLE_USER', default='1000/hour'),  # Authenticated users
         'login': config('THROTTLE_LOGIN', default='5/minute'),  # Login attempts
         'sensitive': config('THROTTLE_SENSITIVE', default='10/minute'),  # Sensitive operations
+        'upload_chunk': config('THROTTLE_UPLOAD_CHUNK', default='3000/hour'),  # Resumable upload chunks
     },
 }
 
@@ -314,6 +319,65 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 
+# Audit Log Settings (see apps/core/audit.py)
+AUDIT_LOG_WRITER = config('AUDIT_LOG_WRITER', default='buffer')  # buffer, celery or sync
+AUDIT_LOG_BATCH_SIZE = config('AUDIT_LOG_BATCH_SIZE', default=200, cast=int)
+AUDIT_LOG_FLUSH_INTERVAL = config('AUDIT_LOG_FLUSH_INTERVAL', default=2.0, cast=float)  # seconds
+AUDIT_LOG_MAX_PENDING = config('AUDIT_LOG_MAX_PENDING', default=10000, cast=int)
+AUDIT_API_REQUESTS = config('AUDIT_API_REQUESTS', default=False, cast=bool)  # one APILog row per /api/ request
+
+# Report Settings
+REPORT_CHUNK_SIZE = config('REPORT_CHUNK_SIZE', default=2000, cast=int)  # rows fetched per round trip
+DATA_EXPORT_CHUNK_SIZE = config('DATA_EXPORT_CHUNK_SIZE', default=5000, cast=int)
+DATA_EXPORT_EXPIRY_DAYS = config('DATA_EXPORT_EXPIRY_DAYS', default=7, cast=int)
+
+# Webhook Delivery Settings (see apps/core/webhooks.py)
+WEBHOOK_TIMEOUT = config('WEBHOOK_TIMEOUT', default=10, cast=int)  # seconds per request
+WEBHOOK_MAX_RETRIES = config('WEBHOOK_MAX_RETRIES', default=5, cast=int)
+WEBHOOK_RETRY_BASE_SECONDS = config('WEBHOOK_RETRY_BASE_SECONDS', default=30, cast=int)
+WEBHOOK_MAX_CONCURRENCY = config('WEBHOOK_MAX_CONCURRENCY', default=32, cast=int)
+WEBHOOK_PER_HOST_CONCURRENCY = config('WEBHOOK_PER_HOST_CONCURRENCY', default=4, cast=int)
+WEBHOOK_PER_HOST_BATCH = config('WEBHOOK_PER_HOST_BATCH', default=8, cast=int)  # deliveries per host per batch
+WEBHOOK_BATCH_SIZE = config('WEBHOOK_BATCH_SIZE', default=200, cast=int)
+
+# Scheduler Settings (see apps/core/scheduler.py)
+SCHEDULER_POLL_INTERVAL = config('SCHEDULER_POLL_INTERVAL', default=15, cast=float)  # max seconds between ticks
+SCHEDULER_BATCH_SIZE = config('SCHEDULER_BATCH_SIZE', default=100, cast=int)  # jobs claimed per tick
+
+# Notification Stream Settings (see apps/core/notifications.py)
+NOTIFICATION_REDIS_URL = config('NOTIFICATION_REDIS_URL', default=CACHES['default']['LOCATION'])  # pub/sub
+NOTIFICATION_COUNTER_TIMEOUT = config('NOTIFICATION_COUNTER_TIMEOUT', default=24 * 3600, cast=int)  # seconds
+NOTIFICATION_STREAM_KEEPALIVE = config('NOTIFICATION_STREAM_KEEPALIVE', default=25, cast=int)  # seconds
+
+# Request Metrics Settings (see apps/core/metrics.py)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')  # bearer token for the Prometheus scraper
+METRICS_SLOW_REQUEST_MS = config('METRICS_SLOW_REQUEST_MS', default=500, cast=int)
+METRICS_SLOW_QUERY_COUNT = config('METRICS_SLOW_QUERY_COUNT', default=20, cast=int)
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default='')  # shared by all workers; empty it at server start
+METRICS_DUMP_INTERVAL = config('METRICS_DUMP_INTERVAL', default=1.0, cast=float)  # seconds between per-worker dumps
+
+# Query Inspector Settings (see apps/core/query_inspector.py)
+QUERY_INSPECTOR_ENABLED = config('QUERY_INSPECTOR_ENABLED', default=DEBUG, cast=bool)  # log N+1 patterns
+QUERY_INSPECTOR_REPEAT_THRESHOLD = config('QUERY_INSPECTOR_REPEAT_THRESHOLD', default=5, cast=int)  # same SQL per request
+
+# Document Text Extraction Settings (see apps/dms/extraction.py)
+DMS_EXTRACTION_MAX_CHARS = config('DMS_EXTRACTION_MAX_CHARS', default=200000, cast=int)  # stored per document
+DMS_EXTRACTION_TIMEOUT = config('DMS_EXTRACTION_TIMEOUT', default=60, cast=int)  # seconds per file
+DMS_EXTRACTION_MAX_ATTEMPTS = config('DMS_EXTRACTION_MAX_ATTEMPTS', default=3, cast=int)
+
+# Document File Storage Settings (see apps/dms/blobs.py)
+DMS_PURGE_AFTER_DAYS = config('DMS_PURGE_AFTER_DAYS', default=30, cast=int)  # soft-deleted documents kept
+
+# Resumable Upload Settings (see apps/dms/uploads.py)
+DMS_UPLOAD_CHUNK_SIZE = config('DMS_UPLOAD_CHUNK_SIZE', default=8 * 1024 * 1024, cast=int)  # below the 10MB request limit
+DMS_UPLOAD_MAX_SIZE = config('DMS_UPLOAD_MAX_SIZE', default=20 * 1024 ** 3, cast=int)  # bytes per file
+DMS_UPLOAD_EXPIRY_HOURS = config('DMS_UPLOAD_EXPIRY_HOURS', default=24, cast=int)  # since the last chunk
+
+# Document Download Settings (see apps/dms/downloads.py)
+DMS_SENDFILE_BACKEND = config('DMS_SENDFILE_BACKEND', default='')  # nginx, apache or '' (Django streams)
+DMS_SENDFILE_URL = config('DMS_SENDFILE_URL', default='/protected-media/')  # internal nginx location
+DMS_DOWNLOAD_URL_TTL = config('DMS_DOWNLOAD_URL_TTL', default=300, cast=int)  # seconds a signed link is valid
+
 # Email Settings
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = config('EMAIL_HOST', default='localhost')
@@ -322,6 +386,9 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@ikodio.com')
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=100, cast=int)  # messages per SMTP batch
+EMAIL_MAX_RETRIES = config('EMAIL_MAX_RETRIES', default=3, cast=int)
+EMAIL_RETRY_BASE_SECONDS = config('EMAIL_RETRY_BASE_SECONDS', default=60, cast=int)
 
 # API Documentation Settings (drf-spectacular)
 SPECTACULAR_SETTINGS = {
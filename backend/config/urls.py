@@ -14,10 +14,15 @@ from drf_spectacular.views import (
     SpectacularSwaggerView,
 )
 
+from apps.core.metrics import metrics_view
+
 urlpatterns = [
     # Admin
     path('admin/', admin.site.urls),
     
+    # Prometheus metrics
+    path('metrics', metrics_view, name='metrics'),
+    
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
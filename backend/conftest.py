@@ -0,0 +1,10 @@
+"""
+Shared pytest fixtures
+"""
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def locmem_cache(settings):
+    """Tests run without Redis: caches and throttles use process memory"""
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}